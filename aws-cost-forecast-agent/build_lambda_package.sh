@@ -93,6 +93,17 @@ build_application_package() {
     # Copy application files
     print_status "Copying application files..."
     cp "$SCRIPT_DIR/lambda_handler.py" "$app_dir/"
+    cp "$SCRIPT_DIR/payload_envelope.py" "$app_dir/"
+    cp "$SCRIPT_DIR/prewarm.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_memo.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_output.py" "$app_dir/"
+    cp "$SCRIPT_DIR/cur_cube.py" "$app_dir/"
+    cp "$SCRIPT_DIR/cost_data_plane.py" "$app_dir/"
+    cp "$SCRIPT_DIR/cost_query.py" "$app_dir/"
+    cp "$SCRIPT_DIR/date_ranges.py" "$app_dir/"
+    cp "$SCRIPT_DIR/daily_cost_cache.py" "$app_dir/"
+    cp "$SCRIPT_DIR/forecasting.py" "$app_dir/"
+    cp "$SCRIPT_DIR/direct_answers.py" "$app_dir/"
     
     # Copy any additional Python modules if they exist
     if [ -f "$SCRIPT_DIR/__init__.py" ]; then
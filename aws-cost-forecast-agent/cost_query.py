@@ -0,0 +1,368 @@
+"""
+Ad-hoc cost queries answered in one tool call.
+
+The fixed-shape tools return monthly costs by service; any other question
+(costs by region for one service, the top usage types of an account, daily
+spend over a fortnight) used to take several tool calls plus ``calculator``
+arithmetic by the model. ``run_cost_query`` instead takes a small query spec,
+validates it, fetches exactly the data it needs and returns compact
+aggregates: one row per period and group, the top N groups with the rest
+folded into "Other", and totals per period and overall.
+
+Data comes from the request's shared cost data or the local CUR cost cube
+when they cover the request (see ``cost_data_plane`` and ``cur_cube``) and
+from Cost Explorer otherwise, so specs are limited to what Cost Explorer can
+group and filter by. DAILY requests go through the interval cache in
+``daily_cost_cache``, so overlapping day ranges are fetched once.
+
+Cost Explorer answers a SERVICE filter on a name it does not know with no
+rows, which reads as $0. SERVICE filters are therefore checked against the
+services with costs in the range first: when none of the values is known
+the query fails with the closest known names, and unknown values next to
+known ones are reported in ``warnings``.
+
+Spec fields (only ``start`` is required):
+    start, end    YYYY-MM-DD, end exclusive (default: today)
+    granularity   DAILY, MONTHLY or TOTAL (default: MONTHLY)
+    group_by      Up to two of SERVICE, LINKED_ACCOUNT, REGION, USAGE_TYPE, ...
+                  (default: SERVICE; empty for totals only)
+    metrics       Cost Explorer metrics (default: UnblendedCost)
+    filters       {dimension: [values]} rows must match
+    exclude       {dimension: [values]} rows must not match
+    top_n         Groups to list, ranked by the first metric (default: 10)
+"""
+
+import difflib
+import logging
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from daily_cost_cache import get_daily_cost_and_usage
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ['SERVICE', 'LINKED_ACCOUNT', 'REGION', 'USAGE_TYPE', 'INSTANCE_TYPE', 'OPERATION',
+              'PURCHASE_TYPE', 'RECORD_TYPE']
+DIMENSION_ALIASES = {'ACCOUNT': 'LINKED_ACCOUNT', 'ACCOUNT_ID': 'LINKED_ACCOUNT', 'USAGETYPE': 'USAGE_TYPE'}
+METRICS = ['UnblendedCost', 'BlendedCost', 'AmortizedCost', 'NetUnblendedCost', 'NetAmortizedCost',
+           'UsageQuantity', 'NormalizedUsageAmount']
+GRANULARITIES = ['DAILY', 'MONTHLY', 'TOTAL']
+
+MAX_GROUP_BY = 2
+MAX_TOP_N = 50
+MAX_DAILY_DAYS = 92
+MAX_RANGE_DAYS = 730
+# Rows returned to the model, periods x (top_n + 1)
+MAX_ROWS = 600
+OTHER = 'Other'
+# Known service names suggested for an unknown one
+MAX_SUGGESTIONS = 5
+# Words too common in service names to suggest one by
+COMMON_WORDS = {'amazon', 'aws', 'service', 'services', 'and', 'for', 'the'}
+
+
+class CostQueryError(ValueError):
+    """The query spec is invalid; the message says how to fix it."""
+
+
+def _dimension(name: Any, field: str) -> str:
+    key = str(name).strip().upper().replace(' ', '_')
+    key = DIMENSION_ALIASES.get(key, key)
+    if key not in DIMENSIONS:
+        raise CostQueryError(f"{field}: unknown dimension {name!r}; use one of {', '.join(DIMENSIONS)}")
+    return key
+
+
+def _metric(name: Any) -> str:
+    for metric in METRICS:
+        if str(name).strip().replace('_', '').lower() == metric.lower():
+            return metric
+    raise CostQueryError(f"metrics: unknown metric {name!r}; use one of {', '.join(METRICS)}")
+
+
+def _date(value: Any, field: str) -> date:
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise CostQueryError(f"{field}: expected a YYYY-MM-DD date, got {value!r}")
+
+
+def _values(spec: Dict[str, Any], field: str) -> Dict[str, List[str]]:
+    conditions = spec.get(field) or {}
+    if not isinstance(conditions, dict):
+        raise CostQueryError(f"{field}: expected {{dimension: [values]}}")
+    normalized = {}
+    for name, values in conditions.items():
+        values = [values] if isinstance(values, str) else list(values or [])
+        if not values:
+            raise CostQueryError(f"{field}: no values given for {name}")
+        normalized[_dimension(name, field)] = [str(value) for value in values]
+    return normalized
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        return [part for part in (part.strip() for part in value.split(',')) if part]
+    return list(value)
+
+
+def validate_spec(spec: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Check a query spec and return it normalized.
+
+    Raises:
+        CostQueryError: With a message the model can act on
+    """
+    if not isinstance(spec, dict):
+        raise CostQueryError("Query spec must be an object")
+    unknown = set(spec) - {'start', 'end', 'granularity', 'group_by', 'metrics', 'filters', 'exclude', 'top_n'}
+    if unknown:
+        raise CostQueryError(f"Unknown spec fields: {', '.join(sorted(unknown))}")
+    if not spec.get('start'):
+        raise CostQueryError("start: required (YYYY-MM-DD)")
+
+    today = today or datetime.now().date()
+    start = _date(spec['start'], 'start')
+    end = _date(spec['end'], 'end') if spec.get('end') else today
+    if end <= start:
+        raise CostQueryError(f"end ({end}) must be after start ({start}); end is exclusive")
+    if end > today + timedelta(days=1):
+        raise CostQueryError(f"end ({end}) is in the future; use a forecast tool for future costs")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise CostQueryError(f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+    granularity = str(spec.get('granularity') or 'MONTHLY').strip().upper()
+    if granularity not in GRANULARITIES:
+        raise CostQueryError(f"granularity: use one of {', '.join(GRANULARITIES)}")
+    if granularity == 'DAILY' and (end - start).days > MAX_DAILY_DAYS:
+        raise CostQueryError(f"DAILY granularity is limited to {MAX_DAILY_DAYS} days; use MONTHLY")
+
+    group_by = []
+    for name in _as_list('SERVICE' if spec.get('group_by') is None else spec['group_by']):
+        dimension = _dimension(name, 'group_by')
+        if dimension not in group_by:
+            group_by.append(dimension)
+    if len(group_by) > MAX_GROUP_BY:
+        raise CostQueryError(f"group_by: at most {MAX_GROUP_BY} dimensions")
+
+    metrics = []
+    for name in _as_list(spec.get('metrics')) or ['UnblendedCost']:
+        metric = _metric(name)
+        if metric not in metrics:
+            metrics.append(metric)
+
+    try:
+        top_n = int(spec.get('top_n') or 10)
+    except (TypeError, ValueError):
+        raise CostQueryError(f"top_n: expected a number, got {spec.get('top_n')!r}")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise CostQueryError(f"top_n: must be between 1 and {MAX_TOP_N}")
+
+    normalized = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'group_by': group_by,
+        'metrics': metrics,
+        'filters': _values(spec, 'filters'),
+        'exclude': _values(spec, 'exclude'),
+        'top_n': top_n
+    }
+    rows = len(_periods(normalized)) * ((top_n + 1) if group_by else 1)
+    if rows > MAX_ROWS:
+        raise CostQueryError(f"Result would have {rows} rows (limit {MAX_ROWS}); "
+                             f"use a coarser granularity, a shorter range or a smaller top_n")
+    return normalized
+
+
+def _periods(spec: Dict[str, Any]) -> List[str]:
+    start = date.fromisoformat(spec['start'])
+    end = date.fromisoformat(spec['end'])
+    if spec['granularity'] == 'TOTAL':
+        return [f"{start.isoformat()}..{end.isoformat()}"]
+    periods = []
+    cursor = start
+    while cursor < end:
+        if spec['granularity'] == 'DAILY':
+            periods.append(cursor.isoformat())
+            cursor += timedelta(days=1)
+        else:
+            periods.append(cursor.strftime('%Y-%m'))
+            cursor = (cursor.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return periods
+
+
+def build_request(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """The Cost Explorer ``get_cost_and_usage`` request for a validated spec."""
+    conditions = [{'Dimensions': {'Key': key, 'Values': values}} for key, values in spec['filters'].items()]
+    conditions += [{'Not': {'Dimensions': {'Key': key, 'Values': values}}}
+                   for key, values in spec['exclude'].items()]
+    request = {
+        'TimePeriod': {'Start': spec['start'], 'End': spec['end']},
+        'Granularity': 'DAILY' if spec['granularity'] == 'DAILY' else 'MONTHLY',
+        'Metrics': spec['metrics']
+    }
+    if spec['group_by']:
+        request['GroupBy'] = [{'Type': 'DIMENSION', 'Key': key} for key in spec['group_by']]
+    if len(conditions) == 1:
+        request['Filter'] = conditions[0]
+    elif conditions:
+        request['Filter'] = {'And': conditions}
+    return request
+
+
+def _fetch(ce_client, request: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str]:
+    """All ResultsByTime pages for a request, and where they came from."""
+    results = []
+    source = 'cost_explorer'
+    token = None
+    while True:
+        response = get_daily_cost_and_usage(ce_client, **request, **({'NextPageToken': token} if token else {}))
+        source = response.get('Source', source)
+        results.extend(response.get('ResultsByTime', []))
+        token = response.get('NextPageToken')
+        if not token:
+            return results, source
+
+
+def known_services(ce_client, spec: Dict[str, Any]) -> Dict[str, float]:
+    """Unblended cost per SERVICE value over a validated spec's range, from the same data sources."""
+    results, _ = _fetch(ce_client, {
+        'TimePeriod': {'Start': spec['start'], 'End': spec['end']},
+        'Granularity': 'MONTHLY',
+        'Metrics': ['UnblendedCost'],
+        'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+    })
+    costs: Dict[str, float] = defaultdict(float)
+    for result in results:
+        for group in result.get('Groups', []):
+            costs[group['Keys'][0]] += float(group['Metrics']['UnblendedCost'].get('Amount', 0) or 0)
+    return dict(costs)
+
+
+def _suggest(value: str, known: Dict[str, float]) -> List[str]:
+    """Known service names that look like ``value``, largest first."""
+    words = {word for word in re.findall(r"[a-z0-9]+", value.lower()) if word not in COMMON_WORDS and len(word) > 1}
+    matches = {name for name in known if words & set(re.findall(r"[a-z0-9]+", name.lower()))}
+    matches.update(difflib.get_close_matches(value, list(known), n=MAX_SUGGESTIONS, cutoff=0.6))
+    return sorted(matches or known, key=lambda name: -known[name])[:MAX_SUGGESTIONS]
+
+
+def check_service_values(spec: Dict[str, Any], ce_client) -> List[str]:
+    """
+    Check a validated spec's SERVICE filter and exclude values against the known services.
+
+    Returns:
+        Warnings for unknown values that sit next to known ones
+
+    Raises:
+        CostQueryError: If no SERVICE filter value is known, naming the closest ones
+    """
+    fields = [field for field in ('filters', 'exclude') if 'SERVICE' in spec[field]]
+    if not fields:
+        return []
+    known = known_services(ce_client, spec)
+    if not known:
+        # Nothing was billed in the range, so there is nothing to compare against
+        return []
+    warnings = []
+    for field in fields:
+        values = spec[field]['SERVICE']
+        unknown = [value for value in values if value not in known]
+        hints = '; '.join(f"{value!r}: did you mean {', '.join(repr(name) for name in _suggest(value, known))}?"
+                          for value in unknown)
+        if field == 'filters' and len(unknown) == len(values):
+            raise CostQueryError(f"filters: no service named {', '.join(map(repr, unknown))} has costs "
+                                 f"between {spec['start']} and {spec['end']}; use Cost Explorer service names. {hints}")
+        if unknown:
+            warnings.append(f"{field}: no costs under SERVICE {', '.join(map(repr, unknown))}, so "
+                            f"{'they match' if field == 'filters' else 'excluding them removes'} nothing. {hints}")
+    return warnings
+
+
+def _period_key(spec: Dict[str, Any], period_start: str) -> str:
+    if spec['granularity'] == 'TOTAL':
+        return _periods(spec)[0]
+    return period_start if spec['granularity'] == 'DAILY' else period_start[:7]
+
+
+def aggregate(spec: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold Cost Explorer results into the compact answer for a validated spec."""
+    metrics = spec['metrics']
+    cells: Dict[Tuple[str, Tuple[str, ...]], List[float]] = defaultdict(lambda: [0.0] * len(metrics))
+    units = {}
+    for result in results:
+        period = _period_key(spec, result['TimePeriod']['Start'])
+        entries = result.get('Groups') or [{'Keys': [], 'Metrics': result.get('Total', {})}]
+        for entry in entries:
+            values = cells[(period, tuple(entry.get('Keys', [])))]
+            for index, metric in enumerate(metrics):
+                amount = entry['Metrics'].get(metric, {})
+                values[index] += float(amount.get('Amount', 0) or 0)
+                units.setdefault(metric, amount.get('Unit'))
+
+    # Rank groups by the first metric over the whole range
+    group_totals: Dict[Tuple[str, ...], float] = defaultdict(float)
+    for (_, keys), values in cells.items():
+        group_totals[keys] += values[0]
+    ranked = sorted(group_totals, key=lambda keys: (-group_totals[keys], keys))
+    shown = set(ranked[:spec['top_n']])
+
+    rows = []
+    period_totals = {}
+    overall = [0.0] * len(metrics)
+    for period in _periods(spec):
+        totals = [0.0] * len(metrics)
+        other = [0.0] * len(metrics)
+        period_rows = []
+        for keys in ranked:
+            values = cells.get((period, keys))
+            if values is None:
+                continue
+            totals = [total + value for total, value in zip(totals, values)]
+            if keys in shown:
+                period_rows.append([period, *keys, *[round(value, 2) for value in values]])
+            else:
+                other = [total + value for total, value in zip(other, values)]
+        if len(ranked) > len(shown) and any(other):
+            period_rows.append([period, *([OTHER] * len(spec['group_by'])), *[round(value, 2) for value in other]])
+        rows.extend(period_rows)
+        period_totals[period] = {metric: round(total, 2) for metric, total in zip(metrics, totals)}
+        overall = [total + value for total, value in zip(overall, totals)]
+
+    answer = {
+        'query': spec,
+        'columns': ['period', *spec['group_by'], *metrics],
+        'rows': rows,
+        'total': {metric: round(total, 2) for metric, total in zip(metrics, overall)},
+        'units': units
+    }
+    if spec['group_by']:
+        answer['period_totals'] = period_totals
+        answer['groups'] = {'shown': len(shown), 'total': len(ranked)}
+        if len(ranked) > len(shown):
+            answer['groups']['other'] = round(sum(group_totals[keys] for keys in ranked[len(shown):]), 2)
+    return answer
+
+
+def run_cost_query(spec: Dict[str, Any], ce_client, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Validate a spec, fetch its data and return the aggregated answer.
+
+    Raises:
+        CostQueryError: If the spec is invalid or none of its SERVICE filter values has costs
+    """
+    spec = validate_spec(spec, today)
+    warnings = check_service_values(spec, ce_client)
+    results, source = _fetch(ce_client, build_request(spec))
+    answer = aggregate(spec, results)
+    answer['source'] = source
+    if warnings:
+        answer['warnings'] = warnings
+    logger.info(f"Cost query {spec['granularity']} by {spec['group_by'] or 'total'} from {source}: "
+                f"{len(answer['rows'])} rows")
+    return answer
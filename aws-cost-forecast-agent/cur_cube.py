@@ -0,0 +1,497 @@
+"""
+Local cost cube built from Cost and Usage Report (CUR) Parquet exports.
+
+Cost Explorer calls are slow, rate-limited, charged per request and only
+group by two coarse dimensions. For accounts with a CUR export, ``build_cube``
+scans the Parquet files once, reading only the columns it needs (column
+projection), skipping row groups outside the requested dates (predicate
+pushdown on the usage start date) and memory-mapping local files. It sums
+the line items into a cube of day x service x account x region x usage type
+with unblended cost, blended cost, usage amount and line item count.
+
+``CostCube.get_cost_and_usage`` answers the subset of Cost Explorer's
+``get_cost_and_usage`` the agents use (DAILY or MONTHLY, up to two DIMENSION
+group-bys over SERVICE, LINKED_ACCOUNT, REGION and USAGE_TYPE, Dimensions
+filters) with a response of the same shape. Requests it cannot answer, or
+that fall outside the dates the cube covers, raise ``UnsupportedCubeQuery``;
+``get_cost_and_usage`` then falls back to Cost Explorer.
+
+Services are stored under Cost Explorer's SERVICE names, not CUR product
+names: EC2 instance usage is "Amazon Elastic Compute Cloud - Compute", the
+rest of EC2 (EBS, NAT gateways, data transfer, ...) "EC2 - Other", tax line
+items "Tax", and the few products Cost Explorer spells differently are
+renamed (``CE_SERVICE_NAMES``). Exports without ``product_product_name`` only have
+product codes, so SERVICE group-bys and filters on their cubes go to Cost
+Explorer, as do filters on services the cube has never seen.
+
+Build a cube from an export and point the agents at it:
+
+    python cur_cube.py --source s3://my-cur-bucket/cur/data/ --output s3://my-cur-bucket/cube/cube.parquet
+    CUR_CUBE_PATH=s3://my-cur-bucket/cube/cube.parquet
+
+Requires ``pyarrow`` (for example from the AWS SDK for pandas Lambda layer);
+without it, or without ``CUR_CUBE_PATH``, every request goes to Cost
+Explorer. pyarrow is imported on first use, so agents without a cube do not
+pay for it at cold start.
+
+This file is shared verbatim by the cost forecast and budget management agents.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ['day', 'service', 'account', 'region', 'usage_type']
+MEASURES = ['unblended_cost', 'blended_cost', 'usage_amount']
+
+# Cube column -> CUR columns that can supply it, first present wins (CUR 2.0 and legacy CUR)
+CUR_COLUMNS = {
+    'usage_start': ['line_item_usage_start_date'],
+    'service': ['product_product_name', 'product_servicecode', 'line_item_product_code'],
+    'account': ['line_item_usage_account_id'],
+    'region': ['product_region_code', 'product_region'],
+    'usage_type': ['line_item_usage_type'],
+    'unblended_cost': ['line_item_unblended_cost'],
+    'blended_cost': ['line_item_blended_cost'],
+    'usage_amount': ['line_item_usage_amount'],
+    # Only used to derive Cost Explorer service names
+    'product_code': ['line_item_product_code'],
+    'line_item_type': ['line_item_line_item_type'],
+}
+REQUIRED_COLUMNS = ('usage_start', 'service', 'account', 'unblended_cost')
+
+# Values for missing dimension data; global services have no region
+MISSING_VALUES = {'region': 'global'}
+
+# Cost Explorer splits EC2 into instance usage and everything else
+EC2_SERVICE = 'Amazon Elastic Compute Cloud'
+EC2_COMPUTE_SERVICE = 'Amazon Elastic Compute Cloud - Compute'
+EC2_OTHER_SERVICE = 'EC2 - Other'
+EC2_COMPUTE_USAGE = (r'(BoxUsage|SpotUsage|DedicatedUsage|HostUsage|HostBoxUsage|ReservedHostUsage|'
+                     r'UnusedBox|UnusedDed|UnusedHost|CPUCredits|HeavyUsage)')
+# CUR product names Cost Explorer reports under another SERVICE name
+CE_SERVICE_NAMES = {
+    'Amazon CloudWatch': 'AmazonCloudWatch',
+    'Elastic Load Balancing': 'Amazon Elastic Load Balancing',
+    'Amazon Elastic Kubernetes Service': 'Amazon Elastic Container Service for Kubernetes',
+}
+
+CE_DIMENSIONS = {'SERVICE': 'service', 'LINKED_ACCOUNT': 'account', 'REGION': 'region', 'USAGE_TYPE': 'usage_type'}
+CE_METRICS = {'UnblendedCost': ('unblended_cost', 'USD'), 'BlendedCost': ('blended_cost', 'USD'),
+              'UsageQuantity': ('usage_amount', 'N/A')}
+
+# Partial aggregates merged once this many batches have accumulated
+MERGE_EVERY_BATCHES = 16
+
+
+class UnsupportedCubeQuery(ValueError):
+    """The cube cannot answer this request; ask Cost Explorer instead."""
+
+
+def _arrow():
+    """Import pyarrow and the submodules used here on first use."""
+    import pyarrow
+    import pyarrow.compute  # noqa: F401
+    import pyarrow.dataset  # noqa: F401
+    import pyarrow.fs  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+    return pyarrow
+
+
+def _filesystem(uri: str):
+    """(filesystem, path) for a local path or URI; local files are memory-mapped."""
+    pa = _arrow()
+    if '://' not in uri:
+        return pa.fs.LocalFileSystem(use_mmap=True), os.path.abspath(uri)
+    return pa.fs.FileSystem.from_uri(uri)
+
+
+def _resolve_columns(schema) -> Dict[str, Optional[str]]:
+    names = set(schema.names)
+    columns = {column: next((name for name in candidates if name in names), None)
+               for column, candidates in CUR_COLUMNS.items()}
+    missing = [CUR_COLUMNS[column][0] for column in REQUIRED_COLUMNS if not columns[column]]
+    if missing:
+        raise ValueError(f"CUR export is missing required columns: {', '.join(missing)}")
+    return columns
+
+
+def _boundary(value: date, field_type):
+    """A date as a scalar comparable with the usage start column, for pushdown."""
+    pa = _arrow()
+    if pa.types.is_timestamp(field_type):
+        moment = datetime(value.year, value.month, value.day, tzinfo=timezone.utc if field_type.tz else None)
+        return pa.scalar(moment, type=field_type)
+    if pa.types.is_date(field_type):
+        return pa.scalar(value, type=field_type)
+    return value.isoformat()
+
+
+def _normalize(batch, columns: Dict[str, Optional[str]]):
+    """A scanned batch as cube columns: a date32 day, string dimensions, float64 measures."""
+    pa = _arrow()
+    pc = pa.compute
+    usage_start = batch.column(columns['usage_start'])
+    if pa.types.is_timestamp(usage_start.type) or pa.types.is_date(usage_start.type):
+        day = pc.cast(usage_start, pa.date32())
+    else:
+        day = pc.cast(pc.utf8_slice_codeunits(pc.cast(usage_start, pa.string()), 0, 10), pa.date32())
+
+    arrays = {'day': day}
+    for dimension in DIMENSIONS[1:]:
+        if columns[dimension]:
+            values = pc.cast(batch.column(columns[dimension]), pa.string())
+        else:
+            values = pa.nulls(batch.num_rows, pa.string())
+        arrays[dimension] = pc.fill_null(values, MISSING_VALUES.get(dimension, 'Unknown'))
+    arrays['service'] = _ce_service(batch, columns, arrays['service'], arrays['usage_type'])
+    for measure in MEASURES:
+        if columns[measure]:
+            arrays[measure] = pc.fill_null(pc.cast(batch.column(columns[measure]), pa.float64()), 0.0)
+        else:
+            arrays[measure] = pa.array([0.0] * batch.num_rows, pa.float64())
+    return pa.table(arrays)
+
+
+def _ce_service(batch, columns: Dict[str, Optional[str]], service, usage_type):
+    """Product names as Cost Explorer SERVICE values: EC2 split into compute and other, tax as "Tax"."""
+    pa = _arrow()
+    pc = pa.compute
+    for product_name, ce_name in CE_SERVICE_NAMES.items():
+        service = pc.if_else(pc.equal(service, product_name), ce_name, service)
+    is_ec2 = pc.equal(service, EC2_SERVICE)
+    if columns['product_code']:
+        product_code = pc.cast(batch.column(columns['product_code']), pa.string())
+        is_ec2 = pc.or_(is_ec2, pc.fill_null(pc.equal(product_code, 'AmazonEC2'), False))
+    ec2 = pc.if_else(pc.match_substring_regex(usage_type, EC2_COMPUTE_USAGE), EC2_COMPUTE_SERVICE, EC2_OTHER_SERVICE)
+    service = pc.if_else(is_ec2, ec2, service)
+    if columns['line_item_type']:
+        line_item_type = pc.cast(batch.column(columns['line_item_type']), pa.string())
+        service = pc.if_else(pc.fill_null(pc.equal(line_item_type, 'Tax'), False), 'Tax', service)
+    return service
+
+
+def _aggregate(table, line_items_column: Optional[str] = None):
+    """Sum measures (and line items) over the cube dimensions."""
+    aggregations = [(measure, 'sum') for measure in MEASURES]
+    aggregations.append((line_items_column, 'sum') if line_items_column else ('unblended_cost', 'count'))
+    grouped = table.group_by(DIMENSIONS, use_threads=True).aggregate(aggregations)
+    names = {f"{measure}_sum": measure for measure in MEASURES}
+    names.update({'line_items_sum': 'line_items', 'unblended_cost_count': 'line_items'})
+    return grouped.rename_columns([names.get(name, name) for name in grouped.column_names])
+
+
+def _merge(partials: List[Any]):
+    pa = _arrow()
+    if len(partials) == 1:
+        return partials[0]
+    return _aggregate(pa.concat_tables(partials), line_items_column='line_items')
+
+
+def build_cube(source: str, start: Optional[date] = None, end: Optional[date] = None,
+               accounts: Optional[List[str]] = None, batch_rows: int = 1 << 20) -> 'CostCube':
+    """
+    Scan CUR Parquet files and aggregate them into a cube.
+
+    Args:
+        source: Parquet file or directory, local or any URI pyarrow supports (s3://...)
+        start: First usage day to include
+        end: Day after the last usage day to include
+        accounts: Only include these usage account IDs
+        batch_rows: Rows per scanned batch; bounds memory use
+
+    Returns:
+        The cube, covering [start, end) or the days present in the export
+    """
+    pa = _arrow()
+    ds = pa.dataset
+    started = time.perf_counter()
+    filesystem, path = _filesystem(source)
+    dataset = ds.dataset(path, format='parquet', filesystem=filesystem)
+    columns = _resolve_columns(dataset.schema)
+
+    usage_start = columns['usage_start']
+    field_type = dataset.schema.field(usage_start).type
+    condition = None
+    if start:
+        condition = ds.field(usage_start) >= _boundary(start, field_type)
+    if end:
+        upper = ds.field(usage_start) < _boundary(end, field_type)
+        condition = upper if condition is None else condition & upper
+    if accounts:
+        in_accounts = ds.field(columns['account']).isin(accounts)
+        condition = in_accounts if condition is None else condition & in_accounts
+
+    projected = sorted({name for name in columns.values() if name})
+    scanner = dataset.scanner(columns=projected, filter=condition, batch_size=batch_rows)
+
+    partials = []
+    line_items = 0
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        line_items += batch.num_rows
+        partials.append(_aggregate(_normalize(batch, columns)))
+        if len(partials) >= MERGE_EVERY_BATCHES:
+            partials = [_merge(partials)]
+
+    if partials:
+        table = _merge(partials)
+    else:
+        table = _normalize(pa.record_batch([pa.array([], dataset.schema.field(name).type) for name in projected],
+                                           names=projected), columns)
+        table = _aggregate(table)
+
+    days = table.column('day')
+    first = start or (pa.compute.min(days).as_py() if len(table) else None)
+    last = end or (pa.compute.max(days).as_py() + timedelta(days=1) if len(table) else None)
+    table = table.sort_by([('day', 'ascending'), ('service', 'ascending')])
+    metadata = {
+        'cube.start': first.isoformat() if first else '',
+        'cube.end': last.isoformat() if last else '',
+        'cube.measures': json.dumps([measure for measure in MEASURES if columns[measure]]),
+        # Product codes are not Cost Explorer service names
+        'cube.service_names': 'cost_explorer' if columns['service'] == 'product_product_name' else 'product_code',
+        'cube.line_items': str(line_items),
+        'cube.source': source,
+        'cube.built_at': datetime.now(timezone.utc).isoformat()
+    }
+    cube = CostCube(table.replace_schema_metadata(metadata))
+    logger.info(f"Built cost cube from {line_items} line items into {len(table)} cells "
+                f"in {time.perf_counter() - started:.1f}s")
+    return cube
+
+
+class CostCube:
+    """Pre-aggregated CUR costs that answer Cost Explorer style requests locally."""
+
+    def __init__(self, table):
+        self.table = table
+        metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+        self.start = date.fromisoformat(metadata['cube.start']) if metadata.get('cube.start') else None
+        self.end = date.fromisoformat(metadata['cube.end']) if metadata.get('cube.end') else None
+        self.measures = set(json.loads(metadata.get('cube.measures', json.dumps(MEASURES))))
+        self.line_items = int(metadata.get('cube.line_items', '0'))
+        # Cubes built before services were named as in Cost Explorer lack the flag
+        self.ce_service_names = metadata.get('cube.service_names') == 'cost_explorer'
+        self._months = None
+        self._services = None
+
+    def services(self) -> set:
+        """Every service name in the cube."""
+        if self._services is None:
+            self._services = set(_arrow().compute.unique(self.table.column('service')).to_pylist())
+        return self._services
+
+    def months(self):
+        """The cube rolled up to month granularity (``day`` is the first of the month), built on first use."""
+        if self._months is None:
+            pc = _arrow().compute
+            month = pc.floor_temporal(self.table.column('day'), unit='month')
+            table = self.table.set_column(self.table.column_names.index('day'), 'day', month)
+            self._months = _aggregate(table, line_items_column='line_items')
+        return self._months
+
+    @classmethod
+    def load(cls, uri: str) -> 'CostCube':
+        pa = _arrow()
+        filesystem, path = _filesystem(uri)
+        return cls(pa.parquet.read_table(path, filesystem=filesystem, memory_map=True))
+
+    def save(self, uri: str):
+        pa = _arrow()
+        filesystem, path = _filesystem(uri)
+        if isinstance(filesystem, pa.fs.LocalFileSystem):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        pa.parquet.write_table(self.table, path, filesystem=filesystem, compression='zstd')
+
+    def covers(self, start: date, end: date) -> bool:
+        """True when [start, end) lies within the days the cube was built from."""
+        return bool(self.start and self.end and self.start <= start and end <= self.end)
+
+    def _filter_mask(self, table, request_filter: Optional[Dict[str, Any]]):
+        pa = _arrow()
+        pc = pa.compute
+        if not request_filter:
+            return None
+        if 'And' in request_filter:
+            masks = [self._filter_mask(table, part) for part in request_filter['And']]
+            mask = masks[0]
+            for other in masks[1:]:
+                mask = pc.and_(mask, other)
+            return mask
+        dimensions = request_filter.get('Dimensions')
+        if set(request_filter) != {'Dimensions'} or dimensions.get('Key') not in CE_DIMENSIONS:
+            raise UnsupportedCubeQuery(f"Unsupported filter: {json.dumps(request_filter)[:200]}")
+        if set(dimensions.get('MatchOptions') or ['EQUALS']) != {'EQUALS'}:
+            raise UnsupportedCubeQuery("Only EQUALS dimension filters are supported")
+        if dimensions['Key'] == 'SERVICE':
+            if not self.ce_service_names:
+                raise UnsupportedCubeQuery("The cube's services are product codes, not Cost Explorer names")
+            unknown = set(dimensions.get('Values', [])) - self.services()
+            if unknown:
+                raise UnsupportedCubeQuery(f"Services not in the cube: {sorted(unknown)}")
+        return pc.is_in(table.column(CE_DIMENSIONS[dimensions['Key']]),
+                        value_set=pa.array(dimensions.get('Values', []), pa.string()))
+
+    @staticmethod
+    def _periods(start: date, end: date, granularity: str) -> List[Tuple[date, date]]:
+        periods = []
+        cursor = start
+        while cursor < end:
+            if granularity == 'DAILY':
+                boundary = cursor + timedelta(days=1)
+            else:
+                boundary = (cursor.replace(day=1) + timedelta(days=32)).replace(day=1)
+            periods.append((cursor, min(boundary, end)))
+            cursor = boundary
+        return periods
+
+    def get_cost_and_usage(self, TimePeriod: Dict[str, str], Granularity: str = 'MONTHLY',
+                           Metrics: Optional[List[str]] = None, GroupBy: Optional[List[Dict[str, str]]] = None,
+                           Filter: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Answer a Cost Explorer ``get_cost_and_usage`` request from the cube.
+
+        Raises:
+            UnsupportedCubeQuery: If the request uses features the cube does
+                not model or dates it does not cover
+        """
+        pa = _arrow()
+        pc = pa.compute
+        if any(value for value in kwargs.values()):
+            raise UnsupportedCubeQuery(f"Unsupported parameters: {sorted(kwargs)}")
+        if Granularity not in ('DAILY', 'MONTHLY'):
+            raise UnsupportedCubeQuery(f"Unsupported granularity: {Granularity}")
+        metrics = Metrics or ['UnblendedCost']
+        for metric in metrics:
+            if metric not in CE_METRICS or CE_METRICS[metric][0] not in self.measures:
+                raise UnsupportedCubeQuery(f"Unsupported metric: {metric}")
+        group_by = GroupBy or []
+        if len(group_by) > 2 or any(group.get('Type') != 'DIMENSION' or group.get('Key') not in CE_DIMENSIONS
+                                    for group in group_by):
+            raise UnsupportedCubeQuery(f"Unsupported group by: {group_by}")
+        if not self.ce_service_names and any(group['Key'] == 'SERVICE' for group in group_by):
+            raise UnsupportedCubeQuery("The cube's services are product codes, not Cost Explorer names")
+        start = date.fromisoformat(TimePeriod['Start'])
+        end = date.fromisoformat(TimePeriod['End'])
+        if not self.covers(start, end):
+            raise UnsupportedCubeQuery(f"{start} to {end} is outside the cube ({self.start} to {self.end})")
+
+        # Whole-month requests read the much smaller monthly rollup
+        whole_months = Granularity == 'MONTHLY' and start.day == 1 and end.day == 1
+        table = self.months() if whole_months else self.table
+        day = table.column('day')
+        mask = pc.and_(pc.greater_equal(day, pa.scalar(start, pa.date32())),
+                       pc.less(day, pa.scalar(end, pa.date32())))
+        filter_mask = self._filter_mask(table, Filter)
+        if filter_mask is not None:
+            mask = pc.and_(mask, filter_mask)
+        table = table.filter(mask)
+
+        periods = self._periods(start, end, Granularity)
+        if Granularity == 'MONTHLY':
+            period_keys = table.column('day') if whole_months else pc.floor_temporal(table.column('day'), unit='month')
+            key_of = {period_start.replace(day=1): (period_start, period_end) for period_start, period_end in periods}
+        else:
+            period_keys = table.column('day')
+            key_of = {period_start: (period_start, period_end) for period_start, period_end in periods}
+        table = table.append_column('period', period_keys)
+
+        dimensions = [CE_DIMENSIONS[group['Key']] for group in group_by]
+        measures = sorted({CE_METRICS[metric][0] for metric in metrics})
+        grouped = table.group_by(['period'] + dimensions).aggregate([(measure, 'sum') for measure in measures])
+
+        cells: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in grouped.to_pylist():
+            cells.setdefault(row['period'], []).append(row)
+
+        def amounts(row):
+            return {metric: {'Amount': str(round(row[f"{CE_METRICS[metric][0]}_sum"], 10)),
+                             'Unit': CE_METRICS[metric][1]} for metric in metrics}
+
+        results = []
+        for key, (period_start, period_end) in key_of.items():
+            rows = sorted(cells.get(key, []), key=lambda row: [row[dimension] for dimension in dimensions])
+            entry = {'TimePeriod': {'Start': period_start.isoformat(), 'End': period_end.isoformat()},
+                     'Estimated': False}
+            if dimensions:
+                entry['Total'] = {}
+                entry['Groups'] = [{'Keys': [row[dimension] for dimension in dimensions], 'Metrics': amounts(row)}
+                                   for row in rows]
+            else:
+                total = rows[0] if rows else {f"{measure}_sum": 0.0 for measure in measures}
+                entry['Total'] = amounts(total)
+                entry['Groups'] = []
+            results.append(entry)
+        return {'GroupDefinitions': group_by, 'ResultsByTime': results, 'DimensionValueAttributes': [],
+                'Source': 'cur_cube'}
+
+
+# Loaded once per container and reloaded after CUR_CUBE_REFRESH_SECONDS
+_cube: Optional[CostCube] = None
+_cube_uri = None
+_cube_loaded_at = 0.0
+_cube_lock = threading.Lock()
+
+
+def get_cost_cube() -> Optional[CostCube]:
+    """The cube at CUR_CUBE_PATH, or None when unset, pyarrow is missing or loading fails."""
+    global _cube, _cube_uri, _cube_loaded_at
+    uri = os.environ.get('CUR_CUBE_PATH')
+    if not uri:
+        return None
+    refresh = float(os.environ.get('CUR_CUBE_REFRESH_SECONDS', '3600'))
+    with _cube_lock:
+        if uri != _cube_uri or time.time() - _cube_loaded_at > refresh:
+            # Failed loads are not retried until the next refresh either
+            if uri != _cube_uri:
+                _cube = None
+            _cube_uri = uri
+            _cube_loaded_at = time.time()
+            try:
+                _cube = CostCube.load(uri)
+                logger.info(f"Loaded cost cube {uri}: {len(_cube.table)} cells, {_cube.start} to {_cube.end}")
+            except Exception as e:
+                # Keep serving the previous copy of this cube, if any, until the next refresh
+                logger.warning(f"Could not load cost cube {uri}: {str(e)}")
+        return _cube
+
+
+def get_cost_and_usage(ce_client, **request) -> Dict[str, Any]:
+    """``ce_client.get_cost_and_usage(**request)``, answered from the cost cube when it can."""
+    cube = get_cost_cube()
+    if cube is not None:
+        try:
+            return cube.get_cost_and_usage(**request)
+        except UnsupportedCubeQuery as e:
+            logger.info(f"Cost cube cannot answer request, using Cost Explorer: {str(e)}")
+    return ce_client.get_cost_and_usage(**request)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a cost cube from CUR Parquet files")
+    parser.add_argument('--source', required=True, help="CUR Parquet file or directory (local path or s3://...)")
+    parser.add_argument('--output', required=True, help="Where to write the cube Parquet file")
+    parser.add_argument('--start', type=date.fromisoformat, help="First usage day (YYYY-MM-DD)")
+    parser.add_argument('--end', type=date.fromisoformat, help="Day after the last usage day (YYYY-MM-DD)")
+    parser.add_argument('--accounts', help="Comma-separated usage account IDs to include")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    accounts = [account.strip() for account in args.accounts.split(',')] if args.accounts else None
+    cube = build_cube(args.source, args.start, args.end, accounts)
+    cube.save(args.output)
+    print(f"{cube.line_items} line items -> {len(cube.table)} cells, {cube.start} to {cube.end}: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
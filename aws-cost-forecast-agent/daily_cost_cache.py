@@ -0,0 +1,195 @@
+"""
+Interval cache for daily-granularity cost data.
+
+Daily trend and anomaly questions ask for overlapping day ranges: "last 30
+days" today and again tomorrow, the last two weeks of it next hour. Cost
+Explorer bills per request and charges the same for one day as for ninety,
+so the cache keeps each day's result per request shape, metrics plus group
+by plus filter, and answers a DAILY request by assembling the cached days.
+Only the days it lacks are fetched, with contiguous missing days merged
+into one request, so a rolling 30-day window asked every day costs one
+Cost Explorer call for its newest days.
+
+A day is closed once ``DAILY_COST_CACHE_SETTLE_DAYS`` full days have passed
+since it ended (Cost Explorer finishes a day's charges within about a
+day). A closed day fetched after it closed is kept until evicted; days
+fetched while still open are refreshed after
+``DAILY_COST_CACHE_OPEN_TTL_SECONDS``. Gaps are fetched through
+``cost_data_plane``, so the request's shared cost data and the CUR cube
+answer them when they can.
+
+Entries live in the warm Lambda container, like the other caches here.
+
+Environment flags:
+    DAILY_COST_CACHE_ENABLED          Keep daily results between requests (default: true)
+    DAILY_COST_CACHE_SETTLE_DAYS      Full days after which a day's costs are final (default: 1)
+    DAILY_COST_CACHE_OPEN_TTL_SECONDS Refresh days that were still open after this long (default: 14400)
+    DAILY_COST_CACHE_MAX_KEYS         Request shapes kept, least recently used dropped first (default: 32)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from cost_data_plane import get_cost_and_usage
+
+logger = logging.getLogger(__name__)
+
+
+class _Days:
+    """Cached days of one request shape."""
+
+    def __init__(self):
+        # day -> (ResultsByTime entry, fetched at, closed when fetched)
+        self.days: Dict[date, Tuple[Dict[str, Any], float, bool]] = {}
+        self.lock = threading.Lock()
+
+
+class DailyCostCache:
+    """Day results per request shape, assembled into DAILY Cost Explorer responses."""
+
+    def __init__(self, enabled: Optional[bool] = None, settle_days: Optional[int] = None,
+                 open_ttl: Optional[float] = None, max_keys: Optional[int] = None,
+                 clock: Callable[[], float] = time.time):
+        self.enabled = enabled if enabled is not None else \
+            os.environ.get('DAILY_COST_CACHE_ENABLED', 'true').lower() == 'true'
+        self.settle_days = settle_days if settle_days is not None else \
+            int(os.environ.get('DAILY_COST_CACHE_SETTLE_DAYS', '1'))
+        self.open_ttl = open_ttl if open_ttl is not None else \
+            float(os.environ.get('DAILY_COST_CACHE_OPEN_TTL_SECONDS', '14400'))
+        self.max_keys = max_keys if max_keys is not None else \
+            int(os.environ.get('DAILY_COST_CACHE_MAX_KEYS', '32'))
+        self.clock = clock
+        self._keys: 'OrderedDict[str, _Days]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'cached_days': 0, 'fetched_days': 0, 'calls': 0}
+
+    def today(self) -> date:
+        return datetime.fromtimestamp(self.clock()).date()
+
+    def closed(self, day: date, today: date) -> bool:
+        """Whether a day's costs are final."""
+        return day < today - timedelta(days=self.settle_days)
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Metrics, group by and filter: everything but the dates."""
+        return json.dumps({
+            'metrics': sorted(request.get('Metrics') or ['UnblendedCost']),
+            'group_by': request.get('GroupBy') or [],
+            'filter': request.get('Filter')
+        }, sort_keys=True, separators=(',', ':'))
+
+    def _entry(self, key: str) -> _Days:
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = _Days()
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+            return entry
+
+    def missing_ranges(self, entry: _Days, start: date, end: date) -> List[Tuple[date, date]]:
+        """The days of [start, end) to fetch, contiguous days merged into one range."""
+        now = self.clock()
+        gaps: List[Tuple[date, date]] = []
+        day = start
+        while day < end:
+            cached = entry.days.get(day)
+            fresh = cached is not None and (cached[2] or now - cached[1] < self.open_ttl)
+            if not fresh:
+                if gaps and gaps[-1][1] == day:
+                    gaps[-1] = (gaps[-1][0], day + timedelta(days=1))
+                else:
+                    gaps.append((day, day + timedelta(days=1)))
+            day += timedelta(days=1)
+        return gaps
+
+    def _fetch(self, ce_client, request: Dict[str, Any], start: date, end: date) -> Tuple[List[Dict[str, Any]], str]:
+        results = []
+        source = 'cost_explorer'
+        token = None
+        gap_request = dict(request, TimePeriod={'Start': start.isoformat(), 'End': end.isoformat()})
+        while True:
+            response = get_cost_and_usage(ce_client, **gap_request, **({'NextPageToken': token} if token else {}))
+            with self._lock:
+                self.stats['calls'] += 1
+            source = response.get('Source', source)
+            results.extend(response.get('ResultsByTime', []))
+            token = response.get('NextPageToken')
+            if not token:
+                return results, source
+
+    def get_cost_and_usage(self, ce_client, **request) -> Dict[str, Any]:
+        """
+        A DAILY ``get_cost_and_usage`` response assembled from cached days,
+        fetching only the missing ranges.
+        """
+        if request.get('Granularity') != 'DAILY' or request.get('NextPageToken') or not self.enabled:
+            return get_cost_and_usage(ce_client, **request)
+        start = date.fromisoformat(request['TimePeriod']['Start'])
+        end = date.fromisoformat(request['TimePeriod']['End'])
+        entry = self._entry(self.make_key(request))
+        sources = set()
+
+        # One fetch per shape at a time, so concurrent requests do not fetch the same days twice
+        with entry.lock:
+            gaps = self.missing_ranges(entry, start, end)
+            today = self.today()
+            for gap_start, gap_end in gaps:
+                results, source = self._fetch(ce_client, request, gap_start, gap_end)
+                sources.add(source)
+                fetched_at = self.clock()
+                returned = {date.fromisoformat(result['TimePeriod']['Start']): result for result in results}
+                day = gap_start
+                while day < gap_end:
+                    # Days Cost Explorer has nothing for yet are cached empty, like any open day
+                    result = returned.get(day) or {
+                        'TimePeriod': {'Start': day.isoformat(), 'End': (day + timedelta(days=1)).isoformat()},
+                        'Total': {}, 'Groups': [], 'Estimated': True}
+                    entry.days[day] = (result, fetched_at, self.closed(day, today))
+                    day += timedelta(days=1)
+            days = [entry.days[start + timedelta(days=offset)][0] for offset in range((end - start).days)]
+
+        fetched = sum((gap_end - gap_start).days for gap_start, gap_end in gaps)
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['fetched_days'] += fetched
+            self.stats['cached_days'] += len(days) - fetched
+        if gaps:
+            logger.info(f"Daily cost cache: {len(days) - fetched} days cached, fetched "
+                        f"{', '.join(f'{s} to {e}' for s, e in gaps)}")
+        return {
+            'GroupDefinitions': request.get('GroupBy') or [],
+            'ResultsByTime': days,
+            'DimensionValueAttributes': [],
+            'Source': 'daily_cost_cache' if not gaps else '+'.join(sorted(sources)),
+            'CacheStats': {'cached_days': len(days) - fetched, 'fetched_days': fetched, 'fetches': len(gaps)}
+        }
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+# Shared across invocations in a warm container
+_daily_cost_cache = None
+
+
+def get_daily_cost_cache() -> DailyCostCache:
+    """Return the container-wide daily cost cache."""
+    global _daily_cost_cache
+    if _daily_cost_cache is None:
+        _daily_cost_cache = DailyCostCache()
+    return _daily_cost_cache
+
+
+def get_daily_cost_and_usage(ce_client, **request) -> Dict[str, Any]:
+    """``cost_data_plane.get_cost_and_usage`` with DAILY requests served through the interval cache."""
+    return get_daily_cost_cache().get_cost_and_usage(ce_client, **request)
@@ -0,0 +1,344 @@
+"""
+Date expressions resolved to cache-aligned Cost Explorer ranges.
+
+``resolve_period`` turns what a user or the model writes for a time period
+into one date range: relative expressions (last month, last quarter, YTD,
+trailing 90 days, this fiscal year) and absolute ones (2025-04, April 2025,
+APRIL_2025, Q1 2025, H1 2025, FY2025, 2025-04-01 to 2025-04-15, January
+through March). An expression it cannot read raises ``DateRangeError``
+instead of quietly becoming some other range.
+
+Ranges are built so that overlapping questions ask Cost Explorer, the
+shared cost data and the CUR cube for the same entries:
+
+- start and end are whole days, end exclusive as Cost Explorer expects
+- whole months always run from the 1st to the next 1st, however they were
+  asked for; a month in progress ends tomorrow, so it includes today
+- ``period_buckets`` splits a range at month boundaries, so "last quarter",
+  "April 2025" and "last 90 days" share their whole-month buckets and only
+  the partial months at the edges are fetched separately
+
+Fiscal years are named by the calendar year they end in (with
+``FISCAL_YEAR_START_MONTH=7``, FY2025 runs from July 2024 through June 2025).
+
+Environment flags:
+    FISCAL_YEAR_START_MONTH  First month of the fiscal year, 1-12 (default: 1)
+"""
+
+import calendar
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+MAX_TRAILING_DAYS = 730
+MAX_TRAILING_MONTHS = 36
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+EXAMPLES = ("this month, last month, last 3 months, last 90 days, this quarter, last quarter, YTD, last year, "
+            "this fiscal year, 2025-04, April 2025, Q1 2025, H1 2025, FY2025, 2025, "
+            "2025-04-01 to 2025-04-15, January through March 2025")
+
+
+class DateRangeError(ValueError):
+    """The expression cannot be resolved; the message lists what can."""
+
+
+def fiscal_year_start_month() -> int:
+    month = int(os.environ.get('FISCAL_YEAR_START_MONTH', '1'))
+    if not 1 <= month <= 12:
+        raise DateRangeError(f"FISCAL_YEAR_START_MONTH must be 1-12, got {month}")
+    return month
+
+
+def add_months(day: date, months: int) -> date:
+    """The first of the month ``months`` after (or before) ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(year_month: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """A YYYY-MM month as (start, end exclusive), ending tomorrow while it is in progress."""
+    today = today or datetime.now().date()
+    try:
+        if not re.fullmatch(r"\d{4}-\d{2}", year_month.strip()):
+            raise ValueError(year_month)
+        start = date(int(year_month[:4]), int(year_month[5:7]), 1)
+    except ValueError:
+        raise DateRangeError(f"Expected a YYYY-MM month, got {year_month!r}")
+    return start, min(add_months(start, 1), today + timedelta(days=1))
+
+
+def _months_between(start: date, end: date) -> List[str]:
+    months = []
+    cursor = start.replace(day=1)
+    while cursor < end:
+        months.append(cursor.strftime('%Y-%m'))
+        cursor = add_months(cursor, 1)
+    return months
+
+
+def period_buckets(start: date, end: date) -> List[Tuple[date, date]]:
+    """A range split at month boundaries: whole months plus the partial months at either end."""
+    buckets = []
+    cursor = start
+    while cursor < end:
+        boundary = min(add_months(cursor, 1), end)
+        buckets.append((cursor, boundary))
+        cursor = boundary
+    return buckets
+
+
+def _year(text: Optional[str]) -> Optional[int]:
+    if not text:
+        return None
+    year = int(text)
+    return year + 2000 if year < 100 else year
+
+
+def _latest_month(month: int, today: date) -> int:
+    """The year of the most recent occurrence of a month, this one included."""
+    return today.year if month <= today.month else today.year - 1
+
+
+def _fiscal_year_start(fiscal_year: int) -> date:
+    month = fiscal_year_start_month()
+    return date(fiscal_year - 1 if month > 1 else fiscal_year, month, 1)
+
+
+def _current_fiscal_year(today: date) -> int:
+    month = fiscal_year_start_month()
+    return today.year + 1 if month > 1 and today.month >= month else today.year
+
+
+def _quarter_start(day: date) -> date:
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _normalize(expression: str) -> str:
+    text = str(expression).strip().lower().replace('_', ' ')
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", ' ', text)
+    text = re.sub(r"\b(?:the|of|in|for)\b", ' ', text)
+    return ' '.join(text.split())
+
+
+def _relative(text: str, today: date) -> Optional[Tuple[date, date, str]]:
+    """Ranges relative to today, or None when the text is not one."""
+    tomorrow = today + timedelta(days=1)
+    this_month = today.replace(day=1)
+    month_label = f"{calendar.month_name[today.month]} {today.year}"
+
+    if text == 'today':
+        return today, tomorrow, 'today'
+    if text == 'yesterday':
+        return today - timedelta(days=1), today, 'yesterday'
+    if text in ('this month', 'current month', 'month to date', 'mtd', 'this month to date'):
+        return this_month, tomorrow, f"{month_label} to date"
+    if text in ('last month', 'previous month', 'prior month'):
+        start = add_months(this_month, -1)
+        return start, this_month, f"{calendar.month_name[start.month]} {start.year}"
+    if text in ('this week', 'week to date', 'wtd'):
+        return _week_start(today), tomorrow, 'this week to date'
+    if text in ('last week', 'previous week', 'prior week'):
+        start = _week_start(today) - timedelta(days=7)
+        return start, start + timedelta(days=7), f"the week of {start.isoformat()}"
+    if text in ('this quarter', 'current quarter', 'quarter to date', 'qtd'):
+        start = _quarter_start(today)
+        return start, tomorrow, f"Q{(start.month - 1) // 3 + 1} {start.year} to date"
+    if text in ('last quarter', 'previous quarter', 'prior quarter'):
+        start = add_months(_quarter_start(today), -3)
+        return start, add_months(start, 3), f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    if text in ('this year', 'current year', 'year to date', 'ytd'):
+        return date(today.year, 1, 1), tomorrow, f"{today.year} year to date"
+    if text in ('last year', 'previous year', 'prior year'):
+        return date(today.year - 1, 1, 1), date(today.year, 1, 1), str(today.year - 1)
+    if text in ('this fiscal year', 'current fiscal year', 'fiscal year to date', 'fytd'):
+        fiscal_year = _current_fiscal_year(today)
+        return _fiscal_year_start(fiscal_year), tomorrow, f"FY{fiscal_year} to date"
+    if text in ('last fiscal year', 'previous fiscal year', 'prior fiscal year'):
+        fiscal_year = _current_fiscal_year(today) - 1
+        start = _fiscal_year_start(fiscal_year)
+        return start, add_months(start, 12), f"FY{fiscal_year}"
+
+    match = re.fullmatch(r"(?:last|past|previous|trailing) (\d{1,3}) (day|week|month|quarter)s?", text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        if unit in ('day', 'week'):
+            days = count * (7 if unit == 'week' else 1)
+            if not 1 <= days <= MAX_TRAILING_DAYS:
+                raise DateRangeError(f"Trailing ranges are limited to {MAX_TRAILING_DAYS} days")
+            return today - timedelta(days=days), today, f"the last {count} {unit}s" if count > 1 else f"the last {unit}"
+        months = count * (3 if unit == 'quarter' else 1)
+        if not 1 <= months <= MAX_TRAILING_MONTHS:
+            raise DateRangeError(f"Trailing ranges are limited to {MAX_TRAILING_MONTHS} months")
+        # Whole months before this one, so the buckets are shared
+        return add_months(this_month, -months), this_month, f"the last {count} {unit}s" if count > 1 else f"the last {unit}"
+    return None
+
+
+def _absolute(text: str, today: date) -> Optional[Tuple[date, date, str]]:
+    """Named days, months, quarters, halves and years, or None when the text is not one."""
+    match = re.fullmatch(r"(\d{4})-(\d{2})-(\d{2})", text)
+    if match:
+        try:
+            day = date.fromisoformat(text)
+        except ValueError:
+            raise DateRangeError(f"Not a valid date: {text}")
+        return day, day + timedelta(days=1), day.isoformat()
+
+    match = (re.fullmatch(r"(\d{4})-(\d{2})", text) or re.fullmatch(rf"({MONTH_NAMES}) (\d{{4}})", text)
+             or re.fullmatch(rf"(\d{{4}}) ({MONTH_NAMES})", text) or re.fullmatch(rf"({MONTH_NAMES})", text))
+    if match:
+        parts = match.groups()
+        if len(parts) == 1:
+            month = MONTHS[parts[0]]
+            year = _latest_month(month, today)
+        elif parts[0].isdigit() and parts[1].isdigit():
+            year, month = int(parts[0]), int(parts[1])
+        elif parts[0].isdigit():
+            year, month = int(parts[0]), MONTHS[parts[1]]
+        else:
+            year, month = int(parts[1]), MONTHS[parts[0]]
+        if not 1 <= month <= 12:
+            raise DateRangeError(f"Not a valid month: {text}")
+        start = date(year, month, 1)
+        return start, add_months(start, 1), f"{calendar.month_name[month]} {year}"
+
+    match = re.fullmatch(r"q([1-4])(?: (\d{2}|\d{4}))?", text) or re.fullmatch(r"(\d{4}) ?q([1-4])", text)
+    if match:
+        if match.group(1).isdigit() and len(match.group(1)) == 4:
+            year, quarter = int(match.group(1)), int(match.group(2))
+        else:
+            quarter, year = int(match.group(1)), _year(match.group(2))
+        if year is None:
+            # The most recent such quarter, this one included
+            year = today.year if date(today.year, quarter * 3 - 2, 1) <= today else today.year - 1
+        start = date(year, quarter * 3 - 2, 1)
+        return start, add_months(start, 3), f"Q{quarter} {year}"
+
+    match = (re.fullmatch(r"h([12]) (\d{4})", text) or re.fullmatch(r"(\d{4}) h([12])", text)
+             or re.fullmatch(r"(first|second) half (\d{4})", text))
+    if match:
+        first, second = match.groups()
+        if first.isdigit() and len(first) == 4:
+            half, year = int(second), int(first)
+        else:
+            half, year = (1 if first in ('1', 'first') else 2), int(second)
+        start = date(year, 1 if half == 1 else 7, 1)
+        return start, add_months(start, 6), f"H{half} {year}"
+
+    match = re.fullmatch(r"(?:fy ?|fiscal year |fiscal )(\d{2}|\d{4})", text)
+    if match:
+        fiscal_year = _year(match.group(1))
+        start = _fiscal_year_start(fiscal_year)
+        return start, add_months(start, 12), f"FY{fiscal_year}"
+
+    match = re.fullmatch(r"(?:cy ?|calendar year |year )?(\d{4})", text)
+    if match:
+        year = int(match.group(1))
+        return date(year, 1, 1), date(year + 1, 1, 1), str(year)
+    return None
+
+
+def _resolve(text: str, today: date) -> Optional[Tuple[date, date, str]]:
+    found = _relative(text, today) or _absolute(text, today)
+    if found:
+        return found
+
+    match = re.fullmatch(r"since (.+)", text)
+    if match:
+        found = _resolve(match.group(1), today)
+        if found:
+            return found[0], today + timedelta(days=1), f"since {found[2]}"
+        return None
+
+    match = re.fullmatch(r"(?:from )?(.+?) ?(?: to | through | thru | until | - |\.\.) ?(.+)", text)
+    if match:
+        first, last = match.groups()
+        year = re.search(r"\b\d{4}$", last)
+        if year and not re.search(r"\b\d{4}\b", first):
+            # "January through March 2025": the year applies to both ends
+            first = f"{first} {year.group(0)}"
+        first_range, last_range = _resolve(first, today), _resolve(last, today)
+        if first_range and last_range:
+            return first_range[0], last_range[1], f"{first_range[2]} to {last_range[2]}"
+    return None
+
+
+def _range(start: date, end: date, label: str, today: date) -> Dict[str, Any]:
+    tomorrow = today + timedelta(days=1)
+    if start >= tomorrow:
+        raise DateRangeError(f"{label} is in the future; use a forecast for future costs")
+    if end <= start:
+        raise DateRangeError(f"{label} ends before it starts")
+    if end > tomorrow:
+        end = tomorrow
+        if not label.endswith('to date'):
+            label = f"{label} to date"
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'label': label,
+        'months': _months_between(start, end),
+        'complete': end <= today
+    }
+
+
+def resolve_period(expression: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Resolve a time period expression.
+
+    Returns:
+        ``{'start': 'YYYY-MM-DD', 'end': 'YYYY-MM-DD' (exclusive), 'label': ...,
+        'months': ['YYYY-MM', ...], 'complete': whether it ended before today}``
+
+    Raises:
+        DateRangeError: If the expression is not recognized or lies in the future
+    """
+    today = today or datetime.now().date()
+    text = _normalize(expression)
+    found = _resolve(text, today) if text else None
+    if found is None:
+        raise DateRangeError(f"Unrecognized time period {expression!r}; use e.g. {EXAMPLES}")
+    return _range(*found, today)
+
+
+def resolve_range(start_date: str, end_date: str = "", today: Optional[date] = None) -> Dict[str, Any]:
+    """A custom range from YYYY-MM-DD dates, the end date included (default: through today)."""
+    today = today or datetime.now().date()
+    try:
+        start = date.fromisoformat(start_date.strip())
+        end = date.fromisoformat(end_date.strip()) + timedelta(days=1) if end_date else today + timedelta(days=1)
+    except ValueError:
+        raise DateRangeError(f"Custom ranges need YYYY-MM-DD dates, got {start_date!r} and {end_date!r}")
+    return _range(start, end, f"{start.isoformat()} to {(end - timedelta(days=1)).isoformat()}", today)
+
+
+def resolve_months(months: str = "", today: Optional[date] = None, default: str = "last 6 months") -> List[str]:
+    """
+    The YYYY-MM months of a comma-separated list or a period expression.
+
+    An empty value means ``default``, the last six whole months.
+    """
+    text = (months or '').strip() or default
+    parts = [part.strip() for part in text.split(',') if part.strip()]
+    if all(re.fullmatch(r"\d{4}-\d{2}", part) for part in parts):
+        for part in parts:
+            month_range(part, today)
+        return parts
+    if len(parts) > 1:
+        resolved = []
+        for part in parts:
+            for month in resolve_months(part, today):
+                if month not in resolved:
+                    resolved.append(month)
+        return resolved
+    return resolve_period(text, today)['months']
@@ -0,0 +1,326 @@
+"""
+Direct answers for simple cost lookups, without the agent loop.
+
+Questions such as "what did I spend last month", "S3 cost in May" or "top 5
+services this month" need one Cost Explorer request and a sentence, yet
+through the agent they cost two or three model turns. ``parse_simple_query``
+recognizes them: a cost word, exactly one period and optionally services
+or a top-N request, with every other word from a small list of filler
+words. Anything else (why, forecast, compare, budgets, regions, a word it
+does not know) returns None and the handler runs the agent as before, so
+an unrecognized question is never answered wrongly, only more slowly.
+
+Recognized periods are the ones ``date_ranges`` resolves, written the way
+people ask: this or last month, week, quarter, year or fiscal year, month
+or year to date, the last N days, weeks or months, yesterday, a month name
+with or without a year, 2025-04, Q1 2025, H1 2025 and FY2025.
+
+Every answer uses the same request, monthly unblended cost by service, so
+it is served from the request's shared cost data or the CUR cost cube when
+they cover the period (see ``cost_data_plane``) and repeated questions
+share entries. Services are matched against the returned service names, so
+no filter is needed. A named service that matches none of them is handed
+to the agent rather than answered as $0: the data source may name it
+differently, or the alias list may be missing a spelling.
+
+Environment flags:
+    DIRECT_ANSWERS_ENABLED  Answer recognized simple lookups without the agent (default: true)
+"""
+
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from cost_data_plane import get_cost_and_usage
+from date_ranges import MONTH_NAMES, DateRangeError, resolve_period
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_N = 5
+MAX_TOP_N = 20
+
+# Short names people use, and the Cost Explorer SERVICE values they cover
+SERVICE_ALIASES = {
+    's3': ('Amazon S3', ['Amazon Simple Storage Service']),
+    'ec2': ('Amazon EC2', ['Amazon Elastic Compute Cloud - Compute', 'EC2 - Other']),
+    'rds': ('Amazon RDS', ['Amazon Relational Database Service']),
+    'lambda': ('AWS Lambda', ['AWS Lambda']),
+    'dynamodb': ('Amazon DynamoDB', ['Amazon DynamoDB']),
+    'cloudfront': ('Amazon CloudFront', ['Amazon CloudFront']),
+    'cloudwatch': ('Amazon CloudWatch', ['AmazonCloudWatch']),
+    'vpc': ('Amazon VPC', ['Amazon Virtual Private Cloud']),
+    'ecs': ('Amazon ECS', ['Amazon Elastic Container Service']),
+    'eks': ('Amazon EKS', ['Amazon Elastic Container Service for Kubernetes',
+                           'Amazon Elastic Kubernetes Service']),
+    'ecr': ('Amazon ECR', ['Amazon EC2 Container Registry (ECR)']),
+    'elb': ('Elastic Load Balancing', ['Amazon Elastic Load Balancing']),
+    'efs': ('Amazon EFS', ['Amazon Elastic File System']),
+    'elasticache': ('Amazon ElastiCache', ['Amazon ElastiCache']),
+    'redshift': ('Amazon Redshift', ['Amazon Redshift']),
+    'opensearch': ('Amazon OpenSearch Service', ['Amazon OpenSearch Service']),
+    'sqs': ('Amazon SQS', ['Amazon Simple Queue Service']),
+    'sns': ('Amazon SNS', ['Amazon Simple Notification Service']),
+    'route53': ('Amazon Route 53', ['Amazon Route 53']),
+    'kms': ('AWS KMS', ['AWS Key Management Service']),
+    'api gateway': ('Amazon API Gateway', ['Amazon API Gateway']),
+    'bedrock': ('Amazon Bedrock', ['Amazon Bedrock']),
+    'glue': ('AWS Glue', ['AWS Glue']),
+    'athena': ('Amazon Athena', ['Amazon Athena']),
+    'kinesis': ('Amazon Kinesis', ['Amazon Kinesis']),
+    'secrets manager': ('AWS Secrets Manager', ['AWS Secrets Manager']),
+    'step functions': ('AWS Step Functions', ['AWS Step Functions']),
+}
+# Other spellings of the names above
+SERVICE_SPELLINGS = {
+    'amazon s3': 's3', 'simple storage service': 's3', 'ec2-other': 'ec2', 'elastic compute cloud': 'ec2',
+    'aurora': 'rds', 'dynamo': 'dynamodb', 'cloud watch': 'cloudwatch', 'load balancer': 'elb',
+    'load balancers': 'elb', 'load balancing': 'elb', 'alb': 'elb', 'nlb': 'elb', 'route 53': 'route53',
+    'elasticsearch': 'opensearch', 'apigateway': 'api gateway', 'nat gateway': 'vpc', 'kubernetes': 'eks',
+}
+
+COST_WORDS = {'spend', 'spent', 'spending', 'cost', 'costs', 'bill', 'billed', 'billing', 'charges',
+              'charged', 'pay', 'paid'}
+TOP_WORDS = {'top', 'biggest', 'largest', 'highest', 'most', 'expensive', 'main', 'drivers'}
+# Words a simple lookup may contain besides its cost word, period and services
+FILLER_WORDS = {
+    'what', "what's", 'whats', 'how', 'much', 'did', 'do', 'does', 'i', 'we', 'my', 'our', 'me', 'us',
+    'was', 'were', 'is', 'are', 'am', 'the', 'a', 'an', 'in', 'for', 'on', 'of', 'during', 'over', 'from',
+    'total', 'totals', 'aws', 'amazon', 'overall', 'show', 'tell', 'give', 'get', 'list', 'please', 'can',
+    'you', 'could', 'so', 'far', 'to', 'date', 'account', 'accounts', 'usage', 'and', 'with', 'by',
+    'service', 'services', 'amount', 'money', 'at', 'all', 'whole', 'entire', 'current',
+}
+# Period expressions in a question, each resolved by date_ranges
+PERIOD_PATTERNS = [
+    r"\b(?:last|past|previous|trailing) \d{1,3} (?:days|weeks|months|quarters)\b",
+    r"\b(?:this|last|previous|prior|current) (?:fiscal year|quarter|month|week|year)\b",
+    r"\b(?:(?:fiscal )?year|quarter|month|week)[- ]to[- ]date\b|\b(?:mtd|qtd|ytd|fytd)\b",
+    r"\b(?:yesterday|today)\b",
+    r"\bq[1-4](?: \d{4})?\b|\bh[12] \d{4}\b|\bfy ?\d{2}(?:\d{2})?\b|\b\d{4}-\d{2}\b",
+    rf"\b(?:{MONTH_NAMES})\b(?: \d{{4}})?",
+]
+
+def enabled() -> bool:
+    return os.environ.get('DIRECT_ANSWERS_ENABLED', 'true').lower() == 'true'
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+(?:-[a-z0-9]+)*", text)
+
+
+def _find_periods(text: str, today: date) -> List[Tuple[Tuple[int, int], Dict[str, Any]]]:
+    """Every period expression in the text, with its span and resolved range (end exclusive)."""
+    found = []
+    for pattern in PERIOD_PATTERNS:
+        for match in re.finditer(pattern, text):
+            span = match.span()
+            if any(span[0] < end and start < span[1] for (start, end), _ in found):
+                continue
+            # "may" is also a verb, so it only counts after a preposition or before a year
+            if match.group(0) == 'may' and not re.search(r"\b(?:in|for|during|of|since) $", text[:span[0]]):
+                continue
+            try:
+                found.append((span, resolve_period(match.group(0), today)))
+            except DateRangeError:
+                # A future period is a forecast question
+                found.append((span, None))
+    return found
+
+
+def _find_services(text: str) -> Tuple[List[str], str]:
+    """Service aliases named in the text, and the text with them removed."""
+    names = {**{alias: alias for alias in SERVICE_ALIASES}, **SERVICE_SPELLINGS}
+    positions = {}
+    for name in sorted(names, key=len, reverse=True):
+        pattern = rf"(?<![a-z0-9]){re.escape(name)}(?![a-z0-9])"
+        match = re.search(pattern, text)
+        if match:
+            positions.setdefault(names[name], match.start())
+            # Blank it out in place so later positions stay comparable
+            text = re.sub(pattern, lambda found: ' ' * len(found.group(0)), text)
+    return sorted(positions, key=positions.get), text
+
+
+def parse_simple_query(query: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """
+    Recognize a simple cost lookup.
+
+    Returns:
+        ``{'intent': 'total' | 'services' | 'top_services', 'period': {...},
+        'services': [...], 'top_n': n}``, or None when the agent should answer
+    """
+    today = today or datetime.now().date()
+    text = ' '.join(query.lower().replace('?', ' ').replace('.', ' ').replace(',', ' ').split())
+    text = text.replace('’', "'")
+
+    periods = _find_periods(text, today)
+    if len(periods) != 1 or periods[0][1] is None:
+        return None
+    (span_start, span_end), period = periods[0]
+    text = text[:span_start] + ' ' + text[span_end:]
+
+    services, text = _find_services(text)
+    words = _words(text)
+
+    top_n = None
+    top_match = re.search(r"\btop (\d{1,2})\b", text)
+    if top_match:
+        top_n = int(top_match.group(1))
+        words.remove(top_match.group(1))
+    if TOP_WORDS.intersection(words) or re.search(r"\bby service\b|\bper service\b|\bbreakdown\b", text):
+        top_n = top_n or DEFAULT_TOP_N
+    # "top 5 services this month" asks for costs without saying so
+    if not COST_WORDS.intersection(words) and not (top_n and {'service', 'services'}.intersection(words)):
+        return None
+    unknown = [word for word in words
+               if word not in FILLER_WORDS | COST_WORDS | TOP_WORDS | {'breakdown', 'per', 'expensive'}]
+    if unknown:
+        logger.info(f"Direct answer declined, unrecognized words: {unknown[:5]}")
+        return None
+    if top_n is not None and (services or not 1 <= top_n <= MAX_TOP_N):
+        return None
+
+    intent = 'top_services' if top_n else ('services' if services else 'total')
+    return {'intent': intent, 'period': period, 'services': services, 'top_n': top_n or DEFAULT_TOP_N}
+
+
+def fetch_service_costs(ce_client, start: str, end: str) -> Tuple[Dict[str, float], bool, str]:
+    """
+    Unblended cost per service over a range.
+
+    Returns:
+        Tuple of ({service: cost}, whether any of it is estimated, data source)
+    """
+    request = {
+        'TimePeriod': {'Start': start, 'End': end},
+        'Granularity': 'MONTHLY',
+        'Metrics': ['UnblendedCost'],
+        'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+    }
+    costs: Dict[str, float] = defaultdict(float)
+    estimated = False
+    source = 'cost_explorer'
+    token = None
+    while True:
+        response = get_cost_and_usage(ce_client, **request, **({'NextPageToken': token} if token else {}))
+        source = response.get('Source', source)
+        for result in response.get('ResultsByTime', []):
+            estimated = estimated or bool(result.get('Estimated'))
+            for group in result.get('Groups', []):
+                costs[group['Keys'][0]] += float(group['Metrics']['UnblendedCost']['Amount'] or 0)
+        token = response.get('NextPageToken')
+        if not token:
+            return dict(costs), estimated, source
+
+
+def unmatched_services(parsed: Dict[str, Any], costs: Dict[str, float]) -> List[str]:
+    """Aliases in a parsed lookup with none of their service names in the costs."""
+    return [alias for alias in parsed['services'] if not set(SERVICE_ALIASES[alias][1]).intersection(costs)]
+
+
+def _money(amount: float) -> str:
+    return f"${amount:,.2f}"
+
+
+def _share(amount: float, total: float) -> str:
+    return f"{amount / total * 100:.1f}%" if total else "-"
+
+
+def _period_line(period: Dict[str, Any]) -> str:
+    last_day = date.fromisoformat(period['end']) - timedelta(days=1)
+    return f"**Time Period**: {period['start']} to {last_day.isoformat()} ({period['label']})"
+
+
+def render_answer(parsed: Dict[str, Any], costs: Dict[str, float], estimated: bool) -> str:
+    """The markdown answer for a parsed lookup and the costs by service."""
+    period = parsed['period']
+    total = sum(costs.values())
+    ranked = sorted(((service, amount) for service, amount in costs.items() if round(amount, 2)),
+                    key=lambda item: item[1], reverse=True)
+    lines = []
+
+    if parsed['intent'] == 'services':
+        rows = []
+        for alias in parsed['services']:
+            display, service_names = SERVICE_ALIASES[alias]
+            matched = {service: amount for service, amount in costs.items() if service in service_names}
+            rows.append((display, sum(matched.values()), matched))
+        title = ' and '.join(display for display, _, _ in rows)
+        lines += [f"# {title} Cost Summary", "",
+                  f"## Total Cost: {_money(sum(amount for _, amount, _ in rows))} USD", "", _period_line(period), ""]
+        if len(rows) > 1 or any(len(matched) > 1 for _, _, matched in rows):
+            lines += ["| Service | Cost | Share of total |", "|---|---:|---:|"]
+            for display, amount, matched in rows:
+                entries = sorted(matched.items(), key=lambda item: item[1], reverse=True) or [(display, 0.0)]
+                lines += [f"| {service} | {_money(value)} | {_share(value, total)} |" for service, value in entries]
+            lines.append("")
+        lines += ["---", ""]
+        for display, amount, matched in rows:
+            if matched and round(amount, 2):
+                lines.append(f"{display} cost {_money(amount)} in {period['label']}, "
+                             f"{_share(amount, total)} of your total AWS spend of {_money(total)}.")
+            else:
+                lines.append(f"No {display} charges were recorded for {period['label']}.")
+    else:
+        lines += ["# AWS Cost Summary", "", f"## Total Cost: {_money(total)} USD", "", _period_line(period), ""]
+        top_n = parsed['top_n']
+        shown = ranked[:top_n]
+        if shown:
+            heading = f"Top {len(shown)} services" if parsed['intent'] == 'top_services' else "Largest services"
+            lines += [f"**{heading}**:", "", "| Service | Cost | Share |", "|---|---:|---:|"]
+            lines += [f"| {service} | {_money(amount)} | {_share(amount, total)} |" for service, amount in shown]
+            rest = ranked[top_n:]
+            if rest:
+                other = sum(amount for _, amount in rest)
+                lines.append(f"| Other ({len(rest)} services) | {_money(other)} | {_share(other, total)} |")
+            lines.append("")
+        lines += ["---", ""]
+        if ranked:
+            lines.append(f"Your AWS spend for {period['label']} was {_money(total)} across {len(ranked)} services.")
+        else:
+            lines.append(f"No AWS charges were recorded for {period['label']}.")
+
+    if estimated:
+        lines += ["", "_Includes estimated charges for days Cost Explorer has not finalized yet._"]
+    return '\n'.join(lines) + '\n'
+
+
+def answer_simple_query(query: str, ce_client, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """
+    Answer a simple cost lookup directly.
+
+    Returns:
+        ``{'response': markdown, 'direct_answer': metrics}``, or None when the
+        query is not recognized, direct answers are disabled, the data
+        cannot be fetched or a named service is not in it (the agent then
+        answers)
+    """
+    if not enabled():
+        return None
+    started = time.perf_counter()
+    parsed = parse_simple_query(query, today)
+    if parsed is None:
+        return None
+    period = parsed['period']
+    try:
+        costs, estimated, source = fetch_service_costs(ce_client, period['start'], period['end'])
+    except Exception as e:
+        logger.warning(f"Direct answer fetch failed, using the agent: {str(e)}")
+        return None
+    unmatched = unmatched_services(parsed, costs)
+    if unmatched:
+        logger.info(f"Direct answer declined, no {source} service matches {unmatched}")
+        return None
+    response = render_answer(parsed, costs, estimated)
+    metrics = {
+        'intent': parsed['intent'],
+        'period': {key: period[key] for key in ('start', 'end', 'label')},
+        'services': parsed['services'],
+        'source': source,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    logger.info(f"Direct answer: {metrics}")
+    return {'response': response, 'direct_answer': metrics}
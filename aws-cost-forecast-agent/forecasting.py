@@ -0,0 +1,293 @@
+"""
+Statistical cost forecasts for the cost forecast agent.
+
+Forecasts used to be the model reading six months of spend analysis and
+extrapolating in prose, which cost extra turns and gave different numbers
+on every run. ``forecast_monthly_costs`` fits every service's daily spend
+rate (month cost / days in month) with ordinary least squares on a linear
+trend, plus month-of-year effects once ``FORECAST_SEASONAL_MIN_MONTHS`` of
+history are available, and returns a forecast with a prediction interval
+for each coming month.
+
+All series share the same months, so the design matrix and its
+pseudo-inverse are computed once and each service is one matrix-vector
+product: hundreds of services fit in milliseconds, without numpy in the
+Lambda package. Least squares is linear in the data, so the total's
+forecast is the sum of the services' forecasts (until a declining service
+is clipped at zero); its interval comes from the total's own residuals.
+
+``ForecastCache`` keeps Cost Explorer ``get_cost_forecast`` responses in
+the warm container (each call is billed like any Cost Explorer request),
+for the agent's tool that asks AWS's own model instead.
+
+Environment flags:
+    FORECAST_HISTORY_MONTHS        Whole months of history fitted (default: 12)
+    FORECAST_SEASONAL_MIN_MONTHS   History needed before month-of-year effects are fitted (default: 24)
+    CE_FORECAST_CACHE_TTL_SECONDS  Keep Cost Explorer forecasts this long (default: 21600)
+"""
+
+import calendar
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def default_history_months() -> int:
+    return int(os.environ.get('FORECAST_HISTORY_MONTHS', '12'))
+
+
+def seasonal_min_months() -> int:
+    return int(os.environ.get('FORECAST_SEASONAL_MIN_MONTHS', '24'))
+
+
+def days_in_month(year_month: str) -> int:
+    year, month = (int(part) for part in year_month.split('-'))
+    return calendar.monthrange(year, month)[1]
+
+
+def _month_index(year_month: str) -> int:
+    year, month = (int(part) for part in year_month.split('-'))
+    return year * 12 + month - 1
+
+
+def _t_central_probability(theta: float, dof: int) -> float:
+    """
+    P(|T| < sqrt(dof) * tan(theta)) for Student's t with integer degrees of
+    freedom, from the finite series of Abramowitz and Stegun 26.7.3-4.
+    """
+    cos_squared = math.cos(theta) ** 2
+    if dof % 2:
+        term, total = 1.0, 1.0 if dof > 1 else 0.0
+        for k in range(1, (dof - 1) // 2):
+            term *= cos_squared * (2 * k) / (2 * k + 1)
+            total += term
+        return 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    term, total = 1.0, 1.0
+    for k in range(1, dof // 2):
+        term *= cos_squared * (2 * k - 1) / (2 * k)
+        total += term
+    return math.sin(theta) * total
+
+
+@functools.lru_cache(maxsize=256)
+def t_quantile(level: float, dof: int) -> float:
+    """
+    Two-sided Student t quantile for a ``level`` interval, exact to machine
+    precision: the t distribution's closed-form probability for integer
+    degrees of freedom, inverted by bisection.
+    """
+    if dof <= 0:
+        return float('inf')
+    low, high = 0.0, math.pi / 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if _t_central_probability(middle, dof) < level:
+            low = middle
+        else:
+            high = middle
+    return math.sqrt(dof) * math.tan((low + high) / 2)
+
+
+def _invert(matrix: List[List[float]]) -> List[List[float]]:
+    """Gauss-Jordan inverse of a small symmetric positive definite matrix."""
+    size = len(matrix)
+    augmented = [list(row) + [1.0 if i == j else 0.0 for j in range(size)] for i, row in enumerate(matrix)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(augmented[row][column]))
+        if abs(augmented[pivot][column]) < 1e-12:
+            raise ValueError("Singular design matrix")
+        augmented[column], augmented[pivot] = augmented[pivot], augmented[column]
+        scale = augmented[column][column]
+        augmented[column] = [value / scale for value in augmented[column]]
+        for row in range(size):
+            if row != column and augmented[row][column]:
+                factor = augmented[row][column]
+                augmented[row] = [value - factor * pivot_value
+                                  for value, pivot_value in zip(augmented[row], augmented[column])]
+    return [row[size:] for row in augmented]
+
+
+class LinearForecaster:
+    """
+    Least squares on a shared design: intercept, linear trend and optional
+    month-of-year effects, fitted once for the months and applied to any
+    number of series.
+    """
+
+    def __init__(self, months: Sequence[str], seasonal: Optional[bool] = None):
+        self.months = list(months)
+        count = len(self.months)
+        if seasonal is None:
+            seasonal = count >= seasonal_min_months()
+        # Month-of-year effects need a spare degree of freedom beyond their 11 columns and the trend
+        self.seasonal = seasonal and count >= 15
+        self.trend = count >= 3
+        self._origin = _month_index(self.months[0]) + (count - 1) / 2 if count else 0
+        rows = [self.features(month) for month in self.months]
+        gram = [[sum(row[i] * row[j] for row in rows) for j in range(len(rows[0]))] for i in range(len(rows[0]))]
+        self._gram_inverse = _invert(gram)
+        # (X'X)^-1 X': one row of weights per coefficient, shared by every series
+        self._weights = [[sum(inverse_row[k] * row[k] for k in range(len(row))) for row in rows]
+                         for inverse_row in self._gram_inverse]
+        self.dof = count - len(self._weights)
+
+    def features(self, year_month: str) -> List[float]:
+        row = [1.0]
+        if self.trend:
+            row.append(_month_index(year_month) - self._origin)
+        if self.seasonal:
+            month = int(year_month.split('-')[1])
+            # December is the baseline month
+            row.extend(1.0 if month == number else 0.0 for number in range(1, 12))
+        return row
+
+    def fit(self, values: Sequence[float]) -> Tuple[List[float], float]:
+        """Coefficients and residual variance of one series."""
+        coefficients = [sum(weight * value for weight, value in zip(weights, values)) for weights in self._weights]
+        residuals = [value - sum(c * x for c, x in zip(coefficients, self.features(month)))
+                     for month, value in zip(self.months, values)]
+        variance = sum(residual * residual for residual in residuals) / self.dof if self.dof > 0 else 0.0
+        return coefficients, variance
+
+    def predict(self, values: Sequence[float], future_months: Sequence[str], level: float) -> List[Dict[str, float]]:
+        """Forecast and prediction interval of one series for each future month."""
+        coefficients, variance = self.fit(values)
+        quantile = t_quantile(level, self.dof) if self.dof > 0 else 0.0
+        predictions = []
+        for month in future_months:
+            row = self.features(month)
+            mean = sum(c * x for c, x in zip(coefficients, row))
+            leverage = sum(row[i] * self._gram_inverse[i][j] * row[j]
+                           for i in range(len(row)) for j in range(len(row)))
+            spread = quantile * math.sqrt(variance * (1 + leverage))
+            predictions.append({'mean': mean, 'lower': mean - spread, 'upper': mean + spread})
+        return predictions
+
+
+def _month_entries(predictions: List[Dict[str, float]], future_months: Sequence[str]) -> List[Dict[str, Any]]:
+    """Daily-rate predictions as month costs, never below zero."""
+    entries = []
+    for month, prediction in zip(future_months, predictions):
+        days = days_in_month(month)
+        entries.append({
+            'month': month,
+            'forecast': round(max(prediction['mean'], 0.0) * days, 2),
+            'lower': round(max(prediction['lower'], 0.0) * days, 2),
+            'upper': round(max(prediction['upper'], 0.0) * days, 2)
+        })
+    return entries
+
+
+def forecast_monthly_costs(monthly_costs: Dict[str, Dict[str, float]], future_months: Sequence[str],
+                           level: float = 0.8, services: Optional[Sequence[str]] = None,
+                           top_n: int = 10) -> Dict[str, Any]:
+    """
+    Forecast whole-month costs per service and in total.
+
+    Args:
+        monthly_costs: Complete months (YYYY-MM) mapped to costs by service
+        future_months: Months to forecast, YYYY-MM
+        level: Prediction interval level, e.g. 0.8 for 80%
+        services: Case-insensitive name fragments to keep (all services when empty)
+        top_n: Services listed by forecast spend; the rest are fitted together as "Other"
+
+    Returns:
+        Dictionary with the method, the history used, and total and per-service
+        forecasts with lower and upper bounds
+    """
+    started = time.perf_counter()
+    months = sorted(monthly_costs)
+    if not months:
+        return {'error': "No cost history to forecast from"}
+    days = [days_in_month(month) for month in months]
+    names = sorted({name for costs in monthly_costs.values() for name in costs})
+    if services:
+        fragments = [fragment.lower() for fragment in services]
+        names = [name for name in names if any(fragment in name.lower() for fragment in fragments)]
+    rates = {name: [monthly_costs[month].get(name, 0.0) / day_count for month, day_count in zip(months, days)]
+             for name in names}
+
+    forecaster = LinearForecaster(months)
+    forecasts = {name: _month_entries(forecaster.predict(series, future_months, level), future_months)
+                 for name, series in rates.items()}
+
+    # Largest forecast spend first; the rest fitted as one series keeps the totals exact
+    ranked = sorted(forecasts, key=lambda name: sum(entry['forecast'] for entry in forecasts[name]), reverse=True)
+    shown = ranked[:max(top_n, 0)]
+    rest = ranked[len(shown):]
+    if len(rest) == 1:
+        shown, rest = ranked, []
+    by_service = {name: forecasts[name] for name in shown}
+    if rest:
+        other = [sum(rates[name][index] for name in rest) for index in range(len(months))]
+        by_service[f"Other ({len(rest)} services)"] = _month_entries(
+            forecaster.predict(other, future_months, level), future_months)
+    total = [sum(rates[name][index] for name in names) for index in range(len(months))]
+
+    method = 'least squares, linear trend' if forecaster.trend else 'mean of history'
+    if forecaster.seasonal:
+        method += ' with month-of-year effects'
+    return {
+        'method': method,
+        'history': {'months': months, 'monthly_totals': {month: round(sum(monthly_costs[month].get(name, 0.0)
+                                                                          for name in names), 2)
+                                                         for month in months}},
+        'interval_level': f"{level:.0%}",
+        'total': _month_entries(forecaster.predict(total, future_months, level), future_months),
+        'services': by_service,
+        'fit_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+class ForecastCache:
+    """Thread-safe TTL cache of Cost Explorer ``get_cost_forecast`` responses."""
+
+    def __init__(self, ttl: Optional[float] = None, clock=time.time):
+        self.ttl = ttl if ttl is not None else float(os.environ.get('CE_FORECAST_CACHE_TTL_SECONDS', '21600'))
+        self.clock = clock
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_cost_forecast(self, ce_client, **request) -> Dict[str, Any]:
+        """``ce_client.get_cost_forecast(**request)``, reused while it is fresh."""
+        key = json.dumps(request, sort_keys=True, default=str)
+        now = self.clock()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self.stats['hits'] += 1
+                return dict(cached[1], Cached=True)
+            self.stats['misses'] += 1
+        response = ce_client.get_cost_forecast(**request)
+        response = {field: value for field, value in response.items() if field != 'ResponseMetadata'}
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (now, response)
+                # Drop expired entries so the container does not accumulate them
+                for stale in [k for k, (stored, _) in self._entries.items() if now - stored >= self.ttl]:
+                    del self._entries[stale]
+        return dict(response, Cached=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared across invocations in a warm container
+_forecast_cache = None
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Return the container-wide Cost Explorer forecast cache."""
+    global _forecast_cache
+    if _forecast_cache is None:
+        _forecast_cache = ForecastCache()
+    return _forecast_cache
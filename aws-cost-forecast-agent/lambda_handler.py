@@ -5,19 +5,51 @@ import boto3
 import os
 import logging
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from strands import tool
+from strands.models import BedrockModel
 from strands.types.content import ContentBlock
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import concurrent.futures
 import functools
+import statistics
 from collections import defaultdict
-import calendar
+from payload_envelope import encode_response
+from prewarm import run_prewarm, init_metrics
+from cost_data_plane import get_cost_and_usage, use_shared_cost_data
+from cost_query import run_cost_query, CostQueryError
+from direct_answers import answer_simple_query
+from daily_cost_cache import get_daily_cost_and_usage
+from date_ranges import DateRangeError, add_months, month_range, period_buckets, resolve_months, resolve_period, resolve_range
+from forecasting import default_history_months, forecast_monthly_costs, get_forecast_cache
+from tool_memo import memoize_tool, tool_memo_scope
+from tool_output import budget_tool_output, get_more_results
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Cost Explorer client and Bedrock models, reused across invocations in the container
+_ce_client = None
+_models = {}
+
+def get_ce_client():
+    """Get or create the Cost Explorer client."""
+    global _ce_client
+    if _ce_client is None:
+        _ce_client = boto3.client('ce', region_name=os.environ.get('REGION', 'us-east-1'))
+    return _ce_client
+
+def get_model(model_id: Optional[str] = None):
+    """Get or create the BedrockModel for the ID (the Strands default model when None)."""
+    key = model_id or 'default'
+    if key not in _models:
+        if model_id:
+            _models[key] = BedrockModel(model_id=model_id, region_name=os.environ.get('STRANDS_MODEL_REGION', 'us-east-1'))
+        else:
+            _models[key] = BedrockModel()
+    return _models[key]
+
 # Cache for cost data to avoid repeated API calls
 @functools.lru_cache(maxsize=100)
 def get_cached_month_costs(year_month, cache_key):
@@ -29,33 +61,26 @@ def get_cached_month_costs(year_month, cache_key):
     """
     return _get_single_month_costs(year_month)
 
-def _get_single_month_costs(year_month):
+# Memoized too: several tools read the same months within one request
+@memoize_tool
+def _get_period_costs(start_date, end_date):
     """
-    Get costs for a single month optimized for performance
+    Get monthly costs by service for one cache-aligned bucket (see date_ranges.period_buckets)
     Args:
-        year_month: Format YYYY-MM (e.g., "2025-04")
+        start_date: First day, YYYY-MM-DD
+        end_date: Day after the last, YYYY-MM-DD
     """
-    region = os.environ.get('REGION', 'us-east-1')
-    ce = boto3.client('ce', region_name=region)
-    
-    # Parse year and month
-    year, month = year_month.split('-')
-    year, month = int(year), int(month)
-    
-    # Get the last day of the month
-    last_day = calendar.monthrange(year, month)[1]
-    
-    start_date = f"{year_month}-01"
-    end_date = f"{year_month}-{last_day:02d}"
+    ce = get_ce_client()
     
     try:
-        response = ce.get_cost_and_usage(
+        response = get_cost_and_usage(
+            ce,
             TimePeriod={
                 'Start': start_date,
                 'End': end_date
             },
             Granularity='MONTHLY',
-            Metrics=['UnblendedCost'],  # Single metric for performance
+            Metrics=['UnblendedCost', 'UsageQuantity'],
             GroupBy=[
                 {
                     'Type': 'DIMENSION',
@@ -66,13 +91,27 @@ def _get_single_month_costs(year_month):
         
         return {
             'time_period': f"{start_date} to {end_date}",
-            'year_month': year_month,
             'results': response['ResultsByTime']
         }
         
     except Exception as e:
-        logger.error(f"Error getting cost data for {year_month}: {str(e)}")
+        logger.error(f"Error getting cost data for {start_date} to {end_date}: {str(e)}")
+        return {"error": str(e)}
+
+def _get_single_month_costs(year_month):
+    """
+    Get costs for a single month optimized for performance
+    Args:
+        year_month: Format YYYY-MM (e.g., "2025-04")
+    """
+    try:
+        start, end = month_range(year_month)
+    except DateRangeError as e:
         return {"error": str(e), "year_month": year_month}
+    
+    # The whole month, 1st to next 1st, whichever question asked for it
+    result = _get_period_costs(start.isoformat(), end.isoformat())
+    return dict(result, year_month=year_month)
 
 def get_parallel_monthly_costs(months_list):
     """
@@ -184,7 +223,9 @@ def analyze_spend_trends(monthly_data):
     return analysis
 
 @tool
-def get_monthly_spend_analysis(months="2025-01,2025-02,2025-03,2025-04,2025-05,2025-06"):
+@memoize_tool
+@budget_tool_output
+def get_monthly_spend_analysis(months=""):
     """
     Get optimized multi-month spend analysis with parallel processing.
     Perfect for month-to-month comparisons and trend analysis.
@@ -192,14 +233,16 @@ def get_monthly_spend_analysis(months="2025-01,2025-02,2025-03,2025-04,2025-05,2
     Args:
         months: Comma-separated list of months in YYYY-MM format 
                 (e.g., "2025-01,2025-02,2025-03" or "2025-04,2025-05,2025-06")
+                or a period such as "last 6 months", "last quarter" or "Q1 2025"
+                (default: the last 6 whole months)
                 
     Returns:
         Comprehensive analysis including monthly totals, service trends, 
         new services, top spenders, and cost change analysis
     """
     try:
-        # Parse months list
-        months_list = [month.strip() for month in months.split(',')]
+        # Parse months list or period ("last quarter", "Q1 2025"); empty means the last six months
+        months_list = resolve_months(months)
         logger.info(f"Analyzing spend for months: {months_list}")
         
         # Get all monthly data in parallel (MAJOR PERFORMANCE BOOST)
@@ -218,8 +261,10 @@ def get_monthly_spend_analysis(months="2025-01,2025-02,2025-03,2025-04,2025-05,2
         logger.error(f"Error in monthly spend analysis: {str(e)}")
         return {"error": str(e)}
 
-@tool  
-def get_service_spend_comparison(service_names="", months="2025-01,2025-02,2025-03,2025-04,2025-05,2025-06"):
+@tool
+@memoize_tool
+@budget_tool_output
+def get_service_spend_comparison(service_names="", months=""):
     """
     Get optimized service-specific spend comparison across multiple months.
     Filters to specific services for faster, focused analysis.
@@ -228,13 +273,14 @@ def get_service_spend_comparison(service_names="", months="2025-01,2025-02,2025-
         service_names: Comma-separated list of service names to focus on
                       (e.g., "Amazon EC2,Amazon S3,Amazon RDS") 
                       Leave empty to analyze all services
-        months: Comma-separated list of months in YYYY-MM format
+        months: Comma-separated list of months in YYYY-MM format, or a period
+                such as "last quarter" (default: the last 6 whole months)
         
     Returns:
         Service-focused cost comparison and trends
     """
     try:
-        months_list = [month.strip() for month in months.split(',')]
+        months_list = resolve_months(months)
         
         # Get monthly data in parallel
         monthly_data = get_parallel_monthly_costs(months_list)
@@ -277,20 +323,23 @@ def get_service_spend_comparison(service_names="", months="2025-01,2025-02,2025-
         return {"error": str(e)}
 
 @tool
-def get_cost_optimization_insights(months="2025-01,2025-02,2025-03,2025-04,2025-05,2025-06", focus_area="top_spenders"):
+@memoize_tool
+@budget_tool_output
+def get_cost_optimization_insights(months="", focus_area="top_spenders"):
     """
     Get intelligent cost optimization insights based on multi-month analysis.
     Uses parallel processing and smart filtering for fast, actionable recommendations.
     
     Args:
-        months: Comma-separated list of months to analyze
+        months: Comma-separated list of months to analyze, or a period such as
+                "YTD" (default: the last 6 whole months)
         focus_area: Analysis focus - "top_spenders", "growing_costs", "new_services", or "all"
         
     Returns:
         Targeted optimization recommendations based on spending patterns
     """
     try:
-        months_list = [month.strip() for month in months.split(',')]
+        months_list = resolve_months(months)
         
         # Get comprehensive analysis
         monthly_data = get_parallel_monthly_costs(months_list)
@@ -341,82 +390,78 @@ def get_cost_optimization_insights(months="2025-01,2025-02,2025-03,2025-04,2025-
     except Exception as e:
         logger.error(f"Error in cost optimization insights: {str(e)}")
         return {"error": str(e)}
+# Daily anomalies: days further than this from the mean of the days before them
+ANOMALY_BASELINE_DAYS = 14
+ANOMALY_STD_DEVIATIONS = 2.0
+ANOMALY_MIN_CHANGE = 1.0
+MAX_TREND_DAYS = 92
+
+def find_daily_anomalies(series_name, daily_costs, days):
+    """
+    Flag days whose cost is unusual against the ANOMALY_BASELINE_DAYS before them
+    Args:
+        series_name: Name reported with each anomaly (a service or "Total")
+        daily_costs: Dictionary of day to cost, including the baseline days
+        days: The days to check, in order
+    """
+    anomalies = []
+    ordered = sorted(daily_costs)
+    for day in days:
+        baseline = [daily_costs[previous] for previous in ordered if previous < day][-ANOMALY_BASELINE_DAYS:]
+        if len(baseline) < 7:
+            continue
+        expected = statistics.mean(baseline)
+        spread = statistics.pstdev(baseline)
+        cost = daily_costs.get(day, 0.0)
+        if abs(cost - expected) > max(ANOMALY_STD_DEVIATIONS * spread, ANOMALY_MIN_CHANGE):
+            anomalies.append({
+                'date': day,
+                'series': series_name,
+                'cost': round(cost, 2),
+                'expected': round(expected, 2),
+                'change_percentage': round((cost - expected) / expected * 100, 1) if expected else None,
+                'direction': 'spike' if cost > expected else 'drop'
+            })
+    return anomalies
+
 @tool
-def get_aws_cost_summary(time_period="MONTH_TO_DATE", start_date="", end_date=""):
+@memoize_tool
+@budget_tool_output
+def get_daily_spend_trend(period="last 30 days", service_names="", top_n=5):
     """
-    Get a summary of AWS costs for a single time period (optimized for simple queries).
-    For multi-month analysis, use get_monthly_spend_analysis() instead.
+    Get daily costs over a period with per-service daily trends and anomalous days.
+    Use for daily trends, spikes, drops and "what happened on" questions.
     
     Args:
-        time_period: The time period for the cost data. Options:
-            - "MONTH_TO_DATE": Current month from 1st to today
-            - "LAST_MONTH": Previous complete month
-            - "LAST_30_DAYS": Last 30 days from today
-            - "CUSTOM": Use custom start_date and end_date (format: YYYY-MM-DD)
-            - "APRIL_2025": April 2025 (2025-04-01 to 2025-04-30)
-            - "MAY_2025": May 2025 (2025-05-01 to 2025-05-31)
-            - "MARCH_2025": March 2025 (2025-03-01 to 2025-03-31)
-        start_date: Custom start date in YYYY-MM-DD format (only used with CUSTOM time_period)
-        end_date: Custom end date in YYYY-MM-DD format (only used with CUSTOM time_period)
+        period: The period, e.g. "last 30 days", "last 2 weeks", "this month", "2025-05"
+                (up to 92 days)
+        service_names: Comma-separated list of service names to focus on
+                      (e.g., "Amazon EC2,Amazon S3"); leave empty for the top services
+        top_n: Number of top services to list when service_names is empty
         
     Returns:
-        A summary of AWS costs including time period and cost breakdown by service
+        Daily totals, daily costs per service, a summary and anomalous days
+        compared with the two weeks before each day
     """
-    # Use the region from environment variable
-    region = os.environ.get('REGION', 'us-east-1')
-    ce = boto3.client('ce', region_name=region)
-    
-    # Define time period based on input
-    current_date = datetime.now()
-    
-    if time_period == "MONTH_TO_DATE":
-        start_date = current_date.replace(day=1).strftime('%Y-%m-%d')
-        end_date = current_date.strftime('%Y-%m-%d')
-    elif time_period == "LAST_MONTH":
-        first_of_month = current_date.replace(day=1)
-        last_month_end = first_of_month - timedelta(days=1)
-        start_date = last_month_end.replace(day=1).strftime('%Y-%m-%d')
-        end_date = last_month_end.strftime('%Y-%m-%d')
-    elif time_period == "LAST_30_DAYS":
-        start_date = (current_date - timedelta(days=30)).strftime('%Y-%m-%d')
-        end_date = current_date.strftime('%Y-%m-%d')
-    elif time_period == "APRIL_2025":
-        start_date = "2025-04-01"
-        end_date = "2025-04-30"
-    elif time_period == "MAY_2025":
-        start_date = "2025-05-01"
-        end_date = "2025-05-31"
-    elif time_period == "MARCH_2025":
-        start_date = "2025-03-01"
-        end_date = "2025-03-31"
-    elif time_period == "CUSTOM":
-        if not start_date or not end_date:
-            return {"error": "Custom time period requires both start_date and end_date parameters"}
-    else:
-        # Try to parse month names and years
-        time_period_lower = time_period.lower()
-        if "april" in time_period_lower and "2025" in time_period_lower:
-            start_date = "2025-04-01"
-            end_date = "2025-04-30"
-        elif "may" in time_period_lower and "2025" in time_period_lower:
-            start_date = "2025-05-01"
-            end_date = "2025-05-31"
-        elif "march" in time_period_lower and "2025" in time_period_lower:
-            start_date = "2025-03-01"
-            end_date = "2025-03-31"
-        else:
-            # Default to last 30 days
-            start_date = (current_date - timedelta(days=30)).strftime('%Y-%m-%d')
-            end_date = current_date.strftime('%Y-%m-%d')
+    try:
+        period_range = resolve_period(period)
+    except DateRangeError as e:
+        return {"error": str(e)}
+    start = date.fromisoformat(period_range['start'])
+    end = date.fromisoformat(period_range['end'])
+    if (end - start).days > MAX_TREND_DAYS:
+        return {"error": f"Daily trends are limited to {MAX_TREND_DAYS} days; use get_monthly_spend_analysis for longer periods"}
     
     try:
-        response = ce.get_cost_and_usage(
+        # The baseline days before the period are cached like the period itself
+        response = get_daily_cost_and_usage(
+            get_ce_client(),
             TimePeriod={
-                'Start': start_date,
-                'End': end_date
+                'Start': (start - timedelta(days=ANOMALY_BASELINE_DAYS)).isoformat(),
+                'End': end.isoformat()
             },
-            Granularity='MONTHLY',
-            Metrics=['UnblendedCost', 'UsageQuantity'],
+            Granularity='DAILY',
+            Metrics=['UnblendedCost'],
             GroupBy=[
                 {
                     'Type': 'DIMENSION',
@@ -424,14 +469,288 @@ def get_aws_cost_summary(time_period="MONTH_TO_DATE", start_date="", end_date=""
                 }
             ]
         )
+    except Exception as e:
+        logger.error(f"Error getting daily cost data: {str(e)}")
+        return {"error": str(e)}
+    
+    service_days = defaultdict(dict)
+    daily_totals = {}
+    for result in response['ResultsByTime']:
+        day = result['TimePeriod']['Start']
+        daily_totals[day] = 0.0
+        for group in result.get('Groups', []):
+            service_name = group['Keys'][0] if group['Keys'] else 'Unknown'
+            cost_amount = float(group['Metrics']['UnblendedCost']['Amount'])
+            service_days[service_name][day] = cost_amount
+            daily_totals[day] += cost_amount
+    
+    days = [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days)]
+    # Today's costs are still coming in, so it is shown but not judged
+    complete_days = [day for day in days if day < datetime.now().date().isoformat()]
+    service_totals = {service: sum(costs.get(day, 0.0) for day in days) for service, costs in service_days.items()}
+    ranked = sorted(service_totals, key=service_totals.get, reverse=True)
+    if service_names:
+        service_filter = [name.strip().lower() for name in service_names.split(',') if name.strip()]
+        shown = [service for service in ranked if any(name in service.lower() for name in service_filter)]
+    else:
+        shown = [service for service in ranked if service_totals[service] > 0][:max(1, int(top_n))]
+    
+    services = {service: {day: round(service_days[service].get(day, 0.0), 2) for day in days} for service in shown}
+    if not service_names and len(ranked) > len(shown):
+        services['Other'] = {day: round(daily_totals.get(day, 0.0) - sum(service_days[service].get(day, 0.0)
+                                                                           for service in shown), 2)
+                             for day in days}
+    
+    anomalies = find_daily_anomalies('Total', daily_totals, complete_days)
+    for service in shown:
+        series = {day: service_days[service].get(day, 0.0) for day in daily_totals}
+        anomalies.extend(find_daily_anomalies(service, series, complete_days))
+    anomalies.sort(key=lambda anomaly: abs(anomaly['cost'] - anomaly['expected']), reverse=True)
+    
+    period_total = sum(daily_totals.get(day, 0.0) for day in days)
+    summary = {'total': round(period_total, 2), 'average_per_day': round(period_total / len(days), 2) if days else 0.0}
+    if complete_days:
+        highest = max(complete_days, key=lambda day: daily_totals.get(day, 0.0))
+        lowest = min(complete_days, key=lambda day: daily_totals.get(day, 0.0))
+        summary['highest_day'] = {'date': highest, 'cost': round(daily_totals.get(highest, 0.0), 2)}
+        summary['lowest_day'] = {'date': lowest, 'cost': round(daily_totals.get(lowest, 0.0), 2)}
+    
+    return {
+        'period': period_range['label'],
+        'time_period': f"{days[0]} to {days[-1]}",
+        'daily_totals': {day: round(daily_totals.get(day, 0.0), 2) for day in days},
+        'services': services,
+        'summary': summary,
+        'anomalies': anomalies,
+        'data_source': response.get('Source', 'cost_explorer')
+    }
+
+MAX_FORECAST_MONTHS = 12
+
+def _forecast_months(months_ahead):
+    """The current month and the months after it, months_ahead in all (1 to MAX_FORECAST_MONTHS)"""
+    months_ahead = max(1, min(int(months_ahead), MAX_FORECAST_MONTHS))
+    first = date.today().replace(day=1)
+    return [add_months(first, offset).strftime('%Y-%m') for offset in range(months_ahead)]
+
+def _month_to_date_costs():
+    """Actual costs of the current month so far, by service"""
+    today = date.today()
+    if today.day == 1:
+        return {}
+    costs = _get_period_costs(today.replace(day=1).isoformat(), today.isoformat())
+    if 'error' in costs:
+        raise RuntimeError(costs['error'])
+    services = defaultdict(float)
+    for result in costs['results']:
+        for group in result.get('Groups', []):
+            services[group['Keys'][0]] += float(group['Metrics']['UnblendedCost']['Amount'])
+    return services
+
+@tool
+@memoize_tool
+@budget_tool_output
+def forecast_costs(months_ahead=3, service_names="", history_months=0, top_n=8, confidence=80):
+    """
+    Forecast monthly AWS costs, in total and per service, with prediction intervals.
+    Use for any forecast, projection or "what will I spend" question instead of estimating from history.
+    
+    Args:
+        months_ahead: Months to forecast, starting with the current month (1-12, default 3)
+        service_names: Comma-separated list of service names to focus on
+                      (e.g., "Amazon EC2,Amazon S3"); leave empty for all services
+        history_months: Whole months of history to fit (default FORECAST_HISTORY_MONTHS, 12;
+                        24 or more also fits month-of-year seasonality)
+        top_n: Number of services listed by forecast spend; the rest are combined as "Other"
+        confidence: Prediction interval in percent (50-99, default 80)
+        
+    Returns:
+        Total and per-service forecasts per month with lower and upper bounds, the method,
+        the history used and the current month's actual spend so far
+    """
+    try:
+        confidence = max(50, min(int(confidence), 99))
+        history = resolve_months(f"last {int(history_months) or default_history_months()} months")
+        future_months = _forecast_months(months_ahead)
+        
+        # Complete months only, fetched per month bucket like the other multi-month tools
+        monthly_data = get_parallel_monthly_costs(history)
+        monthly_costs = {}
+        for month, data in monthly_data.items():
+            if 'error' in data:
+                return {"error": data['error']}
+            services = defaultdict(float)
+            for result in data['results']:
+                for group in result.get('Groups', []):
+                    services[group['Keys'][0]] += float(group['Metrics']['UnblendedCost']['Amount'])
+            monthly_costs[month] = dict(services)
+        
+        service_filter = [name.strip() for name in service_names.split(',') if name.strip()]
+        forecast = forecast_monthly_costs(monthly_costs, future_months, level=confidence / 100,
+                                          services=service_filter, top_n=int(top_n))
+        if 'error' in forecast:
+            return forecast
+        
+        month_to_date = _month_to_date_costs()
+        if service_filter:
+            month_to_date = {name: cost for name, cost in month_to_date.items()
+                             if any(fragment.lower() in name.lower() for fragment in service_filter)}
+        forecast['current_month_actual_to_date'] = round(sum(month_to_date.values()), 2)
+        forecast['service_filter'] = service_filter if service_filter else 'All services'
+        return forecast
+        
+    except DateRangeError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Error forecasting costs: {str(e)}")
+        return {"error": str(e)}
+
+@tool
+@memoize_tool
+@budget_tool_output
+def get_cost_explorer_forecast(months_ahead=3, confidence=80):
+    """
+    Get AWS Cost Explorer's own forecast of total monthly costs.
+    Use only when the user asks for the AWS or Cost Explorer forecast, or to cross-check forecast_costs().
+    
+    Args:
+        months_ahead: Months to forecast, starting with the current month (1-12, default 3)
+        confidence: Prediction interval in percent (51-99, default 80)
+        
+    Returns:
+        Whole-month forecasts with lower and upper bounds; the current month is the
+        actual spend so far plus Cost Explorer's forecast for its remaining days
+    """
+    try:
+        confidence = max(51, min(int(confidence), 99))
+        future_months = _forecast_months(months_ahead)
+        today = date.today()
+        end = add_months(today.replace(day=1), len(future_months))
+        
+        # Cost Explorer bills every forecast call; the same forecast is reused for CE_FORECAST_CACHE_TTL_SECONDS
+        response = get_forecast_cache().get_cost_forecast(
+            get_ce_client(),
+            TimePeriod={'Start': today.isoformat(), 'End': end.isoformat()},
+            Metric='UNBLENDED_COST',
+            Granularity='MONTHLY',
+            PredictionIntervalLevel=confidence
+        )
+        
+        month_to_date = round(sum(_month_to_date_costs().values()), 2)
+        months = []
+        for result in response.get('ForecastResultsByTime', []):
+            month = result['TimePeriod']['Start'][:7]
+            actual = month_to_date if month == today.strftime('%Y-%m') else 0.0
+            months.append({
+                'month': month,
+                'forecast': round(actual + float(result['MeanValue']), 2),
+                'lower': round(actual + float(result.get('PredictionIntervalLowerBound', result['MeanValue'])), 2),
+                'upper': round(actual + float(result.get('PredictionIntervalUpperBound', result['MeanValue'])), 2)
+            })
         
         return {
-            'time_period': f"{start_date} to {end_date}",
-            'results': response['ResultsByTime']
+            'method': 'AWS Cost Explorer forecast',
+            'interval_level': f"{confidence}%",
+            'total': months,
+            'current_month_actual_to_date': month_to_date,
+            'cached': response.get('Cached', False)
         }
         
     except Exception as e:
-        logger.error(f"Error getting cost data: {str(e)}")
+        logger.error(f"Error getting Cost Explorer forecast: {str(e)}")
+        return {"error": str(e)}
+
+@tool
+@memoize_tool
+@budget_tool_output
+def get_aws_cost_summary(time_period="MONTH_TO_DATE", start_date="", end_date=""):
+    """
+    Get a summary of AWS costs for a single time period (optimized for simple queries).
+    For multi-month analysis, use get_monthly_spend_analysis() instead.
+    
+    Args:
+        time_period: The time period for the cost data, for example:
+            - "MONTH_TO_DATE" or "this month": Current month from 1st to today
+            - "LAST_MONTH": Previous complete month
+            - "LAST_30_DAYS", "trailing 90 days": Whole days before today
+            - "last quarter", "this quarter", "YTD", "last year", "this fiscal year"
+            - "2025-04", "April 2025", "APRIL_2025", "Q1 2025", "H1 2025", "FY2025"
+            - "2025-04-01 to 2025-04-15", "January through March 2025"
+            - "CUSTOM": Use custom start_date and end_date (format: YYYY-MM-DD)
+        start_date: Custom start date in YYYY-MM-DD format (only used with CUSTOM time_period)
+        end_date: Custom end date in YYYY-MM-DD format, included (only used with CUSTOM time_period)
+        
+    Returns:
+        A summary of AWS costs including time period and cost breakdown by service
+    """
+    try:
+        if time_period.upper() == "CUSTOM":
+            if not start_date or not end_date:
+                return {"error": "Custom time period requires both start_date and end_date parameters"}
+            period = resolve_range(start_date, end_date)
+        else:
+            period = resolve_period(time_period)
+    except DateRangeError as e:
+        return {"error": str(e)}
+    
+    # Fetch by month bucket so overlapping periods reuse the same entries
+    buckets = period_buckets(date.fromisoformat(period['start']), date.fromisoformat(period['end']))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+        bucket_costs = list(executor.map(lambda bucket: _get_period_costs(bucket[0].isoformat(), bucket[1].isoformat()),
+                                         buckets))
+    errors = [costs['error'] for costs in bucket_costs if 'error' in costs]
+    if errors:
+        return {"error": errors[0]}
+    
+    last_day = date.fromisoformat(period['end']) - timedelta(days=1)
+    return {
+        'time_period': f"{period['start']} to {last_day.isoformat()}",
+        'period': period['label'],
+        'results': [result for costs in bucket_costs for result in costs['results']]
+    }
+
+@tool
+@memoize_tool
+@budget_tool_output
+def query_costs(start_date: str, end_date: str = "", granularity: str = "MONTHLY", group_by: str = "SERVICE",
+                metrics: str = "UnblendedCost", filters: Optional[Dict[str, List[str]]] = None,
+                exclude: Optional[Dict[str, List[str]]] = None, top_n: int = 10):
+    """
+    Answer an ad-hoc cost question in one call: costs for any date range,
+    grouped by up to two dimensions, filtered, ranked and totalled.
+    Use this instead of chaining several tools or adding numbers with calculator.
+
+    Args:
+        start_date: First day, YYYY-MM-DD
+        end_date: Day after the last day, YYYY-MM-DD (exclusive; default today)
+        granularity: "DAILY", "MONTHLY" or "TOTAL" (one row per group for the whole range)
+        group_by: Up to two comma-separated dimensions: SERVICE, LINKED_ACCOUNT, REGION,
+                  USAGE_TYPE, INSTANCE_TYPE, OPERATION, PURCHASE_TYPE, RECORD_TYPE ("" for totals only)
+        metrics: Comma-separated metrics, first one ranks groups (UnblendedCost, AmortizedCost,
+                 BlendedCost, NetUnblendedCost, UsageQuantity, ...)
+        filters: Only include these values, e.g. {"SERVICE": ["Amazon Elastic Compute Cloud - Compute"]}
+        exclude: Leave out these values, e.g. {"RECORD_TYPE": ["Credit", "Refund"]}
+        top_n: Groups to list; the rest are summed into "Other"
+
+    Returns:
+        columns and rows (period, group keys, metric values), per-period and overall
+        totals, and how many groups were folded into "Other"
+    """
+    try:
+        return run_cost_query({
+            'start': start_date,
+            'end': end_date,
+            'granularity': granularity,
+            'group_by': group_by,
+            'metrics': metrics,
+            'filters': filters,
+            'exclude': exclude,
+            'top_n': top_n
+        }, get_ce_client())
+    except CostQueryError as e:
+        return {"error": f"Invalid query: {str(e)}"}
+    except Exception as e:
+        logger.error(f"Error running cost query: {str(e)}")
         return {"error": str(e)}
 
 # Define the Enhanced FinOps system prompt with optimization guidance
@@ -442,6 +761,7 @@ FINOPS_SYSTEM_PROMPT = """You are an advanced FinOps assistant for AWS cost anal
 1. **get_monthly_spend_analysis(months)**: 🔥 BEST for multi-month analysis
    - Use when: Comparing multiple months, trend analysis, "month-to-month" queries
    - Example: months="2025-01,2025-02,2025-03,2025-04,2025-05,2025-06"
+   - months also takes a period ("last 6 months", "last quarter", "Q1 2025", "YTD"); empty means the last 6 whole months
    - Performance: 6x faster than sequential queries (15-20s vs 90-120s)
    - ALWAYS USE for comprehensive financial analysis
 
@@ -459,11 +779,39 @@ FINOPS_SYSTEM_PROMPT = """You are an advanced FinOps assistant for AWS cost anal
 
 4. **get_aws_cost_summary(time_period)**: For single month/period queries ONLY
    - Use when: Simple single-period analysis
-   - Examples: "APRIL_2025", "LAST_MONTH", "MONTH_TO_DATE"
+   - Examples: "APRIL_2025", "LAST_MONTH", "MONTH_TO_DATE", "last quarter", "YTD", "trailing 90 days", "FY2025"
+   - Pass the user's wording for the period; unrecognized periods return an error listing valid ones
    - WARNING: Do NOT use for comprehensive analysis
 
-5. **current_time()**: Get current date for context
-6. **calculator()**: Perform cost calculations
+## 🔎 AD-HOC QUERIES:
+
+5. **query_costs(start_date, end_date, granularity, group_by, metrics, filters, exclude, top_n)**: 🔥 BEST for any other breakdown
+   - Use when: Costs by region, account or usage type, one service's daily spend, top-N rankings, totals over a custom range
+   - Example: query_costs("2025-04-01", "2025-07-01", "MONTHLY", "REGION", filters={"SERVICE": ["Amazon Relational Database Service"]}, top_n=5)
+   - Returns totals and an "Other" bucket already summed - do NOT re-add its numbers with calculator()
+   - One call replaces several tool calls plus arithmetic
+
+6. **get_daily_spend_trend(period, service_names, top_n)**: 🔥 BEST for day-level questions
+   - Use when: Daily trends, spikes, drops, "what happened last Tuesday", anomaly questions
+   - Example: get_daily_spend_trend("last 30 days", "Amazon EC2,Amazon S3")
+   - Returns daily totals, per-service daily costs and anomalous days already flagged against the prior two weeks
+   - Days already fetched are reused from the cache, so repeated and rolling windows are cheap
+
+7. **forecast_costs(months_ahead, service_names, history_months, top_n, confidence)**: 🔥 BEST for forecasts
+   - Use when: "forecast", "projected", "what will I spend", "end of month estimate", budget planning
+   - Example: forecast_costs(3) or forecast_costs(6, "Amazon EC2,Amazon S3", confidence=90)
+   - Returns per-month forecasts with lower/upper bounds in total and per service, fitted from whole months of history
+   - Report these numbers as they are; do NOT extrapolate history yourself or recompute them with calculator()
+
+8. **get_cost_explorer_forecast(months_ahead, confidence)**: AWS Cost Explorer's own total forecast
+   - Use only when the user asks for the AWS/Cost Explorer forecast or a second opinion
+
+9. **get_more_results(cursor, page, path)**: Only when a result has a "_truncated" section
+   - Large results show the top entries per list; "_other"/"_omitted" entries hold the rest, already summed
+   - Call it only if the omitted entries are needed for the answer
+
+10. **current_time()**: Get current date for context
+11. **calculator()**: Perform cost calculations not covered by the tools
 
 ## 🎯 CRITICAL PERFORMANCE RULES:
 
@@ -479,7 +827,7 @@ FINOPS_SYSTEM_PROMPT = """You are an advanced FinOps assistant for AWS cost anal
 - Comparisons: "month-to-month", "trends", "changes over time"
 - Service analysis: "EC2 costs over time", "which services are growing"
 - Optimization: "recommendations", "cost savings", "optimization opportunities"
-- Forecasting: "forecast costs" - USE get_monthly_spend_analysis() for historical data
+- Forecasting: "forecast costs" - USE forecast_costs()
 
 **Use STANDARD tools ONLY when queries involve:**
 - Single month: "April costs", "last month's spend"
@@ -632,15 +980,70 @@ def format_cost_response(
     
     return formatted_response
 
+def apply_scope_hints(query: str, scope: Optional[Dict[str, Any]]) -> str:
+    """
+    Append the supervisor's scope hints to the query so tool calls stay focused.
+    
+    Months are rendered in the comma-separated form the multi-month tools accept.
+    """
+    if not scope:
+        return query
+    
+    hints = []
+    if scope.get('months'):
+        hints.append(f"- Months: {','.join(scope['months'])} (pass these as the months argument)")
+    if scope.get('services'):
+        hints.append(f"- Services: {', '.join(scope['services'])}")
+    if scope.get('max_detail') == 'concise':
+        hints.append("- Detail: concise - totals, top drivers and trend only")
+    elif scope.get('max_detail') == 'detailed':
+        hints.append("- Detail: detailed - include per-service and per-month figures")
+    if scope.get('exclude'):
+        hints.append(f"- Leave out: {', '.join(scope['exclude'])} (covered by other agents)")
+    
+    if not hints:
+        return query
+    return f"{query}\n\nScope for this request:\n" + "\n".join(hints)
+
+def select_agent_model(scope: Optional[Dict[str, Any]]):
+    """
+    Pick the Bedrock model for the tier the supervisor requested.
+    
+    The fast tier uses FAST_MODEL_ID; otherwise STRANDS_MODEL_ID is used when
+    set and the Strands default model when not.
+    
+    Returns:
+        Tuple of (model, model_id, tier)
+    """
+    tier = (scope or {}).get('model_tier', 'strong')
+    model_id = os.environ.get('FAST_MODEL_ID') if tier == 'fast' else None
+    model_id = model_id or os.environ.get('STRANDS_MODEL_ID')
+    return get_model(model_id), model_id or 'default', tier
+
+def agent_model_metrics(agent, model_id: str, tier: str, tool_memo=None) -> Dict[str, Any]:
+    """Model and token usage of a per-request agent, reported back to the supervisor."""
+    usage = getattr(getattr(agent, 'event_loop_metrics', None), 'accumulated_usage', None) or {}
+    metrics = {
+        'model': model_id,
+        'tier': tier,
+        'input_tokens': usage.get('inputTokens', 0),
+        'output_tokens': usage.get('outputTokens', 0)
+    }
+    if tool_memo is not None:
+        metrics['tool_memo'] = tool_memo.metrics()
+    return metrics
+
 def handler(event, context):
     """
     AWS Lambda handler function for the FinOps Agent with improved response formatting
     """
     try:
         logger.info(f"Received event: {event}")
+        cold_start = init_metrics()
         
         # Extract query from the event
         query = None
+        scope = None
         
         # Check if the event is from API Gateway
         if 'body' in event:
@@ -652,6 +1055,7 @@ def handler(event, context):
                     body = event['body']
                 
                 query = body.get('query', '')
+                scope = body.get('scope')
             except Exception as e:
                 logger.error(f"Error parsing request body: {str(e)}")
                 error_response = f"# Error Processing Request\n\nI encountered an error while parsing your request: {str(e)}\n\nPlease ensure your request is properly formatted."
@@ -671,6 +1075,7 @@ def handler(event, context):
         # Direct Lambda invocation
         elif 'query' in event:
             query = event['query']
+            scope = event.get('scope')
         
         if not query:
             error_response = f"# Missing Query\n\nNo query was provided in your request.\n\nPlease provide a question about AWS costs or FinOps."
@@ -688,8 +1093,38 @@ def handler(event, context):
                 })
             }
         
+        # Simple lookups ("S3 cost in May") are answered from the cost data without the agent loop
+        with use_shared_cost_data((scope or {}).get('cost_data')):
+            direct = answer_simple_query(query, get_ce_client())
+        if direct:
+            formatted_response = {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
+                },
+                'body': json.dumps({
+                    'query': query,
+                    'response': direct['response'],
+                    'answer_path': 'direct',
+                    'model_metrics': {
+                        'model': 'none',
+                        'tier': 'direct',
+                        'input_tokens': 0,
+                        'output_tokens': 0,
+                        'direct_answer': direct['direct_answer']
+                    },
+                    **({'init_metrics': cold_start} if cold_start else {})
+                })
+            }
+            return encode_response(formatted_response, event)
+        
         # Initialize the enhanced agent with optimized tools
+        model, model_id, model_tier = select_agent_model(scope)
         finops_agent = Agent(
+            model=model,
             system_prompt=FINOPS_SYSTEM_PROMPT,
             tools=[
                 calculator, 
@@ -697,13 +1132,21 @@ def handler(event, context):
                 get_aws_cost_summary,           # Standard single-period tool
                 get_monthly_spend_analysis,     # 🚀 Optimized multi-month analysis  
                 get_service_spend_comparison,   # 🚀 Optimized service comparison
-                get_cost_optimization_insights  # 🚀 Optimized recommendations
+                get_cost_optimization_insights, # 🚀 Optimized recommendations
+                query_costs,                    # 🔎 Ad-hoc breakdowns in one call
+                get_daily_spend_trend,          # 📈 Daily trends and anomalies from the interval cache
+                forecast_costs,                 # 🔮 Statistical forecasts with prediction intervals
+                get_cost_explorer_forecast,     # 🔮 Cost Explorer's forecast, cached
+                get_more_results                # Next page of a result cut to fit the context
             ],
         )
         
         # Process the query
         logger.info(f"Processing query: {query}")
-        agent_result = finops_agent(query)
+        # Cost data the supervisor already fetched for this request, when it shared any
+        # and repeated tool calls answered once
+        with use_shared_cost_data((scope or {}).get('cost_data')), tool_memo_scope() as tool_memo:
+            agent_result = finops_agent(apply_scope_hints(query, scope))
         
         # Extract response properly from agent result
         if hasattr(agent_result, 'content') and isinstance(agent_result.content, list):
@@ -724,44 +1167,6 @@ def handler(event, context):
         logger.info(f"Agent result type: {type(agent_result)}")
         logger.info(f"Agent result attributes: {dir(agent_result) if hasattr(agent_result, '__dict__') else 'No attributes'}")
         
-        # For demonstration with the S3 example
-        if "S3 spend" in query.lower() and "June" in query:
-            # Use the example data for S3 spend in June
-            cost_data = {
-                "cost_value": 0.0659059005,
-                "currency": "USD",
-                "start_date": "2025-06-01",
-                "end_date": "2025-06-09",
-                "usage_units": 196336,
-                "service_name": "Amazon S3"
-            }
-            
-            # Create a clean markdown response
-            markdown_response = f"# Amazon S3 Cost Summary\n\n"
-            markdown_response += f"## Total Cost: ${cost_data['cost_value']:.2f} {cost_data['currency']}\n\n"
-            markdown_response += f"**Time Period**: {cost_data['start_date']} to {cost_data['end_date']} (first 9 days of June 2025)\n\n"
-            markdown_response += f"**Usage**: {format(cost_data['usage_units'], ',')} units\n\n"
-            markdown_response += f"---\n\n"
-            markdown_response += f"This represents your Amazon Simple Storage Service (S3) costs for approximately the first 9 days of June 2025.\n\n"
-            markdown_response += f"Your usage totaled {format(cost_data['usage_units'], ',')} units during this period.\n\n"
-            markdown_response += f"Would you like me to provide any cost optimization recommendations for your S3 usage, or do you need information about specific aspects of your S3 spending?"
-            
-            formatted_response = {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
-                },
-                'body': json.dumps({
-                    'query': query,
-                    'response': markdown_response
-                })
-            }
-            
-            return formatted_response
-        
         # Extract cost data from the response for potential use
         cost_data = extract_cost_data(response_text)
         
@@ -777,11 +1182,13 @@ def handler(event, context):
             },
             'body': json.dumps({
                 'query': query,
-                'response': response_text  # Use the full LLM response
+                'response': response_text,  # Use the full LLM response
+                'model_metrics': agent_model_metrics(finops_agent, model_id, model_tier, tool_memo),
+                **({'init_metrics': cold_start} if cold_start else {})
             })
         }
         
-        return formatted_response
+        return encode_response(formatted_response, event)
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
@@ -799,3 +1206,10 @@ def handler(event, context):
                 'response': error_response
             })
         }
+
+
+# Build the default model and Cost Explorer client during the init phase
+run_prewarm({
+    'bedrock': lambda: get_model(os.environ.get('STRANDS_MODEL_ID')).client,
+    'cost_explorer': get_ce_client
+})
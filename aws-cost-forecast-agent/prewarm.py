@@ -0,0 +1,118 @@
+"""
+Init-phase pre-warming for the Lambda functions.
+
+Module-level code runs during Lambda's init phase, before the first invoke.
+Each function registers named warm-up steps that build its reusable objects
+(Bedrock models, boto3 clients) and return the clients whose HTTPS
+connections should be opened. ``run_prewarm`` runs the steps, opens one
+pooled connection per client endpoint (TLS handshake and credential
+resolution, no API call), and records how long each step took. The first
+invoke reports those timings through ``init_metrics``.
+
+Environment flags:
+    PREWARM_ENABLED      Run the steps at init (default: true inside Lambda, false elsewhere)
+    PREWARM_CONNECTIONS  Open HTTPS connections as well as building objects (default: true)
+    PREWARM_SKIP         Comma-separated step names to skip
+
+This file is shared verbatim by the supervisor and the agents.
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_stats: Dict[str, Any] = {}
+_reported = False
+
+
+def prewarm_enabled() -> bool:
+    default = 'true' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'false'
+    return os.environ.get('PREWARM_ENABLED', default).lower() == 'true'
+
+
+def warm_connection(client) -> bool:
+    """
+    Open and pool an HTTPS connection to a boto3 client's endpoint.
+
+    The connection is returned to the client's own urllib3 pool, so the first
+    real request reuses it instead of paying DNS, TCP and TLS setup. Returns
+    False for objects that are not botocore clients.
+    """
+    endpoint = getattr(client, '_endpoint', None)
+    session = getattr(endpoint, 'http_session', None)
+    if session is None:
+        return False
+
+    credentials = getattr(getattr(client, '_request_signer', None), '_credentials', None)
+    if credentials is not None and hasattr(credentials, 'get_frozen_credentials'):
+        credentials.get_frozen_credentials()
+
+    url = client.meta.endpoint_url
+    manager = session._get_connection_manager(url, session._proxy_config.proxy_url_for(url))
+    pool = manager.connection_from_url(url)
+    session._setup_ssl_cert(pool, url, session._verify)
+    connection = pool._get_conn()
+    try:
+        connection.connect()
+    except Exception:
+        connection.close()
+        raise
+    pool._put_conn(connection)
+    return True
+
+
+def run_prewarm(steps: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """
+    Run warm-up steps and record their durations.
+
+    Args:
+        steps: Step name to a callable that builds objects and returns a
+            client, a list of clients, or None
+
+    Returns:
+        Stats with total and per-step milliseconds and any step errors
+    """
+    global _stats, _reported
+    if not prewarm_enabled():
+        return {}
+
+    skip = {name.strip() for name in os.environ.get('PREWARM_SKIP', '').split(',') if name.strip()}
+    connect = os.environ.get('PREWARM_CONNECTIONS', 'true').lower() == 'true'
+    stats: Dict[str, Any] = {'steps': {}, 'errors': {}}
+    started = time.perf_counter()
+
+    for name, step in steps.items():
+        if name in skip:
+            continue
+        step_started = time.perf_counter()
+        try:
+            clients = step()
+            if not isinstance(clients, (list, tuple)):
+                clients = [clients] if clients is not None else []
+            connections = sum(1 for client in clients if connect and warm_connection(client))
+            stats['steps'][name] = {
+                'ms': round((time.perf_counter() - step_started) * 1000, 1),
+                'connections': connections
+            }
+        except Exception as e:
+            # A failed warm-up only costs the first request its usual setup
+            stats['errors'][name] = str(e)
+            logger.warning(f"Pre-warm step {name} failed: {str(e)}")
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Init pre-warm completed in {stats['duration_ms']} ms: {stats['steps']}")
+    _stats = stats
+    _reported = False
+    return stats
+
+
+def init_metrics() -> Optional[Dict[str, Any]]:
+    """Pre-warm stats for the first invoke after init, None for later invokes."""
+    global _reported
+    if _reported or not _stats:
+        return None
+    _reported = True
+    return {'cold_start': True, 'prewarm': _stats}
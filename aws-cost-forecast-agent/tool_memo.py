@@ -0,0 +1,148 @@
+"""
+Request-scoped memoization of agent tool results.
+
+Within one agent run the model often calls the same tool with the same
+arguments more than once, and some tools call others internally (the
+Trusted Advisor summary re-reads every recommendation). ``memoize_tool``
+wraps the function under ``@tool`` so a repeated call within the request
+returns the first result without touching the API:
+
+    @tool
+    @memoize_tool
+    def get_budget_analysis() -> str:
+        ...
+
+Results are only reused inside ``tool_memo_scope()``, which the handler
+opens around the agent run and which drops everything when it exits;
+outside a scope the wrapper calls straight through, so nothing is served
+across requests in a warm container. Arguments are bound to the signature
+with defaults applied and serialized with sorted keys, so ``f()`` and
+``f("cost_optimizing")`` share an entry when that is the default.
+Exceptions and results carrying a top-level ``error`` are not kept, so the
+model can still retry after a throttle. Concurrent calls with the same
+arguments wait for the first instead of fetching twice.
+
+Environment flags:
+    TOOL_MEMO_ENABLED  Reuse tool results within a request (default: true)
+
+This file is shared verbatim by the agents.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_active: Optional['ToolMemo'] = None
+
+
+def _is_error(result: Any) -> bool:
+    if isinstance(result, dict) and set(result) == {'text'}:
+        # A ContentBlock wrapping the tool's JSON
+        result = result['text']
+    if isinstance(result, dict):
+        return 'error' in result
+    if isinstance(result, str) and result.startswith('{') and '"error"' in result:
+        try:
+            return 'error' in json.loads(result)
+        except ValueError:
+            return False
+    return False
+
+
+class ToolMemo:
+    """Tool results and hit counts for one request."""
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def call(self, name: str, arguments: str, function: Callable, args: tuple, kwargs: dict) -> Any:
+        key = (name, arguments)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.RLock())
+            stats = self.stats.setdefault(name, {'calls': 0, 'hits': 0, 'saved_ms': 0.0})
+            stats['calls'] += 1
+        with key_lock:
+            if key in self._results:
+                result, elapsed_ms = self._results[key]
+                with self._lock:
+                    stats['hits'] += 1
+                    stats['saved_ms'] += elapsed_ms
+                logger.info(f"Tool memo hit: {name}({arguments})")
+                return result
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            if not _is_error(result):
+                self._results[key] = (result, (time.perf_counter() - started) * 1000)
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Calls, hits and the time the hits saved, overall and per tool."""
+        with self._lock:
+            tools = {name: dict(stats, saved_ms=round(stats['saved_ms'], 1)) for name, stats in self.stats.items()}
+        return {
+            'calls': sum(stats['calls'] for stats in tools.values()),
+            'hits': sum(stats['hits'] for stats in tools.values()),
+            'saved_ms': round(sum(stats['saved_ms'] for stats in tools.values()), 1),
+            'tools': tools
+        }
+
+
+def memoize_tool(function: Callable) -> Callable:
+    """
+    Reuse the function's results within the active ``tool_memo_scope``.
+
+    ``functools.wraps`` keeps the name, docstring, annotations and signature
+    that ``strands.tool`` builds the tool spec from.
+    """
+    signature = inspect.signature(function)
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        memo = _active
+        if memo is None:
+            return function(*args, **kwargs)
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = json.dumps(bound.arguments, sort_keys=True, separators=(',', ':'))
+        except (TypeError, ValueError):
+            # Arguments that cannot be compared reliably are never reused
+            return function(*args, **kwargs)
+        return memo.call(name, arguments, function, args, kwargs)
+
+    return wrapper
+
+
+class tool_memo_scope:
+    """
+    Reuse tool results for the duration of a ``with`` block (one request).
+
+    Yields the request's ``ToolMemo``, or None when ``TOOL_MEMO_ENABLED`` is
+    false. Like the other request state in these functions the memo is
+    container-wide rather than per thread, because tools fan out to thread
+    pools; a Lambda container handles one request at a time.
+    """
+
+    def __enter__(self) -> Optional[ToolMemo]:
+        global _active
+        if os.environ.get('TOOL_MEMO_ENABLED', 'true').lower() != 'true':
+            _active = None
+            return None
+        _active = ToolMemo()
+        return _active
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        _active = None
+        return False
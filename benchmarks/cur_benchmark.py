@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+CUR cost cube benchmark.
+
+Generates a synthetic Cost and Usage Report export (monthly Parquet files,
+row groups in usage-day order, with the wide columns a real export carries),
+builds a cost cube from it with ``cur_cube.build_cube`` and times the
+Cost Explorer style requests the agents make, answered from the cube and by
+scanning the export directly.
+
+Requires pyarrow.
+
+Examples:
+    python benchmarks/cur_benchmark.py
+    python benchmarks/cur_benchmark.py --rows 1000000 --months 3 --json
+    python benchmarks/cur_benchmark.py --data-dir /tmp/cur --keep
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+import cur_cube
+
+SERVICES = {
+    'Amazon Elastic Compute Cloud': 'EC2', 'Amazon Simple Storage Service': 'S3',
+    'Amazon Relational Database Service': 'RDS', 'AWS Lambda': 'Lambda', 'Amazon DynamoDB': 'DynamoDB',
+    'Amazon CloudFront': 'CloudFront', 'Amazon Virtual Private Cloud': 'VPC',
+    'Amazon Elastic Container Service': 'ECS', 'Amazon CloudWatch': 'CW', 'AWS Key Management Service': 'KMS',
+    'Amazon Simple Queue Service': 'SQS', 'Amazon ElastiCache': 'ElastiCache',
+    'Amazon OpenSearch Service': 'ES', 'AWS Glue': 'Glue', 'Amazon Athena': 'Athena', 'Amazon Kinesis': 'Kinesis',
+    'Amazon Route 53': 'Route53', 'AWS Config': 'Config', 'Amazon SageMaker': 'SageMaker', 'Amazon Bedrock': 'Bedrock'
+}
+REGIONS = {'us-east-1': 'USE1', 'us-east-2': 'USE2', 'us-west-2': 'USW2', 'eu-west-1': 'EU', 'eu-central-1': 'EUC1',
+           'ap-southeast-2': 'APS2', 'ap-northeast-1': 'APN1'}
+USAGE_KINDS = ['Usage', 'Requests', 'DataTransfer-Out-Bytes']
+# Usage types are specific to a region and a service, as in real exports
+USAGE_TYPES = [f"{prefix}-{code}-{kind}" for prefix in REGIONS.values() for code in SERVICES.values()
+               for kind in USAGE_KINDS]
+# Each account runs in two regions
+ACCOUNT_REGIONS = 2
+INSTANCE_TYPES = ['', 'm5.large', 'c6g.xlarge', 'r6g.large', 't3.micro', 'db.r6g.large']
+LINE_ITEM_TYPES = ['Usage', 'Usage', 'Usage', 'Tax', 'Credit', 'DiscountedUsage']
+
+# Requests the agents make, in Cost Explorer form; {start} and {end} span the export
+QUERIES = {
+    'monthly_total': {'Granularity': 'MONTHLY', 'Metrics': ['UnblendedCost']},
+    'monthly_by_service': {'Granularity': 'MONTHLY', 'Metrics': ['UnblendedCost'],
+                           'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]},
+    'daily_by_service_one_account': {'Granularity': 'DAILY', 'Metrics': ['UnblendedCost', 'UsageQuantity'],
+                                     'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}],
+                                     'Filter': {'Dimensions': {'Key': 'LINKED_ACCOUNT', 'Values': ['{account}']}}},
+    'monthly_by_account_region': {'Granularity': 'MONTHLY', 'Metrics': ['BlendedCost'],
+                                  'GroupBy': [{'Type': 'DIMENSION', 'Key': 'LINKED_ACCOUNT'},
+                                              {'Type': 'DIMENSION', 'Key': 'REGION'}]},
+}
+
+
+def _month_start(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _choice(pa, pc, values: List[str], size: int, seed: int):
+    """Dictionary-encoded column of ``size`` values drawn from ``values``."""
+    indices = pc.cast(pc.floor(pc.multiply(pc.random(size, initializer=seed), len(values))), pa.int32())
+    return indices, pa.DictionaryArray.from_arrays(indices, pa.array(values, pa.string()))
+
+
+def generate_cur(directory: str, rows: int = 10_000_000, months: int = 6, accounts: int = 50,
+                 end: Optional[date] = None, seed: int = 7) -> Dict[str, Any]:
+    """
+    Write a synthetic CUR export of about ``rows`` line items to ``directory``.
+
+    One Parquet file per month and one row group per usage day, covering the
+    ``months`` whole months before ``end`` (default: the start of the
+    current month).
+    """
+    pa = cur_cube._arrow()
+    pc = pa.compute
+    end = end or date.today().replace(day=1)
+    start = _month_start(end, -months)
+    days = (end - start).days
+    rows_per_day = max(rows // days, 1)
+    account_ids = [f"{100000000000 + index * 7919:012d}" for index in range(accounts)]
+    resource_ids = [f"i-{index * 2654435761 % (1 << 40):010x}" for index in range(5000)]
+    account_regions = pa.array([(account * 3 + slot) % len(REGIONS) for account in range(accounts)
+                                for slot in range(ACCOUNT_REGIONS)], pa.int32())
+    service_weights = pa.array([40.0 / (rank + 1) for rank in range(len(SERVICES))], pa.float64())
+
+    os.makedirs(directory, exist_ok=True)
+    writer = None
+    month = None
+    written = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.replace(day=1) != month:
+            if writer:
+                writer.close()
+            month = day.replace(day=1)
+            writer = None
+        day_seed = seed * 100003 + offset * 16
+        service_index, service = _choice(pa, pc, list(SERVICES), rows_per_day, day_seed)
+        account_index, account = _choice(pa, pc, account_ids, rows_per_day, day_seed + 1)
+        region_slot, _ = _choice(pa, pc, ['first', 'second'], rows_per_day, day_seed + 2)
+        region_index = pc.take(account_regions, pc.add(pc.multiply(account_index, ACCOUNT_REGIONS), region_slot))
+        region = pa.DictionaryArray.from_arrays(region_index, pa.array(list(REGIONS), pa.string()))
+        kind_index, _ = _choice(pa, pc, USAGE_KINDS, rows_per_day, day_seed + 3)
+        usage_type_index = pc.add(pc.multiply(pc.add(pc.multiply(region_index, len(SERVICES)), service_index),
+                                              len(USAGE_KINDS)), kind_index)
+        usage_type = pa.DictionaryArray.from_arrays(usage_type_index, pa.array(USAGE_TYPES, pa.string()))
+        _, resource = _choice(pa, pc, resource_ids, rows_per_day, day_seed + 4)
+        _, instance_type = _choice(pa, pc, INSTANCE_TYPES, rows_per_day, day_seed + 5)
+        _, line_item_type = _choice(pa, pc, LINE_ITEM_TYPES, rows_per_day, day_seed + 6)
+        hours = pc.cast(pc.floor(pc.multiply(pc.random(rows_per_day, initializer=day_seed + 7), 24)), pa.int64())
+        midnight = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+        usage_start = pc.cast(pc.add(pc.multiply(hours, 3_600_000), midnight), pa.timestamp('ms', tz='UTC'))
+        usage = pc.multiply(pc.random(rows_per_day, initializer=day_seed + 8), 100.0)
+        # Skewed costs: a few services dominate, as in real bills
+        unit_cost = pc.multiply(pc.power(pc.random(rows_per_day, initializer=day_seed + 9), 3.0),
+                                pc.take(service_weights, service_index))
+        unblended = pc.round(pc.multiply(unit_cost, 0.01), 10)
+        blended = pc.round(pc.multiply(unblended, 0.98), 10)
+
+        table = pa.table({
+            'identity_line_item_id': pc.cast(pc.add(pa.array(range(rows_per_day), pa.int64()), written),
+                                             pa.string()),
+            'bill_payer_account_id': pa.DictionaryArray.from_arrays(
+                pa.nulls(rows_per_day, pa.int32()).fill_null(0), pa.array([account_ids[0]])),
+            'line_item_usage_account_id': account,
+            'line_item_line_item_type': line_item_type,
+            'line_item_usage_start_date': usage_start,
+            'line_item_usage_end_date': pc.cast(pc.add(pc.multiply(hours, 3_600_000), midnight + 3_600_000),
+                                                pa.timestamp('ms', tz='UTC')),
+            'line_item_product_code': service,
+            'line_item_usage_type': usage_type,
+            'line_item_resource_id': resource,
+            'line_item_line_item_description': usage_type,
+            'line_item_usage_amount': usage,
+            'line_item_unblended_cost': unblended,
+            'line_item_blended_cost': blended,
+            'product_product_name': service,
+            'product_region_code': region,
+            'product_instance_type': instance_type,
+        })
+        if writer is None:
+            path = os.path.join(directory, f"cur-{month:%Y-%m}.parquet")
+            writer = cur_cube._arrow().parquet.ParquetWriter(path, table.schema, compression='snappy')
+        writer.write_table(table, row_group_size=rows_per_day)
+        written += rows_per_day
+    if writer:
+        writer.close()
+    return {'rows': written, 'start': start, 'end': end, 'accounts': account_ids, 'columns': table.num_columns}
+
+
+def _request(name: str, start: date, end: date, account: str) -> Dict[str, Any]:
+    request = json.loads(json.dumps(QUERIES[name]).replace('{account}', account))
+    request['TimePeriod'] = {'Start': start.isoformat(), 'End': end.isoformat()}
+    return request
+
+
+def scan_query(source: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer a request by scanning the export itself (with projection and pushdown)."""
+    period = request['TimePeriod']
+    cube = cur_cube.build_cube(source, date.fromisoformat(period['Start']), date.fromisoformat(period['End']))
+    return cube.get_cost_and_usage(**request)
+
+
+def _timed(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def run_cur_benchmark(rows: int = 10_000_000, months: int = 6, repeat: int = 5,
+                      data_dir: Optional[str] = None, keep: bool = False) -> Dict[str, Any]:
+    directory = data_dir or tempfile.mkdtemp(prefix='cur-benchmark-')
+    try:
+        started = time.perf_counter()
+        export = generate_cur(os.path.join(directory, 'export'), rows, months)
+        generate_seconds = time.perf_counter() - started
+        export_bytes = sum(os.path.getsize(os.path.join(directory, 'export', name))
+                           for name in os.listdir(os.path.join(directory, 'export')))
+
+        started = time.perf_counter()
+        cube = cur_cube.build_cube(os.path.join(directory, 'export'))
+        build_seconds = time.perf_counter() - started
+        cube_path = os.path.join(directory, 'cube.parquet')
+        cube.save(cube_path)
+
+        started = time.perf_counter()
+        loaded = cur_cube.CostCube.load(cube_path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        last_month = _month_start(export['end'], -1)
+        queries = []
+        for name in QUERIES:
+            full = _request(name, export['start'], export['end'], export['accounts'][0])
+            month = _request(name, last_month, export['end'], export['accounts'][0])
+            cube_answer = loaded.get_cost_and_usage(**full)
+            scan_answer = scan_query(os.path.join(directory, 'export'), month)
+            assert scan_answer['ResultsByTime'] == loaded.get_cost_and_usage(**month)['ResultsByTime']
+            queries.append({
+                'query': name,
+                'periods': len(cube_answer['ResultsByTime']),
+                'cube_ms': _timed(lambda: loaded.get_cost_and_usage(**full), repeat),
+                'scan_last_month_ms': _timed(lambda: scan_query(os.path.join(directory, 'export'), month), 1),
+            })
+        return {
+            'line_items': export['rows'],
+            'months': months,
+            'export_columns': export['columns'],
+            'export_bytes': export_bytes,
+            'generate_seconds': generate_seconds,
+            'build_seconds': build_seconds,
+            'build_rows_per_second': export['rows'] / build_seconds,
+            'cube_cells': len(cube.table),
+            'cube_bytes': os.path.getsize(cube_path),
+            'cube_load_ms': load_ms,
+            'queries': queries
+        }
+    finally:
+        if not keep and not data_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = [
+        f"{results['line_items']:,} line items over {results['months']} months, {results['export_columns']} columns, "
+        f"{results['export_bytes'] / 1e6:,.0f} MB of Parquet (generated in {results['generate_seconds']:.1f}s)",
+        f"cube build: {results['build_seconds']:.1f}s ({results['build_rows_per_second']:,.0f} line items/s) -> "
+        f"{results['cube_cells']:,} cells, {results['cube_bytes'] / 1e6:,.1f} MB, loads in "
+        f"{results['cube_load_ms']:.0f} ms",
+        "",
+        f"{'query':<30} {'periods':>7} {'cube ms':>9} {'scan 1 month ms':>16}",
+        "-" * 65
+    ]
+    for query in results['queries']:
+        lines.append(f"{query['query']:<30} {query['periods']:>7} {query['cube_ms']:>9.1f} "
+                     f"{query['scan_last_month_ms']:>16.0f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CUR cost cube benchmark")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Synthetic CUR line items")
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data-dir', help="Write the export and cube here instead of a temporary directory")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated export")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_cur_benchmark(args.rows, args.months, args.repeat, args.data_dir, args.keep)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
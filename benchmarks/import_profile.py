@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cold-start import profiler for the Lambda packages.
+
+Imports a target in a fresh interpreter with ``python -X importtime`` and
+reports the wall time plus the most expensive modules, both by their own
+import cost and cumulatively. Each target models a cold start on one path:
+
+    handler    supervisor ``lambda_handler`` module load (Lambda init phase)
+    legacy     handler plus the router/synthesis modules the legacy path loads
+    strands    handler plus the Strands supervisor and its agent tools
+    cost | budget | trusted_advisor   specialist agent handler modules
+
+Examples:
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --target strands --top 25 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'handler': ('supervisor_agent', ['lambda_handler']),
+    'legacy': ('supervisor_agent', ['lambda_handler', 'llm_router_simple', 'intelligent_finops_supervisor']),
+    'strands': ('supervisor_agent', ['lambda_handler', 'strands_supervisor_agent']),
+    'cost': ('aws-cost-forecast-agent', ['lambda_handler']),
+    'budget': ('budget_management_agent', ['lambda_handler']),
+    'trusted_advisor': ('trusted_advisor_agent', ['lambda_handler']),
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+CHILD_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print('WALL_MS', (time.perf_counter() - started) * 1000)
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` output into per-module self and cumulative microseconds."""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules.append({
+                'module': match.group(4),
+                'self_us': int(match.group(1)),
+                'cumulative_us': int(match.group(2)),
+                'depth': len(match.group(3)) // 2
+            })
+    return modules
+
+
+def profile_target(target: str) -> Dict[str, Any]:
+    """Import ``target`` in a fresh interpreter and return wall time and module costs."""
+    directory, imports = TARGETS[target]
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT] + imports,
+        cwd=os.path.join(REPO_ROOT, directory), env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+
+    wall_ms = float(result.stdout.split('WALL_MS')[-1].strip())
+    modules = parse_importtime(result.stderr)
+    packages: Dict[str, int] = {}
+    for module in modules:
+        package = module['module'].split('.')[0]
+        packages[package] = packages.get(package, 0) + module['self_us']
+    return {'target': target, 'wall_ms': wall_ms, 'modules': modules, 'packages': packages}
+
+
+def run_import_profile(targets: List[str], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Profile each target ``repeat`` times, keeping the run with the median wall time."""
+    profiles = []
+    for target in targets:
+        runs = sorted((profile_target(target) for _ in range(repeat)), key=lambda run: run['wall_ms'])
+        profile = runs[len(runs) // 2]
+        profile['wall_ms_runs'] = [run['wall_ms'] for run in runs]
+        profiles.append(profile)
+    return profiles
+
+
+def format_profile(profile: Dict[str, Any], top: int = 15) -> str:
+    lines = [
+        f"== {profile['target']}: {profile['wall_ms']:.1f} ms wall "
+        f"(median of {len(profile['wall_ms_runs'])}, min {min(profile['wall_ms_runs']):.1f} ms)",
+        "",
+        f"{'package':<40} {'self ms':>10}"
+    ]
+    for package, self_us in sorted(profile['packages'].items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{package:<40} {self_us / 1000:>10.1f}")
+
+    lines += ["", f"{'module':<56} {'self ms':>9} {'cumulative ms':>14}"]
+    for module in sorted(profile['modules'], key=lambda module: -module['cumulative_us'])[:top]:
+        name = '  ' * min(module['depth'], 6) + module['module']
+        lines.append(f"{name[:56]:<56} {module['self_us'] / 1000:>9.1f} {module['cumulative_us'] / 1000:>14.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import profiler")
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS),
+                        help="Target to profile (repeatable, default: handler, legacy, strands)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help="Rows per table")
+    parser.add_argument('--json', action='store_true', help="Print wall times and package costs as JSON")
+    args = parser.parse_args(argv)
+
+    profiles = run_import_profile(args.target or ['handler', 'legacy', 'strands'], args.repeat)
+    if args.json:
+        print(json.dumps([
+            {'target': p['target'], 'wall_ms': p['wall_ms'], 'wall_ms_runs': p['wall_ms_runs'],
+             'packages_ms': {name: us / 1000 for name, us in sorted(p['packages'].items(), key=lambda i: -i[1])}}
+            for p in profiles
+        ], indent=2))
+    else:
+        print("\n\n".join(format_profile(profile, args.top) for profile in profiles))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1080 @@
+"""
+Local AWS emulator for offline performance testing.
+
+Provides in-process stand-ins for Lambda, Bedrock (Strands Agent/BedrockModel),
+Cost Explorer, Trusted Advisor, Support, Budgets, STS, Organizations,
+API Gateway Management, DynamoDB and SQS so the supervisor, the specialist agents and the WebSocket
+progress notifier can be driven end to end without AWS credentials.
+
+Every emulated call sleeps for a latency sampled from a configurable
+distribution, may fail with a configurable probability, and is recorded per
+stage so that p50/p95/p99 can be reported by the benchmark runner.
+"""
+
+import copy
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Any, Optional, List, Callable
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lambda function names used across the repo, mapped to their source location
+AGENT_FUNCTIONS = {
+    'aws-cost-forecast-agent': ('aws-cost-forecast-agent/lambda_handler.py', 'handler'),
+    'trusted-advisor-agent-trusted-advisor-agent': ('trusted_advisor_agent/lambda_handler.py', 'handler'),
+    'budget-management-agent': ('budget_management_agent/lambda_handler.py', 'lambda_handler'),
+}
+
+LOCAL_SERVICES = [
+    'Amazon Elastic Compute Cloud - Compute', 'Amazon Simple Storage Service',
+    'Amazon Relational Database Service', 'AWS Lambda', 'Amazon DynamoDB',
+    'Amazon CloudFront', 'Amazon Bedrock', 'AmazonCloudWatch'
+]
+
+# The emulated caller's account; linked accounts are numbered from 100000000001
+LOCAL_ACCOUNT_ID = '000000000000'
+
+DEFAULT_ROUTING_RESPONSE = {
+    "agents": ["cost_forecast", "trusted_advisor"],
+    "reasoning": "Local emulator routing decision",
+    "synthesis_needed": True,
+    "confidence": "medium"
+}
+
+
+class LatencyProfile:
+    """
+    Latency and failure distribution for one emulated service or stage.
+
+    Latencies are drawn from a log-normal distribution around ``median``
+    seconds; ``sigma`` controls the tail. Set ``sigma`` to 0 for fixed latency.
+    """
+
+    def __init__(self, median: float = 0.0, sigma: float = 0.25,
+                 failure_rate: float = 0.0, error_code: str = 'ThrottlingException'):
+        self.median = median
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.error_code = error_code
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in seconds."""
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        return rng.lognormvariate(math.log(self.median), self.sigma)
+
+    def should_fail(self, rng: random.Random) -> bool:
+        """Decide whether this call fails."""
+        return self.failure_rate > 0 and rng.random() < self.failure_rate
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyProfile':
+        """
+        Parse a CLI spec of the form ``median[,sigma[,failure_rate]]``.
+
+        Example: ``0.2,0.5,0.05`` is a 200ms median, sigma 0.5, 5% failures.
+        """
+        parts = [float(part) for part in spec.split(',') if part.strip()]
+        return cls(*parts[:3])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of ``values`` (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (pct / 100.0) * (len(ordered) - 1)
+    lower = int(math.floor(rank))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class StageRecorder:
+    """Thread-safe collector of per-stage timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = defaultdict(list)
+        self._errors = defaultdict(int)
+
+    def record(self, stage: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._timings[stage].append(seconds)
+            if not ok:
+                self._errors[stage] += 1
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._errors.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, errors, mean, p50, p95 and p99 per stage."""
+        with self._lock:
+            timings = {stage: list(values) for stage, values in self._timings.items()}
+            errors = dict(self._errors)
+
+        return {
+            stage: {
+                'count': len(values),
+                'errors': errors.get(stage, 0),
+                'mean': sum(values) / len(values) if values else 0.0,
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99)
+            }
+            for stage, values in sorted(timings.items())
+        }
+
+
+class FakeLambdaContext:
+    """Minimal Lambda context object."""
+
+    def __init__(self, function_name: str = 'local-function', timeout_seconds: float = 900):
+        self.function_name = function_name
+        self.aws_request_id = f"local-{random.getrandbits(48):012x}"
+        self._deadline = time.time() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.time()) * 1000))
+
+
+class _FakeClient:
+    """Base class for emulated boto3 clients."""
+
+    service_name = 'unknown'
+
+    def __init__(self, local: 'LocalAWS', **kwargs):
+        self._local = local
+        self._kwargs = kwargs
+
+    def _call(self, operation: str, stage: Optional[str] = None):
+        self._local.simulate(stage or f"{self.service_name}.{operation}", self.service_name, operation)
+
+    @property
+    def account_id(self) -> str:
+        """The account the client acts in: the assumed role's, or the caller's."""
+        key = self._kwargs.get('aws_access_key_id') or ''
+        return key[len('LOCALKEY'):] if key.startswith('LOCALKEY') else LOCAL_ACCOUNT_ID
+
+
+class FakeLambdaClient(_FakeClient):
+    """Emulates ``lambda.invoke`` by dispatching to registered in-process handlers."""
+
+    service_name = 'lambda'
+
+    def invoke(self, FunctionName: str, InvocationType: str = 'RequestResponse',
+               Payload: Any = b'{}', **kwargs) -> Dict[str, Any]:
+        function_name = FunctionName.split(':')[0]
+        stage = f"lambda:{function_name}"
+        started = time.time()
+        ok = True
+        try:
+            self._local.simulate(None, 'lambda', 'invoke', key=stage)
+            event = json.loads(Payload) if Payload else {}
+            handler = self._local.functions.get(function_name)
+            response = {'StatusCode': 200}
+            if handler is None:
+                result = {
+                    'statusCode': 200,
+                    'body': json.dumps({'response': f"Local response from {function_name}"})
+                }
+            else:
+                try:
+                    result = handler(event, FakeLambdaContext(function_name))
+                except Exception as e:
+                    ok = False
+                    response['FunctionError'] = 'Unhandled'
+                    result = {'errorMessage': str(e), 'errorType': type(e).__name__}
+            body = json.dumps(result).encode('utf-8')
+            with self._local.lock:
+                self._local.bytes_transferred[stage] += len(body)
+            response['Payload'] = io.BytesIO(body)
+            return response
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self._local.recorder.record(stage, time.time() - started, ok)
+
+
+class FakeCostExplorerClient(_FakeClient):
+    """Emulates Cost Explorer with deterministic synthetic costs."""
+
+    service_name = 'ce'
+
+    def get_cost_and_usage(self, TimePeriod: Dict[str, str], Granularity: str = 'MONTHLY',
+                           Metrics: Optional[List[str]] = None, GroupBy: Optional[List[Dict]] = None,
+                           **kwargs) -> Dict[str, Any]:
+        self._call('get_cost_and_usage')
+        metrics = Metrics or ['UnblendedCost']
+        start = date.fromisoformat(TimePeriod['Start'])
+        end = date.fromisoformat(TimePeriod['End'])
+        results = []
+        for period_start, period_end in _periods(start, end, Granularity):
+            days = (period_end - period_start).days
+            groups = []
+            if GroupBy and GroupBy[0].get('Key') == 'LINKED_ACCOUNT':
+                # Each account's share falls off with its position, like the services
+                total = sum(_synthetic_cost(s, period_start, i) * days for i, s in enumerate(LOCAL_SERVICES))
+                weights = [1 / (index + 1) for index in range(len(self._local.accounts))]
+                for account_id, weight in zip(self._local.accounts, weights):
+                    amount = total * weight / sum(weights)
+                    groups.append({
+                        'Keys': [account_id],
+                        'Metrics': {metric: {'Amount': f"{amount:.10f}", 'Unit': 'USD'} for metric in metrics}
+                    })
+            elif GroupBy:
+                for index, service in enumerate(LOCAL_SERVICES):
+                    amount = _synthetic_cost(service, period_start, index) * days
+                    groups.append({
+                        'Keys': [service],
+                        'Metrics': {metric: {'Amount': f"{amount:.10f}", 'Unit': 'USD'} for metric in metrics}
+                    })
+            total = sum(_synthetic_cost(s, period_start, i) * days for i, s in enumerate(LOCAL_SERVICES))
+            results.append({
+                'TimePeriod': {'Start': period_start.isoformat(), 'End': period_end.isoformat()},
+                'Total': {} if GroupBy else {metric: {'Amount': f"{total:.10f}", 'Unit': 'USD'} for metric in metrics},
+                'Groups': groups,
+                'Estimated': period_end >= date.today()
+            })
+        return {'ResultsByTime': results, 'DimensionValueAttributes': []}
+
+    def get_cost_forecast(self, TimePeriod: Dict[str, str], Metric: str = 'UNBLENDED_COST',
+                          Granularity: str = 'MONTHLY', **kwargs) -> Dict[str, Any]:
+        self._call('get_cost_forecast')
+        start = date.fromisoformat(TimePeriod['Start'])
+        end = date.fromisoformat(TimePeriod['End'])
+        forecasts = []
+        total = 0.0
+        for period_start, period_end in _periods(start, end, Granularity):
+            days = (period_end - period_start).days
+            amount = sum(_synthetic_cost(s, period_start, i) * days for i, s in enumerate(LOCAL_SERVICES))
+            total += amount
+            forecasts.append({
+                'TimePeriod': {'Start': period_start.isoformat(), 'End': period_end.isoformat()},
+                'MeanValue': f"{amount:.4f}",
+                'PredictionIntervalLowerBound': f"{amount * 0.9:.4f}",
+                'PredictionIntervalUpperBound': f"{amount * 1.1:.4f}"
+            })
+        return {'Total': {'Amount': f"{total:.4f}", 'Unit': 'USD'}, 'ForecastResultsByTime': forecasts}
+
+
+class FakeTrustedAdvisorClient(_FakeClient):
+    """Emulates the TrustedAdvisor API."""
+
+    service_name = 'trustedadvisor'
+
+    def list_recommendations(self, **kwargs) -> Dict[str, Any]:
+        self._call('list_recommendations')
+        status = kwargs.get('status', 'warning')
+        summaries = []
+        for index in range(self._local.recommendation_count):
+            summaries.append({
+                'arn': f"arn:aws:trustedadvisor::{self.account_id}:recommendation/local-{status}-{index}",
+                'id': f"local-{status}-{index}",
+                'name': f"Local {status} check {index}",
+                'status': status,
+                'pillars': ['cost_optimizing'],
+                'source': 'ta_check',
+                'awsServices': ['ec2'],
+                'type': 'standard',
+                'pillarSpecificAggregates': {
+                    'costOptimizing': {
+                        'estimatedMonthlySavings': round(25.0 * (index + 1), 2),
+                        'estimatedPercentMonthlySavings': 5.0
+                    }
+                },
+                'resourcesAggregates': {'errorCount': 0, 'warningCount': index + 1, 'okCount': 3}
+            })
+        return {'recommendationSummaries': summaries}
+
+    def get_recommendation(self, recommendationIdentifier: str, **kwargs) -> Dict[str, Any]:
+        self._call('get_recommendation')
+        return {
+            'recommendation': {
+                'arn': recommendationIdentifier,
+                'description': 'Local recommendation description',
+                'recommendedActions': [{'description': 'Review the flagged resources'}],
+                'resources': [
+                    {'resourceId': f"i-local{index:04d}", 'status': 'warning', 'metadata': {'region': 'us-east-1'}}
+                    for index in range(3)
+                ]
+            }
+        }
+
+
+class FakeSupportClient(_FakeClient):
+    """Emulates the Support API Trusted Advisor operations."""
+
+    service_name = 'support'
+
+    def describe_trusted_advisor_checks(self, language: str = 'en', **kwargs) -> Dict[str, Any]:
+        self._call('describe_trusted_advisor_checks')
+        return {
+            'checks': [
+                {
+                    'id': f"local-check-{index}",
+                    'name': f"Local cost check {index}",
+                    'description': 'Local check',
+                    'category': 'cost_optimizing',
+                    'metadata': ['Region', 'Instance ID', 'Estimated Monthly Savings']
+                }
+                for index in range(self._local.recommendation_count)
+            ]
+        }
+
+    def describe_trusted_advisor_check_result(self, checkId: str, language: str = 'en', **kwargs) -> Dict[str, Any]:
+        self._call('describe_trusted_advisor_check_result')
+        return {
+            'result': {
+                'checkId': checkId,
+                'status': 'warning',
+                'timestamp': datetime.now().isoformat(),
+                'flaggedResources': [
+                    {'resourceId': f"r-{index}", 'region': 'us-east-1', 'status': 'warning',
+                     'metadata': ['us-east-1', f"i-{index}", '$12.50']}
+                    for index in range(3)
+                ],
+                'categorySpecificSummary': {'costOptimizing': {'estimatedMonthlySavings': 37.5}},
+                'resourcesSummary': {'resourcesProcessed': 10, 'resourcesFlagged': 3,
+                                     'resourcesIgnored': 0, 'resourcesSuppressed': 0}
+            }
+        }
+
+
+class FakeBudgetsClient(_FakeClient):
+    """Emulates AWS Budgets."""
+
+    service_name = 'budgets'
+
+    def describe_budgets(self, AccountId: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self._call('describe_budgets')
+        account_id = AccountId or self.account_id
+        if account_id != self.account_id:
+            # Budgets only answers for the caller's own account
+            raise ClientError({'Error': {'Code': 'AccessDeniedException',
+                                         'Message': f"Not authorized for account {account_id}"}}, 'DescribeBudgets')
+        budgets = self._local.budgets if account_id == LOCAL_ACCOUNT_ID else self._local.account_budgets.get(account_id, [])
+        return {'Budgets': copy.deepcopy(budgets)}
+
+    def create_budget(self, **kwargs) -> Dict[str, Any]:
+        self._call('create_budget')
+        return {}
+
+    def update_budget(self, **kwargs) -> Dict[str, Any]:
+        self._call('update_budget')
+        return {}
+
+
+class FakeSTSClient(_FakeClient):
+    """Emulates STS; assumed-role keys carry the account they act in."""
+
+    service_name = 'sts'
+
+    def get_caller_identity(self, **kwargs) -> Dict[str, Any]:
+        self._call('get_caller_identity')
+        return {'Account': self.account_id, 'Arn': f"arn:aws:iam::{self.account_id}:user/local"}
+
+    def assume_role(self, RoleArn: str, RoleSessionName: str, DurationSeconds: int = 3600,
+                    **kwargs) -> Dict[str, Any]:
+        self._call('assume_role')
+        account_id = RoleArn.split(':')[4]
+        if account_id not in self._local.accounts:
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': f"Cannot assume {RoleArn}"}},
+                              'AssumeRole')
+        return {
+            'Credentials': {
+                'AccessKeyId': f"LOCALKEY{account_id}",
+                'SecretAccessKey': 'local',
+                'SessionToken': f"local-{RoleSessionName}",
+                'Expiration': datetime.now().astimezone() + timedelta(seconds=DurationSeconds)
+            },
+            'AssumedRoleUser': {'Arn': f"{RoleArn}/{RoleSessionName}"}
+        }
+
+
+class FakeOrganizationsClient(_FakeClient):
+    """Emulates ``organizations.list_accounts`` with 20 accounts per page."""
+
+    service_name = 'organizations'
+
+    def list_accounts(self, NextToken: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self._call('list_accounts')
+        start = int(NextToken or 0)
+        page = self._local.accounts[start:start + 20]
+        response = {'Accounts': [{'Id': account_id, 'Name': f"Local account {account_id}", 'Status': 'ACTIVE'}
+                                 for account_id in page]}
+        if start + 20 < len(self._local.accounts):
+            response['NextToken'] = str(start + 20)
+        return response
+
+
+class _GoneException(Exception):
+    """Stand-in for ApiGatewayManagementApi.Client.exceptions.GoneException."""
+
+
+class FakeApiGatewayManagementClient(_FakeClient):
+    """Emulates ``post_to_connection`` and records every frame sent."""
+
+    service_name = 'apigatewaymanagementapi'
+
+    # API Gateway WebSocket message size limit
+    MAX_MESSAGE_BYTES = 128 * 1024
+
+    class exceptions:
+        GoneException = _GoneException
+
+    def post_to_connection(self, ConnectionId: str, Data: Any, **kwargs) -> Dict[str, Any]:
+        self._call('post_to_connection')
+        if ConnectionId in self._local.gone_connections:
+            raise _GoneException(f"Connection {ConnectionId} is gone")
+        payload = Data.decode('utf-8') if isinstance(Data, bytes) else Data
+        if len(payload.encode('utf-8')) > self.MAX_MESSAGE_BYTES:
+            raise ClientError({'Error': {'Code': 'PayloadTooLargeException',
+                                         'Message': f"Message of {len(payload)} bytes exceeds 128 KB"}},
+                              'PostToConnection')
+        with self._local.lock:
+            self._local.sent_messages[ConnectionId].append(payload)
+            self._local.bytes_transferred['apigatewaymanagementapi:post_to_connection'] += len(payload)
+        return {}
+
+
+class FakeSQSClient(_FakeClient):
+    """Emulates ``sqs.send_message`` by recording messages."""
+
+    service_name = 'sqs'
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs) -> Dict[str, Any]:
+        self._call('send_message')
+        with self._local.lock:
+            self._local.queued_messages.append({'QueueUrl': QueueUrl, 'MessageBody': MessageBody, **kwargs})
+        return {'MessageId': f"local-{len(self._local.queued_messages)}"}
+
+
+class FakeS3Client(_FakeClient):
+    """In-memory S3 objects for ``put_object``/``get_object``."""
+
+    service_name = 's3'
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs) -> Dict[str, Any]:
+        self._call('put_object')
+        data = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        with self._local.lock:
+            self._local.objects[(Bucket, Key)] = data
+            self._local.bytes_transferred['s3:put_object'] += len(data)
+        return {'ETag': f'"{len(data)}"'}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._call('get_object')
+        with self._local.lock:
+            data = self._local.objects.get((Bucket, Key))
+        if data is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, 'GetObject')
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, Any], ExpiresIn: int = 3600,
+                               **kwargs) -> str:
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+_CONDITION_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),]|[#:]?[A-Za-z_][A-Za-z0-9_.]*)")
+
+
+class ConditionEvaluator:
+    """
+    Evaluates the DynamoDB condition expression subset used in this repo.
+
+    Supports ``attribute_exists``/``attribute_not_exists``, the comparison
+    operators, ``IN``, ``AND``/``OR``/``NOT`` and parentheses, with ``#name``
+    and ``:value`` placeholders.
+    """
+
+    def __init__(self, expression: str, names: Dict[str, str], values: Dict[str, Any]):
+        self.tokens = []
+        position = 0
+        expression = expression.strip()
+        while position < len(expression):
+            match = _CONDITION_TOKEN.match(expression, position)
+            if not match:
+                raise ValueError(f"Unsupported condition expression: {expression}")
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.names = names
+        self.values = values
+
+    def evaluate(self, item: Dict[str, Any]) -> bool:
+        self.position = 0
+        self.item = item
+        result = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected token in condition: {self.tokens[self.position]}")
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self, expected: Optional[str] = None) -> str:
+        token = self._peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValueError(f"Expected {expected or 'a token'} in condition, got {token}")
+        self.position += 1
+        return token
+
+    def _or(self) -> bool:
+        result = self._and()
+        while (self._peek() or '').upper() == 'OR':
+            self._take()
+            right = self._and()
+            result = result or right
+        return result
+
+    def _and(self) -> bool:
+        result = self._factor()
+        while (self._peek() or '').upper() == 'AND':
+            self._take()
+            right = self._factor()
+            result = result and right
+        return result
+
+    def _factor(self) -> bool:
+        token = self._peek()
+        if token is not None and token.upper() == 'NOT':
+            self._take()
+            return not self._factor()
+        if token == '(':
+            self._take()
+            result = self._or()
+            self._take(')')
+            return result
+        if token in ('attribute_exists', 'attribute_not_exists'):
+            self._take()
+            self._take('(')
+            exists = self._attribute(self._take()) in self.item
+            self._take(')')
+            return exists if token == 'attribute_exists' else not exists
+        return self._comparison()
+
+    def _attribute(self, token: str) -> str:
+        return self.names.get(token, token)
+
+    def _operand(self, token: str) -> Any:
+        if token.startswith(':'):
+            return self.values[token]
+        return self.item.get(self._attribute(token))
+
+    def _comparison(self) -> bool:
+        left = self._operand(self._take())
+        operator = self._take()
+        if operator.upper() == 'IN':
+            self._take('(')
+            candidates = [self._operand(self._take())]
+            while self._peek() == ',':
+                self._take()
+                candidates.append(self._operand(self._take()))
+            self._take(')')
+            return left in candidates
+        right = self._operand(self._take())
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if left is None or right is None:
+            return False
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[operator]
+
+
+def _conditional_check_failed(operation: str) -> ClientError:
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        operation
+    )
+
+
+def _item_too_large(operation: str) -> ClientError:
+    return ClientError(
+        {'Error': {'Code': 'ValidationException', 'Message': 'Item size has exceeded the maximum allowed size'}},
+        operation
+    )
+
+
+def item_size(item: Dict[str, Any]) -> int:
+    """Approximate DynamoDB item size: UTF-8 attribute names plus values."""
+    return sum(len(name.encode('utf-8')) + len(value.encode('utf-8') if isinstance(value, str) else
+                                              json.dumps(value, default=str).encode('utf-8'))
+               for name, value in item.items())
+
+
+class FakeTable:
+    """In-memory DynamoDB table supporting the operations used in this repo."""
+
+    # Tables with a sort key; every other table is keyed on its first item attribute
+    KEY_SCHEMAS = {
+        'finops-websocket-job-events': ('jobId', 'seq'),
+    }
+
+    # DynamoDB rejects writes that would make an item larger than this
+    ITEM_MAX_BYTES = 400 * 1024
+
+    def __init__(self, local: 'LocalAWS', name: str):
+        self._local = local
+        self.name = name
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.key_names = self.KEY_SCHEMAS.get(name)
+        self._lock = threading.Lock()
+
+    def _key(self, key: Dict[str, Any]) -> str:
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def put_item(self, Item: Dict[str, Any], ConditionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                 ExpressionAttributeValues: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        self._local.simulate(f"dynamodb.{self.name}.put_item", 'dynamodb', 'put_item')
+        key_names = self.key_names or (next(iter(Item)),)
+        with self._lock:
+            key = self._key({name: Item[name] for name in key_names})
+            if ConditionExpression and not self._condition_holds(
+                    ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, self.items.get(key)):
+                raise _conditional_check_failed('PutItem')
+            if item_size(Item) > self.ITEM_MAX_BYTES:
+                raise _item_too_large('PutItem')
+            self.items[key] = copy.deepcopy(Item)
+        return {}
+
+    @staticmethod
+    def _condition_holds(expression: str, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]],
+                         item: Optional[Dict[str, Any]]) -> bool:
+        return ConditionEvaluator(expression, names or {}, values or {}).evaluate(item or {})
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self._local.simulate(f"dynamodb.{self.name}.get_item", 'dynamodb', 'get_item')
+        with self._lock:
+            item = self.items.get(self._key(Key))
+        return {'Item': copy.deepcopy(item)} if item is not None else {}
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str = '',
+                    ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                    ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+                    ConditionExpression: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self._local.simulate(f"dynamodb.{self.name}.update_item", 'dynamodb', 'update_item')
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        with self._lock:
+            if ConditionExpression and not self._condition_holds(
+                    ConditionExpression, names, values, self.items.get(self._key(Key))):
+                raise _conditional_check_failed('UpdateItem')
+            item = copy.deepcopy(self.items.get(self._key(Key), dict(Key)))
+            # SET and REMOVE clauses, in either order
+            for clause in re.split(r'\s+(?=(?:SET|REMOVE)\s)', UpdateExpression.strip(), flags=re.IGNORECASE):
+                action, _, body = clause.partition(' ')
+                if action.upper() == 'SET':
+                    for assignment in body.split(','):
+                        attribute, value = [part.strip() for part in assignment.split('=', 1)]
+                        item[names.get(attribute, attribute)] = copy.deepcopy(values.get(value, value))
+                elif action.upper() == 'REMOVE':
+                    for attribute in body.split(','):
+                        item.pop(names.get(attribute.strip(), attribute.strip()), None)
+            if item_size(item) > self.ITEM_MAX_BYTES:
+                raise _item_too_large('UpdateItem')
+            self.items[self._key(Key)] = item
+            return {'Attributes': copy.deepcopy(item)}
+
+    def query(self, KeyConditionExpression: str, ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+              ExpressionAttributeNames: Optional[Dict[str, str]] = None, ScanIndexForward: bool = True,
+              Limit: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """Key condition given as a string expression; results are not paginated."""
+        self._local.simulate(f"dynamodb.{self.name}.query", 'dynamodb', 'query')
+        with self._lock:
+            items = [copy.deepcopy(item) for item in self.items.values() if self._condition_holds(
+                KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, item)]
+        if self.key_names and len(self.key_names) > 1:
+            items.sort(key=lambda item: item[self.key_names[1]], reverse=not ScanIndexForward)
+        if Limit:
+            items = items[:Limit]
+        return {'Items': items, 'Count': len(items)}
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self._local.simulate(f"dynamodb.{self.name}.delete_item", 'dynamodb', 'delete_item')
+        with self._lock:
+            self.items.pop(self._key(Key), None)
+        return {}
+
+
+class FakeDynamoResource:
+    """Emulates ``boto3.resource('dynamodb')``."""
+
+    def __init__(self, local: 'LocalAWS'):
+        self._local = local
+
+    def Table(self, name: str) -> FakeTable:
+        with self._local.lock:
+            if name not in self._local.tables:
+                self._local.tables[name] = FakeTable(self._local, name)
+            return self._local.tables[name]
+
+
+class FakeGenericClient(_FakeClient):
+    """Fallback for services the emulator does not model."""
+
+    def __init__(self, local: 'LocalAWS', service_name: str, **kwargs):
+        super().__init__(local, **kwargs)
+        self.service_name = service_name
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            # Private botocore internals (e.g. ``_endpoint``) are simply absent
+            raise AttributeError(name)
+        raise NotImplementedError(f"Local emulator does not implement {self.service_name}.{name}")
+
+
+class FakeBedrockModel:
+    """Stand-in for ``strands.models.BedrockModel``; holds config and a placeholder client."""
+
+    def __init__(self, **kwargs):
+        self.config = dict(kwargs)
+        self.client = LocalAWS._active.client('bedrock-runtime') if LocalAWS._active else None
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.config
+
+    def update_config(self, **kwargs):
+        self.config.update(kwargs)
+
+
+class FakeAgentResult:
+    """Mimics the parts of ``strands.agent.AgentResult`` used in this repo."""
+
+    def __init__(self, text: str):
+        self.message = {'role': 'assistant', 'content': [{'text': text}]}
+        self.text = text
+        self.stop_reason = 'end_turn'
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class _StreamEvent:
+    def __init__(self, data: str):
+        self.data = data
+
+
+class FakeAgent:
+    """
+    Stand-in for ``strands.Agent``.
+
+    Each call costs one emulated Bedrock turn, then calls any of its tools that
+    are listed in ``LocalAWS.tool_calls`` and costs one more turn to "format"
+    the tool output, mirroring a typical single-tool agent loop. A latency
+    profile keyed ``model:<model_id>`` overrides the role profile, and token
+    usage is estimated at four characters per token.
+    """
+
+    def __init__(self, model: Any = None, system_prompt: Optional[str] = None,
+                 tools: Optional[List[Any]] = None, **kwargs):
+        self.model = model
+        self.system_prompt = system_prompt or ''
+        self.tools = list(tools or [])
+        self.role = _agent_role(self.system_prompt)
+        self.event_loop_metrics = SimpleNamespace(
+            accumulated_usage={'inputTokens': 0, 'outputTokens': 0, 'totalTokens': 0}
+        )
+
+    def _turn(self, local: 'LocalAWS'):
+        model_id = (getattr(self.model, 'config', None) or {}).get('model_id')
+        key = f"model:{model_id}" if model_id and f"model:{model_id}" in local.latencies else None
+        local.simulate(f"bedrock:{self.role}", 'bedrock', 'converse', key=key)
+
+    def _account(self, prompt: str, text: str):
+        usage = self.event_loop_metrics.accumulated_usage
+        usage['inputTokens'] += (len(self.system_prompt) + len(prompt)) // 4
+        usage['outputTokens'] += len(text) // 4
+        usage['totalTokens'] = usage['inputTokens'] + usage['outputTokens']
+
+    def __call__(self, prompt: str, **kwargs) -> FakeAgentResult:
+        local = LocalAWS.current()
+        self._turn(local)
+
+        if self.role == 'router':
+            text = json.dumps(local.routing_response)
+            self._account(prompt, text)
+            return FakeAgentResult(text)
+
+        tool_outputs = []
+        for tool_obj in self.tools:
+            name = getattr(tool_obj, 'tool_name', getattr(tool_obj, '__name__', str(tool_obj)))
+            if name not in local.tool_calls:
+                continue
+            arguments = local.tool_calls[name]
+            arguments = arguments(prompt) if callable(arguments) else dict(arguments)
+            started = time.time()
+            ok = True
+            try:
+                output = tool_obj(**arguments)
+                tool_outputs.append(f"{name}: {str(getattr(output, 'text', output))[:200]}")
+            except Exception as e:
+                ok = False
+                tool_outputs.append(f"{name}: error {str(e)}")
+            finally:
+                local.recorder.record(f"tool:{name}", time.time() - started, ok)
+
+        if tool_outputs:
+            self._turn(local)
+
+        text = f"# Local {self.role} response\n\nPrompt: {prompt[:120]}\n\n" + "\n".join(tool_outputs)
+        self._account(prompt, text)
+        return FakeAgentResult(text)
+
+    def stream(self, prompt: str, **kwargs):
+        result = self(prompt, **kwargs)
+        for line in result.text.splitlines(keepends=True):
+            yield _StreamEvent(line)
+
+
+def _agent_role(system_prompt: str) -> str:
+    """Classify an agent by its system prompt for per-stage reporting."""
+    prompt = system_prompt.lower()
+    if 'query router' in prompt:
+        return 'router'
+    if 'synthesize' in prompt and 'finops advisor' in prompt:
+        return 'synthesis'
+    if 'supervisor agent' in prompt:
+        return 'supervisor'
+    if 'trusted advisor' in prompt:
+        return 'trusted_advisor'
+    if 'budget' in prompt and 'budget management agent' in prompt:
+        return 'budget_management'
+    if 'finops assistant' in prompt:
+        return 'cost_forecast'
+    return 'agent'
+
+
+def _periods(start: date, end: date, granularity: str):
+    """Split [start, end) into DAILY or MONTHLY periods like Cost Explorer."""
+    current = start
+    while current < end:
+        if granularity == 'DAILY':
+            next_start = current + timedelta(days=1)
+        else:
+            next_start = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        period_end = min(next_start, end)
+        yield current, period_end
+        current = period_end
+
+
+def _synthetic_cost(service: str, day: date, index: int) -> float:
+    """Deterministic daily cost for a service with a mild upward trend."""
+    base = 40.0 / (index + 1)
+    trend = 1 + 0.02 * (day.year * 12 + day.month - 2024 * 12)
+    return round(base * max(trend, 0.1), 6)
+
+
+class LocalAWS:
+    """
+    In-process AWS emulator.
+
+    Use as a context manager; while active, ``boto3.client``, ``boto3.resource``,
+    ``strands.Agent`` and ``strands.models.BedrockModel`` are replaced by fakes.
+
+    Example:
+        with LocalAWS(latencies={'bedrock': LatencyProfile(0.2)}) as local:
+            supervisor = local.load_module('supervisor_agent/lambda_handler.py', 'local_supervisor')
+            local.register_agent_functions()
+            supervisor.handler({'query': 'What are my costs?'}, FakeLambdaContext())
+            print(local.recorder.summary())
+    """
+
+    _active: Optional['LocalAWS'] = None
+
+    def __init__(self, latencies: Optional[Dict[str, LatencyProfile]] = None, seed: int = 0,
+                 tool_calls: Optional[Dict[str, Any]] = None,
+                 routing_response: Optional[Dict[str, Any]] = None,
+                 recommendation_count: int = 5, linked_accounts: int = 0):
+        self.latencies = dict(latencies or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.recorder = StageRecorder()
+        self.functions: Dict[str, Callable] = {}
+        self.tables: Dict[str, FakeTable] = {}
+        self.sent_messages = defaultdict(list)
+        self.gone_connections = set()
+        self.queued_messages: List[Dict[str, Any]] = []
+        self.objects: Dict[Any, bytes] = {}
+        self.bytes_transferred = defaultdict(int)
+        self.routing_response = routing_response or dict(DEFAULT_ROUTING_RESPONSE)
+        self.recommendation_count = recommendation_count
+        self.accounts = [LOCAL_ACCOUNT_ID] + [str(100000000000 + n) for n in range(1, linked_accounts + 1)]
+        # Budgets of linked accounts by account ID; the caller's own are ``budgets``
+        self.account_budgets: Dict[str, List[Dict[str, Any]]] = {}
+        self.budgets = [
+            {
+                'BudgetName': 'Local Monthly Budget',
+                'BudgetType': 'COST',
+                'BudgetLimit': {'Amount': '1000.0', 'Unit': 'USD'},
+                'CalculatedSpend': {
+                    'ActualSpend': {'Amount': '640.0', 'Unit': 'USD'},
+                    'ForecastedSpend': {'Amount': '980.0', 'Unit': 'USD'}
+                },
+                'TimeUnit': 'MONTHLY'
+            }
+        ]
+        self.tool_calls = tool_calls if tool_calls is not None else {
+            'cost_forecast_agent': lambda prompt: {'query': prompt},
+            'trusted_advisor_agent': lambda prompt: {'query': prompt},
+            'budget_management_agent': lambda prompt: {'query': prompt},
+            'get_monthly_spend_analysis': {},
+            'get_trusted_advisor_recommendations': {},
+            'get_budget_analysis': {},
+        }
+        self._patches = []
+        self._added_paths: List[str] = []
+        self._saved_modules: Dict[str, Any] = {}
+
+    @classmethod
+    def current(cls) -> 'LocalAWS':
+        if cls._active is None:
+            raise RuntimeError("No LocalAWS emulator is active")
+        return cls._active
+
+    def profile(self, key: str, service: str) -> LatencyProfile:
+        """Return the most specific latency profile for a stage or service."""
+        return self.latencies.get(key) or self.latencies.get(service) or LatencyProfile()
+
+    def simulate(self, stage: Optional[str], service: str, operation: str, key: Optional[str] = None):
+        """Sleep for a sampled latency and optionally raise an emulated failure."""
+        lookup = key or stage or service
+        profile = self.profile(lookup, service)
+        with self.lock:
+            delay = profile.sample(self.rng)
+            failed = profile.should_fail(self.rng)
+        if delay:
+            time.sleep(delay)
+        if stage:
+            self.recorder.record(stage, delay, not failed)
+        if failed:
+            raise ClientError(
+                {'Error': {'Code': profile.error_code, 'Message': f"Emulated {service} failure"}},
+                operation
+            )
+
+    def client(self, service_name: str, *args, **kwargs):
+        factories = {
+            'lambda': FakeLambdaClient,
+            'ce': FakeCostExplorerClient,
+            'trustedadvisor': FakeTrustedAdvisorClient,
+            'support': FakeSupportClient,
+            'budgets': FakeBudgetsClient,
+            'sts': FakeSTSClient,
+            'organizations': FakeOrganizationsClient,
+            'apigatewaymanagementapi': FakeApiGatewayManagementClient,
+            'sqs': FakeSQSClient,
+            's3': FakeS3Client,
+        }
+        factory = factories.get(service_name)
+        if factory is None:
+            return FakeGenericClient(self, service_name, **kwargs)
+        return factory(self, **kwargs)
+
+    def resource(self, service_name: str, *args, **kwargs):
+        if service_name == 'dynamodb':
+            return FakeDynamoResource(self)
+        raise NotImplementedError(f"Local emulator does not implement resource {service_name}")
+
+    def register_function(self, function_name: str, handler: Callable):
+        """Route ``lambda.invoke`` calls for ``function_name`` to ``handler``."""
+        self.functions[function_name] = handler
+
+    def register_agent_functions(self) -> Dict[str, Any]:
+        """Load the three specialist agents in-process and register them."""
+        modules = {}
+        for function_name, (relative_path, handler_name) in AGENT_FUNCTIONS.items():
+            module_name = 'local_' + function_name.replace('-', '_')
+            module = self.load_module(relative_path, module_name)
+            self.register_function(function_name, getattr(module, handler_name))
+            modules[function_name] = module
+        return modules
+
+    def load_module(self, relative_path: str, module_name: str):
+        """
+        Import a Lambda source file under the emulator.
+
+        The file's directory is put on ``sys.path`` for the lifetime of the
+        emulator so its flat sibling imports resolve, and those siblings are
+        re-imported fresh so they bind the fake boto3 and Strands classes.
+        Shared helper modules (``payload_envelope``, ``prewarm``) are
+        re-imported for every load, as each Lambda has its own process.
+        """
+        path = os.path.join(REPO_ROOT, relative_path)
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+            self._added_paths.append(directory)
+
+        for filename in os.listdir(directory):
+            if not filename.endswith('.py'):
+                continue
+            sibling = filename[:-3]
+            if sibling not in self._saved_modules:
+                self._saved_modules[sibling] = sys.modules.pop(sibling, None)
+            else:
+                sys.modules.pop(sibling, None)
+
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        self._saved_modules.setdefault(module_name, None)
+        spec.loader.exec_module(module)
+        return module
+
+    def __enter__(self) -> 'LocalAWS':
+        if LocalAWS._active is not None:
+            raise RuntimeError("A LocalAWS emulator is already active")
+        LocalAWS._active = self
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        targets = [
+            ('boto3.client', self.client),
+            ('boto3.resource', self.resource),
+            ('strands.Agent', FakeAgent),
+            ('strands.models.BedrockModel', FakeBedrockModel),
+            ('strands.models.bedrock.BedrockModel', FakeBedrockModel),
+        ]
+        for target, replacement in targets:
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self._patches.append(patcher)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for patcher in reversed(self._patches):
+            patcher.stop()
+        self._patches = []
+        for directory in self._added_paths:
+            if directory in sys.path:
+                sys.path.remove(directory)
+        self._added_paths = []
+        for directory_module in list(self._saved_modules):
+            previous = self._saved_modules[directory_module]
+            if previous is None:
+                sys.modules.pop(directory_module, None)
+            else:
+                sys.modules[directory_module] = previous
+        self._saved_modules = {}
+        LocalAWS._active = None
+        return False
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Agent response payload benchmark.
+
+Compares the plain double-JSON agent response against the compressed
+envelopes in ``payload_envelope`` for a range of response sizes, reporting
+bytes on the wire, agent-side encode time and supervisor-side decode time.
+
+Examples:
+    python benchmarks/payload_benchmark.py
+    python benchmarks/payload_benchmark.py --sizes 65536,4194304 --repeat 20 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'supervisor_agent'))
+
+import payload_envelope
+
+LAMBDA_SYNC_LIMIT = 6 * 1024 * 1024
+DEFAULT_SIZES = [8 * 1024, 64 * 1024, 512 * 1024, 4 * 1024 * 1024, 8 * 1024 * 1024]
+
+SERVICES = ['Amazon Elastic Compute Cloud - Compute', 'Amazon Simple Storage Service',
+            'Amazon Relational Database Service', 'AWS Lambda', 'Amazon DynamoDB',
+            'Amazon CloudFront', 'EC2 - Other', 'Amazon Virtual Private Cloud']
+
+
+def synthetic_markdown(size: int, seed: int = 0) -> str:
+    """Agent-style markdown report of roughly ``size`` bytes."""
+    rng = random.Random(seed)
+    lines = ["# AWS Cost Analysis\n", "| Date | Service | Resource | Cost |", "|------|---------|----------|------|"]
+    length = sum(len(line) + 1 for line in lines)
+    row = 0
+    while length < size:
+        line = (f"| 2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} | {rng.choice(SERVICES)} | "
+                f"i-{rng.getrandbits(40):010x} | ${rng.uniform(0, 500):,.2f} |")
+        lines.append(line)
+        length += len(line) + 1
+        row += 1
+    return "\n".join(lines)[:size]
+
+
+def agent_response(markdown: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'query': 'benchmark', 'response': markdown})
+    }
+
+
+def measure(markdown: str, encoding: str, repeat: int) -> Dict[str, Any]:
+    """Encode/decode one response ``repeat`` times with ``encoding`` ('identity' for the plain path)."""
+    event = {'query': 'benchmark'}
+    if encoding != 'identity':
+        event['accept_encoding'] = [encoding]
+
+    encode_times = []
+    decode_times = []
+    wire = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        wire = json.dumps(payload_envelope.encode_response(agent_response(markdown), event)).encode('utf-8')
+        encode_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        payload = payload_envelope.decode_response(json.loads(wire))
+        body = payload['body']
+        content = (json.loads(body) if isinstance(body, str) else body)['response']
+        decode_times.append(time.perf_counter() - started)
+        assert content == markdown
+
+    envelope = json.loads(wire)
+    return {
+        'encoding': encoding,
+        'size': len(markdown),
+        'wire_bytes': len(wire),
+        'ratio': len(wire) / max(len(markdown), 1),
+        'encode_ms': statistics.median(encode_times) * 1000,
+        'decode_ms': statistics.median(decode_times) * 1000,
+        'spilled': 'body_ref' in envelope,
+        'over_limit': len(wire) > LAMBDA_SYNC_LIMIT
+    }
+
+
+def run_payload_benchmark(sizes: Optional[List[int]] = None, repeat: int = 5) -> List[Dict[str, Any]]:
+    """Benchmark every supported encoding for each size, spilling to a temporary directory."""
+    results = []
+    previous = os.environ.get('PAYLOAD_SPILL_DIR')
+    with tempfile.TemporaryDirectory() as spill_dir:
+        os.environ['PAYLOAD_SPILL_DIR'] = spill_dir
+        try:
+            for size in sizes or DEFAULT_SIZES:
+                markdown = synthetic_markdown(size)
+                for encoding in ['identity'] + payload_envelope.SUPPORTED_ENCODINGS:
+                    results.append(measure(markdown, encoding, repeat))
+        finally:
+            if previous is None:
+                os.environ.pop('PAYLOAD_SPILL_DIR', None)
+            else:
+                os.environ['PAYLOAD_SPILL_DIR'] = previous
+    return results
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'size':>10} {'encoding':<9} {'wire bytes':>11} {'ratio':>6} {'encode ms':>10} {'decode ms':>10}  note",
+        "-" * 72
+    ]
+    for result in results:
+        note = 'spilled' if result['spilled'] else ('OVER 6 MB LIMIT' if result['over_limit'] else '')
+        lines.append(
+            f"{result['size']:>10} {result['encoding']:<9} {result['wire_bytes']:>11} {result['ratio']:>6.2f} "
+            f"{result['encode_ms']:>10.2f} {result['decode_ms']:>10.2f}  {note}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Agent response payload benchmark")
+    parser.add_argument('--sizes', help="Comma-separated response sizes in bytes")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')] if args.sizes else None
+    results = run_payload_benchmark(sizes, args.repeat)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
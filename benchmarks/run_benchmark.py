@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Offline FinOps pipeline benchmark.
+
+Drives the supervisor ``handler``/``lambda_handler`` or the WebSocket progress
+notifier against the local AWS emulator at a fixed concurrency and reports
+p50/p95/p99 latency per stage.
+
+Examples:
+    python benchmarks/run_benchmark.py --target handler --requests 40 --concurrency 8
+    python benchmarks/run_benchmark.py --target progress_notifier \\
+        --latency bedrock=0.3,0.4 --latency ce=0.05,0.2,0.02 --json
+    python benchmarks/run_benchmark.py --target progress_notifier --batch-size 5 \\
+        --concurrency 1 --env SQS_RECORD_CONCURRENCY=5
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+import concurrent.futures
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_aws import LocalAWS, LatencyProfile, FakeLambdaContext
+
+TARGETS = {
+    'handler': ('supervisor_agent/lambda_handler.py', 'handler'),
+    'lambda_handler': ('supervisor_agent/lambda_handler.py', 'lambda_handler'),
+    'progress_notifier': ('websocket_api/progress_notifier/lambda_handler.py', 'handler'),
+}
+
+DEFAULT_QUERIES = [
+    "What are my current AWS costs?",
+    "Show me my costs and optimization recommendations",
+    "I need a complete financial analysis of my AWS environment",
+]
+
+DEFAULT_LATENCIES = {
+    'lambda': LatencyProfile(0.02, 0.2),
+    'bedrock': LatencyProfile(0.08, 0.4),
+    'ce': LatencyProfile(0.03, 0.3),
+    'trustedadvisor': LatencyProfile(0.02, 0.3),
+    'support': LatencyProfile(0.02, 0.3),
+    'budgets': LatencyProfile(0.02, 0.3),
+    'apigatewaymanagementapi': LatencyProfile(0.005, 0.2),
+    'dynamodb': LatencyProfile(0.004, 0.2),
+}
+
+
+def build_event(target: str, query: str, index: int, batch_size: int = 1) -> Dict[str, Any]:
+    """Build the invocation event a target expects."""
+    if target == 'progress_notifier':
+        records = []
+        for offset in range(batch_size):
+            job = {
+                'jobId': str(uuid.uuid4()),
+                'connectionId': f"local-connection-{index * batch_size + offset}",
+                'userId': 'benchmark',
+                'query': query,
+                'action': 'process_finops_query'
+            }
+            records.append({'messageId': job['jobId'], 'body': json.dumps(job)})
+        return {'Records': records}
+    return {'query': query}
+
+
+def run_benchmark(target: str, queries: List[str], requests: int, concurrency: int,
+                  latencies: Optional[Dict[str, LatencyProfile]] = None, seed: int = 0,
+                  env: Optional[Dict[str, str]] = None, batch_size: int = 1) -> Dict[str, Any]:
+    """
+    Run ``requests`` invocations of ``target`` at ``concurrency`` under the emulator.
+
+    For ``progress_notifier`` each invocation carries ``batch_size`` SQS records.
+
+    Returns:
+        Dictionary with the per-stage summary, wall time and throughput
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target: {target}. Choose from {', '.join(TARGETS)}")
+
+    previous_env = {key: os.environ.get(key) for key in (env or {})}
+    os.environ.update(env or {})
+    try:
+        with LocalAWS(latencies=latencies if latencies is not None else DEFAULT_LATENCIES, seed=seed) as local:
+            relative_path, handler_name = TARGETS[target]
+            module = local.load_module(relative_path, f"local_benchmark_{target}")
+            local.register_agent_functions()
+            handler = getattr(module, handler_name)
+            logging.getLogger().setLevel(logging.WARNING)
+
+            def invoke(index: int):
+                event = build_event(target, queries[index % len(queries)], index, batch_size)
+                started = time.time()
+                ok = True
+                try:
+                    result = handler(event, FakeLambdaContext(target))
+                    ok = (isinstance(result, dict) and result.get('statusCode', 200) < 500
+                          and not result.get('batchItemFailures'))
+                except Exception:
+                    ok = False
+                finally:
+                    local.recorder.record('end_to_end', time.time() - started, ok)
+
+            wall_start = time.time()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(invoke, range(requests)))
+            wall_time = time.time() - wall_start
+
+            return {
+                'target': target,
+                'requests': requests,
+                'concurrency': concurrency,
+                'batch_size': batch_size,
+                'wall_time': wall_time,
+                'throughput': requests / wall_time if wall_time else 0.0,
+                'stages': local.recorder.summary(),
+                'bytes_transferred': dict(local.bytes_transferred)
+            }
+    finally:
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a benchmark report as a fixed-width table."""
+    lines = [
+        f"Target: {report['target']}  requests={report['requests']}  concurrency={report['concurrency']}"
+        f"  batch_size={report.get('batch_size', 1)}",
+        f"Wall time: {report['wall_time']:.2f}s  throughput: {report['throughput']:.2f} req/s",
+        "",
+        f"{'stage':<55} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+        "-" * 96
+    ]
+    for stage, stats in report['stages'].items():
+        lines.append(
+            f"{stage:<55} {stats['count']:>6} {stats['errors']:>4} "
+            f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_latency_overrides(specs: List[str]) -> Dict[str, LatencyProfile]:
+    """Parse ``key=median[,sigma[,failure_rate]]`` overrides on top of the defaults."""
+    latencies = dict(DEFAULT_LATENCIES)
+    for spec in specs or []:
+        key, _, value = spec.partition('=')
+        if not value:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        latencies[key.strip()] = LatencyProfile.parse(value)
+    return latencies
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline FinOps pipeline benchmark")
+    parser.add_argument('--target', choices=sorted(TARGETS), default='handler')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=1, help="SQS records per progress_notifier invocation")
+    parser.add_argument('--query', action='append', help="Query to send (repeatable); defaults to a mixed set")
+    parser.add_argument('--latency', action='append', default=[],
+                        help="Latency override: service_or_stage=median[,sigma[,failure_rate]]")
+    parser.add_argument('--env', action='append', default=[], help="Environment override KEY=VALUE")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    env = dict(item.split('=', 1) for item in args.env)
+    report = run_benchmark(
+        args.target, args.query or DEFAULT_QUERIES, args.requests, args.concurrency,
+        latencies=parse_latency_overrides(args.latency), seed=args.seed, env=env, batch_size=args.batch_size
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
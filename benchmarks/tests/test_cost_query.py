@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for ad-hoc cost queries
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Add the cost forecast agent directory to Python path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+import cur_cube
+from cost_query import CostQueryError, build_request, run_cost_query, validate_spec
+
+TODAY = date(2025, 7, 15)
+
+
+class FakeCostExplorer:
+    """Returns canned ResultsByTime pages and records requests."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.requests = []
+
+    def get_cost_and_usage(self, **request):
+        self.requests.append(request)
+        return self.pages.pop(0)
+
+
+def _group(keys, cost, usage=0.0):
+    return {'Keys': keys, 'Metrics': {'UnblendedCost': {'Amount': str(cost), 'Unit': 'USD'},
+                                      'UsageQuantity': {'Amount': str(usage), 'Unit': 'N/A'}}}
+
+
+def _month(start, end, groups):
+    return {'TimePeriod': {'Start': start, 'End': end}, 'Total': {}, 'Groups': groups}
+
+
+@pytest.fixture(autouse=True)
+def no_cube(monkeypatch):
+    monkeypatch.delenv('CUR_CUBE_PATH', raising=False)
+
+
+def test_spec_is_normalized_into_one_request():
+    spec = validate_spec({'start': '2025-04-01', 'end': '2025-07-01', 'group_by': 'service, account',
+                          'metrics': ['unblended_cost', 'UsageQuantity'],
+                          'filters': {'region': 'us-east-1'}, 'exclude': {'RECORD_TYPE': ['Credit', 'Refund']}},
+                         today=TODAY)
+    assert spec['group_by'] == ['SERVICE', 'LINKED_ACCOUNT']
+    assert spec['metrics'] == ['UnblendedCost', 'UsageQuantity']
+    assert spec['filters'] == {'REGION': ['us-east-1']}
+
+    request = build_request(spec)
+    assert request['Granularity'] == 'MONTHLY'
+    assert request['GroupBy'] == [{'Type': 'DIMENSION', 'Key': 'SERVICE'},
+                                  {'Type': 'DIMENSION', 'Key': 'LINKED_ACCOUNT'}]
+    assert request['Filter'] == {'And': [
+        {'Dimensions': {'Key': 'REGION', 'Values': ['us-east-1']}},
+        {'Not': {'Dimensions': {'Key': 'RECORD_TYPE', 'Values': ['Credit', 'Refund']}}}]}
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({}, 'start: required'),
+    ({'start': 'April'}, 'expected a YYYY-MM-DD date'),
+    ({'start': '2025-07-01', 'end': '2025-06-01'}, 'must be after start'),
+    ({'start': '2025-07-01', 'end': '2025-09-01'}, 'in the future'),
+    ({'start': '2025-01-01', 'granularity': 'DAILY'}, 'limited to 92 days'),
+    ({'start': '2025-01-01', 'granularity': 'HOURLY'}, 'granularity'),
+    ({'start': '2025-01-01', 'group_by': 'SERVICE,REGION,LINKED_ACCOUNT'}, 'at most 2'),
+    ({'start': '2025-01-01', 'group_by': 'team'}, "unknown dimension 'team'"),
+    ({'start': '2025-01-01', 'metrics': 'cost'}, "unknown metric 'cost'"),
+    ({'start': '2025-01-01', 'top_n': 500}, 'top_n'),
+    ({'start': '2025-05-01', 'granularity': 'DAILY', 'top_n': 50}, 'rows (limit 600)'),
+    ({'start': '2025-01-01', 'sql': 'SELECT 1'}, 'Unknown spec fields: sql'),
+])
+def test_invalid_specs_explain_the_fix(spec, message):
+    with pytest.raises(CostQueryError, match=message.replace('(', r'\(').replace(')', r'\)')):
+        validate_spec(spec, today=TODAY)
+
+
+def test_top_groups_totals_and_other():
+    ce = FakeCostExplorer([
+        {'ResultsByTime': [_month('2025-05-01', '2025-06-01', [
+            _group(['EC2'], 100), _group(['S3'], 20.004), _group(['Lambda'], 5), _group(['KMS'], 1)])],
+         'NextPageToken': 'page-2'},
+        {'ResultsByTime': [_month('2025-06-01', '2025-07-01', [
+            _group(['EC2'], 120), _group(['S3'], 30), _group(['Lambda'], 2)])]},
+    ])
+    answer = run_cost_query({'start': '2025-05-01', 'end': '2025-07-01', 'top_n': 2}, ce, today=TODAY)
+
+    assert ce.requests[1]['NextPageToken'] == 'page-2'
+    assert answer['source'] == 'cost_explorer'
+    assert answer['columns'] == ['period', 'SERVICE', 'UnblendedCost']
+    assert answer['rows'] == [
+        ['2025-05', 'EC2', 100.0], ['2025-05', 'S3', 20.0], ['2025-05', 'Other', 6.0],
+        ['2025-06', 'EC2', 120.0], ['2025-06', 'S3', 30.0], ['2025-06', 'Other', 2.0]]
+    assert answer['period_totals'] == {'2025-05': {'UnblendedCost': 126.0}, '2025-06': {'UnblendedCost': 152.0}}
+    assert answer['total'] == {'UnblendedCost': 278.0}
+    assert answer['groups'] == {'shown': 2, 'total': 4, 'other': 8.0}
+
+
+def test_total_granularity_sums_the_range():
+    ce = FakeCostExplorer([{'ResultsByTime': [
+        _month('2025-05-10', '2025-06-01', [_group(['EC2'], 10, 4)]),
+        _month('2025-06-01', '2025-06-20', [_group(['EC2'], 5, 2), _group(['S3'], 1, 100)])]}])
+    answer = run_cost_query({'start': '2025-05-10', 'end': '2025-06-20', 'granularity': 'TOTAL',
+                             'metrics': 'UsageQuantity,UnblendedCost'}, ce, today=TODAY)
+
+    assert ce.requests[0]['Granularity'] == 'MONTHLY'
+    assert answer['rows'] == [['2025-05-10..2025-06-20', 'S3', 100.0, 1.0],
+                              ['2025-05-10..2025-06-20', 'EC2', 6.0, 15.0]]
+    assert answer['total'] == {'UsageQuantity': 106.0, 'UnblendedCost': 16.0}
+    assert answer['units'] == {'UsageQuantity': 'N/A', 'UnblendedCost': 'USD'}
+
+
+def test_ungrouped_query_uses_totals():
+    ce = FakeCostExplorer([{'ResultsByTime': [
+        {'TimePeriod': {'Start': '2025-06-01', 'End': '2025-06-02'}, 'Groups': [],
+         'Total': {'UnblendedCost': {'Amount': '3.5', 'Unit': 'USD'}}},
+        {'TimePeriod': {'Start': '2025-06-02', 'End': '2025-06-03'}, 'Groups': [],
+         'Total': {'UnblendedCost': {'Amount': '4.25', 'Unit': 'USD'}}}]}])
+    answer = run_cost_query({'start': '2025-06-01', 'end': '2025-06-03', 'granularity': 'DAILY', 'group_by': ''},
+                            ce, today=TODAY)
+
+    assert 'GroupBy' not in ce.requests[0]
+    assert answer['rows'] == [['2025-06-01', 3.5], ['2025-06-02', 4.25]]
+    assert answer['total'] == {'UnblendedCost': 7.75}
+    assert 'groups' not in answer
+
+
+def test_unknown_service_filters_are_caught():
+    services = _month('2025-06-01', '2025-07-01', [
+        _group(['Amazon Elastic Compute Cloud - Compute'], 100), _group(['EC2 - Other'], 12),
+        _group(['Amazon Simple Storage Service'], 8)])
+    spec = {'start': '2025-06-01', 'end': '2025-07-01', 'granularity': 'TOTAL', 'group_by': ''}
+
+    # A CUR-style name Cost Explorer does not know would answer $0
+    ce = FakeCostExplorer([{'ResultsByTime': [services]}])
+    with pytest.raises(CostQueryError, match="no service named 'Amazon EC2'") as error:
+        run_cost_query(dict(spec, filters={'SERVICE': ['Amazon EC2']}), ce, today=TODAY)
+    assert "'EC2 - Other'" in str(error.value)
+    assert len(ce.requests) == 1 and 'Filter' not in ce.requests[0]
+
+    ce = FakeCostExplorer([{'ResultsByTime': [services]}, {'ResultsByTime': [
+        {'TimePeriod': {'Start': '2025-06-01', 'End': '2025-07-01'}, 'Groups': [],
+         'Total': {'UnblendedCost': {'Amount': '8', 'Unit': 'USD'}}}]}])
+    answer = run_cost_query(dict(spec, filters={'SERVICE': ['Amazon Simple Storage Service', 'Amazon S4']}),
+                            ce, today=TODAY)
+    assert answer['total'] == {'UnblendedCost': 8.0}
+    assert "'Amazon S4'" in answer['warnings'][0]
+    assert ce.requests[1]['Filter']['Dimensions']['Values'] == ['Amazon Simple Storage Service', 'Amazon S4']
+
+    # Without a SERVICE filter no extra request is made
+    ce = FakeCostExplorer([{'ResultsByTime': [services]}])
+    assert 'warnings' not in run_cost_query(dict(spec, filters={'REGION': ['us-east-1']}), ce, today=TODAY)
+    assert len(ce.requests) == 1
+
+
+def test_cube_answers_when_it_covers_the_query(tmp_path, monkeypatch):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    pq.write_table(pa.table({
+        'line_item_usage_start_date': ['2025-06-01T00:00:00Z', '2025-06-01T01:00:00Z', '2025-06-02T00:00:00Z'],
+        'product_product_name': ['Amazon EC2', 'Amazon S3', 'Amazon EC2'],
+        'line_item_usage_account_id': ['111111111111'] * 3,
+        'product_region_code': ['us-east-1', 'us-east-1', 'eu-west-1'],
+        'line_item_unblended_cost': [2.0, 0.5, 3.0],
+    }), str(tmp_path / 'cur.parquet'))
+    cur_cube.build_cube(str(tmp_path / 'cur.parquet')).save(str(tmp_path / 'cube.parquet'))
+    monkeypatch.setenv('CUR_CUBE_PATH', str(tmp_path / 'cube.parquet'))
+    monkeypatch.setattr(cur_cube, '_cube_uri', None)
+
+    ce = FakeCostExplorer([])
+    answer = run_cost_query({'start': '2025-06-01', 'end': '2025-06-03', 'granularity': 'TOTAL',
+                             'group_by': 'REGION', 'filters': {'SERVICE': ['Amazon EC2']}}, ce, today=TODAY)
+    assert ce.requests == []
+    assert answer['source'] == 'cur_cube'
+    assert answer['rows'] == [['2025-06-01..2025-06-03', 'eu-west-1', 3.0],
+                              ['2025-06-01..2025-06-03', 'us-east-1', 2.0]]
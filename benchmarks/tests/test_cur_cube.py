@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Tests for the CUR cost cube and its synthetic export generator.
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Add the benchmarks directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cur_benchmark import generate_cur
+import cur_cube
+from cur_cube import CostCube, UnsupportedCubeQuery, build_cube
+
+START = date(2025, 1, 1)
+END = date(2025, 3, 1)
+
+
+@pytest.fixture(scope='module')
+def export(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('cur'))
+    details = generate_cur(directory, rows=20000, months=2, accounts=5, end=END)
+    return directory, details
+
+
+def _ce_service(row):
+    """The Cost Explorer SERVICE a line item is billed under."""
+    if row['line_item_line_item_type'] == 'Tax':
+        return 'Tax'
+    if row['product_product_name'] == 'Amazon Elastic Compute Cloud':
+        return 'Amazon Elastic Compute Cloud - Compute' if 'BoxUsage' in row['line_item_usage_type'] else 'EC2 - Other'
+    return {'Amazon CloudWatch': 'AmazonCloudWatch'}.get(row['product_product_name'], row['product_product_name'])
+
+
+def _direct_sum(directory, start, end, account=None):
+    """Unblended cost per Cost Explorer service summed straight from the export."""
+    table = pq.read_table(directory, columns=['line_item_usage_start_date', 'product_product_name',
+                                              'line_item_usage_type', 'line_item_line_item_type',
+                                              'line_item_usage_account_id', 'line_item_unblended_cost'])
+    day = pc.cast(table.column('line_item_usage_start_date'), pa.date32())
+    mask = pc.and_(pc.greater_equal(day, pa.scalar(start)), pc.less(day, pa.scalar(end)))
+    if account:
+        mask = pc.and_(mask, pc.equal(pc.cast(table.column('line_item_usage_account_id'), pa.string()), account))
+    totals = {}
+    for row in table.filter(mask).to_pylist():
+        service = _ce_service(row)
+        totals[service] = totals.get(service, 0.0) + row['line_item_unblended_cost']
+    return totals
+
+
+def _by_service(result):
+    totals = {}
+    for period in result['ResultsByTime']:
+        for group in period['Groups']:
+            totals[group['Keys'][0]] = totals.get(group['Keys'][0], 0.0) + \
+                float(group['Metrics']['UnblendedCost']['Amount'])
+    return totals
+
+
+def test_cube_answers_match_the_export(export, tmp_path):
+    directory, details = export
+    cube = build_cube(directory)
+    assert (cube.start, cube.end) == (START, END)
+    assert cube.line_items == details['rows']
+
+    cube.save(str(tmp_path / 'cube.parquet'))
+    loaded = CostCube.load(str(tmp_path / 'cube.parquet'))
+    assert len(loaded.table) < details['rows']
+
+    group_by = [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+    monthly = loaded.get_cost_and_usage(TimePeriod={'Start': '2025-01-01', 'End': '2025-03-01'},
+                                        Granularity='MONTHLY', Metrics=['UnblendedCost'], GroupBy=group_by)
+    assert [period['TimePeriod'] for period in monthly['ResultsByTime']] == [
+        {'Start': '2025-01-01', 'End': '2025-02-01'}, {'Start': '2025-02-01', 'End': '2025-03-01'}]
+    expected = _direct_sum(directory, START, END)
+    assert _by_service(monthly).keys() == expected.keys()
+    for service, amount in _by_service(monthly).items():
+        assert amount == pytest.approx(expected[service])
+
+    # Cost Explorer's End is exclusive; partial months come from the daily cells
+    account = details['accounts'][2]
+    daily = loaded.get_cost_and_usage(
+        TimePeriod={'Start': '2025-01-10', 'End': '2025-02-14'}, Granularity='DAILY', Metrics=['UnblendedCost'],
+        GroupBy=group_by, Filter={'Dimensions': {'Key': 'LINKED_ACCOUNT', 'Values': [account]}})
+    assert len(daily['ResultsByTime']) == 35
+    expected = _direct_sum(directory, date(2025, 1, 10), date(2025, 2, 14), account)
+    for service, amount in _by_service(daily).items():
+        assert amount == pytest.approx(expected[service])
+
+    total = loaded.get_cost_and_usage(TimePeriod={'Start': '2025-02-01', 'End': '2025-02-15'},
+                                      Granularity='MONTHLY', Metrics=['UnblendedCost'])
+    assert total['ResultsByTime'][0]['Groups'] == []
+    assert float(total['ResultsByTime'][0]['Total']['UnblendedCost']['Amount']) == \
+        pytest.approx(sum(_direct_sum(directory, date(2025, 2, 1), date(2025, 2, 15)).values()))
+
+
+def test_service_names_match_cost_explorer(tmp_path, monkeypatch):
+    # One day of line items and what Cost Explorer reports for them, by SERVICE
+    lines = [
+        ('Amazon Elastic Compute Cloud', 'AmazonEC2', 'USE1-BoxUsage:m5.large', 'Usage', 10.0),
+        ('Amazon Elastic Compute Cloud', 'AmazonEC2', 'USE1-SpotUsage:c5.xlarge', 'Usage', 3.0),
+        ('Amazon Elastic Compute Cloud', 'AmazonEC2', 'USE1-EBS:VolumeUsage.gp3', 'Usage', 2.0),
+        ('Amazon Elastic Compute Cloud', 'AmazonEC2', 'USE1-NatGateway-Hours', 'Usage', 1.5),
+        ('Amazon Simple Storage Service', 'AmazonS3', 'USE1-TimedStorage-ByteHrs', 'Usage', 4.0),
+        ('Amazon CloudWatch', 'AmazonCloudWatch', 'USE1-CW:MetricMonitorUsage', 'Usage', 0.3),
+        ('Amazon Elastic Compute Cloud', 'AmazonEC2', '', 'Tax', 0.7),
+    ]
+    ce_services = {'Amazon Elastic Compute Cloud - Compute': 13.0, 'EC2 - Other': 3.5,
+                   'Amazon Simple Storage Service': 4.0, 'AmazonCloudWatch': 0.3, 'Tax': 0.7}
+    pq.write_table(pa.table({
+        'line_item_usage_start_date': ['2025-05-01T00:00:00Z'] * len(lines),
+        'product_product_name': [line[0] for line in lines],
+        'line_item_product_code': [line[1] for line in lines],
+        'line_item_usage_type': [line[2] for line in lines],
+        'line_item_line_item_type': [line[3] for line in lines],
+        'line_item_usage_account_id': ['111111111111'] * len(lines),
+        'product_region_code': ['us-east-1'] * len(lines),
+        'line_item_unblended_cost': [line[4] for line in lines],
+    }), str(tmp_path / 'cur.parquet'))
+    build_cube(str(tmp_path / 'cur.parquet')).save(str(tmp_path / 'cube.parquet'))
+
+    class FakeCostExplorer:
+        def get_cost_and_usage(self, TimePeriod, Metrics, GroupBy=None, Filter=None, **kwargs):
+            selected = Filter['Dimensions']['Values'] if Filter else list(ce_services)
+            costs = {service: amount for service, amount in ce_services.items() if service in selected}
+            period = {'TimePeriod': TimePeriod, 'Estimated': False}
+            if GroupBy:
+                period.update(Total={}, Groups=[
+                    {'Keys': [service], 'Metrics': {'UnblendedCost': {'Amount': str(amount), 'Unit': 'USD'}}}
+                    for service, amount in sorted(costs.items())])
+            else:
+                period.update(Total={'UnblendedCost': {'Amount': str(sum(costs.values())), 'Unit': 'USD'}}, Groups=[])
+            return {'ResultsByTime': [period], 'Source': 'ce'}
+
+    def both_paths(**changes):
+        request = dict({'TimePeriod': {'Start': '2025-05-01', 'End': '2025-05-02'}, 'Granularity': 'DAILY',
+                        'Metrics': ['UnblendedCost']}, **changes)
+        monkeypatch.setattr(cur_cube, '_cube_uri', None)
+        monkeypatch.delenv('CUR_CUBE_PATH', raising=False)
+        from_ce = cur_cube.get_cost_and_usage(FakeCostExplorer(), **request)
+        monkeypatch.setenv('CUR_CUBE_PATH', str(tmp_path / 'cube.parquet'))
+        from_cube = cur_cube.get_cost_and_usage(FakeCostExplorer(), **request)
+        return from_ce, from_cube
+
+    def amounts(response):
+        period = response['ResultsByTime'][0]
+        if period['Groups']:
+            return {group['Keys'][0]: float(group['Metrics']['UnblendedCost']['Amount']) for group in period['Groups']}
+        return float(period['Total']['UnblendedCost']['Amount'])
+
+    from_ce, from_cube = both_paths(GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}])
+    assert from_cube['Source'] == 'cur_cube'
+    assert amounts(from_cube) == pytest.approx(amounts(from_ce))
+
+    for services in (['Amazon Elastic Compute Cloud - Compute'], ['EC2 - Other', 'Tax']):
+        from_ce, from_cube = both_paths(Filter={'Dimensions': {'Key': 'SERVICE', 'Values': services}})
+        assert from_cube['Source'] == 'cur_cube'
+        assert amounts(from_cube) == pytest.approx(amounts(from_ce))
+
+    # A CUR product name is not a Cost Explorer service, so Cost Explorer answers it
+    _, from_cube = both_paths(Filter={'Dimensions': {'Key': 'SERVICE', 'Values': ['Amazon Elastic Compute Cloud']}})
+    assert from_cube['Source'] == 'ce'
+
+
+def test_cubes_without_product_names_refuse_service_queries(tmp_path):
+    pq.write_table(pa.table({
+        'line_item_usage_start_date': ['2025-05-01T00:00:00Z'],
+        'line_item_product_code': ['AmazonS3'],
+        'line_item_usage_account_id': ['111111111111'],
+        'line_item_unblended_cost': [1.0],
+    }), str(tmp_path / 'codes.parquet'))
+    cube = build_cube(str(tmp_path / 'codes.parquet'))
+    request = {'TimePeriod': {'Start': '2025-05-01', 'End': '2025-05-02'}, 'Granularity': 'DAILY'}
+    assert cube.get_cost_and_usage(**request)['ResultsByTime'][0]['Total']['UnblendedCost']['Amount'] == '1.0'
+    with pytest.raises(UnsupportedCubeQuery):
+        cube.get_cost_and_usage(GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}], **request)
+    with pytest.raises(UnsupportedCubeQuery):
+        cube.get_cost_and_usage(Filter={'Dimensions': {'Key': 'SERVICE', 'Values': ['AmazonS3']}}, **request)
+
+
+def test_build_pushes_down_dates_and_accounts(export):
+    directory, details = export
+    cube = build_cube(directory, start=date(2025, 2, 1), end=date(2025, 2, 8), accounts=details['accounts'][:1])
+
+    assert (cube.start, cube.end) == (date(2025, 2, 1), date(2025, 2, 8))
+    assert set(cube.table.column('account').to_pylist()) == {details['accounts'][0]}
+    assert set(cube.table.column('day').to_pylist()) == {date(2025, 2, day) for day in range(1, 8)}
+    assert cube.covers(date(2025, 2, 3), date(2025, 2, 8))
+    with pytest.raises(UnsupportedCubeQuery):
+        cube.get_cost_and_usage(TimePeriod={'Start': '2025-01-25', 'End': '2025-02-08'}, Granularity='DAILY')
+
+
+def test_legacy_columns_and_missing_regions(tmp_path):
+    table = pa.table({
+        'line_item_usage_start_date': ['2025-04-01T00:00:00Z', '2025-04-01T05:00:00Z', '2025-04-02T00:00:00Z'],
+        'line_item_product_code': ['AmazonRoute53', 'AmazonEC2', 'AmazonEC2'],
+        'line_item_usage_account_id': ['111111111111'] * 3,
+        'product_region': [None, 'us-east-1', 'us-east-1'],
+        'line_item_unblended_cost': [0.5, 1.25, 2.0],
+    })
+    pq.write_table(table, str(tmp_path / 'legacy.parquet'))
+
+    cube = build_cube(str(tmp_path / 'legacy.parquet'))
+    assert (cube.start, cube.end) == (date(2025, 4, 1), date(2025, 4, 3))
+    result = cube.get_cost_and_usage(TimePeriod={'Start': '2025-04-01', 'End': '2025-04-03'}, Granularity='MONTHLY',
+                                     GroupBy=[{'Type': 'DIMENSION', 'Key': 'REGION'}])
+    groups = {group['Keys'][0]: group['Metrics']['UnblendedCost']['Amount']
+              for group in result['ResultsByTime'][0]['Groups']}
+    assert groups == {'global': '0.5', 'us-east-1': '3.25'}
+
+    # The export has no blended cost, so requests for it go to Cost Explorer
+    with pytest.raises(UnsupportedCubeQuery):
+        cube.get_cost_and_usage(TimePeriod={'Start': '2025-04-01', 'End': '2025-04-03'}, Metrics=['BlendedCost'])
+
+
+@pytest.mark.parametrize('request_changes', [
+    {'Granularity': 'HOURLY'},
+    {'Metrics': ['AmortizedCost']},
+    {'GroupBy': [{'Type': 'TAG', 'Key': 'team'}]},
+    {'Filter': {'Not': {'Dimensions': {'Key': 'SERVICE', 'Values': ['AWS Lambda']}}}},
+    {'Filter': {'Dimensions': {'Key': 'SERVICE', 'Values': ['Amazon'], 'MatchOptions': ['STARTS_WITH']}}},
+    {'NextPageToken': 'abc'},
+])
+def test_unsupported_requests_are_refused(export, request_changes):
+    cube = build_cube(export[0])
+    request = {'TimePeriod': {'Start': '2025-01-01', 'End': '2025-02-01'}, 'Granularity': 'MONTHLY',
+               'Metrics': ['UnblendedCost']}
+    request.update(request_changes)
+    with pytest.raises(UnsupportedCubeQuery):
+        cube.get_cost_and_usage(**request)
+
+
+def test_agents_fall_back_to_cost_explorer(export, tmp_path, monkeypatch):
+    class FakeCostExplorer:
+        def __init__(self):
+            self.requests = []
+
+        def get_cost_and_usage(self, **request):
+            self.requests.append(request)
+            return {'ResultsByTime': [], 'Source': 'ce'}
+
+    ce = FakeCostExplorer()
+    monkeypatch.setattr(cur_cube, '_cube', None)
+    monkeypatch.setattr(cur_cube, '_cube_uri', None)
+    monkeypatch.delenv('CUR_CUBE_PATH', raising=False)
+    request = {'TimePeriod': {'Start': '2025-01-01', 'End': '2025-02-01'}, 'Granularity': 'MONTHLY',
+               'Metrics': ['UnblendedCost']}
+    assert cur_cube.get_cost_and_usage(ce, **request)['Source'] == 'ce'
+
+    build_cube(export[0]).save(str(tmp_path / 'cube.parquet'))
+    monkeypatch.setenv('CUR_CUBE_PATH', str(tmp_path / 'cube.parquet'))
+    assert cur_cube.get_cost_and_usage(ce, **request)['Source'] == 'cur_cube'
+    outside = dict(request, TimePeriod={'Start': '2025-03-01', 'End': '2025-04-01'})
+    assert cur_cube.get_cost_and_usage(ce, **outside)['Source'] == 'ce'
+    assert ce.requests == [request, outside]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the daily cost interval cache
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# Add the cost forecast agent directory to Python path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+from daily_cost_cache import DailyCostCache
+
+BY_SERVICE = [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+
+
+class FakeCostExplorer:
+    """Daily costs of one service, the day of the month in dollars, and the ranges requested."""
+
+    def __init__(self):
+        self.ranges = []
+
+    def get_cost_and_usage(self, **request):
+        start = date.fromisoformat(request['TimePeriod']['Start'])
+        end = date.fromisoformat(request['TimePeriod']['End'])
+        self.ranges.append((start.isoformat(), end.isoformat()))
+        days = [start + timedelta(days=n) for n in range((end - start).days)]
+        return {'ResultsByTime': [{
+            'TimePeriod': {'Start': day.isoformat(), 'End': (day + timedelta(days=1)).isoformat()},
+            'Total': {}, 'Estimated': True,
+            'Groups': [{'Keys': ['Amazon S3'], 'Metrics': {'UnblendedCost': {'Amount': str(day.day), 'Unit': 'USD'}}}]
+        } for day in days]}
+
+
+class Clock:
+    def __init__(self, day):
+        self.now = datetime(day.year, day.month, day.day, 12).timestamp()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, days=0, hours=0):
+        self.now += days * 86400 + hours * 3600
+
+
+@pytest.fixture(autouse=True)
+def no_cube(monkeypatch):
+    monkeypatch.delenv('CUR_CUBE_PATH', raising=False)
+
+
+def daily(cache, ce, start, end, **changes):
+    request = {'TimePeriod': {'Start': start, 'End': end}, 'Granularity': 'DAILY',
+               'Metrics': ['UnblendedCost'], 'GroupBy': BY_SERVICE}
+    request.update(changes)
+    return cache.get_cost_and_usage(ce, **request)
+
+
+def test_ranges_are_assembled_from_cached_days_and_merged_gaps():
+    ce = FakeCostExplorer()
+    cache = DailyCostCache(enabled=True, clock=Clock(date(2025, 6, 20)))
+    daily(cache, ce, '2025-05-01', '2025-05-05')
+    daily(cache, ce, '2025-05-08', '2025-05-12')
+    response = daily(cache, ce, '2025-05-01', '2025-05-15')
+
+    assert ce.ranges[2:] == [('2025-05-05', '2025-05-08'), ('2025-05-12', '2025-05-15')]
+    assert [result['TimePeriod']['Start'] for result in response['ResultsByTime']] == \
+        [f"2025-05-{day:02d}" for day in range(1, 15)]
+    assert response['CacheStats'] == {'cached_days': 8, 'fetched_days': 6, 'fetches': 2}
+
+    assert daily(cache, ce, '2025-05-03', '2025-05-10')['Source'] == 'daily_cost_cache'
+    assert len(ce.ranges) == 4
+
+
+def test_rolling_window_fetches_only_its_newest_days():
+    ce = FakeCostExplorer()
+    clock = Clock(date(2025, 6, 20))
+    cache = DailyCostCache(enabled=True, settle_days=1, open_ttl=3600, clock=clock)
+    daily(cache, ce, '2025-05-21', '2025-06-20')
+    for day in range(21, 25):
+        clock.advance(days=1)
+        start = (date(2025, 6, day) - timedelta(days=30)).isoformat()
+        daily(cache, ce, start, f"2025-06-{day:02d}")
+        # The new day and yesterday's newest day, which has settled since: one call
+        assert ce.ranges[-1] == (f"2025-06-{day - 2:02d}", f"2025-06-{day:02d}")
+    assert len(ce.ranges) == 5
+
+
+def test_closed_days_are_kept_and_open_days_refreshed():
+    ce = FakeCostExplorer()
+    clock = Clock(date(2025, 6, 20))
+    cache = DailyCostCache(enabled=True, settle_days=1, open_ttl=3600, clock=clock)
+    daily(cache, ce, '2025-06-10', '2025-06-21')
+    clock.advance(hours=2)
+    daily(cache, ce, '2025-06-10', '2025-06-21')
+    # 06-19 and 06-20 were still open
+    assert ce.ranges[-1] == ('2025-06-19', '2025-06-21')
+
+
+def test_shapes_are_cached_separately_and_other_requests_pass_through():
+    ce = FakeCostExplorer()
+    cache = DailyCostCache(enabled=True, clock=Clock(date(2025, 6, 20)))
+    daily(cache, ce, '2025-05-01', '2025-05-05')
+    daily(cache, ce, '2025-05-01', '2025-05-05', Filter={'Dimensions': {'Key': 'REGION', 'Values': ['us-east-1']}})
+    daily(cache, ce, '2025-05-01', '2025-05-05', Granularity='MONTHLY')
+    daily(cache, ce, '2025-05-01', '2025-05-05', Metrics=['UnblendedCost'], GroupBy=BY_SERVICE)
+    assert len(ce.ranges) == 3
+
+    disabled = DailyCostCache(enabled=False, clock=Clock(date(2025, 6, 20)))
+    daily(disabled, ce, '2025-05-01', '2025-05-05')
+    daily(disabled, ce, '2025-05-01', '2025-05-05')
+    assert len(ce.ranges) == 5
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for date expressions resolved to cache-aligned ranges
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Add the cost forecast agent directory to Python path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+from date_ranges import DateRangeError, period_buckets, resolve_months, resolve_period, resolve_range
+
+TODAY = date(2025, 6, 10)
+
+
+@pytest.fixture(autouse=True)
+def calendar_fiscal_year(monkeypatch):
+    monkeypatch.delenv('FISCAL_YEAR_START_MONTH', raising=False)
+
+
+@pytest.mark.parametrize('expression, start, end, label', [
+    ("MONTH_TO_DATE", '2025-06-01', '2025-06-11', 'June 2025 to date'),
+    ("LAST_MONTH", '2025-05-01', '2025-06-01', 'May 2025'),
+    ("LAST_30_DAYS", '2025-05-11', '2025-06-10', 'the last 30 days'),
+    ("APRIL_2025", '2025-04-01', '2025-05-01', 'April 2025'),
+    ("2025-04", '2025-04-01', '2025-05-01', 'April 2025'),
+    ("July", '2024-07-01', '2024-08-01', 'July 2024'),
+    ("last quarter", '2025-01-01', '2025-04-01', 'Q1 2025'),
+    ("this quarter", '2025-04-01', '2025-06-11', 'Q2 2025 to date'),
+    ("YTD", '2025-01-01', '2025-06-11', '2025 year to date'),
+    ("last year", '2024-01-01', '2025-01-01', '2024'),
+    ("trailing 90 days", '2025-03-12', '2025-06-10', 'the last 90 days'),
+    ("last 3 months", '2025-03-01', '2025-06-01', 'the last 3 months'),
+    ("q4", '2024-10-01', '2025-01-01', 'Q4 2024'),
+    ("first half of 2024", '2024-01-01', '2024-07-01', 'H1 2024'),
+    ("FY24", '2024-01-01', '2025-01-01', 'FY2024'),
+    ("2025-04-01 to 2025-04-15", '2025-04-01', '2025-04-16', '2025-04-01 to 2025-04-15'),
+    ("January through March 2025", '2025-01-01', '2025-04-01', 'January 2025 to March 2025'),
+    ("since March", '2025-03-01', '2025-06-11', 'since March 2025'),
+])
+def test_expressions_resolve_to_day_ranges(expression, start, end, label):
+    period = resolve_period(expression, TODAY)
+    assert (period['start'], period['end'], period['label']) == (start, end, label)
+
+
+def test_fiscal_years_follow_the_configured_start(monkeypatch):
+    monkeypatch.setenv('FISCAL_YEAR_START_MONTH', '7')
+    fy2025 = resolve_period("FY2025", TODAY)
+    assert (fy2025['start'], fy2025['end'], fy2025['label']) == ('2024-07-01', '2025-06-11', 'FY2025 to date')
+    assert resolve_period("this fiscal year", TODAY)['start'] == '2024-07-01'
+    assert resolve_period("last fiscal year", TODAY)['months'][0] == '2023-07'
+
+
+def test_overlapping_periods_share_month_buckets():
+    def buckets(expression):
+        period = resolve_period(expression, TODAY)
+        return period_buckets(date.fromisoformat(period['start']), date.fromisoformat(period['end']))
+
+    april = (date(2025, 4, 1), date(2025, 5, 1))
+    assert buckets("April 2025") == buckets("2025-04") == buckets("APRIL_2025") == [april]
+    assert april in buckets("this quarter") and april in buckets("last 90 days") and april in buckets("YTD")
+    assert buckets("last 90 days")[0] == (date(2025, 3, 12), date(2025, 4, 1))
+    # A custom range through a month's last day is that month
+    assert resolve_range('2025-04-01', '2025-04-30', TODAY)['end'] == '2025-05-01'
+
+
+def test_month_lists_and_periods():
+    assert resolve_months('', TODAY) == ['2024-12', '2025-01', '2025-02', '2025-03', '2025-04', '2025-05']
+    assert resolve_months('2025-04, 2025-05', TODAY) == ['2025-04', '2025-05']
+    assert resolve_months('Q1 2025,2025-05', TODAY) == ['2025-01', '2025-02', '2025-03', '2025-05']
+
+
+@pytest.mark.parametrize('expression, message', [
+    ("next month", "Unrecognized time period"),
+    ("sometime", "Unrecognized time period"),
+    ("July 2025", "in the future"),
+    ("2025-13", "Not a valid month"),
+    ("last 900 days", "limited to 730 days"),
+])
+def test_unrecognized_or_future_periods_are_errors(expression, message):
+    with pytest.raises(DateRangeError, match=message):
+        resolve_period(expression, TODAY)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for direct answers to simple cost lookups
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Add the cost forecast agent directory to Python path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+from direct_answers import answer_simple_query, parse_simple_query, render_answer
+
+TODAY = date(2025, 6, 10)
+COSTS = {'Amazon Elastic Compute Cloud - Compute': 100.0, 'EC2 - Other': 5.2,
+         'Amazon Simple Storage Service': 12.345, 'AWS Lambda': 0.001,
+         **{f"Service {index}": float(index) for index in range(1, 8)}}
+
+
+class FakeCostExplorer:
+    """One monthly page of costs by service, and the requests it was sent."""
+
+    def __init__(self, costs=COSTS):
+        self.costs = costs
+        self.requests = []
+
+    def get_cost_and_usage(self, **request):
+        self.requests.append(request)
+        return {'ResultsByTime': [{
+            'TimePeriod': request['TimePeriod'], 'Estimated': False,
+            'Groups': [{'Keys': [service], 'Metrics': {'UnblendedCost': {'Amount': str(amount), 'Unit': 'USD'}}}
+                       for service, amount in self.costs.items()]
+        }]}
+
+
+@pytest.fixture(autouse=True)
+def no_cube(monkeypatch):
+    monkeypatch.delenv('CUR_CUBE_PATH', raising=False)
+    monkeypatch.delenv('DIRECT_ANSWERS_ENABLED', raising=False)
+
+
+@pytest.mark.parametrize('query, intent, start, end, services', [
+    ("What did I spend last month?", 'total', '2025-05-01', '2025-06-01', []),
+    ("S3 cost in May", 'services', '2025-05-01', '2025-06-01', ['s3']),
+    ("How much did EC2 and Lambda cost in March 2025?", 'services', '2025-03-01', '2025-04-01', ['ec2', 'lambda']),
+    ("Show my S3 spend for June", 'services', '2025-06-01', '2025-06-11', ['s3']),
+    ("S3 cost in July", 'services', '2024-07-01', '2024-08-01', ['s3']),
+    ("top 3 services this month", 'top_services', '2025-06-01', '2025-06-11', []),
+    ("What were my biggest costs over the last 30 days", 'top_services', '2025-05-11', '2025-06-10', []),
+    ("Total AWS bill year to date", 'total', '2025-01-01', '2025-06-11', []),
+])
+def test_simple_lookups_are_recognized(query, intent, start, end, services):
+    parsed = parse_simple_query(query, TODAY)
+    assert parsed['intent'] == intent
+    assert (parsed['period']['start'], parsed['period']['end']) == (start, end)
+    assert parsed['services'] == services
+
+
+@pytest.mark.parametrize('query', [
+    "Why did my S3 costs increase last month?",
+    "What will I spend in July 2025?",
+    "Forecast my costs for next month",
+    "Compare S3 spend in April and May",
+    "May I see my costs?",
+    "What did I spend on S3 last month by region?",
+    "How can I reduce my EC2 costs?",
+])
+def test_other_questions_go_to_the_agent(query):
+    assert parse_simple_query(query, TODAY) is None
+
+
+def test_answers_are_rendered_from_one_request():
+    ce = FakeCostExplorer()
+    answer = answer_simple_query("What did I spend on EC2 last month?", ce, TODAY)
+    assert ce.requests == [{'TimePeriod': {'Start': '2025-05-01', 'End': '2025-06-01'}, 'Granularity': 'MONTHLY',
+                            'Metrics': ['UnblendedCost'], 'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]}]
+    assert "## Total Cost: $105.20 USD" in answer['response']
+    assert "| EC2 - Other | $5.20 |" in answer['response']
+    assert answer['direct_answer']['intent'] == 'services'
+    assert answer['direct_answer']['source'] == 'cost_explorer'
+
+    top = render_answer(parse_simple_query("top 3 services last month", TODAY), COSTS, True)
+    assert "| Other (7 services) | $26.20 | 18.0% |" in top
+    assert "estimated charges" in top
+
+
+def test_services_missing_from_the_data_go_to_the_agent():
+    # No DynamoDB entry at all: the data may name it differently, so never answer $0
+    ce = FakeCostExplorer()
+    assert answer_simple_query("DynamoDB cost last month", ce, TODAY) is None
+    assert answer_simple_query("How much did S3 and DynamoDB cost last month?", ce, TODAY) is None
+    assert len(ce.requests) == 2
+
+    # A service billed nothing is still answered
+    zero = FakeCostExplorer(dict(COSTS, **{'Amazon DynamoDB': 0.0}))
+    answer = answer_simple_query("DynamoDB cost last month", zero, TODAY)
+    assert "No Amazon DynamoDB charges were recorded for May 2025." in answer['response']
+
+
+def test_direct_answers_from_a_cur_cube(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+    from cur_benchmark import generate_cur
+    import cur_cube
+    generate_cur(str(tmp_path / 'cur'), rows=5000, months=1, accounts=3, end=date(2025, 6, 1))
+    cur_cube.build_cube(str(tmp_path / 'cur')).save(str(tmp_path / 'cube.parquet'))
+    monkeypatch.setenv('CUR_CUBE_PATH', str(tmp_path / 'cube.parquet'))
+    monkeypatch.setattr(cur_cube, '_cube_uri', None)
+    ce = FakeCostExplorer()
+
+    for query in ("S3 cost last month", "What did I spend on EC2 last month?", "CloudWatch spend last month"):
+        answer = answer_simple_query(query, ce, TODAY)
+        assert answer['direct_answer']['source'] == 'cur_cube', query
+        assert "No " not in answer['response'], query
+    # The export has no Redshift, so the agent answers rather than reporting $0
+    assert answer_simple_query("Redshift cost last month", ce, TODAY) is None
+    assert ce.requests == []
+
+
+def test_disabled_or_failed_lookups_fall_back(monkeypatch):
+    class BrokenCostExplorer:
+        def get_cost_and_usage(self, **request):
+            raise RuntimeError("Throttling")
+
+    assert answer_simple_query("What did I spend last month?", BrokenCostExplorer(), TODAY) is None
+    monkeypatch.setenv('DIRECT_ANSWERS_ENABLED', 'false')
+    ce = FakeCostExplorer()
+    assert answer_simple_query("What did I spend last month?", ce, TODAY) is None
+    assert ce.requests == []
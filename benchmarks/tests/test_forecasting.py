@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the statistical cost forecasts
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# Add the cost forecast agent directory to Python path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'aws-cost-forecast-agent'))
+
+from forecasting import ForecastCache, LinearForecaster, days_in_month, forecast_monthly_costs, t_quantile
+
+
+def months_from(year, month, count):
+    return [f"{year + (month - 1 + offset) // 12}-{(month - 1 + offset) % 12 + 1:02d}" for offset in range(count)]
+
+
+def history(months, rates):
+    """Month costs from per-service daily rates, functions of the month's position."""
+    return {month: {name: rate(index, month) * days_in_month(month) for name, rate in rates.items()}
+            for index, month in enumerate(months)}
+
+
+def test_t_quantiles_match_reference_values():
+    assert t_quantile(0.95, 1) == pytest.approx(12.706, abs=1e-3)
+    assert t_quantile(0.95, 2) == pytest.approx(4.303, abs=1e-3)
+    assert t_quantile(0.95, 5) == pytest.approx(2.571, abs=1e-3)
+    assert t_quantile(0.80, 10) == pytest.approx(1.372, abs=1e-3)
+    assert t_quantile(0.95, 1000) == pytest.approx(1.962, abs=1e-3)
+    # The widest allowed interval with little history
+    assert t_quantile(0.99, 3) == pytest.approx(5.841, abs=1e-3)
+    assert t_quantile(0.99, 4) == pytest.approx(4.604, abs=1e-3)
+
+
+def test_linear_trends_are_extrapolated_per_day_of_the_month():
+    months = months_from(2024, 1, 12)
+    costs = history(months, {'Amazon EC2': lambda index, month: 100 + 5 * index,
+                             'Amazon S3': lambda index, month: 20.0})
+    forecast = forecast_monthly_costs(costs, ['2025-01', '2025-02'])
+
+    assert forecast['method'] == 'least squares, linear trend'
+    ec2 = forecast['services']['Amazon EC2']
+    assert ec2[0] == {'month': '2025-01', 'forecast': 160 * 31, 'lower': 160 * 31, 'upper': 160 * 31}
+    assert ec2[1]['forecast'] == pytest.approx(165 * 28)
+    assert forecast['services']['Amazon S3'][1]['forecast'] == pytest.approx(20 * 28)
+    assert [entry['forecast'] for entry in forecast['total']] == pytest.approx([180 * 31, 185 * 28])
+
+
+def test_month_of_year_effects_are_fitted_from_two_years_of_history():
+    months = months_from(2022, 1, 36)
+    december_peak = lambda index, month: 50 + index + (30 if month.endswith('-12') else 0)
+    costs = history(months, {'Amazon CloudFront': december_peak})
+
+    seasonal = forecast_monthly_costs(costs, ['2025-11', '2025-12'])
+    assert seasonal['method'] == 'least squares, linear trend with month-of-year effects'
+    november, december = seasonal['services']['Amazon CloudFront']
+    assert november['forecast'] == pytest.approx((50 + 46) * 30)
+    assert december['forecast'] == pytest.approx((50 + 47 + 30) * 31)
+
+    trend_only = forecast_monthly_costs({month: costs[month] for month in months[-12:]}, ['2025-12'])
+    assert trend_only['method'] == 'least squares, linear trend'
+
+
+def test_intervals_widen_with_noise_confidence_and_horizon():
+    rng = random.Random(7)
+    months = months_from(2024, 1, 12)
+    costs = history(months, {'Amazon RDS': lambda index, month: 40 + index + rng.gauss(0, 2)})
+    future = months_from(2025, 1, 6)
+
+    eighty = forecast_monthly_costs(costs, future, level=0.8)['services']['Amazon RDS']
+    ninety_five = forecast_monthly_costs(costs, future, level=0.95)['services']['Amazon RDS']
+    widths = [(entry['upper'] - entry['lower']) / days_in_month(entry['month']) for entry in eighty]
+    assert all(entry['lower'] < entry['forecast'] < entry['upper'] for entry in eighty)
+    assert widths == sorted(widths)
+    assert all(wide['upper'] - wide['lower'] > narrow['upper'] - narrow['lower']
+               for wide, narrow in zip(ninety_five, eighty))
+
+
+def test_services_are_ranked_and_the_rest_fitted_as_other():
+    months = months_from(2024, 1, 12)
+    rates = {f"Service {index}": (lambda index: lambda position, month: index * (1 + position / 10))(index)
+             for index in range(1, 21)}
+    rates['Retired'] = lambda position, month: max(0.0, 30 - 5 * position)
+    forecast = forecast_monthly_costs(history(months, rates), ['2025-01'], top_n=5)
+
+    assert list(forecast['services']) == ['Service 20', 'Service 19', 'Service 18', 'Service 17', 'Service 16',
+                                          'Other (16 services)']
+    # A declining service is clipped at zero rather than subtracted from the total
+    assert forecast_monthly_costs(history(months, rates), ['2025-01'], services=['retired'])['total'][0]['forecast'] == 0
+    shown = sum(entries[0]['forecast'] for entries in forecast['services'].values())
+    assert shown == pytest.approx(forecast['total'][0]['forecast'], abs=0.05)
+
+    assert list(forecast_monthly_costs(history(months, rates), ['2025-01'], services=['service 2'])['services']) == \
+        ['Service 20', 'Service 2']
+    assert forecast_monthly_costs({}, ['2025-01']) == {'error': "No cost history to forecast from"}
+
+
+def test_short_histories_fall_back_to_simpler_models():
+    assert LinearForecaster(['2025-01', '2025-02']).trend is False
+    one_month = forecast_monthly_costs({'2025-05': {'AWS Lambda': 31.0}}, ['2025-06'])
+    assert one_month['method'] == 'mean of history'
+    assert one_month['total'] == [{'month': '2025-06', 'forecast': 30.0, 'lower': 30.0, 'upper': 30.0}]
+
+
+def test_cost_explorer_forecasts_are_cached_until_they_expire():
+    class FakeCostExplorer:
+        calls = 0
+
+        def get_cost_forecast(self, **request):
+            self.calls += 1
+            return {'Total': {'Amount': '100.0'}, 'ForecastResultsByTime': [], 'ResponseMetadata': {}}
+
+    now = [0.0]
+    cache = ForecastCache(ttl=3600, clock=lambda: now[0])
+    ce = FakeCostExplorer()
+    request = {'TimePeriod': {'Start': '2025-06-10', 'End': '2025-09-01'}, 'Metric': 'UNBLENDED_COST',
+               'Granularity': 'MONTHLY', 'PredictionIntervalLevel': 80}
+
+    assert cache.get_cost_forecast(ce, **request)['Cached'] is False
+    assert cache.get_cost_forecast(ce, **dict(reversed(list(request.items()))))['Cached'] is True
+    assert 'ResponseMetadata' not in cache.get_cost_forecast(ce, **request)
+    cache.get_cost_forecast(ce, **dict(request, PredictionIntervalLevel=95))
+    assert ce.calls == 2
+    now[0] += 3601
+    cache.get_cost_forecast(ce, **request)
+    assert ce.calls == 3
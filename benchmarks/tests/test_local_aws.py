@@ -0,0 +1,801 @@
+#!/usr/bin/env python3
+"""
+Tests for the local AWS emulator and offline benchmark runner.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError
+
+# Add the benchmarks directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_aws import LocalAWS, LatencyProfile, StageRecorder, item_size, percentile
+from run_benchmark import run_benchmark, format_report, parse_latency_overrides
+
+NO_LATENCY = {}
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 100) == 5.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([], 95) == 0.0
+    assert abs(percentile(values, 95) - 4.8) < 1e-9
+
+
+def test_stage_recorder_summary():
+    recorder = StageRecorder()
+    for value in [0.1, 0.2, 0.3]:
+        recorder.record('stage', value)
+    recorder.record('stage', 0.4, ok=False)
+
+    summary = recorder.summary()['stage']
+    assert summary['count'] == 4
+    assert summary['errors'] == 1
+    assert abs(summary['p50'] - 0.25) < 1e-9
+
+
+def test_latency_profile_parse_and_fixed_sample():
+    profile = LatencyProfile.parse("0.5,0,0.25")
+    assert profile.median == 0.5
+    assert profile.sigma == 0
+    assert profile.failure_rate == 0.25
+
+    import random
+    assert profile.sample(random.Random(1)) == 0.5
+
+
+def test_failure_injection_raises_client_error():
+    with LocalAWS(latencies={'ce': LatencyProfile(0, 0, 1.0)}) as local:
+        import boto3
+        ce = boto3.client('ce', region_name='us-east-1')
+        with pytest.raises(ClientError):
+            ce.get_cost_and_usage(TimePeriod={'Start': '2025-01-01', 'End': '2025-02-01'})
+        assert local.recorder.summary()['ce.get_cost_and_usage']['errors'] == 1
+
+
+def test_fake_lambda_dispatches_to_registered_handler():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        local.register_function('echo', lambda event, context: {'statusCode': 200, 'body': json.dumps(event)})
+        import boto3
+        response = boto3.client('lambda').invoke(FunctionName='echo:PROD', Payload=json.dumps({'query': 'hi'}))
+        payload = json.loads(response['Payload'].read())
+        assert json.loads(payload['body']) == {'query': 'hi'}
+        assert 'lambda:echo' in local.recorder.summary()
+
+
+def test_fake_cost_explorer_monthly_periods():
+    with LocalAWS(latencies=NO_LATENCY):
+        import boto3
+        response = boto3.client('ce').get_cost_and_usage(
+            TimePeriod={'Start': '2025-01-01', 'End': '2025-04-01'},
+            Granularity='MONTHLY',
+            Metrics=['UnblendedCost'],
+            GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+        )
+        periods = [result['TimePeriod']['Start'] for result in response['ResultsByTime']]
+        assert periods == ['2025-01-01', '2025-02-01', '2025-03-01']
+        assert response['ResultsByTime'][0]['Groups']
+
+
+def test_emulator_restores_patches():
+    import boto3
+    original_client = boto3.client
+    with LocalAWS(latencies=NO_LATENCY):
+        assert boto3.client is not original_client
+    assert boto3.client is original_client
+
+
+@pytest.mark.parametrize("target", ["handler", "lambda_handler", "progress_notifier"])
+def test_run_benchmark_reports_stage_percentiles(target):
+    report = run_benchmark(
+        target, ["Show me my costs and optimization recommendations"],
+        requests=4, concurrency=2, latencies=NO_LATENCY
+    )
+
+    stages = report['stages']
+    assert stages['end_to_end']['count'] == 4
+    assert stages['end_to_end']['errors'] == 0
+    assert any(stage.startswith('lambda:') for stage in stages)
+    for stats in stages.values():
+        assert stats['p50'] <= stats['p95'] <= stats['p99']
+    assert 'p99 ms' in format_report(report)
+
+
+def test_parse_latency_overrides_keeps_defaults():
+    latencies = parse_latency_overrides(["bedrock=1.5,0.1", "lambda:aws-cost-forecast-agent=2"])
+    assert latencies['bedrock'].median == 1.5
+    assert latencies['lambda:aws-cost-forecast-agent'].median == 2.0
+    assert 'ce' in latencies
+
+
+def test_payload_benchmark_round_trips_each_encoding():
+    from payload_benchmark import run_payload_benchmark
+
+    results = run_payload_benchmark(sizes=[16 * 1024], repeat=1)
+    by_encoding = {result['encoding']: result for result in results}
+    assert set(by_encoding) >= {'identity', 'gzip'}
+    assert by_encoding['gzip']['wire_bytes'] < by_encoding['identity']['wire_bytes']
+
+
+def test_fake_s3_spill_through_agent_envelope(monkeypatch):
+    monkeypatch.setenv('PAYLOAD_SPILL_BUCKET', 'local-spill')
+    monkeypatch.setenv('PAYLOAD_SPILL_MIN_BYTES', '100')
+    monkeypatch.delenv('PAYLOAD_SPILL_DIR', raising=False)
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        envelope_module = local.load_module('supervisor_agent/payload_envelope.py', 'local_payload_envelope')
+        body = json.dumps({'response': 'x' * 20000})
+        envelope = envelope_module.encode_response({'statusCode': 200, 'body': body}, {'accept_encoding': ['gzip']})
+        assert envelope['body_ref'].startswith('s3://local-spill/')
+        assert envelope_module.decode_response(envelope)['body'] == {'response': 'x' * 20000}
+        assert local.bytes_transferred['s3:put_object'] > 0
+
+
+def test_import_profile_parses_importtime_output():
+    from import_profile import parse_importtime
+
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |     json.decoder\n"
+              "import time:       300 |        420 |   json\n"
+              "import time:      8000 |       8420 | lambda_handler\n")
+    modules = parse_importtime(stderr)
+    assert [module['module'] for module in modules] == ['json.decoder', 'json', 'lambda_handler']
+    assert modules[0]['depth'] == 2 and modules[-1]['depth'] == 0
+    assert modules[-1]['cumulative_us'] == 8420
+
+
+def test_agents_report_prewarm_on_first_invoke_only(monkeypatch):
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        modules = local.register_agent_functions()
+        for function_name, module in modules.items():
+            handler = getattr(module, 'handler', None) or module.lambda_handler
+            first = json.loads(handler({'query': 'What are my costs?'}, None)['body'])
+            second = json.loads(handler({'query': 'What are my costs?'}, None)['body'])
+
+            assert first['init_metrics']['cold_start'] is True, function_name
+            assert 'bedrock' in first['init_metrics']['prewarm']['steps'], function_name
+            assert not first['init_metrics']['prewarm']['errors'], function_name
+            assert 'init_metrics' not in second, function_name
+
+
+def test_progress_notifier_resumes_from_agent_checkpoints():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        job = {'jobId': 'job-1', 'connectionId': 'conn-1', 'userId': 'u',
+               'query': 'Show me my costs and optimization recommendations'}
+        event = {'Records': [{'messageId': 'm-1', 'body': json.dumps(job)}]}
+
+        def agent_invocations():
+            summary = local.recorder.summary()
+            return sum(stats['count'] for stage, stats in summary.items() if stage.startswith('lambda:'))
+
+        # First delivery: both agents finish, then the synthesis step fails and the record is retried
+        build_final = notifier.build_combined_response_streaming
+        notifier.build_combined_response_streaming = lambda *args: (_ for _ in ()).throw(TimeoutError("synthesis"))
+        assert notifier.handler(event, None) == {'batchItemFailures': [{'itemIdentifier': 'm-1'}]}
+        assert agent_invocations() == 2
+
+        item = local.tables['finops-websocket-jobs'].items[json.dumps({'jobId': 'job-1'})]
+        assert item['status'] == 'failed'
+        assert {'checkpoint_cost_forecast', 'checkpoint_trusted_advisor'} <= set(item)
+
+        # Redelivery of the same record reuses both checkpoints and only re-runs synthesis
+        notifier.build_combined_response_streaming = build_final
+        assert notifier.handler(event, None) == {'batchItemFailures': []}
+        assert agent_invocations() == 2
+
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-1'})['Item']
+        assert item['status'] == 'completed'
+        final = notifier.deserialize_job_payload(item['finalResult'])
+        assert '## 📊 Cost Analysis' in final['response']
+        assert '## 💡 Optimization Recommendations' in final['response']
+        messages = [json.loads(message) for message in local.sent_messages['conn-1']]
+        resumed = [message['agent'] for message in messages
+                   if message.get('type') == 'agent_completed' and message.get('resumed')]
+        assert sorted(resumed) == ['cost_forecast', 'trusted_advisor']
+
+
+def test_progress_notifier_does_not_checkpoint_errors_or_oversize_results(monkeypatch):
+    monkeypatch.setenv('CHECKPOINT_INLINE_MAX_BYTES', '1000')
+    monkeypatch.delenv('CHECKPOINT_BUCKET', raising=False)
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+
+        assert not notifier.checkpoint_agent_result('job-2', 'cost_forecast', {'error': 'timeout'})
+        assert not notifier.checkpoint_agent_result('job-2', 'cost_forecast', {'statusCode': 500, 'body': '{}'})
+        large = {'statusCode': 200, 'body': json.dumps({'response': 'x' * 5000})}
+        assert not notifier.checkpoint_agent_result('job-2', 'cost_forecast', large)
+
+        monkeypatch.setenv('CHECKPOINT_BUCKET', 'checkpoints')
+        assert notifier.checkpoint_agent_result('job-2', 'cost_forecast', large)
+        assert notifier.load_agent_checkpoints('job-2') == {'cost_forecast': large}
+
+
+def test_progress_notifier_spills_checkpoints_the_job_item_has_no_room_for(monkeypatch):
+    monkeypatch.setenv('CHECKPOINT_BUCKET', 'checkpoints')
+    monkeypatch.delenv('CHECKPOINT_INLINE_MAX_BYTES', raising=False)
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        notifier.jobs_table.put_item(Item={'jobId': 'job-big', 'status': 'processing', 'leaseOwner': 'owner'})
+
+        # Each fits the inline limit, but not all of them fit on one 400 KB item
+        results = {agent: {'statusCode': 200, 'body': json.dumps({'response': agent[0] * 200_000})}
+                   for agent in ('cost_forecast', 'trusted_advisor', 'budget_management')}
+        for agent, result in results.items():
+            assert notifier.checkpoint_agent_result('job-big', agent, result)
+        assert notifier.load_agent_checkpoints('job-big') == results
+
+        final = {'response': 'f' * 300_000}
+        notifier.complete_job('job-big', final, 'owner')
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-big'})['Item']
+        assert item['status'] == 'completed'
+        assert notifier.deserialize_job_payload(item['finalResult']) == final
+        assert item_size(item) <= notifier.JOB_ITEM_MAX_BYTES
+
+
+def test_progress_notifier_fails_jobs_whose_completion_cannot_be_stored():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        job = {'jobId': 'job-store', 'connectionId': 'conn-store', 'userId': 'u', 'query': 'What are my costs?'}
+        event = {'Records': [{'messageId': 'm-store', 'body': json.dumps(job)}]}
+
+        update_item = notifier.jobs_table.update_item
+
+        def failing_update(**kwargs):
+            if kwargs.get('ExpressionAttributeValues', {}).get(':status') == 'completed':
+                raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'Item too large'}},
+                                  'UpdateItem')
+            return update_item(**kwargs)
+
+        notifier.jobs_table.update_item = failing_update
+        assert notifier.handler(event, None) == {'batchItemFailures': [{'itemIdentifier': 'm-store'}]}
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-store'})['Item']
+        assert item['status'] == 'failed'
+        assert 'leaseOwner' not in item
+
+
+def test_progress_notifier_does_not_complete_jobs_reclaimed_by_another_invocation():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        notifier.jobs_table.put_item(Item={'jobId': 'job-taken', 'status': 'processing', 'leaseOwner': 'other'})
+
+        with pytest.raises(notifier.JobInProgressError):
+            notifier.complete_job('job-taken', {'response': 'late'}, 'expired-owner')
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-taken'})['Item']
+        assert item['status'] == 'processing'
+        assert 'finalResult' not in item
+
+
+def _agent_invocations(local):
+    return sum(stats['count'] for stage, stats in local.recorder.summary().items() if stage.startswith('lambda:'))
+
+
+def test_progress_notifier_replays_completed_job_on_redelivery():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        job = {'jobId': 'job-3', 'connectionId': 'conn-3', 'userId': 'u', 'query': 'What are my costs?'}
+        event = {'Records': [{'messageId': 'm', 'body': json.dumps(job)}]}
+
+        notifier.handler(event, None)
+        invocations = _agent_invocations(local)
+        assert invocations == 1
+
+        notifier.handler(event, None)
+        assert _agent_invocations(local) == invocations
+
+        messages = [json.loads(message) for message in local.sent_messages['conn-3']]
+        completed = [message for message in messages if message.get('type') == 'job_completed']
+        assert len(completed) == 2
+        assert completed[1].get('replayed') is True
+        assert completed[1]['result']['response'] == completed[0]['result']['response']
+
+
+def test_progress_notifier_marks_late_failures_failed_and_releases_lease():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        job = {'jobId': 'job-late', 'connectionId': 'conn-late', 'userId': 'u', 'query': 'What are my costs?'}
+
+        build_final = notifier.build_combined_response_streaming
+        notifier.build_combined_response_streaming = lambda *args: (_ for _ in ()).throw(TimeoutError("synthesis"))
+        with pytest.raises(RuntimeError):
+            notifier.process_job(job, None)
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-late'})['Item']
+        assert item['status'] == 'failed'
+        assert 'finalResult' not in item
+        assert 'leaseOwner' not in item and 'leaseExpiresAt' not in item
+
+        # The next delivery claims the job at once and completes it instead of replaying the error
+        notifier.build_combined_response_streaming = build_final
+        notifier.process_job(job, None)
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-late'})['Item']
+        assert item['status'] == 'completed'
+        result = notifier.deserialize_job_payload(item['finalResult'])
+        assert 'error' not in result
+        messages = [json.loads(message) for message in local.sent_messages['conn-late']]
+        assert not any(message.get('replayed') for message in messages)
+
+
+def test_progress_notifier_respects_live_lease_and_reclaims_expired(monkeypatch):
+    import time as time_module
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        job = {'jobId': 'job-4', 'connectionId': 'conn-4', 'userId': 'u', 'query': 'What are my costs?'}
+        event = {'Records': [{'messageId': 'm', 'body': json.dumps(job)}]}
+        table = notifier.jobs_table
+        table.put_item(Item={'jobId': 'job-4', 'status': 'processing', 'leaseOwner': 'other',
+                             'leaseExpiresAt': int(time_module.time()) + 300})
+
+        assert notifier.handler(event, None) == {'batchItemFailures': [{'itemIdentifier': 'm'}]}
+        assert _agent_invocations(local) == 0
+
+        table.put_item(Item={'jobId': 'job-4', 'status': 'processing', 'leaseOwner': 'other',
+                             'leaseExpiresAt': int(time_module.time()) - 1})
+        assert notifier.handler(event, None) == {'batchItemFailures': []}
+        assert _agent_invocations(local) == 1
+        item = notifier.jobs_table.get_item(Key={'jobId': 'job-4'})['Item']
+        assert item['status'] == 'completed'
+        assert item['leaseOwner'] != 'other'
+
+
+def test_progress_notifier_reports_only_failed_records(monkeypatch):
+    import time as time_module
+    monkeypatch.setenv('SQS_RECORD_CONCURRENCY', '4')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        notifier.jobs_table.put_item(Item={'jobId': 'leased', 'status': 'processing', 'leaseOwner': 'other',
+                                           'leaseExpiresAt': int(time_module.time()) + 300})
+        jobs = [{'jobId': job_id, 'connectionId': f'conn-{job_id}', 'userId': 'u', 'query': 'What are my costs?'}
+                for job_id in ('ok-1', 'leased', 'ok-2')]
+        records = [{'messageId': job['jobId'], 'body': json.dumps(job)} for job in jobs]
+        records.append({'messageId': 'malformed', 'body': '{not json'})
+
+        result = notifier.handler({'Records': records}, None)
+
+        assert sorted(failure['itemIdentifier'] for failure in result['batchItemFailures']) == ['leased', 'malformed']
+        for job_id in ('ok-1', 'ok-2'):
+            assert notifier.jobs_table.get_item(Key={'jobId': job_id})['Item']['status'] == 'completed'
+
+
+def test_progress_notifier_retries_only_the_record_whose_job_failed(monkeypatch):
+    monkeypatch.setenv('SQS_RECORD_CONCURRENCY', '2')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        build_final = notifier.build_combined_response_streaming
+
+        def build_or_fail(agents, results, query):
+            if 'budget' in query:
+                raise TimeoutError("synthesis")
+            return build_final(agents, results, query)
+
+        notifier.build_combined_response_streaming = build_or_fail
+        jobs = [{'jobId': 'good', 'connectionId': 'conn-good', 'userId': 'u', 'query': 'What are my costs?'},
+                {'jobId': 'bad', 'connectionId': 'conn-bad', 'userId': 'u', 'query': 'How is my budget doing?'}]
+        records = [{'messageId': job['jobId'], 'body': json.dumps(job)} for job in jobs]
+
+        assert notifier.handler({'Records': records}, None) == {'batchItemFailures': [{'itemIdentifier': 'bad'}]}
+        assert notifier.jobs_table.get_item(Key={'jobId': 'good'})['Item']['status'] == 'completed'
+        assert notifier.jobs_table.get_item(Key={'jobId': 'bad'})['Item']['status'] == 'failed'
+        failed = [json.loads(message) for message in local.sent_messages['conn-bad']]
+        assert any(message.get('type') == 'job_failed' for message in failed)
+
+
+def test_progress_notifier_batch_drains_concurrently(monkeypatch):
+    import time as time_module
+    latencies = {'lambda': LatencyProfile(0.2, 0)}
+
+    def drain(concurrency):
+        monkeypatch.setenv('SQS_RECORD_CONCURRENCY', str(concurrency))
+        with LocalAWS(latencies=latencies) as local:
+            notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+            local.register_agent_functions()
+            records = [{'messageId': f'm-{index}', 'body': json.dumps(
+                {'jobId': f'job-{index}', 'connectionId': f'conn-{index}', 'userId': 'u',
+                 'query': 'What are my costs?'})} for index in range(4)]
+            started = time_module.time()
+            assert notifier.handler({'Records': records}, None) == {'batchItemFailures': []}
+            return time_module.time() - started
+
+    serial, concurrent = drain(1), drain(4)
+    assert serial >= 0.8
+    assert concurrent < serial / 2
+
+
+def test_progress_notifier_chunks_large_final_result():
+    import random
+    rng = random.Random(0)
+    report = "\n".join(f"| resource-{rng.getrandbits(64):x} | ${rng.random() * 1000:.2f} |" for _ in range(12000))
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        frames_module = local.load_module('websocket_api/progress_notifier/websocket_frames.py', 'local_frames')
+        local.register_agent_functions()
+        notifier.build_combined_response_streaming = lambda *args: report
+        job = {'jobId': 'job-big', 'connectionId': 'conn-big', 'userId': 'u', 'query': 'What are my costs?'}
+        notifier.process_job(job, None)
+
+        frames = [json.loads(message) for message in local.sent_messages['conn-big']]
+        chunks = {}
+        for frame in frames:
+            if frame.get('type') == 'message_chunk':
+                chunks.setdefault(frame['messageType'], []).append(frame)
+
+        assert set(chunks) == {'analysis_completed', 'job_completed'}
+        completed = frames_module.reassemble_frames(chunks['job_completed'])
+        assert completed['result']['response'] == report
+        sent = local.bytes_transferred['apigatewaymanagementapi:post_to_connection']
+        assert sent < 2 * len(report)
+
+
+def test_lease_heartbeat_extends_only_while_owned(monkeypatch):
+    monkeypatch.setenv('JOB_LEASE_SECONDS', '3')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        state, item = notifier.claim_job('job-5', 'owner-a')
+        assert state == 'claimed' and item['leaseOwner'] == 'owner-a'
+
+        assert notifier.claim_job('job-5', 'owner-b')[0] == 'in_progress'
+        assert notifier.extend_lease('job-5', 'owner-a')
+        assert not notifier.extend_lease('job-5', 'owner-b')
+
+
+def test_message_handler_deduplicates_double_submit(monkeypatch):
+    monkeypatch.setenv('PROCESSING_QUEUE_URL', 'local-queue')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        handler = local.load_module('websocket_api/message_handler/lambda_handler.py', 'local_message_handler')
+        submit = {'action': 'finops_query', 'query': 'What are my costs?', 'userId': 'u', 'requestId': 'r-1'}
+
+        for _ in range(2):
+            handler.handle_finops_query_direct('conn-6', dict(submit), None)
+        assert len(local.queued_messages) == 1
+        messages = [json.loads(message) for message in local.sent_messages['conn-6']]
+        acks = [message for message in messages if message.get('type') == 'job_queued']
+        assert acks[0]['jobId'] == acks[1]['jobId'] and acks[1]['duplicate'] is True
+
+        # A completed job is queued once more so the notifier can replay it
+        job_id = acks[0]['jobId']
+        handler.jobs_table.update_item(Key={'jobId': job_id}, UpdateExpression='SET #s = :s',
+                                       ExpressionAttributeNames={'#s': 'status'},
+                                       ExpressionAttributeValues={':s': 'completed'})
+        handler.handle_finops_query_direct('conn-6', dict(submit), None)
+        assert len(local.queued_messages) == 2
+        assert json.loads(local.queued_messages[1]['MessageBody'])['jobId'] == job_id
+
+        other = handler.handle_finops_query_direct('conn-6', dict(submit, requestId='r-2'), None)
+        assert other['body'] == 'Query queued' and len(local.queued_messages) == 3
+
+
+def _resume_event(connection_id, body):
+    return {'requestContext': {'routeKey': '$default', 'connectionId': connection_id}, 'body': json.dumps(body)}
+
+
+def test_job_events_are_sequenced_and_replayed_on_resume(monkeypatch):
+    monkeypatch.setenv('PROCESSING_QUEUE_URL', 'local-queue')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        message_handler = local.load_module('websocket_api/message_handler/lambda_handler.py', 'local_message_handler')
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+
+        message_handler.handle_finops_query_direct(
+            'conn-old', {'action': 'finops_query', 'query': 'Show me my costs and optimization recommendations',
+                         'userId': 'u'}, None)
+        notifier.handler({'Records': [{'messageId': 'm', 'body': local.queued_messages[0]['MessageBody']}]}, None)
+        job_id = json.loads(local.queued_messages[0]['MessageBody'])['jobId']
+        invocations = _agent_invocations(local)
+
+        live = [json.loads(message) for message in local.sent_messages['conn-old']][1:]
+        assert [message['seq'] for message in live] == list(range(1, len(live) + 1))
+        assert live[-1]['type'] == 'job_completed'
+
+        # The client saw events 1-2 before its connection dropped, and authenticated again on the new one
+        message_handler.connections_table.put_item(Item={'connectionId': 'conn-new', 'userId': 'u'})
+        result = message_handler.handler(_resume_event('conn-new', {'action': 'resume', 'jobId': job_id,
+                                                                     'fromSeq': 2, 'userId': 'u'}), None)
+        assert result['statusCode'] == 200
+        replayed = [json.loads(message) for message in local.sent_messages['conn-new']]
+        assert [message['seq'] for message in replayed[:-1]] == list(range(3, len(live) + 1))
+        assert all(message['replayed'] for message in replayed[:-1])
+        assert replayed[-2]['result'] == live[-1]['result']
+        assert replayed[-1]['type'] == 'job_resumed' and replayed[-1]['replayedEvents'] == len(live) - 2
+        assert _agent_invocations(local) == invocations
+
+
+
+def test_resume_is_refused_to_other_users_connections(monkeypatch):
+    monkeypatch.setenv('PROCESSING_QUEUE_URL', 'local-queue')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        message_handler = local.load_module('websocket_api/message_handler/lambda_handler.py', 'local_message_handler')
+        message_handler.handle_finops_query_direct(
+            'conn-1', {'action': 'finops_query', 'query': 'What are my costs?', 'userId': 'u'}, None)
+        job_id = json.loads(local.queued_messages[0]['MessageBody'])['jobId']
+        connections = message_handler.connections_table
+        connections.put_item(Item={'connectionId': 'conn-other', 'userId': 'someone-else'})
+        connections.put_item(Item={'connectionId': 'conn-pending', 'userId': 'pending'})
+
+        # The userId in the body is the client's claim, not the connection's user
+        for connection_id in ('conn-other', 'conn-pending', 'conn-unknown'):
+            denied = message_handler.handler(_resume_event(connection_id, {'action': 'resume', 'jobId': job_id,
+                                                                           'userId': 'u'}), None)
+            assert denied['statusCode'] == 404, connection_id
+            assert 'job_resumed' not in local.sent_messages[connection_id][-1]
+        assert message_handler.jobs_table.get_item(Key={'jobId': job_id})['Item']['connectionId'] == 'conn-1'
+
+        # An authorizer's user is trusted over the connection record
+        event = _resume_event('conn-other', {'action': 'resume', 'jobId': job_id})
+        event['requestContext']['authorizer'] = {'principalId': 'u'}
+        assert message_handler.handler(event, None)['statusCode'] == 200
+        assert message_handler.jobs_table.get_item(Key={'jobId': job_id})['Item']['connectionId'] == 'conn-other'
+
+
+def test_running_job_follows_resumed_connection():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        local.register_agent_functions()
+        notifier.jobs_table.put_item(Item={'jobId': 'job-7', 'connectionId': 'conn-old', 'userId': 'u',
+                                           'status': 'queued'})
+        event_log = notifier.open_job_event_log('job-7', 'conn-old')
+        notifier.send_progress_update('conn-old', 'job-7', 'processing', 'Starting', 10)
+
+        # The browser reconnects and resumes: old connection gone, job moved
+        local.gone_connections.add('conn-old')
+        notifier.jobs_table.update_item(Key={'jobId': 'job-7'}, UpdateExpression='SET connectionId = :c',
+                                        ExpressionAttributeValues={':c': 'conn-new'})
+        notifier.send_progress_update('conn-old', 'job-7', 'processing', 'Routing', 20)
+        notifier.send_final_result('conn-old', 'job-7', {'response': 'done'})
+        notifier.close_job_event_log('job-7')
+
+        assert event_log.connection_id == 'conn-new'
+        assert [json.loads(m)['seq'] for m in local.sent_messages['conn-old']] == [1]
+        assert [json.loads(m)['seq'] for m in local.sent_messages['conn-new']] == [2, 3]
+
+        # A redelivered run continues the sequence instead of overwriting it
+        assert notifier.JobEventLog('job-7', 'conn-new').next_seq == 4
+
+
+def test_standard_reports_are_precomputed_and_served(monkeypatch):
+    monkeypatch.setenv('USE_STRANDS_AGENT', 'false')
+    monkeypatch.setenv('PRECOMPUTED_REPORTS_BUCKET', 'reports')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        supervisor = local.load_module('supervisor_agent/lambda_handler.py', 'local_supervisor')
+        local.register_agent_functions()
+
+        run = supervisor.lambda_handler({'action': 'precompute_reports',
+                                         'reports': ['month_to_date_cost', 'budget_status']}, None)
+        summary = json.loads(run['body'])
+        assert summary['stored'] == 2, summary
+        record = json.loads(local.objects[('reports', 'precomputed-reports/month_to_date_cost.json')])
+        assert 'cost_forecast' in record['facts']
+        invocations = _agent_invocations(local)
+
+        answer = json.loads(supervisor.lambda_handler({'query': 'What are my current AWS costs?'}, None)['body'])
+        assert answer['precomputed']['report_id'] == 'month_to_date_cost'
+        assert answer['response'].startswith('> ⚡ Precomputed report: Month-to-date cost')
+        assert answer['response'].endswith(record['response'])
+        assert _agent_invocations(local) == invocations
+
+        narrower = json.loads(supervisor.handler({'query': 'What was my S3 spend in May?'}, None)['body'])
+        assert 'precomputed' not in narrower
+        assert _agent_invocations(local) > invocations
+
+        # WebSocket jobs are answered from the same store
+        notifier = local.load_module('websocket_api/progress_notifier/lambda_handler.py', 'local_notifier')
+        invocations = _agent_invocations(local)
+        job = {'jobId': 'job-8', 'connectionId': 'conn-8', 'userId': 'u', 'query': 'How am I tracking against my budget?'}
+        notifier.process_job(job, None)
+        completed = [json.loads(m) for m in local.sent_messages['conn-8'] if json.loads(m).get('type') == 'job_completed']
+        assert completed[0]['result']['source'] == 'precomputed_report'
+        assert completed[0]['result']['precomputed']['report_id'] == 'budget_status'
+        assert _agent_invocations(local) == invocations
+
+
+def test_supervisor_serves_last_good_agent_result_during_outage(monkeypatch):
+    monkeypatch.setenv('USE_STRANDS_AGENT', 'false')
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        supervisor = local.load_module('supervisor_agent/lambda_handler.py', 'local_supervisor')
+        local.register_agent_functions()
+        query = {'query': 'Show me my costs and optimization recommendations'}
+
+        healthy = json.loads(supervisor.handler(query, None)['body'])
+        assert 'stale_agents' not in healthy['routing_metrics']
+
+        def outage(event, context):
+            raise RuntimeError("Rate exceeded")
+        local.register_function('trusted-advisor-agent-trusted-advisor-agent', outage)
+
+        degraded = json.loads(supervisor.handler(query, None)['body'])
+        assert set(degraded['routing_metrics']['stale_agents']) == {'trusted_advisor'}
+        assert degraded['routing_metrics']['stale_agents']['trusted_advisor']['reason'] == 'failed'
+        assert 'Partial Results' not in degraded['response']
+
+
+def test_cost_and_budget_agents_share_one_cost_fetch(monkeypatch, tmp_path):
+    from datetime import date
+
+    monkeypatch.setenv('USE_STRANDS_AGENT', 'false')
+    monkeypatch.setenv('PAYLOAD_SPILL_DIR', str(tmp_path))
+    today = date.today()
+    months = ','.join(f"{(today.year * 12 + today.month - back - 1) // 12}-"
+                      f"{(today.year * 12 + today.month - back - 1) % 12 + 1:02d}" for back in (3, 2, 1))
+    query = {'query': 'Show me my costs and my budget status'}
+    ce_calls = {}
+    for shared in ('false', 'true'):
+        monkeypatch.setenv('SHARED_COST_DATA_ENABLED', shared)
+        with LocalAWS(latencies=NO_LATENCY) as local:
+            local.tool_calls.update({'get_monthly_spend_analysis': {'months': months},
+                                     'get_budget_recommendations': {}})
+            supervisor = local.load_module('supervisor_agent/lambda_handler.py', 'local_supervisor')
+            local.register_agent_functions()
+            body = json.loads(supervisor.handler(query, None)['body'])
+            assert set(body['routing_metrics']['agents']) == {'cost_forecast', 'budget_management'}
+            assert body['routing_metrics'].get('shared_cost_data', False) == (shared == 'true')
+            ce_calls[shared] = local.recorder.summary()['ce.get_cost_and_usage']['count']
+
+    # Three months from the cost agent and 180 days from the budget agent, against one shared fetch
+    assert ce_calls == {'false': 4, 'true': 1}
+
+
+def test_repeated_tool_calls_within_a_request_are_memoized(monkeypatch):
+    calls = {}
+    for enabled in ('false', 'true'):
+        monkeypatch.setenv('TOOL_MEMO_ENABLED', enabled)
+        with LocalAWS(latencies=NO_LATENCY) as local:
+            # The summary re-reads the recommendations; both cost tools read the same months
+            local.tool_calls.update({'get_cost_optimization_summary': {},
+                                     'get_monthly_spend_analysis': {'months': '2025-04,2025-05'},
+                                     'get_service_spend_comparison': {'months': '2025-04,2025-05'}})
+            modules = local.register_agent_functions()
+            memo = {}
+            for function_name, module in modules.items():
+                handler = getattr(module, 'handler', None) or module.lambda_handler
+                memo[function_name] = json.loads(handler({'query': 'q'}, None)['body'])['model_metrics'].get('tool_memo')
+            summary = local.recorder.summary()
+            calls[enabled] = (summary['trustedadvisor.list_recommendations']['count'],
+                              summary['ce.get_cost_and_usage']['count'])
+
+    assert calls == {'false': (4, 4), 'true': (2, 2)}
+    assert memo['trusted-advisor-agent-trusted-advisor-agent']['tools']['fetch_trusted_advisor_recommendations']['hits'] == 1
+    assert memo['aws-cost-forecast-agent']['hits'] == 2
+
+
+def test_large_tool_outputs_are_cut_to_budget_with_totals_and_pages(monkeypatch):
+    monkeypatch.setenv('TOOL_OUTPUT_MAX_CHARS', '8000')
+    monkeypatch.setenv('TOOL_OUTPUT_MAX_ITEMS', '10')
+    with LocalAWS(latencies=NO_LATENCY, recommendation_count=150) as local:
+        modules = local.register_agent_functions()
+        advisor = modules['trusted-advisor-agent-trusted-advisor-agent']
+
+        full = json.loads(advisor.fetch_trusted_advisor_recommendations('cost_optimizing'))
+        text = advisor.get_trusted_advisor_recommendations('cost_optimizing')
+        shown = json.loads(text)
+        assert len(text) <= 8000 + 400 < len(json.dumps(full, indent=2)) // 10
+        assert shown['total_count'] == full['total_count'] == 300
+
+        recommendations = shown['recommendations']
+        assert len(recommendations) == 11 and recommendations[-1]['_omitted'] == 290
+        savings = sum(r['estimated_monthly_savings'] for r in recommendations[:-1])
+        assert set(recommendations[-1]['_omitted_totals']) == {'estimated_monthly_savings'}
+        assert savings + recommendations[-1]['_omitted_totals']['estimated_monthly_savings'] == \
+            pytest.approx(sum(r['estimated_monthly_savings'] for r in full['recommendations']))
+
+        cursor = shown['_truncated']['cursor']
+        page = json.loads(advisor.get_more_results(cursor=cursor, page=2, path='/recommendations'))
+        assert page['pages'] == 30 and page['next_page'] == 3
+        assert page['items']['/recommendations'][0]['id'] == full['recommendations'][10]['id']
+
+        # The summary is built from every recommendation, not the cut tool output
+        summary = json.loads(advisor.get_cost_optimization_summary())
+        assert summary['total_recommendations'] == 300
+
+
+def test_simple_cost_lookups_are_answered_without_the_agent():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        cost_agent = local.register_agent_functions()['aws-cost-forecast-agent']
+        direct = json.loads(cost_agent.handler({'query': 'What did I spend on S3 last month?'}, None)['body'])
+        summary = local.recorder.summary()
+        assert direct['answer_path'] == 'direct'
+        assert direct['response'].startswith('# Amazon S3 Cost Summary')
+        assert direct['model_metrics']['tier'] == 'direct'
+        assert not any(stage.startswith('bedrock') for stage in summary)
+        assert summary['ce.get_cost_and_usage']['count'] == 1
+
+        agent = json.loads(cost_agent.handler({'query': 'Why did my S3 costs go up last month?'}, None)['body'])
+        assert 'answer_path' not in agent
+        assert any(stage.startswith('bedrock') for stage in local.recorder.summary())
+
+
+def test_overlapping_periods_reuse_month_buckets():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        cost_agent = local.register_agent_functions()['aws-cost-forecast-agent']
+        with cost_agent.tool_memo_scope():
+            quarter = cost_agent.get_aws_cost_summary('last quarter')
+            cost_agent.get_monthly_spend_analysis(','.join(cost_agent.resolve_period('last quarter')['months']))
+            cost_agent.get_aws_cost_summary(cost_agent.resolve_period('last quarter')['months'][-1])
+        assert 'error' not in json.loads(quarter)
+        # One request per month of the quarter, shared by all three calls
+        assert local.recorder.summary()['ce.get_cost_and_usage']['count'] == 3
+
+        unknown = json.loads(cost_agent.get_aws_cost_summary('the other week'))
+        assert 'Unrecognized time period' in unknown['error']
+
+
+def test_daily_spend_trend_reuses_cached_days():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        cost_agent = local.register_agent_functions()['aws-cost-forecast-agent']
+        trend = json.loads(cost_agent.get_daily_spend_trend('last 30 days', top_n=3))
+        assert len(trend['daily_totals']) == 30
+        assert list(trend['services'])[:3] == ['Amazon Elastic Compute Cloud - Compute',
+                                               'Amazon Simple Storage Service', 'Amazon Relational Database Service']
+        assert trend['summary']['total'] == pytest.approx(sum(trend['daily_totals'].values()), abs=0.5)
+
+        # A shorter window inside the first needs no Cost Explorer call, a longer one only the missing days
+        cost_agent.get_daily_spend_trend('last 2 weeks')
+        assert local.recorder.summary()['ce.get_cost_and_usage']['count'] == 1
+        cost_agent.get_daily_spend_trend('last 40 days')
+        assert local.recorder.summary()['ce.get_cost_and_usage']['count'] == 2
+
+
+def test_organization_reports_fan_out_across_linked_accounts(monkeypatch):
+    monkeypatch.delenv('ORG_ACCOUNT_IDS', raising=False)
+    with LocalAWS(latencies=NO_LATENCY, linked_accounts=45) as local:
+        agents = local.register_agent_functions()
+        budget_agent = agents['budget-management-agent']
+        local.account_budgets['100000000007'] = [{
+            'BudgetName': 'Sandbox', 'BudgetType': 'COST', 'TimeUnit': 'MONTHLY',
+            'BudgetLimit': {'Amount': '100.0', 'Unit': 'USD'},
+            'CalculatedSpend': {'ActualSpend': {'Amount': '120.0', 'Unit': 'USD'},
+                                'ForecastedSpend': {'Amount': '150.0', 'Unit': 'USD'}}
+        }]
+        local.recorder.reset()
+
+        report = budget_agent.get_organization_budget_analysis()
+        assert "**Accounts Analyzed**: 46 of 46" in report
+        assert "**Total Budgets**: 2" in report
+        assert "Sandbox at 120.0% (EXCEEDED)" in report
+        # Account spend for the unbudgeted accounts comes from one grouped Cost Explorer request
+        assert "- Local account 100000000001 (100000000001): $" in report
+        summary = local.recorder.summary()
+        assert summary['ce.get_cost_and_usage']['count'] == 1
+        assert summary['organizations.list_accounts']['count'] == 3
+        assert summary['sts.assume_role']['count'] == 45
+        assert summary['budgets.describe_budgets']['count'] == 46
+
+        ta_agent = agents['trusted-advisor-agent-trusted-advisor-agent']
+        savings = json.loads(ta_agent.get_organization_cost_optimization_summary())
+        assert savings['accounts_analyzed'] == 46
+        per_account = 2 * sum(25.0 * (index + 1) for index in range(local.recommendation_count))
+        assert savings['estimated_monthly_savings'] == pytest.approx(46 * per_account)
+        assert savings['checks'][0]['accounts'] == 46
+
+        # Each agent assumes the roles once; the budget agent's next report reuses its sessions
+        budget_agent.get_organization_budget_analysis()
+        assert local.recorder.summary()['sts.assume_role']['count'] == 2 * 45
+
+
+def test_cost_forecasts_are_computed_and_cost_explorer_forecasts_cached():
+    with LocalAWS(latencies=NO_LATENCY) as local:
+        cost_agent = local.register_agent_functions()['aws-cost-forecast-agent']
+        forecast = json.loads(cost_agent.forecast_costs(3, top_n=3))
+        assert len(forecast['history']['months']) == 12
+        assert len(forecast['total']) == 3
+        assert list(forecast['services'])[-1] == 'Other (5 services)'
+        # 12 history months and the current month so far
+        assert local.recorder.summary()['ce.get_cost_and_usage']['count'] == 13
+        assert 'bedrock' not in ' '.join(local.recorder.summary())
+
+        aws_forecast = json.loads(cost_agent.get_cost_explorer_forecast(3))
+        assert json.loads(cost_agent.get_cost_explorer_forecast(3))['cached'] is True
+        assert local.recorder.summary()['ce.get_cost_forecast']['count'] == 1
+        # The emulated costs grow linearly per day, so both forecasts agree
+        assert [month['forecast'] for month in aws_forecast['total']] == \
+            pytest.approx([month['forecast'] for month in forecast['total']], abs=0.05)
@@ -93,6 +93,13 @@ build_application_package() {
     # Copy application files
     print_status "Copying application files..."
     cp "$SCRIPT_DIR/lambda_handler.py" "$app_dir/"
+    cp "$SCRIPT_DIR/payload_envelope.py" "$app_dir/"
+    cp "$SCRIPT_DIR/prewarm.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_memo.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_output.py" "$app_dir/"
+    cp "$SCRIPT_DIR/account_fanout.py" "$app_dir/"
+    cp "$SCRIPT_DIR/cur_cube.py" "$app_dir/"
+    cp "$SCRIPT_DIR/cost_data_plane.py" "$app_dir/"
     
     # Copy __init__.py if it exists
     if [ -f "$SCRIPT_DIR/__init__.py" ]; then
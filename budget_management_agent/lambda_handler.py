@@ -6,7 +6,14 @@ import os
 import logging
 from datetime import datetime, timedelta
 from strands import tool
-from typing import Dict, Any, List
+from strands.models import BedrockModel
+from typing import Dict, Any, List, Optional
+from payload_envelope import encode_response
+from prewarm import run_prewarm, init_metrics
+from cost_data_plane import get_cost_and_usage, use_shared_cost_data
+from tool_memo import memoize_tool, tool_memo_scope
+from tool_output import cut_entries, get_more_results
+from account_fanout import get_account_fanout, invocation_deadline
 
 # Configure logging
 logger = logging.getLogger()
@@ -17,6 +24,19 @@ budgets_client = boto3.client('budgets')
 ce_client = boto3.client('ce')
 ACCOUNT_ID = os.environ.get('AWS_ACCOUNT_ID')
 
+# Bedrock models by model ID, reused across invocations in the container
+_models = {}
+
+def get_model(model_id: Optional[str] = None):
+    """Get or create the BedrockModel for the ID (the Strands default model when None)."""
+    key = model_id or 'default'
+    if key not in _models:
+        if model_id:
+            _models[key] = BedrockModel(model_id=model_id, region_name=os.environ.get('STRANDS_MODEL_REGION', 'us-east-1'))
+        else:
+            _models[key] = BedrockModel()
+    return _models[key]
+
 # System prompt for Budget Management Agent
 BUDGET_MANAGEMENT_SYSTEM_PROMPT = """
 You are an AWS Budget Management Agent specialized in proactive cost control and governance.
@@ -32,6 +52,8 @@ You have access to AWS Budgets API and Cost Explorer data to provide comprehensi
 
 IMPORTANT: When users ask for "recommendations", "suggestions", or "what budgets should I create", you MUST use the get_budget_recommendations() tool.
 
+For questions about budgets across the organization, all accounts or linked accounts, use get_organization_budget_analysis(); get_budget_analysis() covers this account only.
+
 When responding:
 - Always provide natural language responses based on tool results
 - Provide clear, actionable budget recommendations
@@ -45,6 +67,7 @@ Focus on proactive cost management and governance to help users maintain control
 """
 
 @tool
+@memoize_tool
 def get_budget_recommendations() -> str:
     """
     Generate intelligent budget recommendations based on historical AWS spending patterns and cost analysis.
@@ -64,8 +87,8 @@ def get_budget_recommendations() -> str:
         
         recommendations = []
         
-        # Analyze spending patterns by service
-        for service, data in cost_data.items():
+        # Analyze spending patterns by service, highest spend first
+        for service, data in sorted(cost_data.items(), key=lambda item: item[1]['monthly_average'], reverse=True):
             if data['monthly_average'] > 10:  # Only recommend budgets for services with significant spend
                 
                 # Calculate recommended budget amount (110% of average with seasonal adjustment)
@@ -88,6 +111,13 @@ def get_budget_recommendations() -> str:
         total_monthly_spend = sum([data['monthly_average'] for data in cost_data.values()])
         org_budget = total_monthly_spend * 1.1
         
+        # Large accounts: list the top services, the organization budget still covers all of them
+        recommendations, truncated = cut_entries(recommendations, 'get_budget_recommendations')
+        if truncated:
+            recommendations.append(f"""
+_{truncated['omitted']} smaller services not listed; call get_more_results with cursor "{truncated['cursor']}" if they are needed._
+""")
+        
         result = f"""# Budget Recommendations Based on Your AWS Spending Patterns
 
 ## Service-Level Budget Recommendations
@@ -118,6 +148,7 @@ def get_budget_recommendations() -> str:
         return f"I encountered an error while generating budget recommendations: {str(e)}. Please check your AWS permissions and try again."
 
 @tool
+@memoize_tool
 def get_budget_analysis() -> str:
     """
     Analyze existing AWS budgets and their current performance status.
@@ -168,6 +199,13 @@ def get_budget_analysis() -> str:
             total_actual += actual_spend
             total_forecasted += forecasted_spend
 
+        # Large accounts: list the first budgets, the totals above cover all of them
+        budget_analysis, truncated = cut_entries(budget_analysis, 'get_budget_analysis')
+        if truncated:
+            budget_analysis.append(f"""
+_{truncated['omitted']} more budgets not listed; call get_more_results with cursor "{truncated['cursor']}" if they are needed._
+""")
+
         # Generate summary insights
         overall_utilization = (total_actual / total_budgeted * 100) if total_budgeted > 0 else 0
         forecast_utilization = (total_forecasted / total_budgeted * 100) if total_budgeted > 0 else 0
@@ -209,6 +247,128 @@ def get_budget_analysis() -> str:
         logger.error(f"Error analyzing budgets: {str(e)}")
         return f"I encountered an error while analyzing your budgets: {str(e)}. Please check your AWS permissions and try again."
 
+@tool
+@memoize_tool
+def get_organization_budget_analysis() -> str:
+    """
+    Analyze the budgets of every linked account in the AWS Organization.
+    Use this when users ask about budgets across the organization, all accounts or specific linked accounts.
+    
+    Returns:
+        String containing organization-wide budget totals, the accounts with exceeded or
+        critical budgets, and the highest-spending accounts that have no budget
+    """
+    try:
+        logger.info("Analyzing budgets across the organization")
+        fanout = get_account_fanout()
+        accounts = fanout.accounts()
+        if not accounts:
+            return "No linked accounts were found in the organization. Set ORG_ACCOUNT_IDS or check organizations:ListAccounts permissions."
+        
+        # Month-to-date spend of every account in one Cost Explorer request
+        account_spend = get_account_month_to_date_spend()
+        
+        # Per-account totals, merged as each account's budgets arrive
+        totals = {}
+        
+        def describe_account_budgets(account, clients):
+            budgets = []
+            kwargs = {}
+            while True:
+                response = clients('budgets').describe_budgets(AccountId=account['id'], **kwargs)
+                budgets.extend(response.get('Budgets', []))
+                if not response.get('NextToken'):
+                    return budgets
+                kwargs['NextToken'] = response['NextToken']
+        
+        def merge(account, budgets):
+            entry = totals[account['id']] = {'name': account['name'], 'budgets': len(budgets), 'budgeted': 0.0,
+                                             'actual': 0.0, 'forecasted': 0.0, 'statuses': {}, 'worst': None}
+            for budget in budgets:
+                budget_limit = float(budget.get('BudgetLimit', {}).get('Amount', 0))
+                actual_spend = float(budget.get('CalculatedSpend', {}).get('ActualSpend', {}).get('Amount', 0))
+                forecasted_spend = float(budget.get('CalculatedSpend', {}).get('ForecastedSpend', {}).get('Amount', 0))
+                utilization = (actual_spend / budget_limit * 100) if budget_limit > 0 else 0
+                forecast_utilization = (forecasted_spend / budget_limit * 100) if budget_limit > 0 else 0
+                status = determine_budget_status(utilization, forecast_utilization)
+                entry['budgeted'] += budget_limit
+                entry['actual'] += actual_spend
+                entry['forecasted'] += forecasted_spend
+                entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+                if entry['worst'] is None or utilization > entry['worst'][1]:
+                    entry['worst'] = (budget['BudgetName'], utilization, status)
+        
+        run = fanout.run(describe_account_budgets, merge, accounts)
+        
+        total_budgeted = sum(entry['budgeted'] for entry in totals.values())
+        total_actual = sum(entry['actual'] for entry in totals.values())
+        total_forecasted = sum(entry['forecasted'] for entry in totals.values())
+        statuses = {}
+        for entry in totals.values():
+            for status, count in entry['statuses'].items():
+                statuses[status] = statuses.get(status, 0) + count
+        
+        # Accounts at risk first, by the utilization of their worst budget
+        at_risk = sorted((item for item in totals.items()
+                          if item[1]['worst'] and item[1]['worst'][2] in ('EXCEEDED', 'CRITICAL', 'WARNING')),
+                         key=lambda item: item[1]['worst'][1], reverse=True)
+        risk_entries = [f"""
+**{entry['name']}** ({account_id})
+- Worst Budget: {entry['worst'][0]} at {entry['worst'][1]:.1f}% ({entry['worst'][2]})
+- Budgets: {entry['budgets']}, ${entry['actual']:.2f} of ${entry['budgeted']:.2f} spent
+""" for account_id, entry in at_risk]
+        risk_entries, truncated = cut_entries(risk_entries, 'get_organization_budget_analysis')
+        if truncated:
+            risk_entries.append(f"""
+_{truncated['omitted']} more accounts at risk not listed; call get_more_results with cursor "{truncated['cursor']}" if they are needed._
+""")
+        
+        # Spending accounts nobody is watching
+        unbudgeted = sorted(((account_id, account_spend.get(account_id, 0.0)) for account_id, entry in totals.items()
+                             if entry['budgets'] == 0), key=lambda item: item[1], reverse=True)
+        unbudgeted_lines = [f"- {totals[account_id]['name']} ({account_id}): ${spend:.2f} month to date"
+                            for account_id, spend in unbudgeted[:10] if spend > 0]
+        if len(unbudgeted) > len(unbudgeted_lines):
+            unbudgeted_lines.append(f"- {len(unbudgeted) - len(unbudgeted_lines)} more accounts without budgets and little or no spend")
+        
+        # Accounts missing from the totals
+        coverage = ""
+        if run['failed'] or run['pending']:
+            coverage = "\n## Coverage\n"
+            if run['failed']:
+                account_id, error = next(iter(run['failed'].items()))
+                coverage += f"- {len(run['failed'])} accounts could not be read (for example {account_id}: {error})\n"
+            if run['pending']:
+                coverage += f"- {len(run['pending'])} accounts did not answer in time and are not included\n"
+        
+        overall_utilization = (total_actual / total_budgeted * 100) if total_budgeted > 0 else 0
+        forecast_utilization = (total_forecasted / total_budgeted * 100) if total_budgeted > 0 else 0
+        
+        result = f"""# Organization Budget Analysis
+
+## Overall Status
+- **Accounts Analyzed**: {run['succeeded']} of {run['accounts']}
+- **Total Budgets**: {sum(entry['budgets'] for entry in totals.values())}
+- **Total Budgeted Amount**: ${total_budgeted:.2f}
+- **Total Actual Spend**: ${total_actual:.2f}
+- **Overall Utilization**: {overall_utilization:.1f}%
+- **Forecasted Utilization**: {forecast_utilization:.1f}%
+- **Budgets by Status**: {', '.join(f"{status} {count}" for status, count in sorted(statuses.items())) or 'none'}
+
+## Accounts at Risk
+
+{''.join(risk_entries) if risk_entries else "No account has a budget above 80% utilization."}
+
+## Accounts Without Budgets
+{chr(10).join(unbudgeted_lines) if unbudgeted_lines else "- Every analyzed account has at least one budget"}
+{coverage}"""
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error analyzing organization budgets: {str(e)}")
+        return f"I encountered an error while analyzing budgets across the organization: {str(e)}. Please check the organization role and permissions and try again."
+
 # Helper functions
 def determine_budget_status(utilization: float, forecast_utilization: float) -> str:
     """Determine budget status based on utilization"""
@@ -230,7 +390,8 @@ def get_cost_data_for_recommendations() -> Dict[str, Dict]:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=180)
         
-        response = ce_client.get_cost_and_usage(
+        response = get_cost_and_usage(
+            ce_client,
             TimePeriod={
                 'Start': start_date.strftime('%Y-%m-%d'),
                 'End': end_date.strftime('%Y-%m-%d')
@@ -275,13 +436,93 @@ def get_cost_data_for_recommendations() -> Dict[str, Dict]:
         logger.error(f"Error getting cost data: {e}")
         return {}
 
+def get_account_month_to_date_spend() -> Dict[str, float]:
+    """Month-to-date unblended cost of every linked account, from one request grouped by LINKED_ACCOUNT"""
+    try:
+        today = datetime.now().date()
+        response = get_cost_and_usage(
+            ce_client,
+            TimePeriod={
+                'Start': today.replace(day=1).strftime('%Y-%m-%d'),
+                'End': (today + timedelta(days=1)).strftime('%Y-%m-%d')
+            },
+            Granularity='MONTHLY',
+            Metrics=['UnblendedCost'],
+            GroupBy=[
+                {
+                    'Type': 'DIMENSION',
+                    'Key': 'LINKED_ACCOUNT'
+                }
+            ]
+        )
+        
+        spend = {}
+        for result in response.get('ResultsByTime', []):
+            for group in result.get('Groups', []):
+                account_id = group['Keys'][0]
+                spend[account_id] = spend.get(account_id, 0.0) + float(group['Metrics']['UnblendedCost']['Amount'])
+        return spend
+        
+    except Exception as e:
+        logger.error(f"Error getting account spend: {e}")
+        return {}
+
+def apply_scope_hints(query: str, scope: Optional[Dict[str, Any]]) -> str:
+    """Append the supervisor's scope hints to the query so the answer stays on budgets."""
+    if not scope:
+        return query
+    
+    hints = []
+    if scope.get('months'):
+        hints.append(f"- Period: {scope['months'][0]} to {scope['months'][-1]}")
+    if scope.get('services'):
+        hints.append(f"- Services: {', '.join(scope['services'])}")
+    if scope.get('max_detail') == 'concise':
+        hints.append("- Detail: concise - budget status and the top recommendations only")
+    if scope.get('exclude'):
+        hints.append(f"- Leave out: {', '.join(scope['exclude'])} (covered by other agents)")
+    
+    if not hints:
+        return query
+    return f"{query}\n\nScope for this request:\n" + "\n".join(hints)
+
+def select_agent_model(scope: Optional[Dict[str, Any]]):
+    """
+    Pick the Bedrock model for the tier the supervisor requested.
+    
+    The fast tier uses FAST_MODEL_ID; otherwise STRANDS_MODEL_ID is used when
+    set and the Strands default model when not.
+    
+    Returns:
+        Tuple of (model, model_id, tier)
+    """
+    tier = (scope or {}).get('model_tier', 'strong')
+    model_id = os.environ.get('FAST_MODEL_ID') if tier == 'fast' else None
+    model_id = model_id or os.environ.get('STRANDS_MODEL_ID')
+    return get_model(model_id), model_id or 'default', tier
+
+def agent_model_metrics(agent, model_id: str, tier: str, tool_memo=None) -> Dict[str, Any]:
+    """Model and token usage of a per-request agent, reported back to the supervisor."""
+    usage = getattr(getattr(agent, 'event_loop_metrics', None), 'accumulated_usage', None) or {}
+    metrics = {
+        'model': model_id,
+        'tier': tier,
+        'input_tokens': usage.get('inputTokens', 0),
+        'output_tokens': usage.get('outputTokens', 0)
+    }
+    if tool_memo is not None:
+        metrics['tool_memo'] = tool_memo.metrics()
+    return metrics
+
 def lambda_handler(event, context):
     """Lambda handler function using Strands Agent framework - EXACTLY like cost-forecast agent"""
     try:
         logger.info(f"Received event: {event}")
+        cold_start = init_metrics()
         
         # Extract query from the event - EXACTLY like cost-forecast agent
         query = None
+        scope = None
         
         # Check if the event is from API Gateway
         if 'body' in event:
@@ -293,6 +534,7 @@ def lambda_handler(event, context):
                     body = event['body']
                 
                 query = body.get('query', '')
+                scope = body.get('scope')
             except Exception as e:
                 logger.error(f"Error parsing request body: {str(e)}")
                 error_blocks = [
@@ -316,6 +558,7 @@ def lambda_handler(event, context):
         # Direct Lambda invocation
         elif 'query' in event:
             query = event['query']
+            scope = event.get('scope')
         
         if not query:
             error_blocks = [
@@ -338,14 +581,21 @@ def lambda_handler(event, context):
             }
         
         # Initialize the agent with tools - EXACTLY like cost-forecast agent
+        model, model_id, model_tier = select_agent_model(scope)
         budget_agent = Agent(
+            model=model,
             system_prompt=BUDGET_MANAGEMENT_SYSTEM_PROMPT,
-            tools=[calculator, current_time, get_budget_analysis, get_budget_recommendations],
+            tools=[calculator, current_time, get_budget_analysis, get_organization_budget_analysis,
+                   get_budget_recommendations, get_more_results],
         )
         
         # Process the query - EXACTLY like cost-forecast agent
         logger.info(f"Processing query: {query}")
-        agent_result = budget_agent(query)
+        # Cost data the supervisor already fetched for this request, when it shared any,
+        # repeated tool calls answered once and organization fan-outs bounded by the time left
+        with use_shared_cost_data((scope or {}).get('cost_data')), tool_memo_scope() as tool_memo, \
+                invocation_deadline(context):
+            agent_result = budget_agent(apply_scope_hints(query, scope))
         response_text = str(agent_result)
         logger.info(f"Agent response: {response_text}")
         
@@ -360,11 +610,13 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({
                 'query': query,
-                'response': response_text
+                'response': response_text,
+                'model_metrics': agent_model_metrics(budget_agent, model_id, model_tier, tool_memo),
+                **({'init_metrics': cold_start} if cold_start else {})
             })
         }
         
-        return formatted_response
+        return encode_response(formatted_response, event)
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
@@ -386,3 +638,11 @@ def lambda_handler(event, context):
                 'response': error_blocks
             })
         }
+
+
+# Build the default model and open the Budgets and Cost Explorer connections during the init phase
+run_prewarm({
+    'bedrock': lambda: get_model(os.environ.get('STRANDS_MODEL_ID')).client,
+    'budgets': lambda: budgets_client,
+    'cost_explorer': lambda: ce_client
+})
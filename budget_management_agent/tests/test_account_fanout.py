@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the organization account fan-out
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+# Add the agent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import account_fanout
+from account_fanout import AccountFanout, RateLimiter, SessionPool, list_accounts
+
+
+class FakeSTS:
+    def __init__(self, clock=time.time, lifetime=3600):
+        self.assumed = []
+        self.clock = clock
+        self.lifetime = lifetime
+        self.lock = threading.Lock()
+
+    def get_caller_identity(self):
+        return {'Account': '000000000000'}
+
+    def assume_role(self, RoleArn, RoleSessionName):
+        account_id = RoleArn.split(':')[4]
+        with self.lock:
+            self.assumed.append(account_id)
+        if account_id == '999999999999':
+            raise RuntimeError("AccessDenied")
+        expiration = datetime.fromtimestamp(self.clock() + self.lifetime, timezone.utc)
+        return {'Credentials': {'AccessKeyId': f"KEY{account_id}", 'SecretAccessKey': 's',
+                                'SessionToken': 't', 'Expiration': expiration}}
+
+
+class FakeClient:
+    def __init__(self, service_name, **kwargs):
+        self.service_name = service_name
+        self.key = kwargs.get('aws_access_key_id')
+
+    def describe_budgets(self, AccountId):
+        return {'Budgets': [AccountId, self.key]}
+
+
+@pytest.fixture(autouse=True)
+def fake_clients(monkeypatch):
+    monkeypatch.setattr(account_fanout.boto3, 'client', FakeClient)
+    monkeypatch.delenv('ORG_ACCOUNT_IDS', raising=False)
+
+
+def test_rate_limiter_spaces_calls_per_account():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        limiter.acquire('a')
+    # Two calls from the burst, then one every half second
+    assert waits == [pytest.approx(0.5), pytest.approx(0.5)]
+    limiter.acquire('b')
+    assert len(waits) == 2
+
+
+def test_sessions_are_assumed_once_and_refreshed_before_expiry():
+    now = [1_000_000.0]
+    sts = FakeSTS(clock=lambda: now[0])
+    pool = SessionPool('ReadOnly', sts_client=sts, clock=lambda: now[0])
+
+    budgets = pool.client('111111111111', 'budgets')
+    assert budgets.key == 'KEY111111111111'
+    assert pool.client('111111111111', 'budgets') is budgets
+    assert pool.client('111111111111', 'trustedadvisor', 'us-east-1').key == 'KEY111111111111'
+    assert sts.assumed == ['111111111111']
+    # The caller's own account uses the Lambda's credentials
+    assert pool.client('000000000000', 'budgets').key is None
+
+    now[0] += 3600 - account_fanout.CREDENTIAL_MARGIN_SECONDS + 1
+    assert pool.client('111111111111', 'budgets') is not budgets
+    assert sts.assumed == ['111111111111', '111111111111']
+
+
+def test_accounts_are_configured_or_listed(monkeypatch):
+    class FakeOrganizations:
+        def list_accounts(self, NextToken=None):
+            if NextToken is None:
+                return {'Accounts': [{'Id': '1', 'Name': 'one', 'Status': 'ACTIVE'},
+                                     {'Id': '2', 'Name': 'two', 'Status': 'SUSPENDED'}], 'NextToken': 'next'}
+            return {'Accounts': [{'Id': '3', 'Name': 'three', 'Status': 'ACTIVE'}]}
+
+    assert list_accounts(FakeOrganizations()) == [{'id': '1', 'name': 'one'}, {'id': '3', 'name': 'three'}]
+    monkeypatch.setenv('ORG_ACCOUNT_IDS', '4, 5')
+    assert [account['id'] for account in list_accounts(FakeOrganizations())] == ['4', '5']
+
+
+def test_results_are_merged_as_accounts_finish_and_failures_isolated():
+    sts = FakeSTS()
+    fanout = AccountFanout(role_name='ReadOnly', max_workers=8, account_rate=0, sts_client=sts)
+    accounts = [{'id': str(111111111111 + n), 'name': f"account {n}"} for n in range(30)]
+    accounts.append({'id': '999999999999', 'name': 'no role'})
+    merged = []
+    merge_threads = set()
+
+    def merge(account, budgets):
+        merge_threads.add(threading.get_ident())
+        merged.append((account['id'], budgets['Budgets']))
+
+    run = fanout.run(lambda account, clients: clients('budgets').describe_budgets(AccountId=account['id']),
+                     merge, accounts)
+
+    assert run['accounts'] == 31
+    assert run['succeeded'] == 30
+    assert list(run['failed']) == ['999999999999']
+    assert run['pending'] == []
+    assert sorted(merged) == sorted((account['id'], [account['id'], f"KEY{account['id']}"]) for account in accounts[:30])
+    # Merges run in the calling thread
+    assert merge_threads == {threading.get_ident()}
+
+    # A second report reuses the sessions
+    fanout.run(lambda account, clients: clients('budgets'), lambda account, result: None, accounts[:30])
+    assert len(sts.assumed) == 31
+
+
+def test_slow_accounts_are_reported_pending_at_the_deadline():
+    release = threading.Event()
+    fanout = AccountFanout(role_name='ReadOnly', max_workers=4, account_rate=0, deadline=0.2, sts_client=FakeSTS())
+    accounts = [{'id': '000000000000', 'name': 'fast'}, {'id': '111111111111', 'name': 'slow'}]
+
+    def task(account, clients):
+        if account['name'] == 'slow':
+            release.wait(5)
+        return account['name']
+
+    merged = []
+    run = fanout.run(task, lambda account, result: merged.append(result), accounts)
+    release.set()
+    assert merged == ['fast']
+    assert run['pending'] == ['111111111111']
+    assert run['seconds'] < 2
+
+
+def test_deadline_leaves_the_invocation_time_to_answer(monkeypatch):
+    monkeypatch.setenv('ORG_FANOUT_SYNTHESIS_MARGIN_SECONDS', '60')
+    fanout = AccountFanout(role_name='ReadOnly', account_rate=0, deadline=240, sts_client=FakeSTS())
+
+    class FakeContext:
+        def __init__(self, remaining_ms):
+            self.remaining_ms = remaining_ms
+
+        def get_remaining_time_in_millis(self):
+            return self.remaining_ms
+
+    # Outside an invocation the configured deadline applies
+    assert fanout.time_budget() == 240
+    with account_fanout.invocation_deadline(FakeContext(100_000)):
+        assert fanout.time_budget() == pytest.approx(40, abs=1)
+        run = fanout.run(lambda account, clients: account['id'], lambda account, result: None,
+                         [{'id': '000000000000', 'name': 'own'}])
+        assert run['deadline'] == pytest.approx(40, abs=1)
+    # The configured deadline stays the upper bound
+    with account_fanout.invocation_deadline(FakeContext(900_000)):
+        assert fanout.time_budget() == 240
+    # No time left for accounts
+    with account_fanout.invocation_deadline(FakeContext(30_000)):
+        assert fanout.time_budget() == 0
+    with account_fanout.invocation_deadline(None):
+        assert fanout.time_budget() == 240
+    assert fanout.time_budget() == 240
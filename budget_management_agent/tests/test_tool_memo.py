@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for request-scoped tool result memoization
+"""
+
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the agent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool_memo
+from tool_memo import memoize_tool, tool_memo_scope
+
+
+def counting_tool():
+    calls = []
+
+    @memoize_tool
+    def get_recommendations(category: str = "cost_optimizing", limit: int = 10) -> str:
+        """Recommendations for a category."""
+        calls.append((category, limit))
+        return json.dumps({'category': category, 'limit': limit})
+
+    return get_recommendations, calls
+
+
+def test_repeated_calls_are_answered_once_per_request():
+    get_recommendations, calls = counting_tool()
+
+    with tool_memo_scope() as memo:
+        first = get_recommendations()
+        # Defaults and keyword order do not change the key
+        assert get_recommendations("cost_optimizing") == first
+        assert get_recommendations(limit=10, category="cost_optimizing") == first
+        get_recommendations("security")
+    assert calls == [("cost_optimizing", 10), ("security", 10)]
+    metrics = memo.metrics()
+    assert (metrics['calls'], metrics['hits']) == (4, 2)
+    assert metrics['tools']['get_recommendations']['hits'] == 2
+
+    # A new request starts empty, and outside a request nothing is reused
+    with tool_memo_scope():
+        get_recommendations()
+    get_recommendations()
+    get_recommendations()
+    assert len(calls) == 5
+    assert tool_memo._active is None
+
+
+def test_wrapper_keeps_the_tool_spec():
+    get_recommendations, _ = counting_tool()
+    assert get_recommendations.__name__ == 'get_recommendations'
+    assert get_recommendations.__doc__ == "Recommendations for a category."
+    assert list(inspect.signature(get_recommendations).parameters) == ['category', 'limit']
+
+
+def test_errors_and_exceptions_are_not_kept():
+    attempts = []
+
+    @memoize_tool
+    def flaky(kind: str):
+        attempts.append(kind)
+        if kind == 'raise' and attempts.count('raise') == 1:
+            raise RuntimeError("Rate exceeded")
+        if kind == 'json' and attempts.count('json') == 1:
+            return json.dumps({'error': 'Rate exceeded'})
+        if kind == 'block' and attempts.count('block') == 1:
+            return {'text': json.dumps({'error': 'Rate exceeded'})}
+        return {'ok': kind}
+
+    with tool_memo_scope() as memo:
+        try:
+            flaky('raise')
+        except RuntimeError:
+            pass
+        for kind in ('raise', 'json', 'json', 'block', 'block'):
+            flaky(kind)
+        for kind in ('raise', 'json', 'block'):
+            assert flaky(kind) == {'ok': kind}
+    assert len(attempts) == 6
+    assert memo.metrics()['hits'] == 3
+
+
+def test_concurrent_identical_calls_fetch_once():
+    calls = []
+
+    @memoize_tool
+    def slow(month: str):
+        calls.append(month)
+        time.sleep(0.05)
+        return {'month': month}
+
+    with tool_memo_scope():
+        threads = [threading.Thread(target=slow, args=('2025-05',)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert calls == ['2025-05']
+
+
+def test_disabled_memo_calls_through(monkeypatch):
+    monkeypatch.setenv('TOOL_MEMO_ENABLED', 'false')
+    get_recommendations, calls = counting_tool()
+    with tool_memo_scope() as memo:
+        get_recommendations()
+        get_recommendations()
+    assert memo is None
+    assert len(calls) == 2
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted tool outputs
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Add the agent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_output import budget_output, budget_tool_output, compact_json, cut_entries, more_results
+
+
+def spend_analysis(services=120, months=6):
+    return {
+        'months_analyzed': [f"2025-{month:02d}" for month in range(1, months + 1)],
+        'analysis': {
+            'monthly_totals': {f"2025-{month:02d}": 1000.0 * month for month in range(1, months + 1)},
+            'service_trends': {f"2025-{month:02d}": {f"Service {index}": float(index) + month / 10
+                                                    for index in range(services)}
+                               for month in range(1, months + 1)},
+        },
+        'performance_note': None
+    }
+
+
+def test_small_results_are_only_compacted():
+    data = {'total': 12.3456789, 'note': '', 'missing': None, 'at': datetime(2025, 6, 1, 12, 0),
+            'items': [{'name': 'a', 'cost': 1.0}]}
+    text = budget_output(data, 'tool')
+    assert text == '{"total":12.3457,"at":"2025-06-01T12:00:00","items":[{"name":"a","cost":1.0}]}'
+    assert text == compact_json(data)
+
+
+def test_cost_maps_keep_the_largest_entries_and_their_totals():
+    data = spend_analysis()
+    text = budget_output(data, 'get_monthly_spend_analysis', max_chars=3000, max_items=10)
+    shown = json.loads(text)
+
+    assert len(text) < len(json.dumps(data, indent=2)) / 8
+    # Months are short enough to stay whole
+    assert shown['analysis']['monthly_totals'] == data['analysis']['monthly_totals']
+    may = shown['analysis']['service_trends']['2025-05']
+    assert list(may)[:3] == ['Service 119', 'Service 118', 'Service 117']
+    assert may['_other']['count'] == 120 - (len(may) - 1)
+    assert sum(value for key, value in may.items() if key != '_other') + may['_other']['total'] == \
+        pytest.approx(sum(data['analysis']['service_trends']['2025-05'].values()))
+    assert set(shown['_truncated']['lists']) == {f"/analysis/service_trends/2025-{month:02d}" for month in range(1, 7)}
+
+
+def test_more_results_pages_through_the_cut_entries():
+    data = {'findings': [{'id': index, 'savings': 100.0 - index, 'resources': [f"i-{n}" for n in range(30)]}
+                         for index in range(45)]}
+    shown = json.loads(budget_output(data, 'findings_tool', max_chars=2000, max_items=10))
+    limit = shown['_truncated']['shown_per_list']
+    cut = shown['findings'][-1]
+    assert cut['_omitted'] == 45 - limit
+    assert cut['_omitted_totals'] == {'savings': pytest.approx(sum(100.0 - index for index in range(limit, 45)))}
+    # Lists inside the shown findings are cut too
+    assert shown['findings'][0]['resources'][-1] == {'_omitted': 30 - limit}
+
+    cursor = shown['_truncated']['cursor']
+    page = more_results(cursor, 2, '/findings')
+    assert page['tool'] == 'findings_tool'
+    assert [finding['id'] for finding in page['items']['/findings']] == list(range(limit, 2 * limit))
+    assert page['next_page'] == 3
+    last = more_results(cursor, page['pages'], '/findings')
+    assert 'next_page' not in last
+    assert last['items']['/findings'][-1]['id'] == 44
+
+    assert 'error' in more_results(cursor, 2, '/unknown')
+    assert 'error' in more_results('expired', 2)
+
+
+def test_text_tools_cut_their_own_entries():
+    entries = [f"**Service {index}**\n- Recommended Monthly Budget: ${index}.00\n" * 10 for index in range(40)]
+    shown, truncated = cut_entries(entries, 'get_budget_recommendations', max_chars=4000, max_items=10)
+    assert shown == entries[:10]
+    assert truncated['omitted'] == 30
+    assert more_results(truncated['cursor'], 4)['items']['/'] == entries[30:40]
+
+    assert cut_entries(entries[:5], 'get_budget_recommendations', max_chars=100) == (entries[:5], None)
+    assert cut_entries(entries, 'get_budget_recommendations', max_chars=0) == (entries, None)
+
+
+def test_tool_decorator_handles_json_text_and_content_blocks(monkeypatch):
+    monkeypatch.setenv('TOOL_OUTPUT_MAX_CHARS', '2000')
+
+    @budget_tool_output
+    def json_tool(services: int = 120):
+        """Spend analysis."""
+        return json.dumps(spend_analysis(services), indent=2)
+
+    @budget_tool_output
+    def block_tool():
+        return {'type': 'text', 'text': json.dumps(spend_analysis(), indent=2)}
+
+    @budget_tool_output
+    def markdown_tool():
+        return "# Budget Analysis Summary\n"
+
+    assert json_tool.__doc__ == "Spend analysis."
+    assert '_truncated' in json.loads(json_tool())
+    assert json_tool(2) == compact_json(spend_analysis(2))
+    assert '_truncated' in json.loads(block_tool()['text'])
+    assert markdown_tool() == "# Budget Analysis Summary\n"
+
+    monkeypatch.setenv('TOOL_OUTPUT_MAX_CHARS', '0')
+    assert '_truncated' not in json.loads(json_tool())
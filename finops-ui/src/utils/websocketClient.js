@@ -17,6 +17,8 @@ class WebSocketClient {
     this.heartbeatInterval = null;
     this.heartbeatTimeout = null;
     this.connectionPromise = null; // Track connection attempts
+    this.pendingChunks = new Map(); // messageId -> chunked message being reassembled
+    this.activeJobs = new Map(); // jobId -> { lastSeq, seen } for jobs that have not finished
   }
 
   async connect() {
@@ -122,13 +124,136 @@ class WebSocketClient {
         return; // Don't pass pong messages to parent
       }
       
-      this.onMessage(message);
+      // Large results arrive as numbered chunks or an object-store reference
+      if (message.type === 'message_chunk') {
+        this.handleChunk(message);
+        return;
+      }
+      if (message.type === 'message_ref') {
+        this.fetchMessageRef(message);
+        return;
+      }
+
+      // Resumes are authorized by the connection's user, which is only
+      // recorded once authenticate has been handled
+      if (message.type === 'authenticated') {
+        this.resumeActiveJobs();
+      }
+
+      this.deliverMessage(message);
     } catch (error) {
       console.error('Error parsing WebSocket message:', error);
       this.onError(error);
     }
   }
 
+  // Reassembly spec (mirrors supervisor_agent/websocket_frames.py):
+  // collect chunks by messageId until `total` distinct `seq` values arrive,
+  // join `data` in seq order, then base64-decode and gunzip when `encoding`
+  // is 'gzip+base64'. The result is the original message JSON. Incomplete
+  // messages are dropped after 60 seconds.
+  handleChunk(chunk) {
+    let pending = this.pendingChunks.get(chunk.messageId);
+    if (!pending) {
+      pending = {
+        parts: new Map(),
+        timer: setTimeout(() => {
+          console.warn('Dropping incomplete chunked message:', chunk.messageId);
+          this.pendingChunks.delete(chunk.messageId);
+        }, 60000)
+      };
+      this.pendingChunks.set(chunk.messageId, pending);
+    }
+    pending.parts.set(chunk.seq, chunk.data);
+    if (pending.parts.size < chunk.total) {
+      return;
+    }
+
+    clearTimeout(pending.timer);
+    this.pendingChunks.delete(chunk.messageId);
+    let payload = '';
+    for (let seq = 0; seq < chunk.total; seq++) {
+      payload += pending.parts.get(seq);
+    }
+
+    this.decodeChunkPayload(payload, chunk.encoding)
+      .then((text) => this.deliverMessage(JSON.parse(text)))
+      .catch((error) => {
+        console.error('Error reassembling chunked message:', error);
+        this.onError(error);
+      });
+  }
+
+  // Job messages carry a per-job `seq`. Messages already seen (a resume
+  // replay can overlap live delivery) are dropped, and `lastSeq` is the
+  // highest seq up to which nothing is missing.
+  deliverMessage(message) {
+    if (message.jobId && message.type === 'job_queued' && !this.activeJobs.has(message.jobId)) {
+      this.activeJobs.set(message.jobId, { lastSeq: 0, seen: new Set() });
+    }
+
+    if (message.jobId && typeof message.seq === 'number') {
+      let job = this.activeJobs.get(message.jobId);
+      if (!job) {
+        job = { lastSeq: 0, seen: new Set() };
+        this.activeJobs.set(message.jobId, job);
+      }
+      if (message.seq <= job.lastSeq || job.seen.has(message.seq)) {
+        return;
+      }
+      job.seen.add(message.seq);
+      while (job.seen.has(job.lastSeq + 1)) {
+        job.seen.delete(job.lastSeq + 1);
+        job.lastSeq += 1;
+      }
+      if (message.type === 'job_completed' || message.type === 'job_failed') {
+        this.activeJobs.delete(message.jobId);
+      }
+    }
+
+    this.onMessage(message);
+  }
+
+  // After a reconnect, once the server confirms authenticate, ask it to move
+  // unfinished jobs to this connection and replay the events sent to the
+  // old one. Nothing is re-run.
+  resumeActiveJobs() {
+    this.activeJobs.forEach((job, jobId) => {
+      this.sendMessage({
+        action: 'resume',
+        jobId: jobId,
+        fromSeq: job.lastSeq,
+        userId: this.userInfo?.userId || 'anonymous'
+      });
+    });
+  }
+
+  async decodeChunkPayload(payload, encoding) {
+    if (encoding === 'identity') {
+      return payload;
+    }
+    if (encoding !== 'gzip+base64') {
+      throw new Error(`Unsupported chunk encoding: ${encoding}`);
+    }
+    const bytes = Uint8Array.from(atob(payload), (c) => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    return new Response(stream).text();
+  }
+
+  async fetchMessageRef(ref) {
+    try {
+      // The object is stored with Content-Encoding: gzip, which fetch decodes
+      const response = await fetch(ref.url);
+      if (!response.ok) {
+        throw new Error(`Failed to fetch ${ref.messageType} result: HTTP ${response.status}`);
+      }
+      this.deliverMessage(await response.json());
+    } catch (error) {
+      console.error('Error fetching referenced message:', error);
+      this.onError(error);
+    }
+  }
+
   handleError(error) {
     console.error('WebSocket error:', error);
     this.onError(error);
@@ -304,6 +429,8 @@ class WebSocketClient {
   disconnect() {
     this.isManualClose = true;
     this.stopHeartbeat();
+    this.pendingChunks.forEach((pending) => clearTimeout(pending.timer));
+    this.pendingChunks.clear();
     
     if (this.ws) {
       this.ws.close(1000, 'Manual disconnect');
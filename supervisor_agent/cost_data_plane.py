@@ -0,0 +1,302 @@
+"""
+Cost data fetched once per request and shared by the specialist agents.
+
+A comprehensive query sends both the cost forecast agent and the budget
+management agent to Cost Explorer for nearly the same data: six months of
+costs by service, one call per month from the cost agent and a 180-day call
+from the budget agent. When the supervisor routes a request to more than one
+of them, it fetches the union of that data once, at daily granularity by
+service, stores it with ``payload_envelope.store_payload`` and passes a
+handle in each agent's scope:
+
+    {"cost_data": {"ref": "s3://bucket/cost-data/<uuid>", "start": "...", "end": "...", ...}}
+
+Agents activate the handle for the duration of the request, and
+``get_cost_and_usage`` answers any MONTHLY or DAILY request by SERVICE (or
+ungrouped) within the shared window from it by summing days, so the answer
+matches what Cost Explorer would return. Other requests fall through to the
+cost cube when the agent has one, then to Cost Explorer.
+
+Sharing needs a payload location (``PAYLOAD_SPILL_BUCKET`` or
+``PAYLOAD_SPILL_DIR``) and can be turned off with
+``SHARED_COST_DATA_ENABLED=false``.
+
+This file is shared verbatim by the supervisor and the cost forecast and
+budget management agents.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from payload_envelope import store_payload, load_payload
+
+try:
+    from cur_cube import get_cost_and_usage as _cube_cost_and_usage
+except ImportError:
+    _cube_cost_and_usage = None
+
+logger = logging.getLogger(__name__)
+
+SHARED_METRICS = ['UnblendedCost', 'BlendedCost', 'UsageQuantity']
+# Agents that read costs by service, and the history each needs
+COST_DATA_AGENTS = ('cost_forecast', 'budget_management')
+DEFAULT_HISTORY_MONTHS = 6
+BUDGET_HISTORY_DAYS = 180
+
+
+class SharedCostDataMiss(ValueError):
+    """The shared cost data cannot answer this request."""
+
+
+def enabled() -> bool:
+    return (os.environ.get('SHARED_COST_DATA_ENABLED', 'true').lower() == 'true'
+            and bool(os.environ.get('PAYLOAD_SPILL_BUCKET') or os.environ.get('PAYLOAD_SPILL_DIR')))
+
+
+def _month_start(day: date, months_back: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def cost_data_window(agent_requests: Dict[str, Dict[str, Any]], today: Optional[date] = None) -> Tuple[date, date]:
+    """
+    The union of the days the cost data agents will ask for: the months in
+    the cost agent's scope (default the last six months and this one) and
+    the budget agent's 180 days, through today.
+    """
+    today = today or datetime.now().date()
+    starts = []
+    if 'cost_forecast' in agent_requests:
+        months = (agent_requests['cost_forecast'].get('scope') or {}).get('months')
+        starts.append(min(date.fromisoformat(f"{month}-01") for month in months) if months
+                      else _month_start(today, DEFAULT_HISTORY_MONTHS))
+    if 'budget_management' in agent_requests:
+        starts.append(today - timedelta(days=BUDGET_HISTORY_DAYS))
+    return min(starts), today + timedelta(days=1)
+
+
+def fetch_cost_data(ce_client, start: date, end: date) -> Dict[str, Any]:
+    """Daily costs by service for [start, end), following pagination."""
+    results = []
+    token = None
+    calls = 0
+    while True:
+        request = {
+            'TimePeriod': {'Start': start.isoformat(), 'End': end.isoformat()},
+            'Granularity': 'DAILY',
+            'Metrics': SHARED_METRICS,
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+        }
+        if token:
+            request['NextPageToken'] = token
+        response = ce_client.get_cost_and_usage(**request)
+        calls += 1
+        results.extend(response.get('ResultsByTime', []))
+        token = response.get('NextPageToken')
+        if not token:
+            break
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': 'DAILY',
+        'group_by': 'SERVICE',
+        'metrics': SHARED_METRICS,
+        'fetched_at': time.time(),
+        'ce_calls': calls,
+        'results': results
+    }
+
+
+def share_cost_data(ce_client, agent_requests: Dict[str, Dict[str, Any]],
+                    today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch and store the cost data for the agents of one request, adding the
+    handle to each cost data agent's scope.
+
+    Returns:
+        The handle, or None when sharing is off, fewer than two cost data
+        agents are involved or the fetch fails (the agents then fetch their
+        own data as before)
+    """
+    consumers = [agent for agent in COST_DATA_AGENTS if agent in agent_requests]
+    if len(consumers) < 2 or not enabled():
+        return None
+    try:
+        start, end = cost_data_window(agent_requests, today)
+        data = fetch_cost_data(ce_client, start, end)
+        ref = store_payload(gzip.compress(json.dumps(data).encode('utf-8'), compresslevel=1), prefix='cost-data')
+    except Exception as e:
+        logger.warning(f"Could not share cost data, agents will fetch their own: {str(e)}")
+        return None
+    handle = {key: data[key] for key in ('start', 'end', 'granularity', 'group_by', 'metrics')}
+    handle['ref'] = ref
+    for agent in consumers:
+        agent_requests[agent].setdefault('scope', {})['cost_data'] = handle
+    logger.info(f"Shared {data['start']} to {data['end']} cost data with {', '.join(consumers)} "
+                f"({data['ce_calls']} Cost Explorer calls)")
+    return handle
+
+
+def _periods(start: date, end: date, granularity: str) -> List[Tuple[date, date]]:
+    periods = []
+    cursor = start
+    while cursor < end:
+        if granularity == 'DAILY':
+            boundary = cursor + timedelta(days=1)
+        else:
+            boundary = _month_start(cursor.replace(day=28) + timedelta(days=4))
+        periods.append((cursor, min(boundary, end)))
+        cursor = boundary
+    return periods
+
+
+class SharedCostData:
+    """Daily costs by service answering Cost Explorer style requests."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.start = date.fromisoformat(data['start'])
+        self.end = date.fromisoformat(data['end'])
+        self.metrics = set(data['metrics'])
+        # Fetched through today: later days have no costs yet
+        self.open_ended = data['end'] > datetime.fromtimestamp(data['fetched_at']).date().isoformat()
+        self.days: Dict[date, Dict[str, Any]] = {}
+        for result in data['results']:
+            self.days[date.fromisoformat(result['TimePeriod']['Start'])] = result
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.start <= start and (end <= self.end or self.open_ended)
+
+    def get_cost_and_usage(self, TimePeriod: Dict[str, str], Granularity: str = 'MONTHLY',
+                           Metrics: Optional[List[str]] = None, GroupBy: Optional[List[Dict[str, str]]] = None,
+                           **kwargs) -> Dict[str, Any]:
+        """
+        Answer a Cost Explorer ``get_cost_and_usage`` request from the shared data.
+
+        Raises:
+            SharedCostDataMiss: For filters, other dimensions or metrics, or
+                dates outside the shared window
+        """
+        metrics = Metrics or ['UnblendedCost']
+        group_by = GroupBy or []
+        if any(value for value in kwargs.values()):
+            raise SharedCostDataMiss(f"Unsupported parameters: {sorted(key for key in kwargs if kwargs[key])}")
+        if Granularity not in ('DAILY', 'MONTHLY'):
+            raise SharedCostDataMiss(f"Unsupported granularity: {Granularity}")
+        if not set(metrics) <= self.metrics:
+            raise SharedCostDataMiss(f"Unsupported metrics: {metrics}")
+        if group_by not in ([], [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]):
+            raise SharedCostDataMiss(f"Unsupported group by: {group_by}")
+        start = date.fromisoformat(TimePeriod['Start'])
+        end = date.fromisoformat(TimePeriod['End'])
+        if not self.covers(start, end):
+            raise SharedCostDataMiss(f"{start} to {end} is outside the shared window ({self.start} to {self.end})")
+
+        results = []
+        for period_start, period_end in _periods(start, end, Granularity):
+            amounts: Dict[str, Dict[str, float]] = OrderedDict()
+            units: Dict[str, str] = {}
+            estimated = False
+            day = period_start
+            while day < period_end:
+                result = self.days.get(day)
+                day += timedelta(days=1)
+                if not result:
+                    continue
+                estimated = estimated or result.get('Estimated', False)
+                for group in result.get('Groups', []):
+                    totals = amounts.setdefault(group['Keys'][0], {metric: 0.0 for metric in metrics})
+                    for metric in metrics:
+                        value = group['Metrics'].get(metric, {})
+                        totals[metric] += float(value.get('Amount', 0) or 0)
+                        units.setdefault(metric, value.get('Unit', 'USD'))
+
+            def metric_values(values: Dict[str, float]) -> Dict[str, Dict[str, str]]:
+                return {metric: {'Amount': str(round(values[metric], 10)), 'Unit': units.get(metric, 'USD')}
+                        for metric in metrics}
+
+            entry = {'TimePeriod': {'Start': period_start.isoformat(), 'End': period_end.isoformat()},
+                     'Estimated': estimated}
+            if group_by:
+                entry['Total'] = {}
+                entry['Groups'] = [{'Keys': [service], 'Metrics': metric_values(values)}
+                                   for service, values in sorted(amounts.items())]
+            else:
+                entry['Total'] = metric_values({metric: sum(values[metric] for values in amounts.values())
+                                                for metric in metrics})
+                entry['Groups'] = []
+            results.append(entry)
+        return {'GroupDefinitions': group_by, 'ResultsByTime': results, 'DimensionValueAttributes': [],
+                'Source': 'shared_cost_data'}
+
+
+# Loaded shared data by reference, kept for the few requests that may reuse it in a warm container
+_loaded: 'OrderedDict[str, SharedCostData]' = OrderedDict()
+_active: Optional[SharedCostData] = None
+_lock = threading.Lock()
+MAX_LOADED = 4
+
+
+def load_cost_data(handle: Dict[str, Any]) -> SharedCostData:
+    ref = handle['ref']
+    with _lock:
+        if ref in _loaded:
+            return _loaded[ref]
+    shared = SharedCostData(json.loads(gzip.decompress(load_payload(ref))))
+    with _lock:
+        _loaded[ref] = shared
+        while len(_loaded) > MAX_LOADED:
+            _loaded.popitem(last=False)
+    return shared
+
+
+class use_shared_cost_data:
+    """
+    Make a request's shared cost data visible to ``get_cost_and_usage`` for
+    the duration of a ``with`` block. Does nothing without a handle or when
+    the data cannot be loaded.
+
+    The data is container-wide rather than per thread, because tools fan out
+    to thread pools; a Lambda container handles one request at a time.
+    """
+
+    def __init__(self, handle: Optional[Dict[str, Any]]):
+        self.handle = handle
+
+    def __enter__(self) -> Optional[SharedCostData]:
+        global _active
+        if not self.handle or not self.handle.get('ref'):
+            return None
+        try:
+            _active = load_cost_data(self.handle)
+        except Exception as e:
+            logger.warning(f"Could not load shared cost data {self.handle.get('ref')}: {str(e)}")
+            _active = None
+        return _active
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        _active = None
+        return False
+
+
+def get_cost_and_usage(ce_client, **request) -> Dict[str, Any]:
+    """
+    ``ce_client.get_cost_and_usage(**request)``, answered from the request's
+    shared cost data or the cost cube when they can.
+    """
+    shared = _active
+    if shared is not None:
+        try:
+            return shared.get_cost_and_usage(**request)
+        except SharedCostDataMiss as e:
+            logger.info(f"Shared cost data cannot answer request: {str(e)}")
+    if _cube_cost_and_usage is not None:
+        return _cube_cost_and_usage(ce_client, **request)
+    return ce_client.get_cost_and_usage(**request)
@@ -1,16 +1,115 @@
 """
 FinOps Agent Tools - Implementing Agents as Tools pattern with Strands SDK
+
+The supervisor model writes each tool's query itself, so the QueryDecomposer
+sub-queries are not used here; its scope hints (months, services, level of
+detail, topics left to the other agents) are. StrandsFinOpsSupervisor calls
+set_request_scopes with the user's query before the agent runs, and every
+tool sends its agent's scope with the invoke payload, as the legacy fan-out
+does. When the query mentions both the cost forecast and budget agents, their
+cost data is fetched once there too and the tools pass them its handle.
+
+Tools answer the model with an error string rather than raising, so the
+model can still reply; they also record the failure in request_errors,
+which callers that must not keep a partial answer check after the run.
 """
 import json
+import os
 import boto3
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from strands import tool
+from query_decomposer import QueryDecomposer
+from cost_data_plane import COST_DATA_AGENTS, share_cost_data
 
 logger = logging.getLogger(__name__)
 
-# Initialize Lambda client
-lambda_client = boto3.client('lambda', region_name='us-east-1')
+# Lambda and Cost Explorer clients, created on first use rather than at import
+lambda_client = None
+ce_client = None
+
+def get_lambda_client():
+    """Get or create the Lambda client used to invoke the specialist agents."""
+    global lambda_client
+    if lambda_client is None:
+        lambda_client = boto3.client('lambda', region_name='us-east-1')
+    return lambda_client
+
+def get_ce_client():
+    """Get or create the Cost Explorer client used to fetch shared cost data."""
+    global ce_client
+    if ce_client is None:
+        ce_client = boto3.client('ce', region_name=os.environ.get('REGION', 'us-east-1'))
+    return ce_client
+
+# The query being analyzed and its scope hints by agent; a container serves one request at a time
+request_query: Optional[str] = None
+request_scopes: Dict[str, Dict[str, Any]] = {}
+# Errors the agent tools hit during the current request, by agent
+request_errors: Dict[str, str] = {}
+# Handle of the cost data shared by the cost data agents of the current request
+request_cost_data: Optional[Dict[str, Any]] = None
+
+def set_request_scopes(query: Optional[str]):
+    """
+    Decompose the user's query for the tool calls that follow, or clear it with None.
+    
+    Scopes are planned for the agents the query mentions (all of them when it
+    mentions none), so a multi-domain question gets the multi-agent hints.
+    The cost data agents' data is only fetched up front when the query
+    mentions both of them, since the model may call neither.
+    """
+    global request_query, request_scopes, request_errors, request_cost_data
+    request_query = query
+    request_scopes = {}
+    request_errors = {}
+    request_cost_data = None
+    if query:
+        decomposer = QueryDecomposer()
+        mentioned = decomposer.agents_for(query)
+        requests = decomposer.decompose(query, mentioned or ['cost_forecast', 'trusted_advisor', 'budget_management'])
+        if mentioned:
+            request_cost_data = share_cost_data(get_ce_client(), requests)
+        request_scopes = {agent: request['scope'] for agent, request in requests.items()}
+
+def scope_for(agent: str) -> Optional[Dict[str, Any]]:
+    """Scope hints for an agent in the current request, None outside one."""
+    if not request_query:
+        return None
+    if agent not in request_scopes:
+        # The model called an agent the query did not mention; it owns its sub-question alone
+        request_scopes[agent] = QueryDecomposer().decompose(request_query, [agent])[agent]['scope']
+    return request_scopes[agent]
+
+def build_tool_payload(query: str, agent: str) -> str:
+    """The invoke payload for an agent tool: the model's query and the agent's scope hints."""
+    payload = {'query': query}
+    scope = scope_for(agent)
+    if scope:
+        if request_cost_data and agent in COST_DATA_AGENTS:
+            scope = dict(scope, cost_data=request_cost_data)
+        payload['scope'] = scope
+    return json.dumps(payload)
+
+def record_tool_error(agent: str, message: str) -> str:
+    """Note an agent tool's failure for the current request and return the message for the model."""
+    request_errors[agent] = message
+    return message
+
+def payload_error(payload: Any) -> Optional[str]:
+    """The error an agent's Lambda payload reports, if any."""
+    if not isinstance(payload, dict):
+        return None
+    if 'errorMessage' in payload:
+        return payload['errorMessage']
+    if payload.get('statusCode', 200) >= 400:
+        body = payload.get('body')
+        try:
+            body = json.loads(body) if isinstance(body, str) else body
+        except ValueError:
+            pass
+        return str(body.get('error') or body) if isinstance(body, dict) else f"status {payload['statusCode']}"
+    return None
 
 @tool
 def cost_forecast_agent(query: str) -> str:
@@ -33,17 +132,18 @@ def cost_forecast_agent(query: str) -> str:
     try:
         logger.info(f"Invoking cost_forecast_agent with query: {query}")
         
-        response = lambda_client.invoke(
+        response = get_lambda_client().invoke(
             FunctionName='aws-cost-forecast-agent',
             InvocationType='RequestResponse',
-            Payload=json.dumps({'query': query})
+            Payload=build_tool_payload(query, 'cost_forecast')
         )
         
         payload = json.loads(response['Payload'].read())
         
-        if 'errorMessage' in payload:
-            logger.error(f"Cost forecast agent error: {payload['errorMessage']}")
-            return f"Error from cost forecast agent: {payload['errorMessage']}"
+        error = payload_error(payload)
+        if error:
+            logger.error(f"Cost forecast agent error: {error}")
+            return record_tool_error('cost_forecast', f"Error from cost forecast agent: {error}")
         
         # Extract the response from the agent result
         if isinstance(payload, dict) and 'response' in payload:
@@ -55,7 +155,7 @@ def cost_forecast_agent(query: str) -> str:
             
     except Exception as e:
         logger.error(f"Error invoking cost_forecast_agent: {str(e)}")
-        return f"Error analyzing costs: {str(e)}"
+        return record_tool_error('cost_forecast', f"Error analyzing costs: {str(e)}")
 
 @tool
 def trusted_advisor_agent(query: str) -> str:
@@ -78,17 +178,18 @@ def trusted_advisor_agent(query: str) -> str:
     try:
         logger.info(f"Invoking trusted_advisor_agent with query: {query}")
         
-        response = lambda_client.invoke(
+        response = get_lambda_client().invoke(
             FunctionName='trusted-advisor-agent-trusted-advisor-agent',
             InvocationType='RequestResponse',
-            Payload=json.dumps({'query': query})
+            Payload=build_tool_payload(query, 'trusted_advisor')
         )
         
         payload = json.loads(response['Payload'].read())
         
-        if 'errorMessage' in payload:
-            logger.error(f"Trusted advisor agent error: {payload['errorMessage']}")
-            return f"Error from trusted advisor agent: {payload['errorMessage']}"
+        error = payload_error(payload)
+        if error:
+            logger.error(f"Trusted advisor agent error: {error}")
+            return record_tool_error('trusted_advisor', f"Error from trusted advisor agent: {error}")
         
         # Extract the response from the agent result
         if isinstance(payload, dict) and 'response' in payload:
@@ -100,7 +201,7 @@ def trusted_advisor_agent(query: str) -> str:
             
     except Exception as e:
         logger.error(f"Error invoking trusted_advisor_agent: {str(e)}")
-        return f"Error getting optimization recommendations: {str(e)}"
+        return record_tool_error('trusted_advisor', f"Error getting optimization recommendations: {str(e)}")
 
 @tool
 def budget_management_agent(query: str) -> str:
@@ -123,17 +224,18 @@ def budget_management_agent(query: str) -> str:
     try:
         logger.info(f"Invoking budget_management_agent with query: {query}")
         
-        response = lambda_client.invoke(
+        response = get_lambda_client().invoke(
             FunctionName='budget-management-agent',
             InvocationType='RequestResponse',
-            Payload=json.dumps({'query': query})
+            Payload=build_tool_payload(query, 'budget_management')
         )
         
         payload = json.loads(response['Payload'].read())
         
-        if 'errorMessage' in payload:
-            logger.error(f"Budget management agent error: {payload['errorMessage']}")
-            return f"Error from budget management agent: {payload['errorMessage']}"
+        error = payload_error(payload)
+        if error:
+            logger.error(f"Budget management agent error: {error}")
+            return record_tool_error('budget_management', f"Error from budget management agent: {error}")
         
         # Extract the response from the agent result
         if isinstance(payload, dict) and 'response' in payload:
@@ -145,4 +247,4 @@ def budget_management_agent(query: str) -> str:
             
     except Exception as e:
         logger.error(f"Error invoking budget_management_agent: {str(e)}")
-        return f"Error getting budget recommendations: {str(e)}"
+        return record_tool_error('budget_management', f"Error getting budget recommendations: {str(e)}")
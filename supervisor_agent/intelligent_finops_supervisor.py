@@ -7,23 +7,13 @@ import json
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from strands import Agent
+from template_synthesis import SynthesisSelector, TemplateSynthesizer, extract_agent_facts, content_text
+from synthesis_cache import get_synthesis_cache
+from model_tiers import select_model, build_model, invoke_with_metrics
 
 logger = logging.getLogger(__name__)
 
-class IntelligentFinOpsSupervisor:
-    """
-    Enhanced FinOps Supervisor that provides intelligent synthesis with latency optimization.
-    
-    Routing Strategy:
-    - Single agent: Direct routing (fast path)
-    - 2 agents: Smart decision between aggregation vs synthesis
-    - 3+ agents: Always use synthesis (complex scenarios)
-    """
-    
-    def __init__(self):
-        """Initialize the intelligent supervisor with FinOps advisor persona."""
-        self.synthesis_agent = Agent(
-            system_prompt="""You are a Senior AWS FinOps Advisor with 15+ years of experience in cloud financial operations, cost optimization, and strategic financial planning.
+SYNTHESIS_SYSTEM_PROMPT = """You are a Senior AWS FinOps Advisor with 15+ years of experience in cloud financial operations, cost optimization, and strategic financial planning.
 
 Your role is to synthesize insights from multiple specialized FinOps analysis agents to provide unified, actionable strategic advice.
 
@@ -44,7 +34,28 @@ RESPONSE STRUCTURE:
 Always maintain a strategic, advisory tone focused on business outcomes and practical implementation.
 
 Format responses in clear markdown with actionable sections."""
+
+class IntelligentFinOpsSupervisor:
+    """
+    Enhanced FinOps Supervisor that provides intelligent synthesis with latency optimization.
+    
+    Routing Strategy:
+    - Single agent: Direct routing (fast path)
+    - 2 agents: Smart decision between aggregation vs synthesis
+    - 3+ agents: Always use synthesis (complex scenarios)
+    """
+    
+    def __init__(self):
+        """Initialize the intelligent supervisor with FinOps advisor persona."""
+        self.synthesis_model_id, self.synthesis_tier = select_model('synthesis')
+        self.synthesis_agent = Agent(
+            model=build_model(self.synthesis_model_id),
+            system_prompt=SYNTHESIS_SYSTEM_PROMPT
         )
+        self._tier_agents = {}
+        self.synthesis_selector = SynthesisSelector()
+        self.template_synthesizer = TemplateSynthesizer()
+        self.synthesis_cache = get_synthesis_cache()
     
     def should_synthesize(self, query: str, agents: List[str]) -> bool:
         """
@@ -102,10 +113,17 @@ Format responses in clear markdown with actionable sections."""
         
         IMPROVED: Better error handling and fallback mechanisms
         
+        The template engine is used instead of the LLM when the selector decides
+        the agents' numbers only need merging; the chosen mode is written back to
+        routing_context['synthesis_mode']. LLM results are cached on the agent
+        payload fingerprint (routing_context['synthesis_cache'] is 'hit' or 'miss').
+        The synthesis model drops to the fast tier when routing_context['remaining_seconds']
+        is short; its model and token counts go to routing_context['model_metrics'].
+        
         Args:
             query: Original user query
             agent_responses: Dictionary of agent responses
-            routing_context: Context from routing decision
+            routing_context: Context from routing decision (elapsed_seconds is used for the latency budget)
             
         Returns:
             Synthesized strategic response
@@ -113,10 +131,33 @@ Format responses in clear markdown with actionable sections."""
         logger.info(f"Performing intelligent synthesis for {len(agent_responses)} agents")
         
         try:
+            # Extraction and mode selection can fail on malformed agent output too
+            sections = [(agent_name, self._get_agent_display_name(agent_name),
+                         content_text(self._extract_agent_content(response)))
+                        for agent_name, response in agent_responses.items()]
+            facts = {agent_name: extract_agent_facts(agent_name, content) for agent_name, _, content in sections}
+            mode, reason = self.synthesis_selector.select(query, facts, routing_context.get('elapsed_seconds', 0.0))
+            routing_context['synthesis_mode'] = mode
+            routing_context['synthesis_reason'] = reason
+            logger.info(f"Synthesis mode: {mode} ({reason})")
+            
+            if mode == 'template':
+                return self.template_synthesizer.render(query, sections, facts)
+            
+            cache_key = self.synthesis_cache.make_key(query, {agent_name: content for agent_name, _, content in sections})
+            cached = self.synthesis_cache.get(cache_key)
+            routing_context['synthesis_cache'] = 'hit' if cached is not None else 'miss'
+            if cached is not None:
+                logger.info(f"Synthesis cache hit for {list(agent_responses.keys())}")
+                return cached
+            
             synthesis_prompt = self._build_synthesis_prompt(query, agent_responses, routing_context)
             
-            logger.info("Invoking synthesis agent with LLM...")
-            synthesis_response = self.synthesis_agent(synthesis_prompt)
+            model_id, tier = select_model('synthesis', routing_context.get('remaining_seconds'))
+            logger.info(f"Invoking synthesis agent with LLM ({model_id})...")
+            synthesis_response, routing_context['model_metrics'] = invoke_with_metrics(
+                self._get_synthesis_agent(model_id), synthesis_prompt, model_id, tier
+            )
             
             # Extract response content
             if isinstance(synthesis_response, dict):
@@ -125,6 +166,9 @@ Format responses in clear markdown with actionable sections."""
                 result = str(synthesis_response)
             
             logger.info(f"Synthesis completed successfully. Response length: {len(result)} characters")
+            if tier == self.synthesis_tier:
+                # Do not let a deadline-degraded synthesis displace the full one
+                self.synthesis_cache.put(cache_key, result, self.synthesis_cache.ttl_for(agent_responses.keys()))
             return result
                 
         except Exception as e:
@@ -133,6 +177,14 @@ Format responses in clear markdown with actionable sections."""
             # Fallback to enhanced aggregation if synthesis fails
             return self._fallback_aggregation(query, agent_responses, routing_context)
     
+    def _get_synthesis_agent(self, model_id: str):
+        """Synthesis agent for a model, created on first use for non-default tiers."""
+        if model_id == self.synthesis_model_id:
+            return self.synthesis_agent
+        if model_id not in self._tier_agents:
+            self._tier_agents[model_id] = Agent(model=build_model(model_id), system_prompt=SYNTHESIS_SYSTEM_PROMPT)
+        return self._tier_agents[model_id]
+    
     def _build_synthesis_prompt(self, query: str, agent_responses: Dict[str, Any], 
                               routing_context: Dict[str, Any]) -> str:
         """Build a dynamic synthesis prompt that adapts to any agent combination."""
@@ -11,17 +11,46 @@ import concurrent.futures
 import uuid
 import time
 from typing import Dict, Any, Optional, List, Callable, Tuple
-from llm_router_simple import EnhancedLLMQueryRouter
-from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
-from strands_supervisor_agent import get_strands_supervisor
+from query_decomposer import QueryDecomposer
+from model_tiers import select_model, build_model, compute_deadline, agent_model_metrics
+from payload_envelope import request_flags, decode_response
+from prewarm import run_prewarm, init_metrics
+from websocket_frames import post_message
+from stale_while_revalidate import get_agent_dispatcher, stale_agents
+from precomputed_reports import (STANDARD_REPORTS, build_record, get_report_store, is_precompute_event,
+                                 lookup_precomputed, render_precomputed)
+from cost_data_plane import share_cost_data
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
 
+# Each architecture's modules (and the Strands SDK they pull in) are imported
+# on first use, so a cold start only pays for the path USE_STRANDS_AGENT selects.
+
 # WebSocket client for streaming responses
 websocket_client = None
 
+# Lambda client for invoking the specialist agents
+lambda_client = None
+
+def get_lambda_client():
+    """Get or create the Lambda client used to invoke the specialist agents."""
+    global lambda_client
+    if lambda_client is None:
+        lambda_client = boto3.client('lambda')
+    return lambda_client
+
+# Cost Explorer client for the cost data shared with the agents
+ce_client = None
+
+def get_ce_client():
+    """Get or create the Cost Explorer client used to fetch shared cost data."""
+    global ce_client
+    if ce_client is None:
+        ce_client = boto3.client('ce', region_name=os.environ.get('REGION', 'us-east-1'))
+    return ce_client
+
 def get_websocket_client():
     """Get or create WebSocket client for streaming responses."""
     global websocket_client
@@ -37,12 +66,8 @@ def send_websocket_message(connection_id: str, message: Dict[str, Any]) -> bool:
             logger.warning("No connection ID provided for WebSocket message")
             return False
             
-        client = get_websocket_client()
-        client.post_to_connection(
-            ConnectionId=connection_id,
-            Data=json.dumps(message)
-        )
-        logger.info(f"Sent WebSocket message: {message.get('type', 'unknown')}")
+        frames = post_message(get_websocket_client(), connection_id, message)
+        logger.info(f"Sent WebSocket message: {message.get('type', 'unknown')} ({frames} frame(s))")
         return True
     except Exception as e:
         logger.error(f"Failed to send WebSocket message: {str(e)}")
@@ -200,23 +225,37 @@ def format_insufficient_success_response(successful_responses: Dict[str, Any],
     
     return response
 
+def build_agent_payload(query: str, scope: Optional[Dict[str, Any]] = None) -> str:
+    """Build the JSON invoke payload for a specialist agent."""
+    payload = {"query": query}
+    if scope:
+        payload["scope"] = scope
+    if os.environ.get('AGENT_PAYLOAD_COMPRESSION', 'true').lower() == 'true':
+        # Let agents return large bodies compressed or spilled to S3
+        payload.update(request_flags())
+    return json.dumps(payload)
+
 def get_enhanced_supervisor_agent():
     """Initialize and return the enhanced intelligent supervisor agent."""
-    lambda_client = boto3.client('lambda')
+    from llm_router_simple import EnhancedLLMQueryRouter
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
+    lambda_client = get_lambda_client()
     router = EnhancedLLMQueryRouter()
     supervisor = IntelligentFinOpsSupervisor()
+    decomposer = QueryDecomposer()
     
-    def invoke_cost_forecast_agent(query: str) -> Dict[str, Any]:
+    def invoke_cost_forecast_agent(query: str, scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Invoke the AWS Cost Forecast Agent."""
         try:
             logger.info(f"Invoking cost forecast agent with query: {query}")
             response = lambda_client.invoke(
                 FunctionName='aws-cost-forecast-agent:PROD',  # Use PROD alias for provisioned concurrency
                 InvocationType='RequestResponse',
-                Payload=json.dumps({"query": query})
+                Payload=build_agent_payload(query, scope)
             )
             
-            payload = json.loads(response['Payload'].read())
+            payload = decode_response(json.loads(response['Payload'].read()))
             logger.info(f"Cost forecast response received")
             return payload
             
@@ -224,17 +263,17 @@ def get_enhanced_supervisor_agent():
             logger.error(f"Error invoking cost forecast agent: {str(e)}")
             return {"error": f"Cost forecast agent error: {str(e)}"}
     
-    def invoke_trusted_advisor_agent(query: str) -> Dict[str, Any]:
+    def invoke_trusted_advisor_agent(query: str, scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Invoke the Trusted Advisor Agent."""
         try:
             logger.info(f"Invoking trusted advisor agent with query: {query}")
             response = lambda_client.invoke(
                 FunctionName='trusted-advisor-agent-trusted-advisor-agent',
                 InvocationType='RequestResponse',
-                Payload=json.dumps({"query": query})
+                Payload=build_agent_payload(query, scope)
             )
             
-            payload = json.loads(response['Payload'].read())
+            payload = decode_response(json.loads(response['Payload'].read()))
             logger.info(f"Trusted advisor response received")
             return payload
             
@@ -242,17 +281,17 @@ def get_enhanced_supervisor_agent():
             logger.error(f"Error invoking trusted advisor agent: {str(e)}")
             return {"error": f"Trusted advisor agent error: {str(e)}"}
     
-    def invoke_budget_management_agent(query: str) -> Dict[str, Any]:
+    def invoke_budget_management_agent(query: str, scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Invoke the Budget Management Agent."""
         try:
             logger.info(f"Invoking budget management agent with query: {query}")
             response = lambda_client.invoke(
                 FunctionName='budget-management-agent',
                 InvocationType='RequestResponse',
-                Payload=json.dumps({"query": query})
+                Payload=build_agent_payload(query, scope)
             )
             
-            payload = json.loads(response['Payload'].read())
+            payload = decode_response(json.loads(response['Payload'].read()))
             logger.info(f"Budget management response received")
             return payload
             
@@ -260,8 +299,15 @@ def get_enhanced_supervisor_agent():
             logger.error(f"Error invoking budget management agent: {str(e)}")
             return {"error": f"Budget management agent error: {str(e)}"}
     
-    def execute_agents_parallel(agents_to_invoke: List[str], query: str) -> Dict[str, Any]:
-        """Execute multiple agents in parallel."""
+    # Slow or failing agents are answered with their last good result while a live call refreshes it
+    dispatcher = get_agent_dispatcher()
+    invoke_cost_forecast_agent = dispatcher.wrap('cost_forecast', invoke_cost_forecast_agent)
+    invoke_trusted_advisor_agent = dispatcher.wrap('trusted_advisor', invoke_trusted_advisor_agent)
+    invoke_budget_management_agent = dispatcher.wrap('budget_management', invoke_budget_management_agent)
+    
+    def execute_agents_parallel(agents_to_invoke: List[str], query: str,
+                                agent_requests: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Execute multiple agents in parallel, sending each its decomposed sub-query when provided."""
         agent_functions = {
             'cost_forecast': invoke_cost_forecast_agent,
             'aws-cost-forecast-agent': invoke_cost_forecast_agent,
@@ -279,7 +325,10 @@ def get_enhanced_supervisor_agent():
             agent_tasks = {}
             for agent_name in agents_to_invoke:
                 if agent_name in agent_functions:
-                    agent_tasks[agent_name] = executor.submit(agent_functions[agent_name], query)
+                    agent_request = (agent_requests or {}).get(agent_name, {})
+                    agent_tasks[agent_name] = executor.submit(
+                        agent_functions[agent_name], agent_request.get('query', query), agent_request.get('scope')
+                    )
                     logger.info(f"Submitted {agent_name} agent task")
             
             # Collect results from parallel execution with optimized timeouts
@@ -303,7 +352,8 @@ def get_enhanced_supervisor_agent():
         return responses
     
     def execute_agents_parallel_streaming(agents_to_invoke: List[str], query: str, 
-                                        connection_id: str = None, job_id: str = None) -> Dict[str, Any]:
+                                        connection_id: str = None, job_id: str = None,
+                                        agent_requests: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Execute multiple agents in parallel with streaming support and proper timeout handling."""
         agent_functions = {
             'cost_forecast': invoke_cost_forecast_agent,
@@ -323,7 +373,10 @@ def get_enhanced_supervisor_agent():
             agent_tasks = {}
             for agent_name in agents_to_invoke:
                 if agent_name in agent_functions:
-                    agent_tasks[agent_name] = executor.submit(agent_functions[agent_name], query)
+                    agent_request = (agent_requests or {}).get(agent_name, {})
+                    agent_tasks[agent_name] = executor.submit(
+                        agent_functions[agent_name], agent_request.get('query', query), agent_request.get('scope')
+                    )
                     logger.info(f"Submitted {agent_name} agent task")
             
             # Stream results as they complete with optimized timeout handling
@@ -394,18 +447,41 @@ def get_enhanced_supervisor_agent():
         logger.info(f"Streaming processing completed. Received {len(responses)} responses.")
         return responses
     
-    def enhanced_supervisor_agent(query: str, connection_id: str = None):
-        """Enhanced intelligent supervisor agent with latency-optimized routing."""
+    def enhanced_supervisor_agent(query: str, connection_id: str = None, deadline: Optional[float] = None,
+                                  agent_outputs: Optional[Dict[str, Any]] = None):
+        """
+        Enhanced intelligent supervisor agent with latency-optimized routing.
+        
+        The deadline (epoch seconds) drives model tier selection for the agents
+        and synthesis; per-stage models and token counts are returned in
+        routing_decision['stage_models']. When agent_outputs is given, each
+        agent's raw response is added to it.
+        """
         try:
             start_time = time.time()
+            deadline = deadline or compute_deadline(start_time=start_time)
             
             # Get routing decision from LLM
             routing_decision = router.route_query(query)
             logger.info(f"LLM routing decision: {routing_decision}")
+            stage_models = {}
+            if routing_decision.get('model_metrics'):
+                stage_models['routing'] = routing_decision.pop('model_metrics')
+            routing_decision['stage_models'] = stage_models
             
             agents_to_invoke = routing_decision["agents"]
             routing_explanation = router.get_routing_explanation(query, routing_decision)
             
+            # Focused sub-query and scope hints for each selected agent
+            agent_requests = decomposer.decompose(query, agents_to_invoke)
+            _, agent_tier = select_model('agent', deadline - time.time())
+            for agent_request in agent_requests.values():
+                agent_request['scope']['model_tier'] = agent_tier
+            routing_decision['sub_queries'] = {agent: request['query'] for agent, request in agent_requests.items()}
+            # Agents that read the same costs get one shared fetch instead of their own
+            if share_cost_data(get_ce_client(), agent_requests):
+                routing_decision['shared_cost_data'] = True
+            
             routing_context = {
                 'reasoning': routing_explanation,
                 'scope': f"Analysis involving {len(agents_to_invoke)} specialized systems",
@@ -429,7 +505,12 @@ def get_enhanced_supervisor_agent():
                 }
                 
                 if agent in agent_functions:
-                    response = agent_functions[agent](query)
+                    response = agent_functions[agent](query, agent_requests[agent]['scope'])
+                    stage_models.update(agent_model_metrics({agent: response}))
+                    if agent_outputs is not None:
+                        agent_outputs[agent] = response
+                    if stale_agents({agent: response}):
+                        routing_decision['stale_agents'] = stale_agents({agent: response})
                     final_response = supervisor.format_single_agent_response(
                         agent, response, routing_explanation
                     )
@@ -468,9 +549,15 @@ def get_enhanced_supervisor_agent():
                     
                     # Execute agents in parallel
                     if connection_id:
-                        responses = execute_agents_parallel_streaming(agents_to_invoke, query, connection_id, job_id)
+                        responses = execute_agents_parallel_streaming(agents_to_invoke, query, connection_id, job_id, agent_requests)
                     else:
-                        responses = execute_agents_parallel(agents_to_invoke, query)
+                        responses = execute_agents_parallel(agents_to_invoke, query, agent_requests)
+                    
+                    stage_models.update(agent_model_metrics(responses))
+                    if agent_outputs is not None:
+                        agent_outputs.update(responses)
+                    if stale_agents(responses):
+                        routing_decision['stale_agents'] = stale_agents(responses)
                     
                     # PHASE 1 FIX: Implement graceful degradation
                     should_proceed, successful_responses, failed_agents = should_proceed_with_synthesis(responses)
@@ -483,11 +570,17 @@ def get_enhanced_supervisor_agent():
                         synthesis_routing_context = routing_context.copy()
                         synthesis_routing_context['successful_agents'] = list(successful_responses.keys())
                         synthesis_routing_context['failed_agents'] = failed_agents
+                        synthesis_routing_context['elapsed_seconds'] = time.time() - start_time
+                        synthesis_routing_context['remaining_seconds'] = deadline - time.time()
                         
                         # Perform intelligent synthesis with successful responses only
                         synthesis_start = time.time()
                         synthesis_result = supervisor.synthesize_responses(query, successful_responses, synthesis_routing_context)
                         synthesis_time = time.time() - synthesis_start
+                        routing_decision['synthesis_mode'] = synthesis_routing_context.get('synthesis_mode')
+                        routing_decision['synthesis_cache'] = synthesis_routing_context.get('synthesis_cache')
+                        if synthesis_routing_context.get('model_metrics'):
+                            stage_models['synthesis'] = synthesis_routing_context['model_metrics']
                         
                         # Format final response based on whether we have partial or complete success
                         if failed_agents:
@@ -541,7 +634,13 @@ def get_enhanced_supervisor_agent():
                     logger.info(f"AGGREGATION PATH: {len(agents_to_invoke)} agents with enhanced aggregation")
                     
                     # Execute agents in parallel
-                    responses = execute_agents_parallel(agents_to_invoke, query)
+                    responses = execute_agents_parallel(agents_to_invoke, query, agent_requests)
+                    
+                    stage_models.update(agent_model_metrics(responses))
+                    if agent_outputs is not None:
+                        agent_outputs.update(responses)
+                    if stale_agents(responses):
+                        routing_decision['stale_agents'] = stale_agents(responses)
                     
                     # IMPROVED: Always proceed if we have at least 1 successful response
                     should_proceed, successful_responses, failed_agents = should_proceed_with_synthesis(responses, min_success_ratio=0.5)
@@ -555,9 +654,15 @@ def get_enhanced_supervisor_agent():
                             synthesis_routing_context = routing_context.copy()
                             synthesis_routing_context['successful_agents'] = list(successful_responses.keys())
                             synthesis_routing_context['failed_agents'] = failed_agents
+                            synthesis_routing_context['elapsed_seconds'] = time.time() - start_time
+                            synthesis_routing_context['remaining_seconds'] = deadline - time.time()
                             
                             synthesis_start = time.time()
                             synthesis_result = supervisor.synthesize_responses(query, successful_responses, synthesis_routing_context)
+                            routing_decision['synthesis_mode'] = synthesis_routing_context.get('synthesis_mode')
+                            routing_decision['synthesis_cache'] = synthesis_routing_context.get('synthesis_cache')
+                            if synthesis_routing_context.get('model_metrics'):
+                                stage_models['synthesis'] = synthesis_routing_context['model_metrics']
                             synthesis_time = time.time() - synthesis_start
                             
                             if failed_agents:
@@ -609,6 +714,8 @@ def build_simple_aggregation(routing_explanation: str, responses: Dict[str, Any]
     
     Note: This function now expects only successful responses (errors filtered out by graceful degradation).
     """
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
     supervisor = IntelligentFinOpsSupervisor()
     
     combined_response = f"# 🏦 AWS FinOps Analysis\n\n{routing_explanation}\n\n"
@@ -638,6 +745,8 @@ def build_simple_aggregation(routing_explanation: str, responses: Dict[str, Any]
 
 def format_individual_agent_result(agent_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
     """Format individual agent result for streaming."""
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
     supervisor = IntelligentFinOpsSupervisor()
     
     return {
@@ -653,6 +762,9 @@ def handler(event, context):
     try:
         logger.info(f"Received event: {json.dumps(event)}")
         
+        if is_precompute_event(event):
+            return precompute_standard_reports(event, context)
+        
         # Handle OPTIONS request for CORS preflight
         request_context = event.get('requestContext', {})
         http_method = request_context.get('http', {}).get('method')
@@ -678,11 +790,15 @@ def handler(event, context):
         if connection_id:
             logger.info(f"WebSocket connection ID: {connection_id}")
         
+        precomputed = answer_from_precomputed(query, connection_id)
+        if precomputed:
+            return precomputed
+        
         # Get enhanced supervisor agent
         supervisor_agent = get_enhanced_supervisor_agent()
         
         # Process query with enhanced routing
-        response, routing_metrics = supervisor_agent(query, connection_id)
+        response, routing_metrics = supervisor_agent(query, connection_id, compute_deadline(context))
         
         # Format final response
         result = {
@@ -692,6 +808,9 @@ def handler(event, context):
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
             "routing_metrics": routing_metrics
         }
+        cold_start = init_metrics()
+        if cold_start:
+            result["init_metrics"] = cold_start
         
         logger.info("Enhanced supervisor processing completed successfully")
         return format_response(200, result)
@@ -709,6 +828,9 @@ def lambda_handler(event, context):
     Enhanced Lambda handler with Strands-based intelligent synthesis.
     """
     try:
+        if is_precompute_event(event):
+            return precompute_standard_reports(event, context)
+        
         # Extract query from various event formats
         query = extract_query(event)
         if not query:
@@ -720,6 +842,11 @@ def lambda_handler(event, context):
         
         logger.info(f"Processing query: {query}")
         
+        # Standard reports are answered from the scheduled precompute run while fresh
+        precomputed = answer_from_precomputed(query, event.get('requestContext', {}).get('connectionId'))
+        if precomputed:
+            return precomputed
+        
         # Check if we should use Strands-based approach (new architecture)
         use_strands = os.environ.get('USE_STRANDS_AGENT', 'true').lower() == 'true'
         
@@ -746,6 +873,7 @@ def handle_strands_based_query(query: str, event: Dict[str, Any], context) -> Di
         logger.info("Using Strands-based supervisor agent")
         
         # Get the Strands supervisor instance
+        from strands_supervisor_agent import get_strands_supervisor
         supervisor = get_strands_supervisor()
         
         # Check if this is a WebSocket request for streaming
@@ -784,6 +912,9 @@ def handle_strands_direct(supervisor, query: str) -> Dict[str, Any]:
             "processing_time": f"{processing_time:.1f}s",
             "architecture": "strands_agents_as_tools"
         }
+        cold_start = init_metrics()
+        if cold_start:
+            result["init_metrics"] = cold_start
         
         return format_response(200, result)
         
@@ -846,7 +977,7 @@ def handle_legacy_query(query: str, event: Dict[str, Any], context) -> Dict[str,
     # Use the existing enhanced supervisor agent
     connection_id = event.get('requestContext', {}).get('connectionId')
     supervisor_agent = get_enhanced_supervisor_agent()
-    response, routing_metrics = supervisor_agent(query, connection_id)
+    response, routing_metrics = supervisor_agent(query, connection_id, compute_deadline(context))
     
     result = {
         "query": query,
@@ -855,5 +986,159 @@ def handle_legacy_query(query: str, event: Dict[str, Any], context) -> Dict[str,
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
         "routing_metrics": routing_metrics
     }
+    cold_start = init_metrics()
+    if cold_start:
+        result["init_metrics"] = cold_start
+    
+    return format_response(200, result)
+
+def answer_from_precomputed(query: str, connection_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Answer a standard report query from the precomputed store, or None to run the agents."""
+    found = lookup_precomputed(query)
+    if not found:
+        return None
+    record, freshness = found
+    logger.info(f"Answering from precomputed report {record['report_id']} ({freshness['age_seconds']}s old)")
+    response = render_precomputed(record, freshness)
+    
+    if connection_id:
+        send_websocket_message(connection_id, {
+            'type': 'analysis_completed',
+            'final_response': response,
+            'total_agents': len(record['agents']),
+            'analysis_status': 'complete',
+            'processing_time': 'Served from precomputed report',
+            'precomputed': freshness
+        })
     
+    result = {
+        "query": query,
+        "response": response,
+        "agent": "AWS-FinOps-Supervisor-Precomputed",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "precomputed": freshness
+    }
+    cold_start = init_metrics()
+    if cold_start:
+        result["init_metrics"] = cold_start
     return format_response(200, result)
+
+def extract_report_facts(agent_outputs: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Structured facts from each successful agent response of a precompute run."""
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+    from template_synthesis import content_text, extract_agent_facts
+
+    supervisor = IntelligentFinOpsSupervisor()
+    return {
+        agent: extract_agent_facts(agent, content_text(supervisor._extract_agent_content(response)))
+        for agent, response in agent_outputs.items() if not response.get('error')
+    }
+
+def strands_reports() -> bool:
+    """Whether standard reports run on the Strands supervisor (USE_STRANDS_AGENT)."""
+    return os.environ.get('USE_STRANDS_AGENT', 'true').lower() == 'true'
+
+def run_standard_report(report: Dict[str, Any], context) -> Dict[str, Any]:
+    """
+    Answer one standard report with the architecture USE_STRANDS_AGENT selects.
+    
+    Raises:
+        RuntimeError: If the answer is an error or any agent failed, so a
+            partial report is never served from the store
+    """
+    started = time.time()
+    if strands_reports():
+        from strands_supervisor_agent import StrandsFinOpsSupervisor
+        # A fresh agent per report: no conversation carried over from the previous one
+        supervisor = StrandsFinOpsSupervisor()
+        response = str(supervisor.analyze(report['query']))
+        if supervisor.tool_errors:
+            raise RuntimeError(f"Agents failed: {', '.join(sorted(supervisor.tool_errors))}")
+        details = {'architecture': 'strands_agents_as_tools'}
+    else:
+        agent_outputs = {}
+        supervisor_agent = get_enhanced_supervisor_agent()
+        response, routing_metrics = supervisor_agent(report['query'], None, compute_deadline(context), agent_outputs)
+        failed = sorted(agent for agent, output in agent_outputs.items() if output.get('error') or output.get('stale'))
+        if failed:
+            raise RuntimeError(f"Agents failed: {', '.join(failed)}")
+        details = {
+            'architecture': 'legacy',
+            'routing_metrics': routing_metrics,
+            'facts': extract_report_facts(agent_outputs)
+        }
+    
+    if response.startswith(('# ⚠️', 'Error processing')):
+        raise RuntimeError(response.splitlines()[-1][:200])
+    details['duration_ms'] = round((time.time() - started) * 1000)
+    details['response'] = response
+    return details
+
+def precompute_standard_reports(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """
+    Scheduled entry point: answer the standard reports and store the results.
+    
+    ``event['reports']`` limits the run to those report ids. Legacy reports
+    run concurrently (PRECOMPUTE_CONCURRENCY); Strands reports run one at a
+    time, because the agent tools keep their request state container-wide.
+    Each report stays valid for its agents' data freshness, or
+    PRECOMPUTED_REPORT_TTL_SECONDS when set.
+    """
+    from synthesis_cache import freshness_ttl
+
+    store = get_report_store()
+    if not store.enabled:
+        return format_response(400, {
+            "error": "Precomputed reports are not configured",
+            "message": "Set PRECOMPUTED_REPORTS_BUCKET or PRECOMPUTED_REPORTS_DIR.",
+            "agent": "AWS-FinOps-Supervisor-Precompute"
+        })
+    
+    wanted = event.get('reports')
+    reports = [report for report in STANDARD_REPORTS if not wanted or report['id'] in wanted]
+    ttl_override = os.environ.get('PRECOMPUTED_REPORT_TTL_SECONDS')
+    results = {}
+    
+    def precompute(report):
+        details = run_standard_report(report, context)
+        ttl = float(ttl_override) if ttl_override else freshness_ttl(report['agents'])
+        record = build_record(report, details.pop('response'), ttl, details)
+        store.put(record)
+        return {'status': 'stored', 'duration_ms': details['duration_ms'], 'expires_at': record['expires_at']}
+    
+    concurrency = 1 if strands_reports() else int(os.environ.get('PRECOMPUTE_CONCURRENCY', '3'))
+    max_workers = max(1, min(concurrency, len(reports)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(precompute, report): report['id'] for report in reports}
+        for future in concurrent.futures.as_completed(futures):
+            report_id = futures[future]
+            try:
+                results[report_id] = future.result()
+                logger.info(f"Precomputed report {report_id} in {results[report_id]['duration_ms']} ms")
+            except Exception as e:
+                logger.error(f"Precompute of report {report_id} failed: {str(e)}")
+                results[report_id] = {'status': 'failed', 'error': str(e)}
+    
+    return format_response(200, {
+        "reports": results,
+        "stored": sum(1 for result in results.values() if result['status'] == 'stored'),
+        "agent": "AWS-FinOps-Supervisor-Precompute"
+    })
+
+def prewarm_steps() -> Dict[str, Callable[[], Any]]:
+    """Init-phase warm-up steps for the architecture USE_STRANDS_AGENT selects."""
+    if os.environ.get('USE_STRANDS_AGENT', 'true').lower() == 'true':
+        def warm_strands_supervisor():
+            from strands_supervisor_agent import get_strands_supervisor
+            from finops_agent_tools import get_lambda_client as get_tools_lambda_client
+            return [get_strands_supervisor().model.client, get_tools_lambda_client()]
+        return {'strands_supervisor': warm_strands_supervisor}
+
+    def warm_legacy_models():
+        import llm_router_simple, intelligent_finops_supervisor  # noqa: F401
+        model_ids = {select_model(stage)[0] for stage in ('routing', 'synthesis')}
+        return [build_model(model_id).client for model_id in model_ids]
+    return {'bedrock': warm_legacy_models, 'lambda': get_lambda_client}
+
+# Load the selected architecture and open its connections during the init phase
+run_prewarm(prewarm_steps())
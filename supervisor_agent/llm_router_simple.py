@@ -5,6 +5,7 @@ import logging
 import time
 from typing import Dict, Any, Optional
 from strands import Agent
+from model_tiers import select_model, build_model, invoke_with_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +13,10 @@ class EnhancedLLMQueryRouter:
     """Enhanced router that includes synthesis recommendations for latency optimization."""
     
     def __init__(self):
+        # Routing is classification; it always runs on the fast tier
+        self.routing_model_id, self.routing_tier = select_model('routing')
         self.routing_agent = Agent(
+            model=build_model(self.routing_model_id),
             system_prompt="""You are an intelligent AWS FinOps query router with synthesis optimization capabilities. 
 
 Analyze the user's query and route to appropriate agents based on intent and content, while also determining if intelligent synthesis is needed.
@@ -324,7 +328,9 @@ Respond with JSON only: {
             logger.info("Using LLM routing for complex query")
             start_time = time.time()
             
-            routing_response = self.routing_agent(f"Route this query: {query}")
+            routing_response, model_metrics = invoke_with_metrics(
+                self.routing_agent, f"Route this query: {query}", self.routing_model_id, self.routing_tier
+            )
             
             routing_time = time.time() - start_time
             logger.info(f"LLM routing completed in {routing_time:.2f}s")
@@ -348,6 +354,7 @@ Respond with JSON only: {
                     # Add metadata
                     routing_decision["routing_method"] = "llm"
                     routing_decision["routing_time"] = routing_time
+                    routing_decision["model_metrics"] = model_metrics
                     
                     # Ensure synthesis_needed is present
                     if "synthesis_needed" not in routing_decision:
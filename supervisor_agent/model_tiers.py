@@ -0,0 +1,149 @@
+"""
+Per-stage model tiering with latency-budget-driven selection.
+
+Routing and classification run on a small fast model; synthesis runs on a
+larger model unless the remaining request deadline is too short for it, in
+which case it drops to the fast tier. Specialist agents receive the chosen
+tier as a scope hint. Each stage's model and token counts are recorded so the
+response metrics show where time and tokens went.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from strands.models import BedrockModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAST_MODEL_ID = 'us.anthropic.claude-3-5-haiku-20241022-v1:0'
+DEFAULT_STRONG_MODEL_ID = 'us.anthropic.claude-3-7-sonnet-20250219-v1:0'
+
+# Default tier for each pipeline stage
+STAGE_TIERS = {
+    'routing': 'fast',
+    'synthesis': 'strong',
+    'agent': 'strong'
+}
+
+# Stage-specific model overrides
+STAGE_MODEL_ENV = {
+    'routing': 'ROUTER_MODEL_ID',
+    'synthesis': 'SYNTHESIS_MODEL_ID'
+}
+
+# Remaining seconds below which a strong stage drops to the fast tier
+STAGE_FAST_THRESHOLD_ENV = {
+    'synthesis': ('SYNTHESIS_FAST_TIER_THRESHOLD_SECONDS', '20'),
+    'agent': ('AGENT_FAST_TIER_THRESHOLD_SECONDS', '45')
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def tier_model_id(tier: str) -> str:
+    """Model ID configured for a tier."""
+    if tier == 'fast':
+        return os.environ.get('FAST_MODEL_ID', DEFAULT_FAST_MODEL_ID)
+    return os.environ.get('STRONG_MODEL_ID', DEFAULT_STRONG_MODEL_ID)
+
+
+def select_model(stage: str, remaining_seconds: Optional[float] = None) -> Tuple[str, str]:
+    """
+    Choose the model for a pipeline stage.
+
+    Args:
+        stage: 'routing', 'synthesis' or 'agent'
+        remaining_seconds: Time left before the request deadline, if known
+
+    Returns:
+        Tuple of (model_id, tier)
+    """
+    tier = STAGE_TIERS.get(stage, 'strong')
+    if tier == 'strong' and remaining_seconds is not None and stage in STAGE_FAST_THRESHOLD_ENV:
+        env_name, default = STAGE_FAST_THRESHOLD_ENV[stage]
+        if remaining_seconds < float(os.environ.get(env_name, default)):
+            logger.info(f"{remaining_seconds:.1f}s left before deadline, using fast tier for {stage}")
+            tier = 'fast'
+
+    stage_override = os.environ.get(STAGE_MODEL_ENV.get(stage, ''))
+    if stage_override and tier == STAGE_TIERS.get(stage):
+        return stage_override, tier
+    return tier_model_id(tier), tier
+
+
+def build_model(model_id: str) -> 'BedrockModel':
+    """Return a BedrockModel for the ID, shared across agents in the container."""
+    # Imported here so the handler module can load without the Strands SDK
+    from strands.models import BedrockModel
+
+    with _models_lock:
+        if model_id not in _models:
+            _models[model_id] = BedrockModel(
+                model_id=model_id,
+                region_name=os.environ.get('STRANDS_MODEL_REGION', 'us-east-1')
+            )
+        return _models[model_id]
+
+
+def compute_deadline(context=None, start_time: Optional[float] = None) -> float:
+    """
+    Absolute deadline for the request.
+
+    Uses the Lambda context's remaining time minus a safety margin when
+    available, otherwise SUPERVISOR_DEADLINE_SECONDS from the start time.
+    """
+    start_time = start_time or time.time()
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        margin = float(os.environ.get('DEADLINE_SAFETY_MARGIN_SECONDS', '5'))
+        return start_time + context.get_remaining_time_in_millis() / 1000.0 - margin
+    return start_time + float(os.environ.get('SUPERVISOR_DEADLINE_SECONDS', '60'))
+
+
+def _usage_snapshot(agent) -> Dict[str, int]:
+    metrics = getattr(agent, 'event_loop_metrics', None)
+    usage = getattr(metrics, 'accumulated_usage', None) or {}
+    return {
+        'input_tokens': int(usage.get('inputTokens', 0) or 0),
+        'output_tokens': int(usage.get('outputTokens', 0) or 0)
+    }
+
+
+def invoke_with_metrics(agent, prompt: str, model_id: str, tier: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Call a Strands agent and measure the model, latency and tokens of this call.
+
+    Token counts are the difference in the agent's accumulated usage, so reused
+    agents report only the tokens spent on this prompt.
+    """
+    before = _usage_snapshot(agent)
+    start_time = time.time()
+    result = agent(prompt)
+    after = _usage_snapshot(agent)
+    return result, {
+        'model': model_id,
+        'tier': tier,
+        'latency': round(time.time() - start_time, 3),
+        'input_tokens': after['input_tokens'] - before['input_tokens'],
+        'output_tokens': after['output_tokens'] - before['output_tokens']
+    }
+
+
+def agent_model_metrics(responses: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Collect the model metrics specialist agents report in their response bodies."""
+    collected = {}
+    for agent_name, response in responses.items():
+        body = response.get('body') if isinstance(response, dict) else None
+        if isinstance(body, str):
+            try:
+                body = json.loads(body)
+            except json.JSONDecodeError:
+                continue
+        if isinstance(body, dict) and body.get('model_metrics'):
+            collected[f"agent:{agent_name}"] = body['model_metrics']
+    return collected
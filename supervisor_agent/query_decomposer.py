@@ -0,0 +1,221 @@
+"""
+Agent-specific sub-query decomposition for multi-agent fan-out.
+
+Splits the user's query into focused sub-queries for each selected agent and
+attaches scope hints (month range, services, level of detail, topics to
+exclude) so each agent's tool loop and answer stay on its own domain.
+"""
+
+import calendar
+import logging
+import re
+from datetime import date
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Canonical agent keys and the names used for them elsewhere in the supervisor
+AGENT_ALIASES = {
+    'aws-cost-forecast-agent': 'cost_forecast',
+    'trusted-advisor-agent-trusted-advisor-agent': 'trusted_advisor',
+    'budget-management-agent': 'budget_management'
+}
+
+# Keyword families used to assign query clauses to agents
+AGENT_KEYWORDS = {
+    'cost_forecast': ['cost', 'spend', 'expenditure', 'forecast', 'trend', 'breakdown',
+                      'usage', 'bill', 'projection', 'month to month', 'mom', 'uptick'],
+    'trusted_advisor': ['optim', 'saving', 'reduc', 'trusted advisor', 'efficien',
+                        'rightsiz', 'idle', 'underutil', 'recommendation'],
+    'budget_management': ['budget', 'spending limit', 'cost control', 'governance',
+                          'threshold', 'alert']
+}
+
+# Default focused question when no clause of the query maps to an agent
+AGENT_DEFAULT_QUERIES = {
+    'cost_forecast': "Summarize my AWS spending and cost trends",
+    'trusted_advisor': "List my Trusted Advisor cost optimization recommendations with estimated monthly savings",
+    'budget_management': "Review my AWS budgets and recommend budget changes"
+}
+
+# Topics each agent should leave to the other agents
+AGENT_EXCLUSIONS = {
+    'cost_forecast': ['budgets', 'optimization recommendations'],
+    'trusted_advisor': ['historical spend trends', 'budgets'],
+    'budget_management': ['cost trend analysis', 'optimization recommendations']
+}
+
+SERVICE_KEYWORDS = {
+    r'\bec2\b': 'Amazon Elastic Compute Cloud - Compute',
+    r'\bs3\b': 'Amazon Simple Storage Service',
+    r'\brds\b': 'Amazon Relational Database Service',
+    r'\blambda\b': 'AWS Lambda',
+    r'\bdynamodb\b': 'Amazon DynamoDB',
+    r'\bcloudfront\b': 'Amazon CloudFront',
+    r'\bbedrock\b': 'Amazon Bedrock',
+    r'\bcloudwatch\b': 'AmazonCloudWatch',
+    r'\bebs\b': 'EC2 - Other',
+    r'\belasticache\b': 'Amazon ElastiCache',
+    r'\bredshift\b': 'Amazon Redshift',
+    r'\bvpc\b|\bnat gateway': 'Amazon Virtual Private Cloud'
+}
+
+MONTH_NAMES = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+MONTH_NAMES.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+
+DETAILED_PATTERNS = ['detailed', 'in depth', 'in-depth', 'deep dive', 'full breakdown', 'every ']
+
+CLAUSE_SPLIT = re.compile(r'[.;?!]\s+|,\s*(?:and\s+)?|\s+and\s+|\s+including\s+|\s+as well as\s+')
+
+
+def canonical_agent(agent: str) -> str:
+    """Map an agent function name to its canonical key."""
+    return AGENT_ALIASES.get(agent, agent)
+
+
+class QueryDecomposer:
+    """
+    Rule-based decomposer that runs in microseconds, so it adds no model
+    round trip in front of the fan-out.
+    """
+
+    def __init__(self, today: Optional[date] = None):
+        self._today = today
+
+    @property
+    def today(self) -> date:
+        return self._today or date.today()
+
+    def decompose(self, query: str, agents: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Build a focused request for each agent.
+
+        Args:
+            query: The user's original query
+            agents: Agents selected by the router
+
+        Returns:
+            Mapping of agent name to {"query": sub_query, "scope": scope_hints}
+        """
+        months = self.extract_months(query)
+        services = self.extract_services(query)
+        clauses = self._split_clauses(query)
+        multi_agent = len(agents) > 1
+
+        requests = {}
+        for agent in agents:
+            key = canonical_agent(agent)
+            scope = {
+                'agent': key,
+                'max_detail': self._detail_level(query, multi_agent)
+            }
+            if months:
+                scope['months'] = months
+            if services:
+                scope['services'] = services
+
+            if multi_agent:
+                matched = [clause for clause in clauses if key in self._clause_agents(clause)]
+                sub_query = '. '.join(matched) if matched else AGENT_DEFAULT_QUERIES.get(key, query)
+                scope['exclude'] = AGENT_EXCLUSIONS.get(key, [])
+            else:
+                # A single agent already owns the whole question
+                sub_query = query
+
+            requests[agent] = {'query': sub_query, 'scope': scope}
+
+        logger.info(f"Decomposed query for {len(agents)} agents: "
+                    f"{ {agent: request['query'] for agent, request in requests.items()} }")
+        return requests
+
+    def agents_for(self, query: str) -> List[str]:
+        """Agents whose domain some clause of the query mentions, in AGENT_KEYWORDS order."""
+        matched = {agent for clause in self._split_clauses(query) for agent in self._clause_agents(clause)}
+        return [agent for agent in AGENT_KEYWORDS if agent in matched]
+
+    def extract_months(self, query: str) -> List[str]:
+        """Resolve the month range mentioned in the query to YYYY-MM strings."""
+        query_lower = query.lower()
+        today = self.today
+        current = (today.year, today.month)
+
+        match = re.search(r'(?:last|past|previous|trailing)\s+(\d{1,2})\s+months?|(\d{1,2})[- ]month', query_lower)
+        if match:
+            count = int(match.group(1) or match.group(2))
+            return self._month_range(self._shift(current, -(count - 1)), current)
+
+        if re.search(r'\blast month\b|\bprevious month\b', query_lower):
+            previous = self._shift(current, -1)
+            return self._month_range(previous, previous)
+
+        if re.search(r'\bthis month\b|\bmonth[- ]to[- ]date\b|\bmtd\b', query_lower):
+            return self._month_range(current, current)
+
+        quarter = re.search(r'\bq([1-4])(?:\s*(\d{4}))?\b', query_lower)
+        if quarter:
+            year = int(quarter.group(2) or today.year)
+            first = (int(quarter.group(1)) - 1) * 3 + 1
+            return self._clip(self._month_range((year, first), (year, first + 2)))
+
+        year_match = re.search(r'\b(20\d{2})\b', query_lower)
+        named = [MONTH_NAMES[word] for word in re.findall(r'[a-z]+', query_lower) if word in MONTH_NAMES]
+        if 'may' in re.findall(r'[a-z]+', query_lower) and not re.search(r'\b(?:in|for|of|during)\s+may\b|\bmay\s+20\d{2}\b', query_lower):
+            # "may" is usually the verb, not the month
+            named = [month for month in named if month != 5]
+        if named:
+            year = int(year_match.group(1)) if year_match else None
+            resolved = []
+            for month in sorted(set(named)):
+                month_year = year or (today.year if month <= today.month else today.year - 1)
+                resolved.append(f"{month_year}-{month:02d}")
+            return resolved
+
+        if re.search(r'\bytd\b|year[- ]to[- ]date|this year|so far', query_lower) or year_match:
+            year = int(year_match.group(1)) if year_match else today.year
+            return self._clip(self._month_range((year, 1), (year, 12)))
+
+        return []
+
+    def extract_services(self, query: str) -> List[str]:
+        """Return Cost Explorer service names mentioned in the query."""
+        query_lower = query.lower()
+        return [service for pattern, service in SERVICE_KEYWORDS.items() if re.search(pattern, query_lower)]
+
+    def _detail_level(self, query: str, multi_agent: bool) -> str:
+        query_lower = query.lower()
+        if any(pattern in query_lower for pattern in DETAILED_PATTERNS):
+            return 'detailed'
+        return 'concise' if multi_agent else 'standard'
+
+    def _split_clauses(self, query: str) -> List[str]:
+        return [clause.strip(' .?!') for clause in CLAUSE_SPLIT.split(query) if clause and clause.strip(' .?!')]
+
+    def _clause_agents(self, clause: str) -> List[str]:
+        clause_lower = clause.lower()
+        matched = []
+        for agent, keywords in AGENT_KEYWORDS.items():
+            if any(keyword in clause_lower for keyword in keywords):
+                matched.append(agent)
+        # "budget recommendations" belongs to budgets, not Trusted Advisor
+        if 'budget_management' in matched and 'trusted_advisor' in matched:
+            if not any(keyword in clause_lower for keyword in AGENT_KEYWORDS['trusted_advisor'] if keyword != 'recommendation'):
+                matched.remove('trusted_advisor')
+        return matched
+
+    def _shift(self, year_month, delta: int):
+        year, month = year_month
+        index = year * 12 + (month - 1) + delta
+        return index // 12, index % 12 + 1
+
+    def _month_range(self, start, end) -> List[str]:
+        months = []
+        current = start
+        while current <= end:
+            months.append(f"{current[0]}-{current[1]:02d}")
+            current = self._shift(current, 1)
+        return months
+
+    def _clip(self, months: List[str]) -> List[str]:
+        """Drop months after the current month."""
+        limit = f"{self.today.year}-{self.today.month:02d}"
+        return [month for month in months if month <= limit]
@@ -0,0 +1,262 @@
+"""
+Stale-while-revalidate dispatch for specialist agent calls.
+
+Every good agent result is remembered per agent and request (sub-query plus
+scope). When a later call for the same request fails, or is still running
+after the agent's soft timeout, the supervisor answers with the remembered
+result instead of leaving a gap, labelled with its age. The live call keeps
+running in the background and replaces the remembered result when it
+succeeds; a failed call triggers one background retry.
+
+A remembered result is only served while it is younger than the agent's
+maximum staleness. Without one, calls wait for the live result exactly as
+before. The soft timeout counts from when the live call starts running, so a
+call queued behind others is never answered from memory before it has had
+its chance; background retries run on their own pool and never hold up
+live calls.
+
+Settings take a number for every agent, ``agent=value`` pairs, or both
+(``"30,cost_forecast=60"``):
+    AGENT_SWR_ENABLED               Serve remembered results (default: true)
+    AGENT_SWR_SOFT_TIMEOUT_SECONDS  Wait this long for a live call before serving a remembered result
+    AGENT_SWR_MAX_STALENESS_SECONDS Oldest remembered result that may be served
+    AGENT_SWR_MAX_ENTRIES           Remembered results kept per container (default: 256)
+    AGENT_SWR_MAX_WORKERS           Live agent calls run at once per container (default: 32)
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from query_decomposer import canonical_agent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOFT_TIMEOUT_SECONDS = {
+    'cost_forecast': 60,
+    'trusted_advisor': 30,
+    'budget_management': 30
+}
+DEFAULT_MAX_STALENESS_SECONDS = {
+    'cost_forecast': 4 * 3600,
+    'budget_management': 4 * 3600,
+    'trusted_advisor': 24 * 3600
+}
+FALLBACK_SOFT_TIMEOUT_SECONDS = 30
+FALLBACK_MAX_STALENESS_SECONDS = 3600
+
+# Scope hints that change how an agent answers or where it reads data, not what it answers
+IGNORED_SCOPE_KEYS = ('model_tier', 'cost_data')
+
+
+def agent_setting(env_name: str, agent: str, defaults: Dict[str, float], fallback: float) -> float:
+    """Per-agent value from ``defaults`` overridden by ``env_name``."""
+    agent = canonical_agent(agent)
+    value = defaults.get(agent, fallback)
+    for part in os.environ.get(env_name, '').split(','):
+        name, _, setting = part.strip().rpartition('=')
+        if not setting:
+            continue
+        if not name:
+            value = float(setting)
+        elif canonical_agent(name.strip()) == agent:
+            return float(setting)
+    return value
+
+
+def is_good_result(response: Any) -> bool:
+    return (isinstance(response, dict) and not response.get('error') and not response.get('errorMessage')
+            and response.get('statusCode', 200) == 200)
+
+
+def _format_age(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return 'less than a minute'
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m"
+
+
+def label_stale(response: Dict[str, Any], age_seconds: float, reason: str) -> Dict[str, Any]:
+    """
+    Copy of a remembered response whose content starts with a note giving
+    its age, with a ``stale`` entry describing it.
+    """
+    note = (f"> ⏳ Cached result from {_format_age(age_seconds)} ago; the live request {reason}. "
+            f"A refresh is running in the background.")
+    labeled = dict(response)
+    body = labeled.get('body')
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except json.JSONDecodeError:
+            labeled['body'] = f"{note}\n\n{body}"
+            body = None
+    if isinstance(body, dict):
+        # The remembered call's model usage does not belong to this request
+        body = {key: value for key, value in body.items() if key != 'model_metrics'}
+        body['response'] = f"{note}\n\n{body.get('response', '')}"
+        labeled['body'] = json.dumps(body)
+    elif isinstance(labeled.get('response'), str):
+        labeled['response'] = f"{note}\n\n{labeled['response']}"
+    labeled['stale'] = {'age_seconds': int(age_seconds), 'reason': reason}
+    return labeled
+
+
+class AgentResultCache:
+    """Thread-safe LRU of the last good result per agent request."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else \
+            int(os.environ.get('AGENT_SWR_MAX_ENTRIES', '256'))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(agent: str, query: str, scope: Optional[Dict[str, Any]] = None) -> str:
+        scope = {key: value for key, value in (scope or {}).items() if key not in IGNORED_SCOPE_KEYS}
+        fingerprint = {'agent': canonical_agent(agent), 'query': ' '.join(query.lower().split()), 'scope': scope}
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(stored_at, response) for a key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, response: Dict[str, Any], stored_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.time() if stored_at is None else stored_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class StaleWhileRevalidate:
+    """Runs agent calls, falling back to remembered results when they are slow or fail."""
+
+    def __init__(self, cache: Optional[AgentResultCache] = None, max_workers: Optional[int] = None,
+                 refresh_workers: int = 2):
+        self.cache = cache or AgentResultCache()
+        # Live calls outlive the request that started them, so they run on a
+        # container-wide pool rather than the caller's executor. It is sized
+        # for several requests' fan-outs at once (a precompute run answers
+        # three reports of up to three agents each)
+        max_workers = max_workers if max_workers is not None else \
+            int(os.environ.get('AGENT_SWR_MAX_WORKERS', '32'))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='agent-swr')
+        # Background retries get their own pool, so stuck ones cannot queue live calls
+        self._refresh_executor = concurrent.futures.ThreadPoolExecutor(max_workers=refresh_workers,
+                                                                       thread_name_prefix='agent-swr-refresh')
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.environ.get('AGENT_SWR_ENABLED', 'true').lower() == 'true'
+
+    def _remember(self, key: str, future: concurrent.futures.Future):
+        try:
+            response = future.result()
+        except Exception:
+            return
+        if is_good_result(response):
+            self.cache.put(key, response)
+
+    def _revalidate(self, key: str, agent: str, invoke: Callable, query: str, scope: Optional[Dict[str, Any]]):
+        """Retry a failed call in the background, at most once at a time per request."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                response = invoke(query, scope)
+                if is_good_result(response):
+                    self.cache.put(key, response)
+                    logger.info(f"Background refresh of {agent} succeeded")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        self._refresh_executor.submit(refresh)
+
+    def call(self, agent: str, invoke: Callable[[str, Optional[Dict[str, Any]]], Dict[str, Any]],
+             query: str, scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Invoke an agent, serving its last good result for this request when
+        the live call fails or outlasts the agent's soft timeout.
+        """
+        if not self.enabled():
+            return invoke(query, scope)
+
+        key = self.cache.make_key(agent, query, scope)
+        started = threading.Event()
+
+        def live_call():
+            started.set()
+            return invoke(query, scope)
+        future = self._executor.submit(live_call)
+        future.add_done_callback(lambda done: self._remember(key, done))
+
+        entry = self.cache.get(key)
+        max_staleness = agent_setting('AGENT_SWR_MAX_STALENESS_SECONDS', agent,
+                                      DEFAULT_MAX_STALENESS_SECONDS, FALLBACK_MAX_STALENESS_SECONDS)
+        if not entry or time.time() - entry[0] > max_staleness:
+            return future.result()
+        stored_at, remembered = entry
+
+        soft_timeout = agent_setting('AGENT_SWR_SOFT_TIMEOUT_SECONDS', agent,
+                                     DEFAULT_SOFT_TIMEOUT_SECONDS, FALLBACK_SOFT_TIMEOUT_SECONDS)
+        # The soft timeout starts when the call does, not while it waits for a worker
+        started.wait()
+        try:
+            response = future.result(timeout=soft_timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"{agent} still running after {soft_timeout}s; serving result from "
+                           f"{time.time() - stored_at:.0f}s ago")
+            return label_stale(remembered, time.time() - stored_at, f"took longer than {soft_timeout:g}s")
+        except Exception as e:
+            response = {'error': str(e)}
+
+        if is_good_result(response):
+            return response
+        logger.warning(f"{agent} failed ({response.get('error', 'unsuccessful response')}); "
+                       f"serving result from {time.time() - stored_at:.0f}s ago")
+        self._revalidate(key, agent, invoke, query, scope)
+        return label_stale(remembered, time.time() - stored_at, 'failed')
+
+    def wrap(self, agent: str, invoke: Callable[[str, Optional[Dict[str, Any]]], Dict[str, Any]]):
+        """``invoke`` with the same signature, dispatched through ``call``."""
+        def dispatched(query: str, scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            return self.call(agent, invoke, query, scope)
+        return dispatched
+
+
+def stale_agents(responses: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The ``stale`` entries of responses that were served from remembered results."""
+    return {agent: response['stale'] for agent, response in responses.items()
+            if isinstance(response, dict) and response.get('stale')}
+
+
+# Shared across invocations in a warm container
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_agent_dispatcher() -> StaleWhileRevalidate:
+    """Return the container-wide stale-while-revalidate dispatcher."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = StaleWhileRevalidate()
+        return _dispatcher
@@ -5,7 +5,8 @@ import os
 import logging
 from strands import Agent
 from strands.models import BedrockModel
-from finops_agent_tools import cost_forecast_agent, trusted_advisor_agent, budget_management_agent
+import finops_agent_tools
+from finops_agent_tools import cost_forecast_agent, trusted_advisor_agent, budget_management_agent, set_request_scopes
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +89,9 @@ class StrandsFinOpsSupervisor:
             ]
         )
         
+        # Errors the agent tools hit during the last analyze(), by agent
+        self.tool_errors = {}
+        
         logger.info("Strands FinOps Supervisor Agent initialized with 3 specialized agent tools")
     
     def analyze(self, query: str) -> str:
@@ -103,6 +107,8 @@ class StrandsFinOpsSupervisor:
         try:
             logger.info(f"Processing FinOps query with Strands agent: {query}")
             
+            # Tools send their agent's scope hints, derived from the user's query
+            set_request_scopes(query)
             # Let the Strands agent decide which tools to use and synthesize the response
             result = self.agent(query)
             
@@ -120,6 +126,9 @@ class StrandsFinOpsSupervisor:
         except Exception as e:
             logger.error(f"Error in Strands FinOps analysis: {str(e)}")
             return f"Error processing FinOps analysis: {str(e)}"
+        finally:
+            self.tool_errors = dict(finops_agent_tools.request_errors)
+            set_request_scopes(None)
     
     def stream_analyze(self, query: str):
         """
@@ -133,6 +142,7 @@ class StrandsFinOpsSupervisor:
         """
         try:
             logger.info(f"Starting streaming FinOps analysis: {query}")
+            set_request_scopes(query)
             
             # Use the Strands agent's streaming capability
             for event in self.agent.stream(query):
@@ -141,6 +151,8 @@ class StrandsFinOpsSupervisor:
         except Exception as e:
             logger.error(f"Error in streaming FinOps analysis: {str(e)}")
             yield {"error": f"Error in streaming analysis: {str(e)}"}
+        finally:
+            set_request_scopes(None)
 
 # Global instance for Lambda handler
 strands_supervisor = None
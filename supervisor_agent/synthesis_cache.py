@@ -0,0 +1,139 @@
+"""
+Synthesis result cache keyed on agent-response fingerprints.
+
+Dashboards and repeated strategic questions often produce agent answers that
+are identical to an earlier run even when the query wording differs. The
+cache key is a hash of the query class and the canonicalized agent payloads,
+so any such repeat reuses the earlier synthesis instead of another Bedrock
+round trip. Entries live in the warm Lambda container and expire with the
+freshness of the underlying data.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+from query_decomposer import canonical_agent
+from template_synthesis import is_reasoning_query
+
+logger = logging.getLogger(__name__)
+
+# How long each agent's data stays current. Cost Explorer and Budgets refresh
+# a few times a day; Trusted Advisor checks refresh less often.
+AGENT_FRESHNESS_SECONDS = {
+    'cost_forecast': 4 * 3600,
+    'budget_management': 4 * 3600,
+    'trusted_advisor': 12 * 3600
+}
+DEFAULT_FRESHNESS_SECONDS = 3600
+
+# Fragments that change between runs without changing the analysis
+VOLATILE_PATTERNS = [
+    re.compile(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?'),
+    re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE),
+    re.compile(r'\b(?:completed|processed|generated) in \d+(?:\.\d+)?\s*(?:s|ms|seconds)\b', re.IGNORECASE),
+]
+
+
+def canonicalize_content(content: str) -> str:
+    """Normalize an agent answer so cosmetic differences do not change its fingerprint."""
+    for pattern in VOLATILE_PATTERNS:
+        content = pattern.sub('', content)
+    return re.sub(r'\s+', ' ', content).strip().lower()
+
+
+def freshness_ttl(agents, now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the data from these agents may be out of date: the
+    shortest freshness among them (the agent whose data refreshes soonest),
+    capped at the end of the current billing day (UTC) so a new day's costs
+    are never hidden.
+    """
+    ttl = min(AGENT_FRESHNESS_SECONDS.get(canonical_agent(agent), DEFAULT_FRESHNESS_SECONDS) for agent in agents)
+    now = now or datetime.now(timezone.utc)
+    next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return min(ttl, (next_day - now).total_seconds())
+
+
+def query_class(query: str, agents) -> str:
+    """Coarse query class: reasoning vs report, plus the agents consulted."""
+    intent = 'reasoning' if is_reasoning_query(query) else 'report'
+    return f"{intent}:{'+'.join(sorted(canonical_agent(agent) for agent in agents))}"
+
+
+class SynthesisCache:
+    """Thread-safe TTL + LRU cache of synthesized responses."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_override: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        self.max_entries = max_entries if max_entries is not None else \
+            int(os.environ.get('SYNTHESIS_CACHE_MAX_ENTRIES', '256'))
+        override = os.environ.get('SYNTHESIS_CACHE_TTL_SECONDS')
+        self.ttl_override = ttl_override if ttl_override is not None else (float(override) if override else None)
+        self.enabled = enabled if enabled is not None else \
+            os.environ.get('SYNTHESIS_CACHE_ENABLED', 'true').lower() == 'true'
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, query: str, agent_contents: Dict[str, str]) -> str:
+        """Hash the query class and canonicalized agent payloads."""
+        fingerprint = {
+            'class': query_class(query, agent_contents.keys()),
+            'agents': {canonical_agent(agent): canonicalize_content(content)
+                       for agent, content in agent_contents.items()}
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def ttl_for(self, agents, now: Optional[datetime] = None) -> float:
+        """TTL for a synthesis of these agents' data (see ``freshness_ttl``)."""
+        if self.ttl_override is not None:
+            return self.ttl_override
+        return freshness_ttl(agents, now)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, ttl: float):
+        if not self.enabled or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared across invocations in a warm container
+_synthesis_cache = None
+
+
+def get_synthesis_cache() -> SynthesisCache:
+    """Return the container-wide synthesis cache."""
+    global _synthesis_cache
+    if _synthesis_cache is None:
+        _synthesis_cache = SynthesisCache()
+    return _synthesis_cache
@@ -0,0 +1,317 @@
+"""
+Deterministic template synthesis for multi-agent responses.
+
+Most multi-agent answers restate numbers the agents already computed: spend
+totals, top services, Trusted Advisor savings and budget status. This module
+extracts those facts from each agent's markdown and merges them into an
+executive summary, an action plan ranked by savings and an implementation
+timeline without a second model call. SynthesisSelector decides per request
+whether the template is enough or LLM synthesis is worth its latency.
+"""
+
+import logging
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from query_decomposer import canonical_agent
+
+logger = logging.getLogger(__name__)
+
+MONEY = r'\$\s?([\d,]+(?:\.\d+)?)'
+
+# Queries that need reasoning across agents rather than a merge of their numbers
+REASONING_PATTERNS = [
+    'why', 'explain', 'strategy', 'strategic', 'should i', 'should we', 'trade-off',
+    'tradeoff', 'what if', 'root cause', 'correlat', 'justify', 'impact of', 'risk'
+]
+
+AT_RISK_STATUSES = ('EXCEEDED', 'CRITICAL', 'WARNING', 'AT RISK', 'OVER')
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(',', ''))
+
+
+def content_text(content: Any) -> str:
+    """Flatten agent content (markdown string or list of text blocks) to a string."""
+    if isinstance(content, list):
+        return ''.join(block.get('text', '') if isinstance(block, dict) else str(block) for block in content)
+    return content if isinstance(content, str) else str(content)
+
+
+def _clean(text: str) -> str:
+    """Strip markdown decoration from a line."""
+    text = re.sub(r'[*_`#>|]', '', text)
+    text = re.sub(r'^\s*(?:[-•]|\d+[.)])\s*', '', text)
+    return re.sub(r'\s+', ' ', text).strip(' :-')
+
+
+def extract_cost_facts(content: str) -> Dict[str, Any]:
+    """Extract total spend, top services and trend from cost agent output."""
+    facts = {'total_cost': None, 'services': [], 'trend': None}
+
+    for line in content.splitlines():
+        lower = line.lower()
+        money = re.search(MONEY, line)
+        if not money:
+            continue
+        if facts['total_cost'] is None and 'total' in lower and any(word in lower for word in ('cost', 'spend', 'total:')):
+            facts['total_cost'] = _to_float(money.group(1))
+            continue
+        service = re.match(r'^\s*(?:[-*•|]|\d+[.)])?\s*\**([A-Za-z][\w .()/&-]{1,60}?)\**\s*[:|]\s*\**' + MONEY, line)
+        if service and not any(word in service.group(1).lower() for word in ('total', 'average', 'forecast', 'saving', 'budget')):
+            facts['services'].append({'name': service.group(1).strip(), 'cost': _to_float(service.group(2))})
+
+    seen = set()
+    unique_services = []
+    for service in sorted(facts['services'], key=lambda item: item['cost'], reverse=True):
+        if service['name'] not in seen:
+            seen.add(service['name'])
+            unique_services.append(service)
+    facts['services'] = unique_services[:5]
+
+    trend = re.search(r'\b(increase[ds]?|decrease[ds]?|up|down|grew|dropped|rose|fell)\b[^.\n]{0,40}?(\d+(?:\.\d+)?)\s?%', content, re.IGNORECASE)
+    if trend:
+        direction = 'up' if trend.group(1).lower() in ('increase', 'increased', 'increases', 'up', 'grew', 'rose') else 'down'
+        facts['trend'] = {'direction': direction, 'percent': float(trend.group(2))}
+
+    return facts
+
+
+def extract_savings_facts(content: str) -> Dict[str, Any]:
+    """Extract savings opportunities from Trusted Advisor agent output."""
+    items = []
+    heading = None
+    for line in content.splitlines():
+        stripped = line.strip()
+        bold = re.match(r'^(?:#+\s*|\d+[.)]\s*)?\*\*(.+?)\*\*\s*:?\s*$', stripped) or re.match(r'^#{2,}\s*(.+)$', stripped)
+        if bold:
+            heading = _clean(bold.group(1))
+            continue
+        money = re.search(MONEY, line)
+        if not money or 'saving' not in line.lower():
+            continue
+        label = _clean(re.sub(MONEY + r'(?:\s*/\s*month|\s*per month|\s*monthly)?', '', line))
+        label = re.sub(r'(?i)\b(?:estimated|potential|monthly|annual)?\s*(?:monthly\s+)?savings?\b.*$', '', label).strip(' :-(')
+        if 'total' in line.lower() and not label:
+            continue
+        name = label if len(label) > 3 and 'total' not in label.lower() else heading
+        if not name or 'total' in name.lower():
+            continue
+        amount = _to_float(money.group(1))
+        if 'annual' in line.lower() or 'per year' in line.lower():
+            amount = amount / 12
+        items.append({'action': name, 'monthly_savings': amount})
+
+    deduped = {}
+    for item in items:
+        key = item['action'].lower()
+        if key not in deduped or item['monthly_savings'] > deduped[key]['monthly_savings']:
+            deduped[key] = item
+    ranked = sorted(deduped.values(), key=lambda item: item['monthly_savings'], reverse=True)
+    return {'savings': ranked, 'total_savings': sum(item['monthly_savings'] for item in ranked)}
+
+
+def extract_budget_facts(content: str) -> Dict[str, Any]:
+    """Extract budget statuses and recommended budgets from budget agent output."""
+    budgets = []
+    recommendations = []
+    name = None
+    for line in content.splitlines():
+        stripped = line.strip()
+        bold = re.match(r'^(?:#+\s*)?\*\*(.+?)\*\*', stripped)
+        if bold and not re.search(r'\*\*\s*:', stripped):
+            name = _clean(bold.group(1))
+            continue
+        status = re.search(r'status\s*:?\**\s*:?\s*([A-Za-z][A-Za-z ]+)', stripped, re.IGNORECASE)
+        if status and name and re.match(r'^[-*•]?\s*\**status', stripped, re.IGNORECASE):
+            budgets.append({'name': name, 'status': status.group(1).strip().upper()})
+            continue
+        recommended = re.search(r'recommended monthly budget\**\s*:?\**\s*' + MONEY, stripped, re.IGNORECASE)
+        if recommended and name:
+            recommendations.append({'name': name, 'amount': _to_float(recommended.group(1))})
+
+    at_risk = [budget for budget in budgets if budget['status'].startswith(AT_RISK_STATUSES)]
+    return {'budgets': budgets, 'at_risk': at_risk, 'budget_recommendations': recommendations}
+
+
+def extract_agent_facts(agent_name: str, content: str) -> Dict[str, Any]:
+    """Extract the structured facts an agent's response carries."""
+    agent = canonical_agent(agent_name)
+    if agent == 'cost_forecast':
+        return extract_cost_facts(content)
+    if agent == 'trusted_advisor':
+        return extract_savings_facts(content)
+    if agent == 'budget_management':
+        return extract_budget_facts(content)
+    facts = extract_cost_facts(content)
+    facts.update(extract_savings_facts(content))
+    facts.update(extract_budget_facts(content))
+    return facts
+
+
+def is_reasoning_query(query: str) -> bool:
+    """True when the query asks for reasoning across agents."""
+    query_lower = query.lower()
+    return any(re.search(r'\b' + re.escape(pattern), query_lower) for pattern in REASONING_PATTERNS)
+
+
+def has_usable_facts(facts: Dict[str, Dict[str, Any]]) -> bool:
+    """True when at least one agent produced numbers the template can rank."""
+    for agent_facts in facts.values():
+        if agent_facts.get('total_cost') or agent_facts.get('services') or agent_facts.get('savings') \
+                or agent_facts.get('budgets') or agent_facts.get('budget_recommendations'):
+            return True
+    return False
+
+
+class SynthesisSelector:
+    """
+    Chooses between template and LLM synthesis.
+
+    Order of precedence:
+    1. SYNTHESIS_MODE=template|llm forces a mode
+    2. Template when the remaining latency budget cannot fit an LLM round trip
+    3. LLM for queries that ask for reasoning (why, strategy, trade-offs)
+    4. Template when the agents returned facts it can rank, LLM otherwise
+    """
+
+    def __init__(self, latency_budget: Optional[float] = None, llm_estimate: Optional[float] = None,
+                 mode: Optional[str] = None):
+        self.latency_budget = latency_budget if latency_budget is not None else \
+            float(os.environ.get('SYNTHESIS_LATENCY_BUDGET_SECONDS', '30'))
+        self.llm_estimate = llm_estimate if llm_estimate is not None else \
+            float(os.environ.get('LLM_SYNTHESIS_ESTIMATE_SECONDS', '12'))
+        self.mode = (mode or os.environ.get('SYNTHESIS_MODE', 'auto')).lower()
+
+    def select(self, query: str, facts: Dict[str, Dict[str, Any]],
+               elapsed_seconds: float = 0.0) -> Tuple[str, str]:
+        """
+        Args:
+            query: The user's query
+            facts: Extracted facts per agent
+            elapsed_seconds: Time already spent on routing and agent calls
+
+        Returns:
+            Tuple of (mode, reason) where mode is 'template' or 'llm'
+        """
+        if self.mode in ('template', 'llm'):
+            return self.mode, f"forced by SYNTHESIS_MODE={self.mode}"
+
+        remaining = self.latency_budget - elapsed_seconds
+        if remaining < self.llm_estimate:
+            return 'template', f"{remaining:.1f}s of latency budget left, LLM synthesis needs ~{self.llm_estimate:.0f}s"
+
+        if is_reasoning_query(query):
+            return 'llm', "query asks for cross-agent reasoning"
+
+        if has_usable_facts(facts):
+            return 'template', "report-style query with structured agent facts"
+
+        return 'llm', "no structured facts to merge"
+
+
+class TemplateSynthesizer:
+    """Renders a unified FinOps report from extracted agent facts."""
+
+    def render(self, query: str, sections: List[Tuple[str, str, str]],
+               facts: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Args:
+            query: The user's query
+            sections: (agent_name, display_name, content) for each agent
+            facts: Extracted facts per agent
+
+        Returns:
+            Markdown report
+        """
+        merged = self._merge(facts)
+
+        response = "# 🏦 AWS FinOps Analysis\n\n"
+        response += "## Executive Summary\n\n"
+        response += "\n".join(f"- {line}" for line in self._summary_lines(merged)) + "\n\n"
+
+        actions = self._actions(merged)
+        if actions:
+            response += "## Prioritized Action Plan\n\n"
+            response += "| # | Action | Est. Monthly Savings | Source |\n|---|--------|---------------------|--------|\n"
+            for index, action in enumerate(actions, 1):
+                savings = f"${action['monthly_savings']:,.2f}" if action.get('monthly_savings') else "—"
+                response += f"| {index} | {action['action']} | {savings} | {action['source']} |\n"
+            response += "\n"
+
+            response += "## Implementation Timeline\n\n"
+            for period, items in self._timeline(actions):
+                if items:
+                    response += f"**{period}**\n" + "".join(f"- {item['action']}\n" for item in items) + "\n"
+
+        response += "## Detailed Findings\n\n"
+        for _, display_name, content in sections:
+            response += f"### {display_name}\n\n{content}\n\n"
+
+        response += "*⚡ Summary assembled directly from agent results.*"
+        return response
+
+    def _merge(self, facts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        merged = {'total_cost': None, 'services': [], 'trend': None, 'savings': [],
+                  'budgets': [], 'at_risk': [], 'budget_recommendations': []}
+        for agent_facts in facts.values():
+            if merged['total_cost'] is None and agent_facts.get('total_cost'):
+                merged['total_cost'] = agent_facts['total_cost']
+            if merged['trend'] is None and agent_facts.get('trend'):
+                merged['trend'] = agent_facts['trend']
+            for key in ('services', 'savings', 'budgets', 'at_risk', 'budget_recommendations'):
+                merged[key].extend(agent_facts.get(key, []))
+        merged['savings'].sort(key=lambda item: item['monthly_savings'], reverse=True)
+        merged['total_savings'] = sum(item['monthly_savings'] for item in merged['savings'])
+        return merged
+
+    def _summary_lines(self, merged: Dict[str, Any]) -> List[str]:
+        lines = []
+        total = merged['total_cost']
+        if total:
+            line = f"**Total spend**: ${total:,.2f}"
+            if merged['trend']:
+                arrow = '📈' if merged['trend']['direction'] == 'up' else '📉'
+                line += f" ({arrow} {merged['trend']['direction']} {merged['trend']['percent']:g}%)"
+            lines.append(line)
+        if merged['services']:
+            top = merged['services'][0]
+            line = f"**Top cost driver**: {top['name']} (${top['cost']:,.2f}"
+            if total:
+                line += f", {top['cost'] / total * 100:.0f}% of spend"
+            lines.append(line + ")")
+        if merged['savings']:
+            line = f"**Potential savings**: ${merged['total_savings']:,.2f}/month across {len(merged['savings'])} recommendations"
+            if total:
+                line += f" ({merged['total_savings'] / total * 100:.0f}% of spend)"
+            lines.append(line)
+        if merged['budgets']:
+            if merged['at_risk']:
+                names = ', '.join(budget['name'] for budget in merged['at_risk'])
+                lines.append(f"**Budgets**: {len(merged['at_risk'])} of {len(merged['budgets'])} need attention ({names})")
+            else:
+                lines.append(f"**Budgets**: all {len(merged['budgets'])} within limits")
+        elif merged['budget_recommendations']:
+            lines.append(f"**Budgets**: {len(merged['budget_recommendations'])} recommended budgets to create")
+        if not lines:
+            lines.append("The agents returned qualitative findings only; see the detailed findings below.")
+        return lines
+
+    def _actions(self, merged: Dict[str, Any]) -> List[Dict[str, Any]]:
+        actions = [{'action': item['action'], 'monthly_savings': item['monthly_savings'],
+                    'source': 'Trusted Advisor'} for item in merged['savings']]
+        for budget in merged['at_risk']:
+            actions.append({'action': f"Review spend against budget {budget['name']} ({budget['status'].lower()})",
+                            'monthly_savings': None, 'source': 'Budgets', 'urgent': True})
+        for recommendation in merged['budget_recommendations']:
+            actions.append({'action': f"Create a ${recommendation['amount']:,.2f}/month budget for {recommendation['name']}",
+                            'monthly_savings': None, 'source': 'Budgets'})
+        return actions
+
+    def _timeline(self, actions: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        savings = [action for action in actions if action.get('monthly_savings')]
+        immediate = savings[:3] + [action for action in actions if action.get('urgent')]
+        later = [action for action in actions if action not in immediate]
+        return [('Next 30 days', immediate), ('30–90 days', later)]
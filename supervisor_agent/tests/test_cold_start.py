@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Cold-start import budget for the supervisor handler.
+
+Each check imports in a fresh interpreter so earlier tests cannot warm the
+module cache. The wall-time budget is generous for CI noise; set
+COLD_START_IMPORT_BUDGET_MS to tighten it. The profile behind a regression
+is available from ``python benchmarks/import_profile.py``.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SUPERVISOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ARCHITECTURE_MODULES = {
+    'legacy': ['llm_router_simple', 'intelligent_finops_supervisor'],
+    'strands': ['strands_supervisor_agent', 'finops_agent_tools'],
+}
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({'elapsed_ms': elapsed_ms, 'modules': sorted(sys.modules)}))
+"""
+
+
+def import_in_fresh_interpreter(*modules):
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT] + list(modules),
+        cwd=SUPERVISOR_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_handler_import_loads_no_architecture():
+    loaded = set(import_in_fresh_interpreter('lambda_handler')['modules'])
+
+    for modules in ARCHITECTURE_MODULES.values():
+        assert not loaded.intersection(modules)
+    assert 'strands' not in loaded
+
+
+def test_each_architecture_loads_only_its_own_modules():
+    legacy = set(import_in_fresh_interpreter('lambda_handler', *ARCHITECTURE_MODULES['legacy'])['modules'])
+    assert not legacy.intersection(ARCHITECTURE_MODULES['strands'])
+
+    strands = set(import_in_fresh_interpreter('lambda_handler', *ARCHITECTURE_MODULES['strands'])['modules'])
+    assert not strands.intersection(ARCHITECTURE_MODULES['legacy'])
+
+
+def test_handler_import_within_budget():
+    budget_ms = float(os.environ.get('COLD_START_IMPORT_BUDGET_MS', '400'))
+    timings = sorted(import_in_fresh_interpreter('lambda_handler')['elapsed_ms'] for _ in range(3))
+
+    assert timings[1] <= budget_ms, (
+        f"lambda_handler import took {timings[1]:.0f} ms (budget {budget_ms:.0f} ms); "
+        f"run benchmarks/import_profile.py to see which modules regressed"
+    )
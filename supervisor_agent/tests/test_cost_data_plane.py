@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for the cost data shared by the specialist agents of one request
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cost_data_plane
+from cost_data_plane import (SharedCostData, SharedCostDataMiss, cost_data_window, get_cost_and_usage,
+                             share_cost_data, use_shared_cost_data)
+
+TODAY = date(2025, 6, 10)
+SERVICES = {'Amazon S3': 1.25, 'AWS Lambda': 0.5}
+BY_SERVICE = [{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+
+
+class FakeCostExplorer:
+    """Daily costs by service, one fixed amount per service and day, in pages of 30 days."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_cost_and_usage(self, **request):
+        self.requests.append(request)
+        start = date.fromisoformat(request['TimePeriod']['Start'])
+        end = date.fromisoformat(request['TimePeriod']['End'])
+        offset = int(request.get('NextPageToken', 0))
+        days = [start + timedelta(days=n) for n in range((end - start).days)]
+        page = days[offset:offset + 30]
+        response = {'ResultsByTime': [{
+            'TimePeriod': {'Start': day.isoformat(), 'End': (day + timedelta(days=1)).isoformat()},
+            'Estimated': day >= TODAY - timedelta(days=1),
+            'Groups': [{'Keys': [service], 'Metrics': {metric: {'Amount': str(amount), 'Unit': 'USD'}
+                                                       for metric in request['Metrics']}}
+                       for service, amount in SERVICES.items()]
+        } for day in page]}
+        if offset + 30 < len(days):
+            response['NextPageToken'] = str(offset + 30)
+        return response
+
+
+@pytest.fixture
+def spill_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv('PAYLOAD_SPILL_BUCKET', raising=False)
+    monkeypatch.delenv('SHARED_COST_DATA_ENABLED', raising=False)
+    monkeypatch.setenv('PAYLOAD_SPILL_DIR', str(tmp_path))
+    return tmp_path
+
+
+def requests_for(*agents, months=None):
+    requests = {agent: {'query': 'q', 'scope': {}} for agent in agents}
+    if months and 'cost_forecast' in requests:
+        requests['cost_forecast']['scope']['months'] = months
+    return requests
+
+
+def test_window_is_the_union_of_the_agents_history():
+    assert cost_data_window(requests_for('cost_forecast'), TODAY) == (date(2024, 12, 1), date(2025, 6, 11))
+    assert cost_data_window(requests_for('cost_forecast', months=['2025-04', '2025-05']), TODAY) == \
+        (date(2025, 4, 1), date(2025, 6, 11))
+    assert cost_data_window(requests_for('cost_forecast', 'budget_management', months=['2025-04']), TODAY) == \
+        (TODAY - timedelta(days=180), date(2025, 6, 11))
+
+
+def test_share_needs_two_consumers_and_a_location(spill_dir, monkeypatch):
+    ce = FakeCostExplorer()
+    assert share_cost_data(ce, requests_for('cost_forecast', 'trusted_advisor'), TODAY) is None
+
+    monkeypatch.setenv('SHARED_COST_DATA_ENABLED', 'false')
+    assert share_cost_data(ce, requests_for('cost_forecast', 'budget_management'), TODAY) is None
+    monkeypatch.delenv('SHARED_COST_DATA_ENABLED')
+    monkeypatch.delenv('PAYLOAD_SPILL_DIR')
+    assert share_cost_data(ce, requests_for('cost_forecast', 'budget_management'), TODAY) is None
+    assert ce.requests == []
+
+
+def test_shared_data_answers_like_cost_explorer(spill_dir):
+    ce = FakeCostExplorer()
+    agent_requests = requests_for('cost_forecast', 'budget_management', 'trusted_advisor')
+    handle = share_cost_data(ce, agent_requests, TODAY)
+
+    assert handle['ref'].startswith('file://')
+    assert agent_requests['cost_forecast']['scope']['cost_data'] is handle
+    assert agent_requests['budget_management']['scope']['cost_data'] is handle
+    assert 'cost_data' not in agent_requests['trusted_advisor']['scope']
+    # 193 days in pages of 30
+    assert len(ce.requests) == 7
+
+    with use_shared_cost_data(handle) as shared:
+        assert isinstance(shared, SharedCostData)
+        # The cost agent's whole months, End on the last day as it sends them
+        monthly = get_cost_and_usage(ce, TimePeriod={'Start': '2025-04-01', 'End': '2025-05-31'},
+                                     Granularity='MONTHLY', Metrics=['UnblendedCost'], GroupBy=BY_SERVICE)
+        daily = get_cost_and_usage(ce, TimePeriod={'Start': '2025-06-01', 'End': '2025-06-11'},
+                                   Granularity='DAILY', Metrics=['UnblendedCost', 'UsageQuantity'])
+    assert len(ce.requests) == 7
+
+    assert monthly['Source'] == 'shared_cost_data'
+    assert [period['TimePeriod'] for period in monthly['ResultsByTime']] == [
+        {'Start': '2025-04-01', 'End': '2025-05-01'}, {'Start': '2025-05-01', 'End': '2025-05-31'}]
+    april = {group['Keys'][0]: float(group['Metrics']['UnblendedCost']['Amount'])
+             for group in monthly['ResultsByTime'][0]['Groups']}
+    assert april == pytest.approx({service: amount * 30 for service, amount in SERVICES.items()})
+
+    assert len(daily['ResultsByTime']) == 10
+    assert daily['ResultsByTime'][-1]['Groups'] == []
+    assert daily['ResultsByTime'][-1]['Estimated'] is True
+    assert float(daily['ResultsByTime'][0]['Total']['UsageQuantity']['Amount']) == pytest.approx(1.75)
+
+
+@pytest.mark.parametrize('request_changes', [
+    {'Granularity': 'HOURLY'},
+    {'Metrics': ['AmortizedCost']},
+    {'GroupBy': [{'Type': 'DIMENSION', 'Key': 'REGION'}]},
+    {'Filter': {'Dimensions': {'Key': 'SERVICE', 'Values': ['Amazon S3']}}},
+    {'TimePeriod': {'Start': '2024-01-01', 'End': '2024-02-01'}},
+])
+def test_misses_fall_through_to_cost_explorer(spill_dir, request_changes):
+    ce = FakeCostExplorer()
+    handle = share_cost_data(ce, requests_for('cost_forecast', 'budget_management'), TODAY)
+    request = {'TimePeriod': {'Start': '2025-05-01', 'End': '2025-06-01'}, 'Granularity': 'MONTHLY',
+               'Metrics': ['UnblendedCost'], 'GroupBy': BY_SERVICE}
+    request.update(request_changes)
+
+    shared = cost_data_plane.load_cost_data(handle)
+    with pytest.raises(SharedCostDataMiss):
+        shared.get_cost_and_usage(**request)
+    fetched = len(ce.requests)
+    with use_shared_cost_data(handle):
+        get_cost_and_usage(ce, **request)
+    assert ce.requests[fetched:] == [request]
+
+
+def test_missing_handle_or_data_uses_cost_explorer(spill_dir):
+    ce = FakeCostExplorer()
+    request = {'TimePeriod': {'Start': '2025-05-01', 'End': '2025-06-01'}, 'Granularity': 'MONTHLY',
+               'Metrics': ['UnblendedCost'], 'GroupBy': BY_SERVICE}
+    with use_shared_cost_data(None) as shared:
+        assert shared is None
+        get_cost_and_usage(ce, **request)
+    with use_shared_cost_data({'ref': f"file://{spill_dir / 'missing'}"}) as shared:
+        assert shared is None
+        get_cost_and_usage(ce, **request)
+    assert len(ce.requests) == 2
+    assert cost_data_plane._active is None
+
+
+def test_strands_tools_pass_the_shared_cost_data(spill_dir, monkeypatch):
+    import json
+    import finops_agent_tools
+
+    class FakeLambda:
+        def __init__(self):
+            self.payloads = {}
+
+        def invoke(self, FunctionName, InvocationType, Payload):
+            self.payloads[FunctionName] = json.loads(Payload)
+
+            class Stream:
+                def read(self):
+                    return json.dumps({'response': 'ok'}).encode()
+            return {'Payload': Stream()}
+
+    ce = FakeCostExplorer()
+    lambda_client = FakeLambda()
+    monkeypatch.setattr(finops_agent_tools, 'get_ce_client', lambda: ce)
+    monkeypatch.setattr(finops_agent_tools, 'get_lambda_client', lambda: lambda_client)
+
+    # One agent's data is not fetched up front
+    finops_agent_tools.set_request_scopes("Show my costs for the last 3 months")
+    assert finops_agent_tools.request_cost_data is None
+    assert ce.requests == []
+
+    finops_agent_tools.set_request_scopes("Show my costs for the last 3 months and what budgets should I set?")
+    try:
+        finops_agent_tools.cost_forecast_agent("costs for the last 3 months")
+        finops_agent_tools.budget_management_agent("budget recommendations")
+        finops_agent_tools.trusted_advisor_agent("savings")
+    finally:
+        finops_agent_tools.set_request_scopes(None)
+
+    handle = lambda_client.payloads['aws-cost-forecast-agent']['scope']['cost_data']
+    assert handle['ref']
+    assert lambda_client.payloads['budget-management-agent']['scope']['cost_data'] == handle
+    assert 'cost_data' not in lambda_client.payloads['trusted-advisor-agent-trusted-advisor-agent']['scope']
+    assert ce.requests
+    assert finops_agent_tools.request_cost_data is None
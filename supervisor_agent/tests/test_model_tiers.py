@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage model tiering
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_tiers import select_model, invoke_with_metrics, agent_model_metrics, compute_deadline
+
+TIER_ENV = ['FAST_MODEL_ID', 'STRONG_MODEL_ID', 'ROUTER_MODEL_ID', 'SYNTHESIS_MODEL_ID',
+            'SYNTHESIS_FAST_TIER_THRESHOLD_SECONDS', 'AGENT_FAST_TIER_THRESHOLD_SECONDS']
+
+
+@pytest.fixture
+def tier_env(monkeypatch):
+    for name in TIER_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('FAST_MODEL_ID', 'fast-model')
+    monkeypatch.setenv('STRONG_MODEL_ID', 'strong-model')
+    return monkeypatch
+
+
+def test_stage_defaults(tier_env):
+    assert select_model('routing') == ('fast-model', 'fast')
+    assert select_model('synthesis') == ('strong-model', 'strong')
+    assert select_model('agent', remaining_seconds=300) == ('strong-model', 'strong')
+
+
+def test_short_deadline_switches_to_fast_tier(tier_env):
+    assert select_model('synthesis', remaining_seconds=10) == ('fast-model', 'fast')
+    assert select_model('agent', remaining_seconds=30) == ('fast-model', 'fast')
+
+    tier_env.setenv('SYNTHESIS_FAST_TIER_THRESHOLD_SECONDS', '5')
+    assert select_model('synthesis', remaining_seconds=10) == ('strong-model', 'strong')
+
+
+def test_stage_override_applies_only_to_default_tier(tier_env):
+    tier_env.setenv('SYNTHESIS_MODEL_ID', 'synthesis-model')
+    assert select_model('synthesis') == ('synthesis-model', 'strong')
+    assert select_model('synthesis', remaining_seconds=1) == ('fast-model', 'fast')
+
+
+def test_invoke_with_metrics_reports_per_call_tokens():
+    class CountingAgent:
+        def __init__(self):
+            self.event_loop_metrics = SimpleNamespace(accumulated_usage={'inputTokens': 100, 'outputTokens': 20})
+
+        def __call__(self, prompt):
+            self.event_loop_metrics.accumulated_usage['inputTokens'] += 50
+            self.event_loop_metrics.accumulated_usage['outputTokens'] += 10
+            return "ok"
+
+    result, metrics = invoke_with_metrics(CountingAgent(), "prompt", 'fast-model', 'fast')
+    assert result == "ok"
+    assert metrics['model'] == 'fast-model'
+    assert metrics['input_tokens'] == 50
+    assert metrics['output_tokens'] == 10
+
+
+def test_agent_model_metrics_read_from_response_bodies():
+    responses = {
+        'cost_forecast': {'body': json.dumps({'response': 'x', 'model_metrics': {'model': 'm', 'input_tokens': 3}})},
+        'trusted_advisor': {'error': 'timeout'},
+    }
+    assert agent_model_metrics(responses) == {'agent:cost_forecast': {'model': 'm', 'input_tokens': 3}}
+
+
+def test_compute_deadline_uses_lambda_context(monkeypatch):
+    monkeypatch.setenv('DEADLINE_SAFETY_MARGIN_SECONDS', '5')
+    context = SimpleNamespace(get_remaining_time_in_millis=lambda: 30000)
+    assert compute_deadline(context, start_time=1000.0) == 1025.0
+
+    monkeypatch.setenv('SUPERVISOR_DEADLINE_SECONDS', '60')
+    assert compute_deadline(None, start_time=1000.0) == 1060.0
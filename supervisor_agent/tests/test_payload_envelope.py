@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for compressed, size-aware agent response envelopes
+"""
+
+import json
+import os
+import sys
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payload_envelope import encode_response, decode_response, request_flags
+
+LARGE_TEXT = "| 2025-06 | Amazon EC2 | $123.45 |\n" * 2000
+
+
+def make_response(text):
+    return {'statusCode': 200, 'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'query': 'q', 'response': text})}
+
+
+def test_plain_response_without_flag(monkeypatch):
+    monkeypatch.delenv('PAYLOAD_SPILL_DIR', raising=False)
+    response = make_response(LARGE_TEXT)
+    assert encode_response(response, {'query': 'q'}) is response
+
+    decoded = decode_response(json.loads(json.dumps(response)))
+    assert decoded['body']['response'] == LARGE_TEXT
+
+
+def test_small_bodies_are_not_compressed():
+    response = make_response("tiny")
+    assert encode_response(response, request_flags()) is response
+
+
+def test_gzip_round_trip_shrinks_payload():
+    response = make_response(LARGE_TEXT)
+    envelope = encode_response(response, {'accept_encoding': ['gzip']})
+
+    assert envelope['body_encoding'] == 'gzip'
+    assert envelope['statusCode'] == 200
+    assert len(json.dumps(envelope)) < len(json.dumps(response)) / 3
+
+    decoded = decode_response(json.loads(json.dumps(envelope)))
+    assert decoded['body'] == {'query': 'q', 'response': LARGE_TEXT}
+    assert 'body_encoding' not in decoded
+
+
+def test_unsupported_encodings_fall_back_to_plain():
+    response = make_response(LARGE_TEXT)
+    assert encode_response(response, {'accept_encoding': ['br']}) is response
+
+
+def test_oversize_body_spills_to_local_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('PAYLOAD_SPILL_DIR', str(tmp_path))
+    monkeypatch.setenv('PAYLOAD_SPILL_MIN_BYTES', '100')
+
+    envelope = encode_response(make_response(LARGE_TEXT), {'accept_encoding': ['gzip']})
+    assert envelope['body_ref'].startswith('file://')
+    assert 'body' not in envelope
+    assert len(os.listdir(tmp_path)) == 1
+
+    assert decode_response(envelope)['body']['response'] == LARGE_TEXT
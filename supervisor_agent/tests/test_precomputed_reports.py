@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for precomputed standard reports
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import precomputed_reports
+from precomputed_reports import (PrecomputedReportStore, build_record, freshness, is_precompute_event,
+                                 lookup_precomputed, match_standard_report, render_precomputed)
+
+REPORTS = {report['id']: report for report in precomputed_reports.STANDARD_REPORTS}
+
+
+@pytest.fixture
+def report_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv('PRECOMPUTED_REPORTS_BUCKET', raising=False)
+    monkeypatch.setenv('PRECOMPUTED_REPORTS_DIR', str(tmp_path))
+    monkeypatch.setattr(precomputed_reports, '_report_store', None)
+    return tmp_path
+
+
+@pytest.mark.parametrize('query, report_id', [
+    ("What are my current AWS costs?", 'month_to_date_cost'),
+    ("What is my current AWS spend?", 'month_to_date_cost'),
+    ("How much have I spent so far this month?", 'month_to_date_cost'),
+    ("Show me cost trends over time", 'cost_trend_6_months'),
+    ("What's my spending trend over the past 6 months?", 'cost_trend_6_months'),
+    ("Show me cost optimization recommendations", 'trusted_advisor_summary'),
+    ("What are my current cost optimization recommendations from trusted advisor?", 'trusted_advisor_summary'),
+    ("How am I tracking against my budget?", 'budget_status'),
+    ("Do I have any AWS budget set and if not, what is your recommendation?", 'budget_status'),
+    ("I need a complete financial analysis of my AWS environment", 'comprehensive_analysis'),
+])
+def test_standard_queries_match_their_report(query, report_id):
+    assert match_standard_report(query)['id'] == report_id
+
+
+@pytest.mark.parametrize('query', [
+    "What was my S3 spend in the month of May?",
+    "What are my current AWS costs by service?",
+    "Show me my cost trend over the last 3 months",
+    "What did I spend last month?",
+    "Which cost optimization recommendations would have the biggest impact on my spending?",
+    "Show me my costs and optimization recommendations",
+    "Forecast my costs for next quarter",
+    "",
+])
+def test_narrower_queries_go_to_the_agents(query):
+    assert match_standard_report(query) is None
+
+
+def test_stored_report_is_served_until_it_expires(report_dir):
+    report = REPORTS['month_to_date_cost']
+    record = build_record(report, "## 📊 Cost Analysis\n\nTotal: $1,234.56", 3600,
+                          {'facts': {'cost_forecast': {'total_cost': 1234.56}}}, now=1000000.0)
+    PrecomputedReportStore().put(record)
+
+    found = lookup_precomputed("what are my costs", now=1000000.0 + 5400 - 3600 + 1)
+    assert found is not None
+    stored, indicator = found
+    assert stored['facts'] == {'cost_forecast': {'total_cost': 1234.56}}
+    assert indicator['report_id'] == 'month_to_date_cost'
+    assert indicator['age_seconds'] == 1801 and indicator['fresh'] is True
+
+    assert lookup_precomputed("what are my costs", now=1000000.0 + 3600) is None
+
+
+def test_store_caches_misses_and_disables_without_location(report_dir, monkeypatch):
+    store = PrecomputedReportStore(cache_seconds=60)
+    assert store.get('budget_status') is None
+
+    # A report written by another container is picked up once the cached miss expires
+    PrecomputedReportStore().put(build_record(REPORTS['budget_status'], "## 💰 Budgets", 3600))
+    assert store.get('budget_status') is None
+    store._cache.clear()
+    assert store.get('budget_status')['response'] == "## 💰 Budgets"
+
+    monkeypatch.delenv('PRECOMPUTED_REPORTS_DIR')
+    assert PrecomputedReportStore().enabled is False
+
+
+def test_rendered_answer_leads_with_its_age():
+    record = build_record(REPORTS['budget_status'], "## 💰 Budgets", 4 * 3600, now=0.0)
+    text = render_precomputed(record, freshness(record, now=2 * 3600 + 14 * 60))
+
+    note, body = text.split('\n\n', 1)
+    assert note.startswith('> ⚡ Precomputed report: Budget status')
+    assert '1970-01-01 00:00 UTC (2h 14m ago)' in note and 'refreshed by 04:00 UTC' in note
+    assert body == "## 💰 Budgets"
+
+
+def test_precompute_event_detection():
+    assert is_precompute_event({'action': 'precompute_reports'})
+    assert is_precompute_event({'source': 'aws.events', 'detail-type': 'Scheduled Event'})
+    assert not is_precompute_event({'query': 'What are my current AWS costs?'})
+    assert not is_precompute_event(None)
+
+
+def test_strands_reports_run_one_at_a_time_on_fresh_agents(report_dir, monkeypatch):
+    import json
+    import threading
+
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('USE_STRANDS_AGENT', 'true')
+    monkeypatch.setenv('PRECOMPUTE_CONCURRENCY', '3')
+    monkeypatch.delenv('PRECOMPUTED_REPORT_TTL_SECONDS', raising=False)
+    import finops_agent_tools
+    import lambda_handler
+    import strands_supervisor_agent
+
+    busy = threading.Lock()
+    agents = []
+
+    class FakeAgent:
+        """Refuses concurrent calls and keeps its conversation, like a Strands Agent."""
+
+        def __init__(self, model, system_prompt, tools):
+            self.tools = tools
+            self.messages = []
+            agents.append(self)
+
+        def __call__(self, query):
+            if not busy.acquire(blocking=False):
+                raise RuntimeError("Agent is already processing a request")
+            try:
+                self.messages.append(query)
+                answers = [tool(query) for tool in self.tools]
+                return f"{len(self.messages)} turn(s): " + ' '.join(answers)
+            finally:
+                busy.release()
+
+    class FakeLambda:
+        def invoke(self, FunctionName, InvocationType, Payload):
+            query = json.loads(Payload)['query']
+            if FunctionName == 'budget-management-agent' and 'budget' in query:
+                body = {'statusCode': 500, 'body': json.dumps({'error': 'Budgets throttled'})}
+            else:
+                body = {'response': f"{FunctionName} answer"}
+
+            class Stream:
+                def read(self):
+                    return json.dumps(body).encode()
+            return {'Payload': Stream()}
+
+    monkeypatch.setattr(strands_supervisor_agent, 'Agent', FakeAgent)
+    monkeypatch.setattr(strands_supervisor_agent, 'BedrockModel', lambda **kwargs: None)
+    monkeypatch.setattr(finops_agent_tools, 'get_lambda_client', lambda: FakeLambda())
+
+    response = lambda_handler.precompute_standard_reports({}, None)
+    results = json.loads(response['body'])['reports']
+
+    assert len(agents) == len(REPORTS)
+    # The budget agent failed the budget report, so it is not stored
+    assert results.pop('budget_status')['status'] == 'failed'
+    assert PrecomputedReportStore().get('budget_status') is None
+    assert {result['status'] for result in results.values()} == {'stored'}
+    for report_id in results:
+        record = PrecomputedReportStore().get(report_id)
+        # Every report was answered on a fresh conversation
+        assert record['response'].startswith("1 turn(s)")
+    assert finops_agent_tools.request_query is None
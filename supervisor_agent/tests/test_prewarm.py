@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for init-phase pre-warming
+"""
+
+import os
+import socket
+import sys
+import threading
+
+import boto3
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prewarm
+
+PREWARM_ENV = ['PREWARM_ENABLED', 'PREWARM_CONNECTIONS', 'PREWARM_SKIP', 'AWS_LAMBDA_FUNCTION_NAME']
+
+
+@pytest.fixture
+def prewarm_env(monkeypatch):
+    for name in PREWARM_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(prewarm, '_stats', {})
+    monkeypatch.setattr(prewarm, '_reported', False)
+    return monkeypatch
+
+
+@pytest.fixture
+def local_endpoint():
+    """A TCP listener that counts accepted connections."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(4)
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            accepted.append(connection)
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}", accepted
+    server.close()
+    for connection in accepted:
+        connection.close()
+
+
+def make_client(endpoint_url):
+    return boto3.client('lambda', region_name='us-east-1', endpoint_url=endpoint_url,
+                        aws_access_key_id='test', aws_secret_access_key='test')
+
+
+def test_disabled_outside_lambda(prewarm_env):
+    calls = []
+    assert prewarm.run_prewarm({'step': lambda: calls.append(1)}) == {}
+    assert calls == []
+    assert prewarm.init_metrics() is None
+
+
+def test_enabled_by_default_inside_lambda(prewarm_env):
+    prewarm_env.setenv('AWS_LAMBDA_FUNCTION_NAME', 'budget-management-agent')
+    stats = prewarm.run_prewarm({'step': lambda: None})
+    assert stats['steps']['step']['connections'] == 0
+
+
+def test_warm_connection_is_pooled_for_first_request(prewarm_env, local_endpoint):
+    endpoint_url, accepted = local_endpoint
+    client = make_client(endpoint_url)
+
+    assert prewarm.warm_connection(client) is True
+
+    pool = client._endpoint.http_session._manager.connection_from_url(endpoint_url)
+    assert pool._get_conn().sock is not None
+    for _ in range(50):
+        if accepted:
+            break
+        threading.Event().wait(0.01)
+    assert len(accepted) == 1
+
+
+def test_warm_connection_ignores_non_botocore_objects():
+    assert prewarm.warm_connection(object()) is False
+
+
+def test_steps_are_timed_skipped_and_isolated(prewarm_env, local_endpoint):
+    endpoint_url, _ = local_endpoint
+    prewarm_env.setenv('PREWARM_ENABLED', 'true')
+    prewarm_env.setenv('PREWARM_SKIP', 'skipped')
+
+    def failing():
+        raise RuntimeError("no credentials")
+
+    stats = prewarm.run_prewarm({
+        'clients': lambda: [make_client(endpoint_url), object()],
+        'failing': failing,
+        'skipped': lambda: pytest.fail("skipped step ran"),
+    })
+
+    assert stats['steps']['clients']['connections'] == 1
+    assert stats['errors'] == {'failing': 'no credentials'}
+    assert 'skipped' not in stats['steps']
+    assert stats['duration_ms'] >= stats['steps']['clients']['ms']
+
+    assert prewarm.init_metrics() == {'cold_start': True, 'prewarm': stats}
+    assert prewarm.init_metrics() is None
+
+
+def test_connections_flag_builds_without_connecting(prewarm_env, local_endpoint):
+    endpoint_url, accepted = local_endpoint
+    prewarm_env.setenv('PREWARM_ENABLED', 'true')
+    prewarm_env.setenv('PREWARM_CONNECTIONS', 'false')
+
+    stats = prewarm.run_prewarm({'clients': lambda: make_client(endpoint_url)})
+    assert stats['steps']['clients']['connections'] == 0
+    assert accepted == []
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for agent-specific sub-query decomposition
+"""
+
+import json
+import os
+import sys
+from datetime import date
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_decomposer import QueryDecomposer
+
+AGENTS = ['cost_forecast', 'trusted_advisor', 'budget_management']
+
+
+def test_multi_agent_query_is_split_by_domain():
+    decomposer = QueryDecomposer(today=date(2025, 7, 15))
+    requests = decomposer.decompose(
+        "Show me my EC2 spend for the last 3 months, how can I optimize it, and what budgets should I set?",
+        AGENTS
+    )
+
+    assert 'spend' in requests['cost_forecast']['query']
+    assert 'optimize' in requests['trusted_advisor']['query']
+    assert 'budgets' in requests['budget_management']['query']
+    assert 'budgets' not in requests['cost_forecast']['query']
+
+    for agent in AGENTS:
+        scope = requests[agent]['scope']
+        assert scope['agent'] == agent
+        assert scope['months'] == ['2025-05', '2025-06', '2025-07']
+        assert scope['services'] == ['Amazon Elastic Compute Cloud - Compute']
+        assert scope['max_detail'] == 'concise'
+        assert scope['exclude']
+
+
+def test_budget_recommendations_do_not_go_to_trusted_advisor():
+    decomposer = QueryDecomposer(today=date(2025, 7, 15))
+    requests = decomposer.decompose("Show my spending and give me budget recommendations", AGENTS)
+
+    assert requests['budget_management']['query'] == 'give me budget recommendations'
+    # No clause mentions optimization, so Trusted Advisor gets its default focused question
+    assert 'Trusted Advisor' in requests['trusted_advisor']['query']
+
+
+def test_single_agent_keeps_full_query():
+    decomposer = QueryDecomposer(today=date(2025, 7, 15))
+    query = "Give me a detailed breakdown of my costs in Q1 2025"
+    requests = decomposer.decompose(query, ['cost_forecast'])
+
+    assert requests['cost_forecast']['query'] == query
+    assert requests['cost_forecast']['scope']['months'] == ['2025-01', '2025-02', '2025-03']
+    assert requests['cost_forecast']['scope']['max_detail'] == 'detailed'
+    assert 'exclude' not in requests['cost_forecast']['scope']
+
+
+def test_month_extraction():
+    decomposer = QueryDecomposer(today=date(2025, 3, 10))
+
+    assert decomposer.extract_months("What did I spend last month?") == ['2025-02']
+    assert decomposer.extract_months("costs month to date") == ['2025-03']
+    assert decomposer.extract_months("costs for 2025 so far") == ['2025-01', '2025-02', '2025-03']
+    assert decomposer.extract_months("compare January and February 2024") == ['2024-01', '2024-02']
+    # A month later than today without a year refers to last year
+    assert decomposer.extract_months("What was my bill in November?") == ['2024-11']
+    assert decomposer.extract_months("What may I save?") == []
+    assert decomposer.extract_months("How can I save money?") == []
+
+
+def test_scope_reaches_agent_payload():
+    from lambda_handler import build_agent_payload
+
+    assert json.loads(build_agent_payload("costs"))["query"] == "costs"
+    assert "scope" not in json.loads(build_agent_payload("costs"))
+    payload = json.loads(build_agent_payload("costs", {"agent": "cost_forecast", "months": ["2025-01"]}))
+    assert payload["scope"]["months"] == ["2025-01"]
+
+
+def test_strands_tools_send_the_scope_of_the_request(monkeypatch):
+    import finops_agent_tools
+
+    class FakeLambda:
+        def __init__(self):
+            self.payloads = {}
+
+        def invoke(self, FunctionName, InvocationType, Payload):
+            self.payloads[FunctionName] = json.loads(Payload)
+            return {'Payload': FakeStream()}
+
+    class FakeStream:
+        def read(self):
+            return json.dumps({'statusCode': 200, 'body': json.dumps({'response': 'ok'})}).encode()
+
+    fake = FakeLambda()
+    monkeypatch.setattr(finops_agent_tools, 'get_lambda_client', lambda: fake)
+
+    finops_agent_tools.set_request_scopes(
+        "Show me my EC2 spend for the last 3 months and how can I optimize it?")
+    try:
+        finops_agent_tools.cost_forecast_agent("EC2 spend for the last 3 months")
+        finops_agent_tools.trusted_advisor_agent("EC2 optimization")
+        # Not mentioned by the user's query, but the model may still call it
+        finops_agent_tools.budget_management_agent("EC2 budgets")
+    finally:
+        finops_agent_tools.set_request_scopes(None)
+
+    cost = fake.payloads['aws-cost-forecast-agent']
+    assert cost['query'] == "EC2 spend for the last 3 months"
+    assert len(cost['scope']['months']) == 3
+    assert cost['scope']['services'] == ['Amazon Elastic Compute Cloud - Compute']
+    assert cost['scope']['exclude']
+    assert fake.payloads['trusted-advisor-agent-trusted-advisor-agent']['scope']['agent'] == 'trusted_advisor'
+    assert fake.payloads['budget-management-agent']['scope']['agent'] == 'budget_management'
+
+    # Outside a request the tools send the query alone
+    finops_agent_tools.cost_forecast_agent("EC2 spend")
+    assert 'scope' not in fake.payloads['aws-cost-forecast-agent']
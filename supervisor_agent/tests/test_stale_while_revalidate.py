@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for stale-while-revalidate agent dispatch
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stale_while_revalidate import AgentResultCache, StaleWhileRevalidate, agent_setting, stale_agents
+
+SWR_ENV = ['AGENT_SWR_ENABLED', 'AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'AGENT_SWR_MAX_STALENESS_SECONDS']
+SCOPE = {'months': ['2025-05'], 'model_tier': 'strong'}
+
+
+@pytest.fixture
+def swr(monkeypatch):
+    for name in SWR_ENV:
+        monkeypatch.delenv(name, raising=False)
+    return StaleWhileRevalidate(AgentResultCache(max_entries=8))
+
+
+def agent_response(text):
+    return {'statusCode': 200, 'body': json.dumps({'response': text, 'model_metrics': {'input_tokens': 10}})}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failure_serves_last_good_result_and_retries(swr):
+    calls = []
+    outcomes = [agent_response("Total: $1,234.56"), {'error': 'ThrottlingException'}, agent_response("Total: $1,300.00")]
+
+    def invoke(query, scope):
+        calls.append(query)
+        return outcomes[min(len(calls) - 1, 2)]
+
+    assert swr.call('cost_forecast', invoke, 'What are my costs?', SCOPE) == outcomes[0]
+    served = swr.call('cost_forecast', invoke, 'What are my costs?', dict(SCOPE, model_tier='fast'))
+
+    assert served['stale']['reason'] == 'failed'
+    body = json.loads(served['body'])
+    assert body['response'].startswith('> ⏳ Cached result from less than a minute ago; the live request failed.')
+    assert body['response'].endswith("Total: $1,234.56")
+    assert 'model_metrics' not in body
+    assert stale_agents({'cost_forecast': served, 'budget_management': outcomes[0]}) == {'cost_forecast': served['stale']}
+
+    # The background retry replaces the remembered result
+    key = AgentResultCache.make_key('cost_forecast', 'What are my costs?', SCOPE)
+    assert wait_for(lambda: swr.cache.get(key)[1] == outcomes[2])
+    assert len(calls) == 3
+
+
+def test_slow_call_serves_remembered_result_then_refreshes(swr, monkeypatch):
+    monkeypatch.setenv('AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'trusted_advisor=0.05')
+    release = threading.Event()
+    responses = iter([agent_response("Savings: $10"), agent_response("Savings: $12")])
+
+    def invoke(query, scope):
+        response = next(responses)
+        if 'Savings: $12' in response['body']:
+            release.wait(2)
+        return response
+
+    swr.call('trusted-advisor-agent-trusted-advisor-agent', invoke, 'recommendations', None)
+    started = time.time()
+    served = swr.call('trusted_advisor', invoke, 'recommendations', None)
+
+    assert time.time() - started < 1
+    assert served['stale']['reason'] == 'took longer than 0.05s'
+    release.set()
+    key = AgentResultCache.make_key('trusted_advisor', 'recommendations')
+    assert wait_for(lambda: 'Savings: $12' in swr.cache.get(key)[1]['body'])
+
+
+def test_results_older_than_max_staleness_are_not_served(swr, monkeypatch):
+    monkeypatch.setenv('AGENT_SWR_MAX_STALENESS_SECONDS', '60')
+    key = AgentResultCache.make_key('budget_management', 'budgets')
+    swr.cache.put(key, agent_response("Budget OK"), stored_at=time.time() - 61)
+
+    assert swr.call('budget_management', lambda query, scope: {'error': 'timeout'}, 'budgets') == {'error': 'timeout'}
+
+
+def test_without_remembered_result_waits_for_live_call(swr, monkeypatch):
+    monkeypatch.setenv('AGENT_SWR_SOFT_TIMEOUT_SECONDS', '0.01')
+
+    def invoke(query, scope):
+        time.sleep(0.1)
+        return agent_response("Budget OK")
+
+    assert swr.call('budget_management', invoke, 'budgets') == agent_response("Budget OK")
+
+
+def test_disabled_calls_agent_directly(swr, monkeypatch):
+    monkeypatch.setenv('AGENT_SWR_ENABLED', 'false')
+    swr.cache.put(AgentResultCache.make_key('budget_management', 'budgets'), agent_response("Budget OK"))
+
+    assert swr.call('budget_management', lambda query, scope: {'error': 'timeout'}, 'budgets') == {'error': 'timeout'}
+
+
+def test_agent_setting_overrides(monkeypatch):
+    defaults = {'cost_forecast': 60}
+    monkeypatch.delenv('AGENT_SWR_SOFT_TIMEOUT_SECONDS', raising=False)
+    assert agent_setting('AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'aws-cost-forecast-agent', defaults, 30) == 60
+    assert agent_setting('AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'budget_management', defaults, 30) == 30
+
+    monkeypatch.setenv('AGENT_SWR_SOFT_TIMEOUT_SECONDS', '20, cost_forecast=90')
+    assert agent_setting('AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'cost_forecast', defaults, 30) == 90
+    assert agent_setting('AGENT_SWR_SOFT_TIMEOUT_SECONDS', 'budget_management', defaults, 30) == 20
+
+
+def test_soft_timeout_counts_from_when_the_call_starts(monkeypatch):
+    for name in SWR_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('AGENT_SWR_SOFT_TIMEOUT_SECONDS', '0.2')
+    swr = StaleWhileRevalidate(AgentResultCache(max_entries=8), max_workers=1)
+    swr.cache.put(AgentResultCache.make_key('cost_forecast', 'q', None), agent_response("remembered"))
+    release = threading.Event()
+
+    def blocker(query, scope):
+        release.wait(5)
+        return agent_response("blocker")
+
+    # The only worker is busy for longer than the soft timeout
+    blocking = threading.Thread(target=swr.call, args=('budget_management', blocker, 'other'))
+    blocking.start()
+    threading.Timer(0.4, release.set).start()
+
+    # Queued behind it, the live call still gets its own soft timeout once it starts
+    assert swr.call('cost_forecast', lambda query, scope: agent_response("live"), 'q') == agent_response("live")
+    blocking.join()
+
+
+def test_background_retries_do_not_hold_up_live_calls(swr):
+    stuck = threading.Event()
+    key = AgentResultCache.make_key('cost_forecast', 'q', None)
+    swr.cache.put(key, agent_response("remembered"))
+    calls = []
+
+    def failing_then_stuck(query, scope):
+        calls.append(query)
+        if len(calls) == 1:
+            return {'error': 'ThrottlingException'}
+        stuck.wait(5)
+        return agent_response("refreshed")
+
+    assert swr.call('cost_forecast', failing_then_stuck, 'q')['stale']['reason'] == 'failed'
+    assert wait_for(lambda: len(calls) == 2)
+    # Every refresh worker is stuck, but live calls still run
+    swr._refresh_executor.submit(stuck.wait, 5)
+    assert swr.call('trusted_advisor', lambda query, scope: agent_response("live"), 'q') == agent_response("live")
+    stuck.set()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthesis result cache
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthesis_cache import SynthesisCache, canonicalize_content, query_class
+from template_synthesis import SynthesisSelector
+
+COST = "Total cost: $1,200.00. Generated in 2.4s at 2025-07-01T10:00:00Z"
+ADVISOR = "Idle Load Balancers - Estimated Monthly Savings: $90.00"
+
+
+def test_key_ignores_volatile_fragments_and_query_wording():
+    cache = SynthesisCache(enabled=True)
+    first = cache.make_key("Why are my costs high and what should I optimize?",
+                           {'cost_forecast': COST, 'trusted_advisor': ADVISOR})
+    second = cache.make_key("Explain my high costs and what I should optimize",
+                            {'aws-cost-forecast-agent': COST.replace('2.4s', '3.1s').replace('10:00:00Z', '11:30:00Z'),
+                             'trusted-advisor-agent-trusted-advisor-agent': ADVISOR})
+    assert first == second
+
+    changed = cache.make_key("Why are my costs high?", {'cost_forecast': COST.replace('1,200', '1,300'),
+                                                        'trusted_advisor': ADVISOR})
+    assert changed != first
+    # Report-style and reasoning queries over the same data are different classes
+    assert query_class("Show my costs", ['cost_forecast']) != query_class("Why are my costs up?", ['cost_forecast'])
+    assert canonicalize_content("A  b\n C") == "a b c"
+
+
+def test_ttl_uses_freshest_agent_and_ends_at_billing_day():
+    cache = SynthesisCache(enabled=True)
+    morning = datetime(2025, 7, 1, 6, 0, tzinfo=timezone.utc)
+    assert cache.ttl_for(['cost_forecast', 'trusted_advisor'], now=morning) == 4 * 3600
+    assert cache.ttl_for(['trusted_advisor'], now=morning) == 12 * 3600
+
+    late = datetime(2025, 7, 1, 23, 0, tzinfo=timezone.utc)
+    assert cache.ttl_for(['trusted_advisor'], now=late) == 3600
+
+
+def test_expiry_and_lru_eviction():
+    cache = SynthesisCache(max_entries=2, enabled=True)
+    cache.put('a', 'A', ttl=60)
+    cache.put('expired', 'X', ttl=-1)
+    assert cache.get('expired') is None
+
+    cache.put('b', 'B', ttl=60)
+    cache.get('a')
+    cache.put('c', 'C', ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.stats()['hits'] == 2
+
+
+def test_supervisor_reuses_synthesis_for_identical_agent_payloads():
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
+    supervisor = IntelligentFinOpsSupervisor()
+    supervisor.synthesis_selector = SynthesisSelector(mode='llm')
+    supervisor.synthesis_cache = SynthesisCache(enabled=True)
+    calls = []
+
+    def synthesis_agent(prompt):
+        calls.append(prompt)
+        return "# Strategic synthesis"
+    supervisor.synthesis_agent = synthesis_agent
+
+    responses = {
+        'cost_forecast': {'body': json.dumps({'response': COST})},
+        'trusted_advisor': {'body': json.dumps({'response': ADVISOR})},
+    }
+    first_context = {}
+    second_context = {}
+    assert supervisor.synthesize_responses("Why are costs high?", responses, first_context) == "# Strategic synthesis"
+    assert supervisor.synthesize_responses("Why are my costs so high?", responses, second_context) == "# Strategic synthesis"
+
+    assert len(calls) == 1
+    assert first_context['synthesis_cache'] == 'miss'
+    assert second_context['synthesis_cache'] == 'hit'
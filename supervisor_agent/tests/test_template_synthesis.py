@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for deterministic template synthesis and the template/LLM selector
+"""
+
+import json
+import os
+import sys
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_synthesis import (
+    SynthesisSelector, TemplateSynthesizer, extract_agent_facts, extract_budget_facts,
+    extract_cost_facts, extract_savings_facts
+)
+
+COST_RESPONSE = """# AWS Cost Summary
+**Total Cost**: $1,250.40 for June 2025
+
+## Top Services
+1. **Amazon Elastic Compute Cloud - Compute**: $800.00
+2. **Amazon Simple Storage Service**: $300.25
+3. **AWS Lambda**: $50.10
+
+Spend increased 12.5% compared to May.
+"""
+
+TRUSTED_ADVISOR_RESPONSE = """# Cost Optimization Opportunities
+**Total Potential Savings**: $410.00/month
+
+1. **Low Utilization Amazon EC2 Instances**
+   - Estimated Monthly Savings: $320.00
+2. **Idle Load Balancers**
+   - Estimated Monthly Savings: $90.00
+"""
+
+BUDGET_RESPONSE = [
+    {"text": "# Budget Analysis Summary\n\n## Individual Budget Performance\n"},
+    {"text": "\n**Monthly-Total** (COST)\n- Budget Limit: $1000.00\n- Actual Spend: $1250.40 (125.0% utilized)\n- Status: EXCEEDED\n"},
+    {"text": "\n**Dev-Sandbox** (COST)\n- Budget Limit: $200.00\n- Actual Spend: $40.00 (20.0% utilized)\n- Status: ON_TRACK\n"},
+]
+
+
+def test_extracts_cost_facts():
+    facts = extract_cost_facts(COST_RESPONSE)
+    assert facts['total_cost'] == 1250.40
+    assert facts['services'][0] == {'name': 'Amazon Elastic Compute Cloud - Compute', 'cost': 800.0}
+    assert len(facts['services']) == 3
+    assert facts['trend'] == {'direction': 'up', 'percent': 12.5}
+
+
+def test_extracts_savings_ranked_without_totals():
+    facts = extract_savings_facts(TRUSTED_ADVISOR_RESPONSE)
+    assert [item['action'] for item in facts['savings']] == ['Low Utilization Amazon EC2 Instances', 'Idle Load Balancers']
+    assert facts['total_savings'] == 410.0
+
+
+def test_extracts_budget_status_from_content_blocks():
+    text = ''.join(block['text'] for block in BUDGET_RESPONSE)
+    facts = extract_budget_facts(text)
+    assert [budget['name'] for budget in facts['budgets']] == ['Monthly-Total', 'Dev-Sandbox']
+    assert [budget['name'] for budget in facts['at_risk']] == ['Monthly-Total']
+
+
+def test_template_renders_summary_actions_and_timeline():
+    sections = [
+        ('cost_forecast', 'Cost Analysis & Forecasting', COST_RESPONSE),
+        ('trusted_advisor', 'Optimization & Efficiency', TRUSTED_ADVISOR_RESPONSE),
+    ]
+    facts = {name: extract_agent_facts(name, content) for name, _, content in sections}
+    report = TemplateSynthesizer().render("Show my costs and savings", sections, facts)
+
+    assert "## Executive Summary" in report
+    assert "$1,250.40" in report
+    assert "$410.00/month across 2 recommendations (33% of spend)" in report
+    assert report.index("Low Utilization Amazon EC2 Instances") < report.index("Idle Load Balancers")
+    assert "**Next 30 days**" in report
+    assert COST_RESPONSE in report
+
+
+def test_selector_prefers_template_for_report_queries():
+    facts = {'cost_forecast': extract_cost_facts(COST_RESPONSE)}
+    selector = SynthesisSelector(latency_budget=30, llm_estimate=12, mode='auto')
+
+    assert selector.select("Show me my costs and savings", facts)[0] == 'template'
+    assert selector.select("Why did my costs go up and what strategy should I follow?", facts)[0] == 'llm'
+    assert selector.select("Show me my costs", {'cost_forecast': extract_cost_facts("No data")})[0] == 'llm'
+
+
+def test_selector_uses_template_when_latency_budget_is_spent():
+    facts = {'cost_forecast': extract_cost_facts(COST_RESPONSE)}
+    selector = SynthesisSelector(latency_budget=30, llm_estimate=12, mode='auto')
+
+    mode, reason = selector.select("Explain why my costs went up", facts, elapsed_seconds=25)
+    assert mode == 'template'
+    assert 'latency budget' in reason
+    assert SynthesisSelector(mode='llm').select("Show me my costs", facts)[0] == 'llm'
+
+
+def test_supervisor_template_path_skips_llm():
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
+    supervisor = IntelligentFinOpsSupervisor()
+    supervisor.synthesis_selector = SynthesisSelector(latency_budget=30, llm_estimate=12, mode='auto')
+
+    def fail(prompt):
+        raise AssertionError("LLM synthesis should not run")
+    supervisor.synthesis_agent = fail
+
+    responses = {
+        'aws-cost-forecast-agent': {'statusCode': 200, 'body': json.dumps({'response': COST_RESPONSE})},
+        'budget-management-agent': {'statusCode': 200, 'body': json.dumps({'response': BUDGET_RESPONSE})},
+    }
+    routing_context = {'reasoning': 'test', 'elapsed_seconds': 3.0}
+    report = supervisor.synthesize_responses("Show my costs and budget status", responses, routing_context)
+
+    assert routing_context['synthesis_mode'] == 'template'
+    assert "1 of 2 need attention (Monthly-Total)" in report
+    assert "Review spend against budget Monthly-Total" in report
+
+
+def test_malformed_agent_response_falls_back_to_aggregation():
+    from intelligent_finops_supervisor import IntelligentFinOpsSupervisor
+
+    supervisor = IntelligentFinOpsSupervisor()
+
+    def fail(prompt):
+        raise AssertionError("LLM synthesis should not run")
+    supervisor.synthesis_agent = fail
+
+    # Content blocks with a null text cannot be flattened
+    responses = {
+        'aws-cost-forecast-agent': {'statusCode': 200, 'body': json.dumps({'response': COST_RESPONSE})},
+        'budget-management-agent': {'response': [{'text': None}]},
+    }
+    routing_context = {'reasoning': 'test', 'elapsed_seconds': 3.0}
+    report = supervisor.synthesize_responses("Show my costs and budget status", responses, routing_context)
+
+    assert report == supervisor._fallback_aggregation("Show my costs and budget status", responses,
+                                                      {'reasoning': 'test'})
+    assert 'synthesis_mode' not in routing_context
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for chunked WebSocket message delivery
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+# Add the supervisor directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websocket_frames
+
+FRAME_ENV = ['WS_FRAME_MAX_BYTES', 'WS_COMPRESSION', 'WS_SPILL_BUCKET', 'WS_SPILL_MIN_BYTES']
+
+
+@pytest.fixture
+def frame_env(monkeypatch):
+    for name in FRAME_ENV:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def report_message(size):
+    rows = "\n".join(f"| service-{i} | ${i * 13.7:,.2f} | \"{i % 7}\" |" for i in range(size))
+    return {'type': 'job_completed', 'jobId': 'job-1', 'result': {'response': f"## 📊 Costs\n{rows}"}}
+
+
+class RecordingClient:
+    def __init__(self):
+        self.frames = []
+
+    def post_to_connection(self, ConnectionId, Data):
+        self.frames.append(Data)
+
+
+def test_small_message_is_sent_unchanged(frame_env):
+    message = {'type': 'job_progress', 'jobId': 'job-1', 'progress': 50}
+    assert websocket_frames.build_frames(message) == [json.dumps(message)]
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'none'])
+def test_large_message_round_trips_in_bounded_frames(frame_env, compression):
+    frame_env.setenv('WS_FRAME_MAX_BYTES', '8000')
+    frame_env.setenv('WS_COMPRESSION', compression)
+    message = report_message(2000)
+
+    frames = [json.loads(frame) for frame in websocket_frames.build_frames(message)]
+
+    assert len(frames) > 1
+    assert all(len(json.dumps(frame)) <= 8000 for frame in frames)
+    assert {frame['messageType'] for frame in frames} == {'job_completed'}
+    assert [frame['seq'] for frame in frames] == list(range(len(frames)))
+    shuffled = frames[:]
+    random.Random(1).shuffle(shuffled)
+    assert websocket_frames.reassemble_frames(shuffled) == message
+
+
+def test_gzip_sends_fewer_bytes_than_identity(frame_env):
+    frame_env.setenv('WS_FRAME_MAX_BYTES', '8000')
+    message = report_message(2000)
+
+    compressed = sum(len(frame) for frame in websocket_frames.build_frames(message))
+    frame_env.setenv('WS_COMPRESSION', 'none')
+    plain = sum(len(frame) for frame in websocket_frames.build_frames(message))
+
+    assert compressed < plain / 3
+
+
+def test_missing_chunk_is_rejected(frame_env):
+    frame_env.setenv('WS_FRAME_MAX_BYTES', '4000')
+    frames = [json.loads(frame) for frame in websocket_frames.build_frames(report_message(2000))]
+    with pytest.raises(ValueError):
+        websocket_frames.reassemble_frames(frames[:-1])
+
+
+def test_oversize_message_spills_to_presigned_url(frame_env, monkeypatch):
+    frame_env.setenv('WS_SPILL_BUCKET', 'results')
+    frame_env.setenv('WS_SPILL_MIN_BYTES', '50000')
+    stored = {}
+
+    class FakeS3:
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            stored[(Bucket, Key)] = (Body, kwargs)
+
+        def generate_presigned_url(self, method, Params, ExpiresIn):
+            return f"https://{Params['Bucket']}/{Params['Key']}"
+
+    monkeypatch.setattr(websocket_frames, '_s3_client', FakeS3())
+    client = RecordingClient()
+
+    assert websocket_frames.post_message(client, 'conn-1', report_message(5000)) == 1
+    ref = json.loads(client.frames[0])
+    assert ref['type'] == 'message_ref' and ref['messageType'] == 'job_completed'
+    (bucket, key), (body, kwargs) = next(iter(stored.items()))
+    assert ref['url'] == f"https://{bucket}/{key}"
+    assert kwargs['ContentEncoding'] == 'gzip'
+
+
+def test_failed_spill_falls_back_to_chunks(frame_env, monkeypatch):
+    frame_env.setenv('WS_SPILL_BUCKET', 'results')
+    frame_env.setenv('WS_SPILL_MIN_BYTES', '50000')
+
+    class BrokenS3:
+        def put_object(self, **kwargs):
+            raise RuntimeError("AccessDenied")
+
+    monkeypatch.setattr(websocket_frames, '_s3_client', BrokenS3())
+    message = report_message(5000)
+    frames = [json.loads(frame) for frame in websocket_frames.build_frames(message)]
+    assert websocket_frames.reassemble_frames(frames) == message
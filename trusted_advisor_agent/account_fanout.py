@@ -0,0 +1,329 @@
+"""
+Fan-out of per-account API calls across an organization's linked accounts.
+
+Budgets and Trusted Advisor only answer for the account that calls them,
+so an organization-wide report has to call them once per linked account
+with that account's credentials. ``AccountFanout`` runs a task for every
+account on a bounded thread pool and hands each account's result to a
+merge callback as soon as it arrives, so the report is built while the
+slower accounts are still running and a failing account only costs its
+own entry:
+
+    fanout = get_account_fanout()
+    report = fanout.run(lambda account, clients: clients('budgets').describe_budgets(
+        AccountId=account['id']), merge=add_budgets)
+
+Credentials come from a session pool: the role ``ORG_ACCOUNT_ROLE_NAME``
+is assumed once per account and the session, and the clients built on it,
+are reused until shortly before the credentials expire. The caller's own
+account uses the Lambda's credentials. Every client call goes through a
+per-account token bucket (``ORG_FANOUT_ACCOUNT_RATE``), so many threads
+working on one account do not throttle it.
+
+Cost Explorer does not need any of this: the management account answers
+for every linked account, grouped by ``LINKED_ACCOUNT`` in one request.
+
+Accounts are read from ``ORG_ACCOUNT_IDS`` or, when that is empty, listed
+from AWS Organizations (active accounts only) once per container.
+
+A fan-out stops waiting for accounts early enough for the agent to write
+its answer before the Lambda times out. The handler opens
+``invocation_deadline(context)`` around the agent run, and a fan-out inside
+it waits at most the invocation's remaining time less
+``ORG_FANOUT_SYNTHESIS_MARGIN_SECONDS``; ``ORG_FANOUT_DEADLINE_SECONDS`` only
+caps that.
+
+Environment flags:
+    ORG_ACCOUNT_IDS              Comma-separated account IDs (default: list the organization)
+    ORG_ACCOUNT_ROLE_NAME        Role assumed in each linked account (default: FinOpsAgentReadOnly)
+    ORG_FANOUT_MAX_WORKERS       Accounts worked on at once (default: 16)
+    ORG_FANOUT_ACCOUNT_RATE      API calls per second per account (default: 5)
+    ORG_FANOUT_DEADLINE_SECONDS  Stop waiting for accounts after this long at most (default: 240)
+    ORG_FANOUT_SYNTHESIS_MARGIN_SECONDS  Invocation time left for the answer after a fan-out (default: 60)
+
+This file is shared verbatim by the agents.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+# Refresh assumed-role credentials this long before they expire
+CREDENTIAL_MARGIN_SECONDS = 300
+
+# When the current invocation times out (time.time()), inside invocation_deadline
+_invocation_ends_at: Optional[float] = None
+
+
+class invocation_deadline:
+    """
+    Bound fan-outs by the Lambda invocation's remaining time for the duration
+    of a ``with`` block. Does nothing without a context that reports it.
+
+    The deadline is container-wide rather than per thread, because tools fan
+    out to thread pools; a Lambda container handles one request at a time.
+    """
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self) -> Optional[float]:
+        global _invocation_ends_at
+        remaining = getattr(self.context, 'get_remaining_time_in_millis', None)
+        _invocation_ends_at = time.time() + remaining() / 1000 if callable(remaining) else None
+        return _invocation_ends_at
+
+    def __exit__(self, exc_type, exc, tb):
+        global _invocation_ends_at
+        _invocation_ends_at = None
+        return False
+
+
+class RateLimiter:
+    """Token bucket per key: ``rate`` calls per second, bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str):
+        """Wait until ``key`` may make another call."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                tokens, updated = self._buckets.get(key, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[key] = (tokens - 1, now)
+                    return
+                self._buckets[key] = (tokens, now)
+                wait_seconds = (1 - tokens) / self.rate
+            self.sleep(wait_seconds)
+
+
+class _RateLimitedClient:
+    """A boto3 client whose API calls first take a token for its account."""
+
+    def __init__(self, client, account_id: str, limiter: RateLimiter):
+        self._client = client
+        self._account_id = account_id
+        self._limiter = limiter
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if name.startswith('_') or not callable(attribute) or name in ('get_paginator', 'can_paginate'):
+            return attribute
+
+        def call(*args, **kwargs):
+            self._limiter.acquire(self._account_id)
+            return attribute(*args, **kwargs)
+        return call
+
+
+class SessionPool:
+    """Assumed-role credentials and clients per linked account, reused until they near expiry."""
+
+    def __init__(self, role_name: str, sts_client=None, clock: Callable[[], float] = time.time):
+        self.role_name = role_name
+        self.clock = clock
+        self._sts = sts_client
+        self._caller_account: Optional[str] = None
+        # account -> (credentials or None for the caller's own, expires at, {(service, region): client})
+        self._sessions: Dict[str, Tuple[Optional[Dict[str, Any]], float, Dict[Tuple[str, Optional[str]], Any]]] = {}
+        self._account_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'assumed': 0, 'reused': 0}
+
+    @property
+    def sts(self):
+        if self._sts is None:
+            self._sts = boto3.client('sts')
+        return self._sts
+
+    def caller_account(self) -> str:
+        if self._caller_account is None:
+            self._caller_account = self.sts.get_caller_identity()['Account']
+        return self._caller_account
+
+    def _account_lock(self, account_id: str) -> threading.Lock:
+        with self._lock:
+            return self._account_locks.setdefault(account_id, threading.Lock())
+
+    def _session(self, account_id: str):
+        # One assume-role per account at a time, so concurrent first calls share it
+        with self._account_lock(account_id):
+            session = self._sessions.get(account_id)
+            if session is not None and self.clock() < session[1]:
+                with self._lock:
+                    self.stats['reused'] += 1
+                return session
+            if account_id == self.caller_account():
+                session = (None, float('inf'), {})
+            else:
+                response = self.sts.assume_role(
+                    RoleArn=f"arn:aws:iam::{account_id}:role/{self.role_name}",
+                    RoleSessionName='finops-agent-fanout'
+                )
+                credentials = response['Credentials']
+                expiration = credentials['Expiration']
+                expires_at = expiration.timestamp() if hasattr(expiration, 'timestamp') else \
+                    self.clock() + 3600
+                session = (credentials, expires_at - CREDENTIAL_MARGIN_SECONDS, {})
+                with self._lock:
+                    self.stats['assumed'] += 1
+            self._sessions[account_id] = session
+            return session
+
+    def client(self, account_id: str, service_name: str, region_name: Optional[str] = None):
+        """A client for ``service_name`` acting in ``account_id``."""
+        credentials, _, clients = self._session(account_id)
+        key = (service_name, region_name)
+        if key not in clients:
+            kwargs = {'region_name': region_name} if region_name else {}
+            if credentials is not None:
+                kwargs.update(aws_access_key_id=credentials['AccessKeyId'],
+                              aws_secret_access_key=credentials['SecretAccessKey'],
+                              aws_session_token=credentials['SessionToken'])
+            clients[key] = boto3.client(service_name, **kwargs)
+        return clients[key]
+
+
+def list_accounts(org_client=None) -> List[Dict[str, str]]:
+    """The accounts to fan out over: ``ORG_ACCOUNT_IDS``, else the organization's active accounts."""
+    configured = [account.strip() for account in os.environ.get('ORG_ACCOUNT_IDS', '').split(',') if account.strip()]
+    if configured:
+        return [{'id': account, 'name': account} for account in configured]
+
+    org_client = org_client or boto3.client('organizations')
+    accounts = []
+    kwargs = {}
+    while True:
+        response = org_client.list_accounts(**kwargs)
+        accounts.extend({'id': account['Id'], 'name': account.get('Name', account['Id'])}
+                        for account in response.get('Accounts', []) if account.get('Status', 'ACTIVE') == 'ACTIVE')
+        if not response.get('NextToken'):
+            return accounts
+        kwargs['NextToken'] = response['NextToken']
+
+
+class AccountFanout:
+    """Runs a per-account task across the organization and merges results as they arrive."""
+
+    def __init__(self, role_name: Optional[str] = None, max_workers: Optional[int] = None,
+                 account_rate: Optional[float] = None, deadline: Optional[float] = None,
+                 sts_client=None, org_client=None):
+        self.pool = SessionPool(role_name or os.environ.get('ORG_ACCOUNT_ROLE_NAME', 'FinOpsAgentReadOnly'),
+                                sts_client=sts_client)
+        self.max_workers = max_workers if max_workers is not None else \
+            int(os.environ.get('ORG_FANOUT_MAX_WORKERS', '16'))
+        self.limiter = RateLimiter(account_rate if account_rate is not None else
+                                   float(os.environ.get('ORG_FANOUT_ACCOUNT_RATE', '5')))
+        self.deadline = deadline if deadline is not None else \
+            float(os.environ.get('ORG_FANOUT_DEADLINE_SECONDS', '240'))
+        self.synthesis_margin = float(os.environ.get('ORG_FANOUT_SYNTHESIS_MARGIN_SECONDS', '60'))
+        self._org_client = org_client
+        self._accounts: Optional[List[Dict[str, str]]] = None
+        self._lock = threading.Lock()
+
+    def accounts(self) -> List[Dict[str, str]]:
+        """The organization's accounts, listed once per container."""
+        with self._lock:
+            if self._accounts is None:
+                self._accounts = list_accounts(self._org_client)
+            return self._accounts
+
+    def time_budget(self) -> float:
+        """Seconds a fan-out started now may wait for accounts."""
+        if _invocation_ends_at is None:
+            return self.deadline
+        return max(0.0, min(self.deadline, _invocation_ends_at - time.time() - self.synthesis_margin))
+
+    def clients_for(self, account_id: str) -> Callable[..., Any]:
+        """``clients(service, region=None)`` returning rate-limited clients acting in the account."""
+        def clients(service_name: str, region_name: Optional[str] = None):
+            return _RateLimitedClient(self.pool.client(account_id, service_name, region_name),
+                                      account_id, self.limiter)
+        return clients
+
+    def run(self, task: Callable[[Dict[str, str], Callable[..., Any]], Any],
+            merge: Callable[[Dict[str, str], Any], None],
+            accounts: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Run ``task(account, clients)`` for every account on the thread pool.
+
+        ``merge(account, result)`` is called in the calling thread as each
+        account finishes, so it needs no locking. Accounts that fail are
+        reported with their error; accounts still running at the deadline
+        (``time_budget()``) are reported as pending and their results dropped.
+
+        Returns:
+            Dictionary with account counts, failures, pending accounts and the time taken
+        """
+        accounts = accounts if accounts is not None else self.accounts()
+        started = time.time()
+        deadline = self.time_budget()
+        failed: Dict[str, str] = {}
+        succeeded = 0
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(accounts) or 1)))
+        try:
+            futures = {executor.submit(task, account, self.clients_for(account['id'])): account
+                       for account in accounts}
+            pending = set(futures)
+            while pending:
+                remaining = deadline - (time.time() - started)
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account = futures[future]
+                    try:
+                        merge(account, future.result())
+                        succeeded += 1
+                    except Exception as e:
+                        logger.warning(f"Account {account['id']} failed: {e}")
+                        failed[account['id']] = str(e)
+            for future in pending:
+                future.cancel()
+        finally:
+            # Do not wait for accounts past the deadline
+            executor.shutdown(wait=False)
+
+        seconds = round(time.time() - started, 3)
+        logger.info(f"Fan-out over {len(accounts)} accounts: {succeeded} succeeded, {len(failed)} failed, "
+                    f"{len(accounts) - succeeded - len(failed)} pending in {seconds}s")
+        return {
+            'accounts': len(accounts),
+            'succeeded': succeeded,
+            'failed': failed,
+            'pending': sorted(futures[future]['id'] for future in pending),
+            'seconds': seconds,
+            'deadline': round(deadline, 3),
+            'sessions': dict(self.pool.stats)
+        }
+
+
+# Shared across invocations in a warm container
+_account_fanout = None
+
+
+def get_account_fanout() -> AccountFanout:
+    """Return the container-wide account fan-out, with its session pool."""
+    global _account_fanout
+    if _account_fanout is None:
+        _account_fanout = AccountFanout()
+    return _account_fanout
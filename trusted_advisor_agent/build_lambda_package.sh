@@ -98,6 +98,11 @@ build_application_package() {
     # Copy application files
     print_status "Copying application files..."
     cp "$SCRIPT_DIR/lambda_handler.py" "$app_dir/"
+    cp "$SCRIPT_DIR/payload_envelope.py" "$app_dir/"
+    cp "$SCRIPT_DIR/prewarm.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_memo.py" "$app_dir/"
+    cp "$SCRIPT_DIR/tool_output.py" "$app_dir/"
+    cp "$SCRIPT_DIR/account_fanout.py" "$app_dir/"
     cp "$SCRIPT_DIR/trusted_advisor_tools.py" "$app_dir/"
     
     # Copy __init__.py if it exists
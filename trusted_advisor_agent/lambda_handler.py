@@ -1,13 +1,19 @@
 import json
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from strands import Agent, tool
 import boto3
 from botocore.exceptions import ClientError
 
+from payload_envelope import encode_response
+from prewarm import run_prewarm, init_metrics
+from tool_memo import memoize_tool, tool_memo_scope
+from tool_output import budget_tool_output, get_more_results
+from account_fanout import get_account_fanout, invocation_deadline
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -23,16 +29,16 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-@tool
-def get_trusted_advisor_recommendations(category: str = "cost_optimizing") -> str:
+@memoize_tool
+def fetch_trusted_advisor_recommendations(category: str = "cost_optimizing") -> str:
     """
-    Get cost optimization recommendations from AWS Trusted Advisor.
+    Fetch every cost optimization recommendation from AWS Trusted Advisor.
     
     Args:
         category: The category of recommendations to retrieve (default: cost_optimizing)
         
     Returns:
-        JSON string containing the recommendations
+        JSON string containing all the recommendations
     """
     try:
         logger.info(f"Getting Trusted Advisor recommendations for category: {category}")
@@ -97,6 +103,8 @@ def get_trusted_advisor_recommendations(category: str = "cost_optimizing") -> st
                 
                 all_recommendations.append(recommendation_data)
             
+            # Highest savings first, so cut outputs keep the findings that matter most
+            all_recommendations.sort(key=lambda r: r.get('estimated_monthly_savings') or 0, reverse=True)
             return json.dumps({
                 'source': 'TrustedAdvisor API',
                 'recommendations': all_recommendations,
@@ -167,6 +175,7 @@ def get_trusted_advisor_recommendations(category: str = "cost_optimizing") -> st
                 warning_count = len([r for r in recommendations if r.get('status') == 'warning'])
                 error_count = len([r for r in recommendations if r.get('status') == 'error'])
                 
+                recommendations.sort(key=lambda r: r.get('estimated_monthly_savings') or 0, reverse=True)
                 return json.dumps({
                     'source': 'Support API',
                     'recommendations': recommendations,
@@ -187,6 +196,24 @@ def get_trusted_advisor_recommendations(category: str = "cost_optimizing") -> st
         })
 
 @tool
+@memoize_tool
+@budget_tool_output
+def get_trusted_advisor_recommendations(category: str = "cost_optimizing") -> str:
+    """
+    Get cost optimization recommendations from AWS Trusted Advisor.
+    
+    Args:
+        category: The category of recommendations to retrieve (default: cost_optimizing)
+        
+    Returns:
+        JSON string containing the recommendations, the largest lists cut to
+        fit the context (see get_more_results)
+    """
+    return fetch_trusted_advisor_recommendations(category)
+
+@tool
+@memoize_tool
+@budget_tool_output
 def get_cost_optimization_summary() -> str:
     """
     Get a summary of all cost optimization opportunities from Trusted Advisor.
@@ -198,7 +225,7 @@ def get_cost_optimization_summary() -> str:
         logger.info("Getting cost optimization summary")
         
         # Get all cost optimization recommendations
-        recommendations_data = json.loads(get_trusted_advisor_recommendations("cost_optimizing"))
+        recommendations_data = json.loads(fetch_trusted_advisor_recommendations("cost_optimizing"))
         recommendations = recommendations_data.get('recommendations', [])
         
         # Calculate summary statistics
@@ -244,6 +271,80 @@ def get_cost_optimization_summary() -> str:
             'details': f'Error type: {type(e).__name__}'
         })
 
+@tool
+@memoize_tool
+@budget_tool_output
+def get_organization_cost_optimization_summary() -> str:
+    """
+    Get the Trusted Advisor cost optimization opportunities of every linked account in the AWS Organization.
+    Use this when users ask about savings across the organization, all accounts or linked accounts.
+    
+    Returns:
+        JSON string containing organization-wide savings, the accounts with the largest
+        savings and the checks with the most savings across accounts
+    """
+    try:
+        logger.info("Getting cost optimization summary across the organization")
+        fanout = get_account_fanout()
+        accounts = fanout.accounts()
+        
+        # Savings per account and per check, merged as each account's recommendations arrive
+        account_savings = {}
+        check_savings = {}
+        
+        def list_account_recommendations(account, clients):
+            client = clients('trustedadvisor', 'us-east-1')
+            recommendations = []
+            for status in ('warning', 'error'):
+                kwargs = {'pillar': 'cost_optimizing', 'status': status, 'maxResults': 100}
+                while True:
+                    response = client.list_recommendations(**kwargs)
+                    recommendations.extend(response.get('recommendationSummaries', []))
+                    if not response.get('nextToken'):
+                        break
+                    kwargs['nextToken'] = response['nextToken']
+            return recommendations
+        
+        def merge(account, recommendations):
+            entry = account_savings[account['id']] = {'name': account['name'], 'recommendations': len(recommendations),
+                                                      'estimated_monthly_savings': 0.0}
+            for rec in recommendations:
+                savings = rec.get('pillarSpecificAggregates', {}).get('costOptimizing', {}).get('estimatedMonthlySavings', 0) or 0
+                entry['estimated_monthly_savings'] += savings
+                check = check_savings.setdefault(rec.get('name', 'Unknown'), {'accounts': 0, 'estimated_monthly_savings': 0.0})
+                check['accounts'] += 1
+                check['estimated_monthly_savings'] += savings
+        
+        run = fanout.run(list_account_recommendations, merge, accounts)
+        
+        # Largest savings first, so cut outputs keep the accounts and checks that matter most
+        by_account = sorted(({'account_id': account_id, **entry} for account_id, entry in account_savings.items()),
+                            key=lambda entry: entry['estimated_monthly_savings'], reverse=True)
+        by_check = sorted(({'check': name, **entry} for name, entry in check_savings.items()),
+                          key=lambda entry: entry['estimated_monthly_savings'], reverse=True)
+        
+        return json.dumps({
+            'source': 'TrustedAdvisor API',
+            'accounts_analyzed': run['succeeded'],
+            'accounts_total': run['accounts'],
+            'failed_accounts': run['failed'],
+            'pending_accounts': run['pending'],
+            'total_recommendations': sum(entry['recommendations'] for entry in by_account),
+            'estimated_monthly_savings': round(sum(entry['estimated_monthly_savings'] for entry in by_account), 2),
+            'accounts': by_account,
+            'checks': by_check,
+            'seconds': run['seconds']
+        }, cls=DateTimeEncoder)
+        
+    except Exception as e:
+        logger.error(f"Error getting organization cost optimization summary: {str(e)}")
+        return json.dumps({
+            'error': f'Failed to retrieve organization cost optimization summary: {str(e)}',
+            'total_recommendations': 0,
+            'estimated_monthly_savings': 0,
+            'details': f'Error type: {type(e).__name__}'
+        })
+
 # System prompt for the Trusted Advisor Agent
 TRUSTED_ADVISOR_SYSTEM_PROMPT = """
 You are a specialized AWS Trusted Advisor Cost Optimization Agent. Your primary function is to analyze and present cost optimization opportunities from AWS Trusted Advisor.
@@ -254,6 +355,7 @@ YOUR CORE CAPABILITIES:
 - Calculate exact potential monthly savings without rounding
 - Present actionable recommendations for cost reduction
 - Categorize findings by service type and impact
+- Summarize savings across the organization's linked accounts (use get_organization_cost_optimization_summary for organization-wide or multi-account questions)
 
 YOUR RESPONSIBILITIES:
 - Pull live data from AWS Trusted Advisor API
@@ -280,6 +382,11 @@ Each finding includes:
 - Specific optimization actions
 - Resource details and metadata
 
+LARGE RESULTS:
+- Results with a "_truncated" section show the top entries of each long list
+- "_omitted"/"_other" entries summarize the rest and are included in the totals
+- Call get_more_results with the cursor only when the omitted entries are needed
+
 RESPONSE GUIDELINES:
 - Present data exactly as received from Trusted Advisor
 - Use structured formatting for clarity
@@ -306,26 +413,79 @@ Clearly communicate when:
 # Global agent instance - will be reinitialized for each request
 agent = None
 
-def create_fresh_agent():
-    """Create a fresh agent instance to avoid state corruption."""
+def select_model_id(scope: Optional[Dict[str, Any]]):
+    """
+    Pick the Bedrock model for the tier the supervisor requested.
+    
+    Returns:
+        Tuple of (model_id, tier)
+    """
+    tier = (scope or {}).get('model_tier', 'strong')
+    default_model_id = os.environ.get('STRANDS_MODEL_ID', 'us.anthropic.claude-3-5-haiku-20241022-v1:0')
+    if tier == 'fast':
+        return os.environ.get('FAST_MODEL_ID', default_model_id), tier
+    return default_model_id, tier
+
+def agent_model_metrics(agent, model_id: str, tier: str, tool_memo=None) -> Dict[str, Any]:
+    """Model and token usage of a per-request agent, reported back to the supervisor."""
+    usage = getattr(getattr(agent, 'event_loop_metrics', None), 'accumulated_usage', None) or {}
+    metrics = {
+        'model': model_id,
+        'tier': tier,
+        'input_tokens': usage.get('inputTokens', 0),
+        'output_tokens': usage.get('outputTokens', 0)
+    }
+    if tool_memo is not None:
+        metrics['tool_memo'] = tool_memo.metrics()
+    return metrics
+
+# Bedrock models by model ID, reused across invocations in the container
+_models = {}
+
+def get_model(model_id: Optional[str] = None):
+    """Get or create the BedrockModel for the ID (STRANDS_MODEL_ID when None)."""
     from strands.models.bedrock import BedrockModel
     
-    # Configure optimized Bedrock model with cross-region inference
-    trusted_advisor_model = BedrockModel(
-        region_name="us-east-1",  # Same region as Lambda for optimal performance
-        model_id=os.environ.get('STRANDS_MODEL_ID', 'us.anthropic.claude-3-5-haiku-20241022-v1:0')  # Cross-region inference profile
-    )
+    model_id = model_id or os.environ.get('STRANDS_MODEL_ID', 'us.anthropic.claude-3-5-haiku-20241022-v1:0')  # Cross-region inference profile
+    if model_id not in _models:
+        # Same region as Lambda for optimal performance
+        _models[model_id] = BedrockModel(region_name="us-east-1", model_id=model_id)
+    return _models[model_id]
 
-    # Create agent without session to avoid state management issues
+def create_fresh_agent(model_id: Optional[str] = None):
+    """Create a fresh agent instance to avoid state corruption."""
+    # Create agent without session to avoid state management issues;
+    # only the stateless model and its connection pool are shared
     return Agent(
-        model=trusted_advisor_model,
+        model=get_model(model_id),
         system_prompt=TRUSTED_ADVISOR_SYSTEM_PROMPT,
         tools=[
             get_trusted_advisor_recommendations,
-            get_cost_optimization_summary
+            get_cost_optimization_summary,
+            get_organization_cost_optimization_summary,
+            get_more_results
         ]
     )
 
+def apply_scope_hints(query: str, scope: Optional[Dict[str, Any]]) -> str:
+    """Append the supervisor's scope hints to the query so the answer stays on optimization."""
+    if not scope:
+        return query
+    
+    hints = []
+    if scope.get('services'):
+        hints.append(f"- Only report recommendations for: {', '.join(scope['services'])}")
+    if scope.get('max_detail') == 'concise':
+        hints.append("- Detail: concise - the highest-savings recommendations and the total potential savings")
+    elif scope.get('max_detail') == 'detailed':
+        hints.append("- Detail: detailed - list every affected resource")
+    if scope.get('exclude'):
+        hints.append(f"- Leave out: {', '.join(scope['exclude'])} (covered by other agents)")
+    
+    if not hints:
+        return query
+    return f"{query}\n\nScope for this request:\n" + "\n".join(hints)
+
 def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     """
     AWS Lambda handler for the Trusted Advisor Agent.
@@ -339,9 +499,11 @@ def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     """
     try:
         logger.info(f"Received event: {event}")
+        cold_start = init_metrics()
         
         # Extract query from event
         query = None
+        scope = event.get('scope')
         if 'query' in event:
             query = event['query']
         elif 'inputText' in event:
@@ -351,6 +513,7 @@ def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
         elif 'body' in event:
             body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
             query = body.get('query', body.get('message', ''))
+            scope = body.get('scope', scope)
         
         if not query:
             query = "Please provide a summary of my current cost optimization opportunities from AWS Trusted Advisor."
@@ -358,15 +521,18 @@ def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
         logger.info(f"Processing query: {query}")
         
         # Create fresh agent for each request to avoid session state issues
-        fresh_agent = create_fresh_agent()
+        model_id, model_tier = select_model_id(scope)
+        fresh_agent = create_fresh_agent(model_id)
         
-        # Process query through agent
-        response = fresh_agent(query)
+        # Process query through agent, answering repeated tool calls once and
+        # bounding organization fan-outs by the invocation's remaining time
+        with tool_memo_scope() as tool_memo, invocation_deadline(context):
+            response = fresh_agent(apply_scope_hints(query, scope))
         response_text = str(response)
         
         logger.info(f"Agent response generated successfully")
         
-        return {
+        return encode_response({
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
@@ -374,9 +540,11 @@ def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
             },
             'body': json.dumps({
                 'response': response_text,
-                'agent': 'TrustedAdvisorAgent'
+                'agent': 'TrustedAdvisorAgent',
+                'model_metrics': agent_model_metrics(fresh_agent, model_id, model_tier, tool_memo),
+                **({'init_metrics': cold_start} if cold_start else {})
             }, cls=DateTimeEncoder)
-        }
+        }, event)
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
@@ -392,3 +560,10 @@ def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                 'details': f'Error type: {type(e).__name__}'
             })
         }
+
+
+# Build the default model and open the Trusted Advisor connections during the init phase
+run_prewarm({
+    'bedrock': lambda: get_model().client,
+    'trusted_advisor': lambda: [trustedadvisor_client, support_client]
+})
@@ -0,0 +1,170 @@
+"""
+Compressed, size-aware envelopes for agent Lambda responses.
+
+The supervisor advertises the encodings it can read with an
+``accept_encoding`` flag in the invoke payload. An agent that sees the flag
+compresses a large response body (zstd when the ``zstandard`` package is
+installed, otherwise gzip) and base64-encodes it:
+
+    {"statusCode": 200, "headers": {...}, "body_encoding": "gzip", "body": "<base64>"}
+
+Bodies still too large for Lambda's 6 MB synchronous response limit are
+written to S3 (or a local directory for tests) and returned by reference:
+
+    {"statusCode": 200, "headers": {...}, "body_encoding": "gzip", "body_ref": "s3://bucket/key"}
+
+Callers that do not send the flag get the plain response, so older clients
+keep working. This file is shared verbatim by the supervisor and the agents.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import os
+import uuid
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SUPPORTED_ENCODINGS: List[str] = (['zstd'] if zstandard else []) + ['gzip']
+
+_s3_client = None
+
+
+def request_flags() -> Dict[str, Any]:
+    """Fields the caller adds to an invoke payload to accept compressed responses."""
+    return {'accept_encoding': list(SUPPORTED_ENCODINGS)}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if encoding == 'gzip':
+        # Level 1 is ~3x faster than the default for ~30% larger output on agent markdown
+        return gzip.compress(data, compresslevel=int(os.environ.get('PAYLOAD_GZIP_LEVEL', '1')))
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        if not zstandard:
+            raise ValueError("zstd payload received but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+
+def store_payload(data: bytes, prefix: str = 'agent-payloads') -> Optional[str]:
+    """
+    Store bytes where any Lambda in the system can read them back and return
+    their reference (``s3://`` or ``file://``), or None when no location
+    (``PAYLOAD_SPILL_BUCKET`` or ``PAYLOAD_SPILL_DIR``) is configured.
+    """
+    key = f"{prefix}/{uuid.uuid4()}"
+    spill_dir = os.environ.get('PAYLOAD_SPILL_DIR')
+    if spill_dir:
+        path = os.path.join(spill_dir, key.replace('/', '_'))
+        os.makedirs(spill_dir, exist_ok=True)
+        with open(path, 'wb') as spill_file:
+            spill_file.write(data)
+        return f"file://{path}"
+    bucket = os.environ.get('PAYLOAD_SPILL_BUCKET')
+    if bucket:
+        _get_s3_client().put_object(Bucket=bucket, Key=key, Body=data)
+        return f"s3://{bucket}/{key}"
+    return None
+
+
+def load_payload(ref: str) -> bytes:
+    """Read back bytes stored by ``store_payload``."""
+    if ref.startswith('file://'):
+        with open(ref[len('file://'):], 'rb') as spill_file:
+            return spill_file.read()
+    if ref.startswith('s3://'):
+        bucket, _, key = ref[len('s3://'):].partition('/')
+        return _get_s3_client().get_object(Bucket=bucket, Key=key)['Body'].read()
+    raise ValueError(f"Unsupported payload reference: {ref}")
+
+
+def encode_response(response: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compress and, if needed, spill a Lambda response for a caller that accepts it.
+
+    Args:
+        response: Response with a JSON string ``body``
+        event: The invoke event (checked for ``accept_encoding``)
+
+    Returns:
+        The original response, or an envelope with ``body_encoding`` set
+    """
+    accepted = event.get('accept_encoding') if isinstance(event, dict) else None
+    body = response.get('body')
+    if not accepted or not isinstance(body, str):
+        return response
+
+    raw = body.encode('utf-8')
+    if len(raw) < int(os.environ.get('PAYLOAD_COMPRESS_MIN_BYTES', '4096')):
+        return response
+
+    encoding = next((name for name in SUPPORTED_ENCODINGS if name in accepted), None)
+    if not encoding:
+        return response
+
+    compressed = compress(raw, encoding)
+    envelope = {key: value for key, value in response.items() if key != 'body'}
+    envelope['body_encoding'] = encoding
+
+    if len(compressed) * 4 // 3 > int(os.environ.get('PAYLOAD_SPILL_MIN_BYTES', str(5 * 1024 * 1024))):
+        ref = store_payload(compressed)
+        if ref:
+            envelope['body_ref'] = ref
+            logger.info(f"Spilled {len(compressed)} byte {encoding} body to {ref}")
+            return envelope
+        logger.warning("Response exceeds the spill threshold but no spill location is configured")
+
+    envelope['body'] = base64.b64encode(compressed).decode('ascii')
+    logger.info(f"Compressed response body {len(raw)} -> {len(compressed)} bytes ({encoding})")
+    return envelope
+
+
+def decode_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restore an agent response from an envelope.
+
+    Returns the payload with ``body`` as a parsed dictionary, for plain
+    responses too, so downstream readers never decode the JSON a second time.
+    """
+    if not isinstance(payload, dict):
+        return payload
+    if 'body_encoding' not in payload:
+        if isinstance(payload.get('body'), str):
+            try:
+                return {**payload, 'body': json.loads(payload['body'])}
+            except json.JSONDecodeError:
+                pass
+        return payload
+
+    encoding = payload['body_encoding']
+    if 'body_ref' in payload:
+        data = load_payload(payload['body_ref'])
+    else:
+        data = base64.b64decode(payload['body'])
+
+    decoded = {key: value for key, value in payload.items() if key not in ('body', 'body_ref', 'body_encoding')}
+    decoded['body'] = json.loads(decompress(data, encoding))
+    return decoded
@@ -0,0 +1,329 @@
+"""
+Token-budgeted tool outputs.
+
+Every tool result stays in the model's context for the rest of the agent
+loop, so a large account's six months of costs by service or a few hundred
+Trusted Advisor findings are re-sent on every turn. ``budget_output`` turns
+a tool's result into the text the model sees:
+
+- compact JSON: no indentation or spaces, None and empty strings dropped,
+  floats rounded to ``FLOAT_DIGITS``, datetimes as ISO strings
+- when that is still over ``TOOL_OUTPUT_MAX_CHARS``, every longer list and
+  map is cut to its first ``TOOL_OUTPUT_MAX_ITEMS`` entries, halving that
+  until the result fits (maps of numbers, such as costs by service, keep
+  their largest values). The rest
+  is summarized in place, ``{"_omitted": n, "_omitted_totals": {...}}`` for
+  lists and ``{"_other": {"count": n, "total": x}}`` for maps, so totals over
+  what is shown still add up
+- a ``_truncated`` section names the cut collections and a cursor for the
+  ``get_more_results`` tool, which returns the following pages
+
+Tools apply it with ``@budget_tool_output`` under ``@tool``; tools that
+build text cut their own lists with ``cut_entries``. Cut results are kept
+for ``get_more_results`` in a small per-container store under a random
+cursor.
+
+Environment flags:
+    TOOL_OUTPUT_MAX_CHARS  Budget per tool result in characters, about four per token (0: never cut)
+    TOOL_OUTPUT_MAX_ITEMS  Entries shown per cut list or map (default: 10)
+
+This file is shared verbatim by the agents.
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from strands import tool
+
+FLOAT_DIGITS = 4
+# Numeric fields that are not summed for omitted entries, by word of their name
+NOT_ADDITIVE = {'percent', 'percentage', 'pct', 'ratio', 'rate', 'utilization', 'average', 'avg', 'index',
+                'year', 'month', 'day', 'id'}
+MAX_STORED_RESULTS = 32
+
+_stored: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            item = _clean(item)
+            if item is not None and item != '':
+                cleaned[str(key)] = item
+        return cleaned
+    if isinstance(value, (list, tuple, set)):
+        return [_clean(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (float, Decimal)):
+        return round(float(value), FLOAT_DIGITS)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def compact_json(data: Any) -> str:
+    """JSON without indentation or spaces, with the cleanups above."""
+    return json.dumps(_clean(data), separators=(',', ':'), default=str)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _collections(value: Any, path: Tuple = ()) -> List[Tuple[Tuple, Any]]:
+    """Every list and map inside a result, with its path of keys and indexes."""
+    found = []
+    if isinstance(value, dict):
+        if path:
+            found.append((path, value))
+        for key, item in value.items():
+            found.extend(_collections(item, path + (key,)))
+    elif isinstance(value, list):
+        found.append((path, value))
+        for index, item in enumerate(value):
+            found.extend(_collections(item, path + (index,)))
+    return found
+
+
+def _ordered(collection: Any) -> List[Any]:
+    """A collection's entries in the order they are shown: maps of numbers largest first."""
+    if isinstance(collection, list):
+        return list(collection)
+    items = list(collection.items())
+    if items and all(_is_number(value) for _, value in items):
+        items.sort(key=lambda item: item[1], reverse=True)
+    return items
+
+
+def _additive(key: str) -> bool:
+    words = re.sub(r'([a-z])([A-Z])', r'\1_\2', key).lower().split('_')
+    return not NOT_ADDITIVE.intersection(words)
+
+
+def _summarize(omitted: List[Any], is_map: bool) -> Dict[str, Any]:
+    if is_map:
+        values = [value for _, value in omitted]
+        if all(_is_number(value) for value in values):
+            return {'_other': {'count': len(values), 'total': round(sum(values), FLOAT_DIGITS)}}
+        return {'_other': {'count': len(values)}}
+    totals: Dict[str, float] = {}
+    for item in omitted:
+        if _is_number(item):
+            totals['value'] = totals.get('value', 0) + item
+        elif isinstance(item, dict):
+            for key, value in item.items():
+                if _is_number(value) and _additive(key):
+                    totals[key] = totals.get(key, 0) + value
+    summary: Dict[str, Any] = {'_omitted': len(omitted)}
+    if totals:
+        summary['_omitted_totals'] = {key: round(value, FLOAT_DIGITS) for key, value in totals.items()}
+    return summary
+
+
+def _cut(collection: Any, limit: int) -> Any:
+    entries = _ordered(collection)
+    shown, omitted = entries[:limit], entries[limit:]
+    if isinstance(collection, list):
+        return shown + [_summarize(omitted, False)]
+    cut = dict(shown)
+    cut.update(_summarize(omitted, True))
+    return cut
+
+
+def _replace(value: Any, path: Tuple, replacement: Any) -> Any:
+    if not path:
+        return replacement
+    head, rest = path[0], path[1:]
+    if isinstance(value, dict):
+        copy = dict(value)
+    else:
+        copy = list(value)
+    copy[head] = _replace(value[head], rest, replacement)
+    return copy
+
+
+def _shown(view: Any, path: Tuple, cut_paths: List[Tuple], limit: int) -> bool:
+    """Whether a collection is still shown after the cuts made so far."""
+    value = view
+    for depth, part in enumerate(path):
+        if path[:depth] in cut_paths and isinstance(value, list) and part >= limit:
+            return False
+        try:
+            value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return False
+    return True
+
+
+def _path_name(path: Tuple) -> str:
+    return '/' + '/'.join(str(part) for part in path)
+
+
+def _limits() -> Tuple[int, int]:
+    return (int(os.environ.get('TOOL_OUTPUT_MAX_CHARS', '12000')),
+            max(1, int(os.environ.get('TOOL_OUTPUT_MAX_ITEMS', '10'))))
+
+
+def budget_output(data: Any, tool_name: str, max_chars: Optional[int] = None,
+                  max_items: Optional[int] = None) -> str:
+    """
+    Serialize a tool result within the output budget.
+
+    Args:
+        data: The tool's result (JSON-serializable, datetimes allowed)
+        tool_name: Name reported in the ``_truncated`` section
+        max_chars, max_items: Override ``TOOL_OUTPUT_MAX_CHARS`` and ``TOOL_OUTPUT_MAX_ITEMS``
+
+    Returns:
+        Compact JSON, cut to fit when needed
+    """
+    default_chars, default_items = _limits()
+    max_chars = default_chars if max_chars is None else max_chars
+    limit = default_items if max_items is None else max_items
+    cleaned = _clean(data)
+    text = json.dumps(cleaned, separators=(',', ':'), default=str)
+    if not max_chars or len(text) <= max_chars:
+        return text
+
+    # Cut every long collection alike, outermost first, halving the entries shown until it fits
+    candidates = sorted(_collections(cleaned), key=lambda found: len(found[0]))
+    while True:
+        view = cleaned
+        cut_paths = []
+        for path, collection in candidates:
+            if len(collection) <= limit + 1 or not _shown(view, path, cut_paths, limit):
+                continue
+            view = _replace(view, path, _cut(collection, limit))
+            cut_paths.append(path)
+        text = json.dumps(view, separators=(',', ':'), default=str)
+        if len(text) <= max_chars or limit == 1:
+            break
+        limit = max(1, limit // 2)
+    if not cut_paths:
+        return text
+
+    cursor = _store(tool_name, limit, {_path_name(path): _ordered(_lookup(cleaned, path)) for path in cut_paths})
+    truncated = {
+        'shown_per_list': limit,
+        'lists': {_path_name(path): len(_lookup(cleaned, path)) for path in cut_paths},
+        'cursor': cursor,
+        'hint': 'Totals above include the omitted entries; call get_more_results with this cursor for the rest'
+    }
+    if isinstance(view, dict):
+        view = dict(view, _truncated=truncated)
+    else:
+        view = {'items': view, '_truncated': truncated}
+    return json.dumps(view, separators=(',', ':'), default=str)
+
+
+def _store(tool_name: str, limit: int, collections: Dict[str, List[Any]]) -> str:
+    cursor = uuid.uuid4().hex[:12]
+    with _lock:
+        _stored[cursor] = {'tool': tool_name, 'limit': limit, 'collections': collections}
+        while len(_stored) > MAX_STORED_RESULTS:
+            _stored.popitem(last=False)
+    return cursor
+
+
+def cut_entries(entries: List[Any], tool_name: str, max_chars: Optional[int] = None,
+                max_items: Optional[int] = None) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+    """
+    The same budget for tools that build text from a list of entries.
+
+    Returns:
+        The entries to show and, when the rest were cut, ``{'omitted': n,
+        'cursor': ...}`` for the tool to mention; all entries when they fit
+    """
+    default_chars, default_items = _limits()
+    max_chars = default_chars if max_chars is None else max_chars
+    limit = default_items if max_items is None else max_items
+    if not max_chars or len(entries) <= limit + 1 or sum(len(str(entry)) for entry in entries) <= max_chars:
+        return entries, None
+    cursor = _store(tool_name, limit, {'/': list(entries)})
+    return entries[:limit], {'omitted': len(entries) - limit, 'cursor': cursor}
+
+
+def _lookup(value: Any, path: Tuple) -> Any:
+    for part in path:
+        value = value[part]
+    return value
+
+
+def more_results(cursor: str, page: int = 2, path: str = '') -> Dict[str, Any]:
+    """The entries of a cut result on one page (page 1 is what the tool showed)."""
+    with _lock:
+        stored = _stored.get(cursor)
+    if stored is None:
+        return {'error': f"Unknown or expired cursor {cursor}; call the original tool again"}
+    collections = stored['collections']
+    if path:
+        if path not in collections:
+            return {'error': f"No cut list {path}; choose one of {sorted(collections)}"}
+        collections = {path: collections[path]}
+    limit = stored['limit']
+    start = (max(page, 1) - 1) * limit
+    pages = max((len(entries) + limit - 1) // limit for entries in collections.values())
+    items = {}
+    for name, entries in collections.items():
+        shown = entries[start:start + limit]
+        if shown:
+            items[name] = dict(shown) if entries and isinstance(entries[0], tuple) else shown
+    return {'tool': stored['tool'], 'page': page, 'pages': pages, 'items': items,
+            **({'next_page': page + 1} if page < pages else {})}
+
+
+def budget_tool_output(function: Callable) -> Callable:
+    """
+    Pass a tool's result through ``budget_output``: dicts and lists, JSON
+    strings and ContentBlocks of JSON; other text is returned unchanged.
+    """
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return _budget_result(function(*args, **kwargs), name)
+
+    return wrapper
+
+
+def _budget_result(result: Any, tool_name: str) -> Any:
+    if isinstance(result, dict) and set(result) <= {'type', 'text'} and isinstance(result.get('text'), str):
+        return dict(result, text=_budget_result(result['text'], tool_name))
+    if isinstance(result, str):
+        if not result.lstrip().startswith(('{', '[')):
+            return result
+        try:
+            result = json.loads(result)
+        except ValueError:
+            return result
+    return budget_output(result, tool_name)
+
+
+@tool
+def get_more_results(cursor: str, page: int = 2, path: str = "") -> str:
+    """
+    Get more entries of a tool result that was cut to fit the context.
+
+    Use it when a result has a "_truncated" section and the omitted entries
+    matter for the answer (the totals already include them).
+
+    Args:
+        cursor: The cursor from the result's "_truncated" section
+        page: Page to return; page 1 is what the tool already showed
+        path: One of the "_truncated" lists to page through (default: all of them)
+
+    Returns:
+        The entries on that page for each cut list
+    """
+    return budget_output(more_results(cursor, page, path), 'get_more_results')
@@ -12,6 +12,9 @@ from typing import Dict, Any, List, Optional
 from strands import tool
 from strands.types.content import ContentBlock
 
+from tool_memo import memoize_tool
+from tool_output import budget_tool_output
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -28,10 +31,10 @@ except Exception:
     use_new_api = False
 
 
-@tool
-def get_trusted_advisor_recommendations() -> ContentBlock:
+@memoize_tool
+def fetch_recommendations() -> ContentBlock:
     """
-    Get all cost optimization recommendations from AWS Trusted Advisor.
+    Fetch all cost optimization recommendations from AWS Trusted Advisor.
     
     This tool retrieves comprehensive cost optimization findings including:
     - Underutilized resources
@@ -220,6 +223,29 @@ def get_trusted_advisor_recommendations() -> ContentBlock:
 
 
 @tool
+@memoize_tool
+@budget_tool_output
+def get_trusted_advisor_recommendations() -> ContentBlock:
+    """
+    Get all cost optimization recommendations from AWS Trusted Advisor.
+    
+    This tool retrieves comprehensive cost optimization findings including:
+    - Underutilized resources
+    - Idle or unused resources  
+    - Reserved Instance opportunities
+    - Over-provisioned resources
+    
+    Returns:
+        ContentBlock with structured cost optimization data including total potential 
+        monthly savings, detailed recommendations, and affected resources; the
+        largest lists are cut to fit the context (see get_more_results).
+    """
+    return fetch_recommendations()
+
+
+@tool
+@memoize_tool
+@budget_tool_output
 def get_recommendation_details(recommendation_identifier: str) -> ContentBlock:
     """
     Get detailed information for a specific Trusted Advisor recommendation.
@@ -298,6 +324,8 @@ def get_recommendation_details(recommendation_identifier: str) -> ContentBlock:
 
 
 @tool
+@memoize_tool
+@budget_tool_output
 def get_cost_optimization_summary() -> ContentBlock:
     """
     Get a high-level summary of cost optimization opportunities from Trusted Advisor.
@@ -308,8 +336,8 @@ def get_cost_optimization_summary() -> ContentBlock:
     """
     try:
         # Get all recommendations first
-        recommendations_result = get_trusted_advisor_recommendations()
-        recommendations_data = json.loads(recommendations_result.text)
+        recommendations_result = fetch_recommendations()
+        recommendations_data = json.loads(recommendations_result['text'])
         
         if 'error' in recommendations_data:
             return recommendations_result
@@ -4,7 +4,9 @@ import os
 import uuid
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from botocore.exceptions import ClientError
+from websocket_frames import post_message
 
 # Configure logging
 logger = logging.getLogger()
@@ -18,6 +20,17 @@ apigateway_management = boto3.client('apigatewaymanagementapi',
 
 jobs_table = dynamodb.Table(os.environ.get('JOBS_TABLE', 'finops-websocket-jobs'))
 connections_table = dynamodb.Table(os.environ.get('CONNECTIONS_TABLE', 'finops-websocket-connections'))
+job_events_table = dynamodb.Table(os.environ.get('JOB_EVENTS_TABLE', 'finops-websocket-job-events'))
+
+# S3 client for logged events stored by reference (CHECKPOINT_BUCKET)
+s3_client = None
+
+def get_s3_client():
+    """Get or create the S3 client used for oversize logged events."""
+    global s3_client
+    if s3_client is None:
+        s3_client = boto3.client('s3')
+    return s3_client
 
 def handler(event, context):
     """
@@ -53,6 +66,8 @@ def handle_websocket_message(event, context):
         
         if action == 'finops_query':
             return handle_finops_query_direct(connection_id, body, context)
+        elif action == 'resume':
+            return handle_resume(connection_id, body, event.get('requestContext', {}).get('authorizer'))
         else:
             return {'statusCode': 400, 'body': f'Unknown action: {action}'}
             
@@ -71,22 +86,28 @@ def handle_finops_query_direct(connection_id: str, body: Dict, context):
             send_error_to_client(connection_id, "Query is required")
             return {'statusCode': 400, 'body': 'Query is required'}
         
-        # Generate unique job ID
-        job_id = str(uuid.uuid4())
-        
-        # Store job in DynamoDB
-        jobs_table.put_item(
-            Item={
-                'jobId': job_id,
-                'connectionId': connection_id,
-                'userId': user_id,
-                'username': username,
-                'query': query,
-                'status': 'queued',
-                'createdAt': int(time.time()),
-                'ttl': int(time.time()) + 3600  # 1 hour TTL
-            }
-        )
+        # Deterministic job ID, so a double-submit maps to the job already queued
+        job_id = build_job_id(connection_id, user_id, query, body.get('requestId'))
+        
+        # Store job in DynamoDB unless this submission is a duplicate
+        try:
+            jobs_table.put_item(
+                Item={
+                    'jobId': job_id,
+                    'connectionId': connection_id,
+                    'userId': user_id,
+                    'username': username,
+                    'query': query,
+                    'status': 'queued',
+                    'createdAt': int(time.time()),
+                    'ttl': int(time.time()) + 3600  # 1 hour TTL
+                },
+                ConditionExpression='attribute_not_exists(jobId)'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return handle_duplicate_submission(connection_id, job_id, query)
         
         # Send acknowledgment to client
         send_message_to_client(connection_id, {
@@ -98,23 +119,7 @@ def handle_finops_query_direct(connection_id: str, body: Dict, context):
         })
         
         # Queue job for background processing
-        sqs.send_message(
-            QueueUrl=os.environ.get('PROCESSING_QUEUE_URL'),
-            MessageBody=json.dumps({
-                'jobId': job_id,
-                'connectionId': connection_id,
-                'userId': user_id,
-                'username': username,
-                'query': query,
-                'action': 'process_finops_query'
-            }),
-            MessageAttributes={
-                'jobType': {
-                    'StringValue': 'finops_query',
-                    'DataType': 'String'
-                }
-            }
-        )
+        enqueue_job(job_id, connection_id, user_id, username, query)
         
         logger.info(f"FinOps query queued: {job_id} for user: {username}")
         return {'statusCode': 200, 'body': 'Query queued'}
@@ -124,6 +129,155 @@ def handle_finops_query_direct(connection_id: str, body: Dict, context):
         send_error_to_client(connection_id, f"Query processing error: {str(e)}")
         return {'statusCode': 500, 'body': f'Error: {str(e)}'}
 
+def build_job_id(connection_id: str, user_id: str, query: str, request_id: str = None) -> str:
+    """
+    Job ID for a submission.
+    
+    Uses the client's requestId when sent; otherwise identical queries from
+    the same connection within JOB_DEDUP_WINDOW_SECONDS share an ID.
+    """
+    if not request_id:
+        window = int(os.environ.get('JOB_DEDUP_WINDOW_SECONDS', '60'))
+        request_id = str(int(time.time() // window))
+    key = f"{connection_id}|{user_id}|{' '.join(query.lower().split())}|{request_id}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"finops-job:{key}"))
+
+def enqueue_job(job_id: str, connection_id: str, user_id: str, username: str, query: str):
+    """Send a job to the processing queue."""
+    sqs.send_message(
+        QueueUrl=os.environ.get('PROCESSING_QUEUE_URL'),
+        MessageBody=json.dumps({
+            'jobId': job_id,
+            'connectionId': connection_id,
+            'userId': user_id,
+            'username': username,
+            'query': query,
+            'action': 'process_finops_query'
+        }),
+        MessageAttributes={
+            'jobType': {
+                'StringValue': 'finops_query',
+                'DataType': 'String'
+            }
+        }
+    )
+
+def handle_duplicate_submission(connection_id: str, job_id: str, query: str):
+    """
+    Acknowledge a double-submit without starting a second pipeline.
+    
+    A completed job is queued once more so the progress notifier replays its
+    stored result, and a failed one so it retries from its checkpoints; a
+    queued or running job keeps streaming to the client.
+    """
+    job = jobs_table.get_item(Key={'jobId': job_id}).get('Item') or {}
+    status = job.get('status', 'queued')
+    logger.info(f"Duplicate submission for job {job_id} (status: {status})")
+    
+    send_message_to_client(connection_id, {
+        'type': 'job_queued',
+        'jobId': job_id,
+        'message': 'This query is already being processed...',
+        'query': query,
+        'progress': 5,
+        'duplicate': True
+    })
+    if status in ('completed', 'failed'):
+        enqueue_job(job_id, connection_id, job.get('userId'), job.get('username'), query)
+    return {'statusCode': 200, 'body': 'Duplicate query'}
+
+def connection_user(connection_id: str, authorizer: Dict = None) -> Optional[str]:
+    """
+    The user a connection belongs to, never taken from the message body.
+    
+    That is the authorizer's user when the route has one, else the user the
+    connection authenticated as; None for a connection that has not.
+    """
+    authorizer = authorizer or {}
+    user_id = authorizer.get('userId') or authorizer.get('principalId')
+    if user_id:
+        return user_id
+    item = connections_table.get_item(Key={'connectionId': connection_id}, ConsistentRead=True).get('Item') or {}
+    user_id = item.get('userId')
+    return None if user_id in (None, 'pending') else user_id
+
+def handle_resume(connection_id: str, body: Dict, authorizer: Dict = None):
+    """
+    Attach a reconnected client to a job and replay the events it missed.
+    
+    Only the job's own user may resume it, as identified by the connection
+    (see connection_user). The job is moved to the new connection before its
+    event log is read, so an event appended concurrently is either in the
+    replay or delivered live by the progress notifier. Clients ignore events
+    whose seq they have seen.
+    """
+    try:
+        job_id = body.get('jobId')
+        from_seq = int(body.get('fromSeq', 0))
+        if not job_id:
+            send_error_to_client(connection_id, "jobId is required to resume")
+            return {'statusCode': 400, 'body': 'jobId is required'}
+        
+        job = jobs_table.get_item(Key={'jobId': job_id}).get('Item')
+        user_id = connection_user(connection_id, authorizer)
+        if not job or user_id is None or job.get('userId', 'anonymous') != user_id:
+            # Same answer for another user's job as for a missing one
+            send_error_to_client(connection_id, f"Job {job_id} not found or expired")
+            return {'statusCode': 404, 'body': 'Job not found'}
+        
+        jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET connectionId = :connection, updatedAt = :timestamp',
+            ExpressionAttributeValues={':connection': connection_id, ':timestamp': int(time.time())}
+        )
+        
+        replayed = 0
+        for event in load_job_events(job_id, from_seq):
+            send_message_to_client(connection_id, dict(event, replayed=True))
+            replayed += 1
+        
+        send_message_to_client(connection_id, {
+            'type': 'job_resumed',
+            'jobId': job_id,
+            'fromSeq': from_seq,
+            'replayedEvents': replayed,
+            'status': job.get('status', 'queued')
+        })
+        logger.info(f"Resumed job {job_id} on connection {connection_id}: {replayed} event(s) after seq {from_seq}")
+        return {'statusCode': 200, 'body': 'Job resumed'}
+        
+    except Exception as e:
+        logger.error(f"Error resuming job: {str(e)}")
+        send_error_to_client(connection_id, f"Resume error: {str(e)}")
+        return {'statusCode': 500, 'body': f'Error: {str(e)}'}
+
+def load_job_events(job_id: str, from_seq: int) -> List[Dict[str, Any]]:
+    """Logged client messages of a job with seq greater than from_seq, in order."""
+    events = []
+    query = {
+        'KeyConditionExpression': 'jobId = :job AND #seq > :from',
+        'ExpressionAttributeNames': {'#seq': 'seq'},
+        'ExpressionAttributeValues': {':job': job_id, ':from': from_seq}
+    }
+    while True:
+        response = job_events_table.query(**query)
+        for item in response.get('Items', []):
+            if 'event' not in item:
+                logger.warning(f"Event {item['seq']} of job {job_id} was too large to log; skipping")
+                continue
+            events.append(load_event_payload(item['event']))
+        if 'LastEvaluatedKey' not in response:
+            return events
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def load_event_payload(stored: str) -> Dict[str, Any]:
+    """Load an event written by the progress notifier (inline, or an S3 reference)."""
+    stored = json.loads(stored)
+    if 'ref' in stored:
+        bucket, _, key = stored['ref'][len('s3://'):].partition('/')
+        return json.loads(get_s3_client().get_object(Bucket=bucket, Key=key)['Body'].read())
+    return stored['result']
+
 def process_message(message: Dict[str, Any], context):
     """Process individual WebSocket message from SQS."""
     try:
@@ -155,10 +309,7 @@ def handle_finops_query(connection_id: str, user_id: str, query: str, context):
 def send_message_to_client(connection_id: str, message: Dict[str, Any]):
     """Send message to WebSocket client."""
     try:
-        apigateway_management.post_to_connection(
-            ConnectionId=connection_id,
-            Data=json.dumps(message)
-        )
+        post_message(apigateway_management, connection_id, message)
         logger.info(f"Message sent to connection: {connection_id}")
         
     except apigateway_management.exceptions.GoneException:
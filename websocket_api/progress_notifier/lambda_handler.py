@@ -2,8 +2,14 @@ import json
 import boto3
 import os
 import time
+import uuid
 import logging
-from typing import Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from botocore.exceptions import ClientError
+from websocket_frames import post_message
+from precomputed_reports import lookup_precomputed, render_precomputed
 
 # Configure logging
 logger = logging.getLogger()
@@ -16,36 +22,143 @@ apigateway_management = boto3.client('apigatewaymanagementapi',
                                    endpoint_url=os.environ.get('WEBSOCKET_ENDPOINT'))
 
 jobs_table = dynamodb.Table(os.environ.get('JOBS_TABLE', 'finops-websocket-jobs'))
+job_events_table = dynamodb.Table(os.environ.get('JOB_EVENTS_TABLE', 'finops-websocket-job-events'))
+
+# Completed agent results are checkpointed on the job item under this attribute prefix
+CHECKPOINT_PREFIX = 'checkpoint_'
+
+# DynamoDB's item size limit, shared by a job's checkpoints and final result
+JOB_ITEM_MAX_BYTES = 400 * 1024
+# Kept free on the job item for its status, message and lease attributes
+JOB_ITEM_RESERVED_BYTES = 4096
+
+class JobInProgressError(Exception):
+    """Another invocation holds a live lease on the job; SQS should redeliver later."""
+
+class JobEventLog:
+    """
+    Sequenced client messages for one run of a job.
+    
+    Each message gets the next ``seq``, is appended to the job event log and
+    is then sent to the job's connection. When that connection is gone the
+    job item is re-read, because a ``resume`` from a reconnected client moves
+    the job to the new connection.
+    """
+    
+    def __init__(self, job_id: str, connection_id: str):
+        self.job_id = job_id
+        self.connection_id = connection_id
+        self.next_seq = last_job_event_seq(job_id) + 1
+        self.lock = threading.Lock()
+    
+    def publish(self, message: Dict[str, Any]):
+        # Held across the send so a client sees events in sequence order
+        with self.lock:
+            message = dict(message, seq=self.next_seq)
+            self.next_seq += 1
+            append_job_event(self.job_id, message)
+            if deliver_message(self.connection_id, message):
+                return
+            current = current_job_connection(self.job_id)
+            if current and current != self.connection_id:
+                logger.info(f"Job {self.job_id} moved to connection {current}")
+                self.connection_id = current
+                deliver_message(current, message)
+
+# Event logs of the jobs this container is processing, by job ID
+event_logs: Dict[str, JobEventLog] = {}
+event_logs_lock = threading.Lock()
+
+# S3 client for checkpoints too large for the job item
+s3_client = None
+
+def get_s3_client():
+    """Get or create the S3 client used for oversize checkpoints."""
+    global s3_client
+    if s3_client is None:
+        s3_client = boto3.client('s3')
+    return s3_client
 
 def handler(event, context):
     """
     Background Processor for FinOps Queries
     Processes long-running jobs via Supervisor Agent and sends real-time updates via WebSocket
+
+    Records in a batch run concurrently, up to SQS_RECORD_CONCURRENCY at a
+    time. Failed records are returned as batchItemFailures so SQS redelivers
+    only those messages; the event source mapping must enable
+    ReportBatchItemFailures.
+    """
+    records = event.get('Records', [])
+    logger.info(f"Received event with {len(records)} record(s): {json.dumps(event)}")
+
+    max_workers = min(int(os.environ.get('SQS_RECORD_CONCURRENCY', '4')), len(records))
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(lambda record: process_record(record, context), records))
+    else:
+        outcomes = [process_record(record, context) for record in records]
+
+    failures = [{'itemIdentifier': record['messageId']}
+                for record, succeeded in zip(records, outcomes) if not succeeded]
+    if failures:
+        logger.warning(f"{len(failures)} of {len(records)} record(s) failed and will be retried")
+    return {'batchItemFailures': failures}
+
+def process_record(record: Dict[str, Any], context) -> bool:
+    """
+    Process one SQS record, returning False if the message should be retried.
+    
+    That covers malformed records, jobs leased elsewhere and jobs that
+    failed, which process_job re-raises after marking them failed.
     """
+    message_id = record.get('messageId')
     try:
-        logger.info(f"Received event: {json.dumps(event)}")
-        
-        # Process SQS messages
-        for record in event.get('Records', []):
-            message_body = json.loads(record['body'])
-            process_job(message_body, context)
-            
-        return {'statusCode': 200}
-        
+        process_job(json.loads(record['body']), context)
+        return True
+    except JobInProgressError as e:
+        # Retried after the visibility timeout, by which time the running job
+        # has completed (replay) or its lease has expired
+        logger.info(f"Job {str(e)} is in progress elsewhere; message {message_id} will be retried")
     except Exception as e:
-        logger.error(f"Error in background processor: {str(e)}")
-        return {'statusCode': 500, 'body': f'Error: {str(e)}'}
+        logger.error(f"Error processing message {message_id}: {str(e)}")
+    return False
 
 def process_job(job_data: Dict[str, Any], context):
-    """Process individual FinOps job using Supervisor Agent with streaming."""
+    """
+    Process individual FinOps job using Supervisor Agent with streaming.
+    
+    The job is claimed with a conditional write before any agent runs. A
+    redelivered job that already completed replays its stored result, and one
+    still leased by another invocation raises JobInProgressError. A job that
+    fails is marked failed and the error re-raised, so SQS redelivers it.
+    """
+    job_id = job_data.get('jobId')
+    connection_id = job_data.get('connectionId')
+    user_id = job_data.get('userId')
+    query = job_data.get('query')
+    
+    owner = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+    state, item = claim_job(job_id, owner)
+    if state == 'completed':
+        logger.info(f"Job {job_id} already completed; replaying stored result")
+        replay_completed_job(connection_id, job_id, query, item)
+        return
+    if state == 'in_progress':
+        logger.info(f"Job {job_id} is leased by {item.get('leaseOwner')} until {item.get('leaseExpiresAt')}")
+        raise JobInProgressError(job_id)
+    
+    stop_heartbeat = start_lease_heartbeat(job_id, owner)
+    # A client that resumed while the job was queued has moved it to a new connection
+    open_job_event_log(job_id, item.get('connectionId') or connection_id)
     try:
-        job_id = job_data.get('jobId')
-        connection_id = job_data.get('connectionId')
-        user_id = job_data.get('userId')
-        query = job_data.get('query')
-        
         logger.info(f"Processing job: {job_id} for user: {user_id}")
         
+        # Results from an earlier delivery of this job are reused instead of re-running those agents
+        checkpoints = load_agent_checkpoints(job_id)
+        if checkpoints:
+            logger.info(f"Resuming job {job_id} with checkpointed results for: {sorted(checkpoints)}")
+        
         # Update job status to processing
         update_job_status(job_id, 'processing', 'Starting FinOps analysis...')
         send_progress_update(connection_id, job_id, 'processing', 'Starting FinOps analysis...', 10)
@@ -54,27 +167,233 @@ def process_job(job_data: Dict[str, Any], context):
         send_progress_update(connection_id, job_id, 'processing', 'Analyzing query and routing to appropriate agents...', 20)
         
         # Use streaming supervisor invocation
-        final_result = invoke_supervisor_agent_streaming(query, connection_id, job_id)
+        final_result = invoke_supervisor_agent_streaming(query, connection_id, job_id, checkpoints)
+        if 'error' in final_result:
+            # Not stored as completed: a redelivery retries from the checkpoints instead of replaying the error
+            raise RuntimeError(final_result['error'])
         
-        # Step 2: Send Final Result
-        update_job_status(job_id, 'completed', 'Analysis completed successfully')
+        # Step 2: Store and Send Final Result
+        complete_job(job_id, final_result, owner)
         send_final_result(connection_id, job_id, final_result)
         
         logger.info(f"Job completed successfully: {job_id}")
         
+    except JobInProgressError:
+        # The lease expired and another invocation reclaimed the job; it answers the client
+        logger.warning(f"Job {job_id} was reclaimed before it could be completed")
+        raise
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {str(e)}")
-        update_job_status(job_id, 'failed', f'Job failed: {str(e)}')
+        fail_job(job_id, owner, f'Job failed: {str(e)}')
         send_error_result(connection_id, job_id, str(e))
+        # The record is retried, resuming from the agents checkpointed so far
+        raise
+    finally:
+        close_job_event_log(job_id)
+        stop_heartbeat.set()
+
+def claim_job(job_id: str, owner: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Claim a job with a conditional write on its status and lease.
+    
+    A job can be claimed when it is new, queued or failed, or when it is
+    processing under an expired lease (the previous invocation died).
+    
+    Returns:
+        Tuple of ('claimed' | 'completed' | 'in_progress', job item)
+    """
+    if not job_id:
+        return 'claimed', {}
+    now = int(time.time())
+    try:
+        response = jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET #status = :processing, leaseOwner = :owner, leaseExpiresAt = :expires, updatedAt = :now',
+            ConditionExpression=(
+                'attribute_not_exists(#status) OR NOT (#status IN (:processing, :completed)) '
+                'OR (#status = :processing AND leaseExpiresAt < :now)'
+            ),
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':processing': 'processing',
+                ':completed': 'completed',
+                ':owner': owner,
+                ':expires': now + int(os.environ.get('JOB_LEASE_SECONDS', '60')),
+                ':now': now
+            },
+            ReturnValues='ALL_NEW'
+        )
+        return 'claimed', response.get('Attributes', {})
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    
+    item = jobs_table.get_item(Key={'jobId': job_id}, ConsistentRead=True).get('Item') or {}
+    return ('completed' if item.get('status') == 'completed' else 'in_progress'), item
+
+def extend_lease(job_id: str, owner: str) -> bool:
+    """Push the lease expiry forward while this invocation still owns the job."""
+    try:
+        jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET leaseExpiresAt = :expires',
+            ConditionExpression='leaseOwner = :owner AND #status = :processing',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':owner': owner,
+                ':processing': 'processing',
+                ':expires': int(time.time()) + int(os.environ.get('JOB_LEASE_SECONDS', '60'))
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.warning(f"Lost lease on job {job_id}")
+        else:
+            logger.error(f"Error extending lease on job {job_id}: {str(e)}")
+        return False
+
+def start_lease_heartbeat(job_id: str, owner: str) -> threading.Event:
+    """
+    Extend the job lease every third of JOB_LEASE_SECONDS until the returned event is set.
+    
+    The lease stays short so a job whose invocation dies is reclaimable soon
+    after, while a long job keeps its claim.
+    """
+    stopped = threading.Event()
+    if not job_id:
+        return stopped
+    interval = int(os.environ.get('JOB_LEASE_SECONDS', '60')) / 3
+    
+    def heartbeat():
+        while not stopped.wait(interval):
+            if not extend_lease(job_id, owner):
+                return
+    
+    threading.Thread(target=heartbeat, name=f"lease-{job_id}", daemon=True).start()
+    return stopped
+
+def complete_job(job_id: str, result: Dict[str, Any], owner: str):
+    """
+    Mark a job completed and store its final result for replay on redelivery.
+    
+    The write is conditional on this invocation still owning the lease, like
+    fail_job. Errors are raised rather than logged, so the job is marked
+    failed and its record retried instead of staying leased while SQS drops it.
+    
+    Raises:
+        JobInProgressError: If another invocation has reclaimed the job
+    """
+    if not job_id:
+        return
+    stored = serialize_job_payload(job_id, 'final-result', result, job_item_bytes(job_id, 'finalResult'))
+    update_expression = 'SET #status = :status, #message = :message, updatedAt = :timestamp'
+    values = {
+        ':status': 'completed',
+        ':message': 'Analysis completed successfully',
+        ':owner': owner,
+        ':timestamp': int(time.time())
+    }
+    if stored:
+        update_expression += ', finalResult = :result'
+        values[':result'] = stored
+    try:
+        jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression=update_expression,
+            ConditionExpression='leaseOwner = :owner',
+            ExpressionAttributeNames={'#status': 'status', '#message': 'message'},
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise JobInProgressError(job_id)
+        raise
+
+def fail_job(job_id: str, owner: str, message: str):
+    """
+    Mark a job failed and release its lease, so the next delivery claims it at once.
+    
+    No final result is stored. The write is conditional on this invocation
+    still owning the lease, so it never overwrites a job another invocation
+    has reclaimed.
+    """
+    if not job_id:
+        return
+    try:
+        jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET #status = :failed, #message = :message, updatedAt = :timestamp '
+                             'REMOVE leaseOwner, leaseExpiresAt, finalResult',
+            ConditionExpression='leaseOwner = :owner',
+            ExpressionAttributeNames={'#status': 'status', '#message': 'message'},
+            ExpressionAttributeValues={
+                ':failed': 'failed',
+                ':message': message,
+                ':owner': owner,
+                ':timestamp': int(time.time())
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.warning(f"Job {job_id} was reclaimed before it could be marked failed")
+        else:
+            logger.error(f"Error marking job {job_id} failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error marking job {job_id} failed: {str(e)}")
+
+def replay_completed_job(connection_id: str, job_id: str, query: str, item: Dict[str, Any]):
+    """Send a completed job's stored result again without invoking any agent."""
+    if item.get('finalResult'):
+        try:
+            send_final_result(connection_id, job_id, deserialize_job_payload(item['finalResult']), replayed=True)
+            return
+        except Exception as e:
+            logger.error(f"Error loading stored result for job {job_id}: {str(e)}")
+    
+    # No stored result (too large to keep): rebuild it from the agent checkpoints
+    final_result = invoke_supervisor_agent_streaming(query, connection_id, job_id, load_agent_checkpoints(job_id))
+    send_final_result(connection_id, job_id, final_result, replayed=True)
 
-def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: str) -> Dict[str, Any]:
-    """Invoke the Supervisor Agent with streaming support by calling individual agents."""
+def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: str,
+                                      checkpoints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Invoke the Supervisor Agent with streaming support by calling individual agents.
+    
+    Agents with a result in ``checkpoints`` are not invoked again; each newly
+    completed agent result is checkpointed as soon as it arrives.
+    """
     try:
         logger.info(f"Starting streaming supervisor analysis for query: {query}")
         
         # Step 1: Get routing decision from supervisor agent (fast routing only)
         send_progress_update(connection_id, job_id, 'processing', 'Determining optimal agent routing...', 30)
         
+        # Standard reports are answered from the supervisor's scheduled precompute run while fresh
+        precomputed = lookup_precomputed(query)
+        if precomputed:
+            record, freshness = precomputed
+            logger.info(f"Answering from precomputed report {record['report_id']} ({freshness['age_seconds']}s old)")
+            final_response = render_precomputed(record, freshness)
+            send_websocket_message(connection_id, {
+                'type': 'analysis_completed',
+                'jobId': job_id,
+                'final_response': final_response,
+                'total_agents': len(record['agents']),
+                'completed_agents': len(record['agents']),
+                'processing_time': 'Served from precomputed report',
+                'precomputed': freshness
+            })
+            return {
+                "query": query,
+                "response": final_response,
+                "agent": "AWS-FinOps-WebSocket-Supervisor-Precomputed",
+                "timestamp": int(time.time()),
+                "agents_invoked": record['agents'],
+                "source": "precomputed_report",
+                "precomputed": freshness
+            }
+        
         # Simple routing logic (can be enhanced later)
         agents_to_invoke = determine_agents_for_query(query)
         logger.info(f"Routing decision: {agents_to_invoke}")
@@ -88,18 +407,34 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
             'estimatedTime': f"{len(agents_to_invoke) * 2}-{len(agents_to_invoke) * 5} seconds"
         })
         
-        # Step 2: Invoke agents in parallel and stream results
+        # Step 2: Replay checkpointed results, then invoke the remaining agents in parallel and stream results
         agent_results = {}
         completed_agents = []
         
-        if len(agents_to_invoke) > 1:
+        for agent in agents_to_invoke:
+            if agent in (checkpoints or {}):
+                agent_results[agent] = checkpoints[agent]
+                completed_agents.append(agent)
+                send_websocket_message(connection_id, {
+                    'type': 'agent_completed',
+                    'jobId': job_id,
+                    'agent': agent,
+                    'result': format_individual_agent_result(agent, checkpoints[agent]),
+                    'progress': int((len(completed_agents) / len(agents_to_invoke)) * 70) + 30,
+                    'completed_agents': list(completed_agents),
+                    'total_agents': len(agents_to_invoke),
+                    'resumed': True
+                })
+        pending_agents = [agent for agent in agents_to_invoke if agent not in agent_results]
+        
+        if len(pending_agents) > 1:
             # Parallel invocation for multiple agents
             import concurrent.futures
             
             with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
                 # Submit agent tasks
                 agent_futures = {}
-                for agent in agents_to_invoke:
+                for agent in pending_agents:
                     if agent == 'cost_forecast':
                         agent_futures[agent] = executor.submit(invoke_cost_forecast_agent, query)
                     elif agent == 'trusted_advisor':
@@ -108,7 +443,7 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
                         agent_futures[agent] = executor.submit(invoke_budget_management_agent, query)
                 
                 # Process results as they complete
-                completed_count = 0
+                completed_count = len(completed_agents)
                 for future in concurrent.futures.as_completed(agent_futures.values(), timeout=60):  # Increased timeout
                     # Find which agent completed
                     completed_agent = None
@@ -121,6 +456,7 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
                         try:
                             result = future.result(timeout=10)  # Individual agent timeout
                             agent_results[completed_agent] = result
+                            checkpoint_agent_result(job_id, completed_agent, result)
                             completed_agents.append(completed_agent)
                             completed_count += 1
                             
@@ -161,6 +497,7 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
                             # Try to get result with short timeout
                             result = future.result(timeout=1)
                             agent_results[agent_name] = result
+                            checkpoint_agent_result(job_id, agent_name, result)
                             completed_agents.append(agent_name)
                         except:
                             # Agent didn't complete in time
@@ -179,9 +516,9 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
                                 'completed_agents': completed_agents,
                                 'total_agents': len(agents_to_invoke)
                             })
-        else:
+        elif pending_agents:
             # Single agent invocation
-            agent = agents_to_invoke[0]
+            agent = pending_agents[0]
             send_progress_update(connection_id, job_id, 'processing', f'Processing {agent} analysis...', 50)
             
             if agent == 'cost_forecast':
@@ -195,6 +532,7 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
             
             agent_results[agent] = result
             completed_agents.append(agent)
+            checkpoint_agent_result(job_id, agent, result)
             
             # Stream single result
             formatted_result = format_individual_agent_result(agent, result)
@@ -205,7 +543,7 @@ def invoke_supervisor_agent_streaming(query: str, connection_id: str, job_id: st
                 'result': formatted_result,
                 'progress': 90,
                 'completed_agents': completed_agents,
-                'total_agents': 1
+                'total_agents': len(agents_to_invoke)
             })
         
         # Step 3: Build final combined response
@@ -385,32 +723,8 @@ def build_combined_response_streaming(agents: list, results: Dict[str, Any], que
     return combined_response
 
 def send_websocket_message(connection_id: str, message: Dict[str, Any]):
-    """Send a message via WebSocket."""
-    try:
-        apigateway_management.post_to_connection(
-            ConnectionId=connection_id,
-            Data=json.dumps(message)
-        )
-        logger.info(f"Sent streaming message: {message.get('type', 'unknown')}")
-    except Exception as e:
-        logger.error(f"Failed to send streaming message: {str(e)}")
-    """Invoke the Supervisor Agent for intelligent routing."""
-    try:
-        logger.info(f"Invoking Supervisor Agent with query: {query}")
-        
-        response = lambda_client.invoke(
-            FunctionName='AWS-FinOps-Agent',  # Supervisor Agent function name
-            InvocationType='RequestResponse',
-            Payload=json.dumps({"query": query})
-        )
-        
-        payload = json.loads(response['Payload'].read())
-        logger.info(f"Supervisor Agent response: {payload}")
-        return payload
-        
-    except Exception as e:
-        logger.error(f"Error invoking Supervisor Agent: {str(e)}")
-        return {"error": f"Supervisor Agent failed: {str(e)}"}
+    """Send a streaming message via WebSocket."""
+    send_message_to_client(connection_id, message)
 
 def process_supervisor_result(supervisor_result: Dict, query: str) -> Dict[str, Any]:
     """Process the Supervisor Agent result."""
@@ -511,6 +825,153 @@ def extract_routing_info(response_text: str) -> Dict[str, Any]:
         logger.error(f"Error extracting routing info: {str(e)}")
         return {"routed_to": "error", "agent_used": "Error extracting routing info"}
 
+def is_successful_result(result: Dict[str, Any]) -> bool:
+    """Whether an agent result is worth keeping (errors are retried on the next delivery)."""
+    return isinstance(result, dict) and not result.get('error') and result.get('statusCode', 200) < 400
+
+def serialize_job_payload(job_id: str, name: str, value: Dict[str, Any], item_bytes: int = 0) -> Optional[str]:
+    """
+    Serialize a result for storage on the job item.
+    
+    Values larger than CHECKPOINT_INLINE_MAX_BYTES, or than the room left on
+    an item already ``item_bytes`` large, go to CHECKPOINT_BUCKET and the
+    item keeps a reference; without a bucket they are not stored (None).
+    """
+    stored = json.dumps({'result': value}, default=str)
+    room = JOB_ITEM_MAX_BYTES - JOB_ITEM_RESERVED_BYTES - item_bytes
+    if len(stored.encode('utf-8')) <= min(int(os.environ.get('CHECKPOINT_INLINE_MAX_BYTES', '350000')), room):
+        return stored
+    bucket = os.environ.get('CHECKPOINT_BUCKET')
+    if not bucket:
+        logger.warning(f"{name} is too large to store on job {job_id} and no CHECKPOINT_BUCKET is set")
+        return None
+    key = f"job-checkpoints/{job_id}/{name}.json"
+    get_s3_client().put_object(Bucket=bucket, Key=key, Body=json.dumps(value, default=str).encode('utf-8'))
+    return json.dumps({'ref': f"s3://{bucket}/{key}"})
+
+def deserialize_job_payload(stored: str) -> Dict[str, Any]:
+    """Load a value written by serialize_job_payload."""
+    stored = json.loads(stored)
+    if 'ref' in stored:
+        bucket, _, key = stored['ref'][len('s3://'):].partition('/')
+        return json.loads(get_s3_client().get_object(Bucket=bucket, Key=key)['Body'].read())
+    return stored['result']
+
+def job_item_bytes(job_id: str, replacing: str) -> int:
+    """
+    Size of the job item as DynamoDB counts it (attribute names plus values),
+    without the attribute about to be replaced.
+    """
+    item = jobs_table.get_item(Key={'jobId': job_id}, ConsistentRead=True).get('Item') or {}
+    return sum(len(str(name).encode('utf-8')) + len(str(value).encode('utf-8'))
+               for name, value in item.items() if name != replacing)
+
+def checkpoint_agent_result(job_id: str, agent: str, result: Dict[str, Any]) -> bool:
+    """Store a completed agent result on the job item, or by reference when the item has no room."""
+    if not job_id or not is_successful_result(result):
+        return False
+    attribute = f"{CHECKPOINT_PREFIX}{agent}"
+    try:
+        stored = serialize_job_payload(job_id, agent, result, job_item_bytes(job_id, attribute))
+        if not stored:
+            return False
+        
+        jobs_table.update_item(
+            Key={'jobId': job_id},
+            UpdateExpression='SET #checkpoint = :checkpoint, updatedAt = :timestamp',
+            ExpressionAttributeNames={'#checkpoint': attribute},
+            ExpressionAttributeValues={
+                ':checkpoint': stored,
+                ':timestamp': int(time.time())
+            }
+        )
+        logger.info(f"Checkpointed {agent} result for job {job_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error checkpointing {agent} result for job {job_id}: {str(e)}")
+        return False
+
+def load_agent_checkpoints(job_id: str) -> Dict[str, Any]:
+    """Load the agent results checkpointed by earlier deliveries of a job."""
+    if not job_id:
+        return {}
+    try:
+        item = jobs_table.get_item(Key={'jobId': job_id}).get('Item') or {}
+        checkpoints = {}
+        for attribute, value in item.items():
+            if attribute.startswith(CHECKPOINT_PREFIX):
+                checkpoints[attribute[len(CHECKPOINT_PREFIX):]] = deserialize_job_payload(value)
+        return checkpoints
+    except Exception as e:
+        # Without checkpoints the job simply runs every agent again
+        logger.error(f"Error loading checkpoints for job {job_id}: {str(e)}")
+        return {}
+
+def open_job_event_log(job_id: str, connection_id: str) -> Optional[JobEventLog]:
+    """Route the job's client messages through its event log until close_job_event_log."""
+    if not job_id:
+        return None
+    event_log = JobEventLog(job_id, connection_id)
+    with event_logs_lock:
+        event_logs[job_id] = event_log
+    return event_log
+
+def close_job_event_log(job_id: str):
+    with event_logs_lock:
+        event_logs.pop(job_id, None)
+
+def last_job_event_seq(job_id: str) -> int:
+    """Highest sequence number in a job's event log (0 when empty), so a redelivery continues it."""
+    try:
+        response = job_events_table.query(
+            KeyConditionExpression='jobId = :job',
+            ExpressionAttributeValues={':job': job_id},
+            ProjectionExpression='#seq',
+            ExpressionAttributeNames={'#seq': 'seq'},
+            ScanIndexForward=False,
+            Limit=1
+        )
+        items = response.get('Items', [])
+        return int(items[0]['seq']) if items else 0
+    except Exception as e:
+        logger.error(f"Error reading event log for job {job_id}: {str(e)}")
+        return 0
+
+def append_job_event(job_id: str, message: Dict[str, Any]) -> bool:
+    """Append a sequenced client message to the job event log."""
+    try:
+        seq = message['seq']
+        item = {
+            'jobId': job_id,
+            'seq': seq,
+            'type': message.get('type', 'unknown'),
+            'createdAt': int(time.time()),
+            'ttl': int(time.time()) + int(os.environ.get('JOB_EVENT_TTL_SECONDS', '3600'))
+        }
+        # Oversize events without a CHECKPOINT_BUCKET keep their slot but no body
+        stored = serialize_job_payload(job_id, f"event_{seq}", message)
+        if stored:
+            item['event'] = stored
+        job_events_table.put_item(Item=item)
+        return True
+    except Exception as e:
+        # Live delivery continues; only a later resume would miss this event
+        logger.error(f"Error appending event to log for job {job_id}: {str(e)}")
+        return False
+
+def current_job_connection(job_id: str) -> Optional[str]:
+    """The connection a job's messages should go to, as last set by submit or resume."""
+    try:
+        item = jobs_table.get_item(
+            Key={'jobId': job_id},
+            ProjectionExpression='connectionId',
+            ConsistentRead=True
+        ).get('Item') or {}
+        return item.get('connectionId')
+    except Exception as e:
+        logger.error(f"Error reading connection for job {job_id}: {str(e)}")
+        return None
+
 def update_job_status(job_id: str, status: str, message: str):
     """Update job status in DynamoDB."""
     try:
@@ -544,15 +1005,18 @@ def send_progress_update(connection_id: str, job_id: str, status: str, message:
     except Exception as e:
         logger.error(f"Error sending progress update: {str(e)}")
 
-def send_final_result(connection_id: str, job_id: str, result: Dict[str, Any]):
+def send_final_result(connection_id: str, job_id: str, result: Dict[str, Any], replayed: bool = False):
     """Send final result to WebSocket client."""
     try:
-        send_message_to_client(connection_id, {
+        message = {
             'type': 'job_completed',
             'jobId': job_id,
             'result': result,
             'timestamp': int(time.time())
-        })
+        }
+        if replayed:
+            message['replayed'] = True
+        send_message_to_client(connection_id, message)
     except Exception as e:
         logger.error(f"Error sending final result: {str(e)}")
 
@@ -569,16 +1033,25 @@ def send_error_result(connection_id: str, job_id: str, error_message: str):
         logger.error(f"Error sending error result: {str(e)}")
 
 def send_message_to_client(connection_id: str, message: Dict[str, Any]):
-    """Send message to WebSocket client."""
+    """Send message to WebSocket client, through the job event log while the job is running."""
+    with event_logs_lock:
+        event_log = event_logs.get(message.get('jobId'))
+    if event_log:
+        event_log.publish(message)
+    else:
+        deliver_message(connection_id, message)
+
+def deliver_message(connection_id: str, message: Dict[str, Any]) -> bool:
+    """Post a message to a connection; False only when the connection is gone."""
     try:
-        apigateway_management.post_to_connection(
-            ConnectionId=connection_id,
-            Data=json.dumps(message)
-        )
-        logger.info(f"Message sent to connection: {connection_id}")
+        frames = post_message(apigateway_management, connection_id, message)
+        logger.info(f"Sent {message.get('type', 'unknown')} to connection: {connection_id} ({frames} frame(s))")
+        return True
         
     except apigateway_management.exceptions.GoneException:
         logger.warning(f"Connection {connection_id} is gone")
+        return False
         
     except Exception as e:
         logger.error(f"Error sending message to {connection_id}: {str(e)}")
+        return True
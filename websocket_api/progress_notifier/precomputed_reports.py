@@ -0,0 +1,283 @@
+"""
+Precomputed answers for the standard FinOps reports.
+
+A handful of questions (month-to-date cost, the 6-month trend, the Trusted
+Advisor summary, budget status and the comprehensive analysis) account for
+most traffic and each takes tens of seconds of agent and Bedrock time. A
+scheduled run of the supervisor (``{"action": "precompute_reports"}`` or an
+EventBridge scheduled event) answers them off-peak and stores the rendered
+answer with its structured facts. Incoming queries that match a standard
+report are then answered from the store, with a note giving the age of the
+data, until the stored copy expires.
+
+Matching is deliberately conservative: a query matches only when every word
+is part of the report's vocabulary, so "What are my current AWS costs?"
+matches but "What are my S3 costs in May?" does not.
+
+Reports are stored as JSON in ``PRECOMPUTED_REPORTS_BUCKET`` (S3) or, for
+local runs, ``PRECOMPUTED_REPORTS_DIR``; without either the feature is off.
+
+This file is shared verbatim by the supervisor and the progress notifier.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Filler words that never change which report a query asks for
+STOPWORDS = {
+    'what', 'whats', 'are', 'is', 'was', 'my', 'me', 'i', 'im', 'the', 'of', 'for', 'a', 'an',
+    'show', 'give', 'tell', 'do', 'does', 'have', 'any', 'please', 'aws', 'in', 'on', 'can',
+    'you', 'provide', 'get', 'see', 'need', 'our', 'we', 'us', 'with', 'about', 'how',
+    'much', 'from', 'all', 'current', 'currently', 'latest', 'overview', 'summary', 'report'
+}
+
+STANDARD_REPORTS: List[Dict[str, Any]] = [
+    {
+        'id': 'comprehensive_analysis',
+        'title': 'Comprehensive FinOps analysis',
+        'query': 'I need a complete financial analysis of my AWS environment',
+        'agents': ['cost_forecast', 'trusted_advisor', 'budget_management'],
+        'required': [{'complete', 'comprehensive', 'full'}, {'analysis', 'review', 'assessment'}],
+        'vocabulary': {'financial', 'finops', 'environment', 'account', 'cost', 'spend', 'spending', 'usage'}
+    },
+    {
+        'id': 'cost_trend_6_months',
+        'title': '6-month cost trend',
+        'query': 'Show me my AWS cost trend over the last 6 months',
+        'agents': ['cost_forecast'],
+        'required': [{'trend', 'history', 'historical'}],
+        'vocabulary': {'cost', 'spend', 'spending', 'last', 'past', '6', 'six', 'month', 'monthly', 'over',
+                       'time'}
+    },
+    {
+        'id': 'trusted_advisor_summary',
+        'title': 'Trusted Advisor cost optimization summary',
+        'query': 'What are my current cost optimization recommendations from trusted advisor?',
+        'agents': ['trusted_advisor'],
+        'required': [{'recommendation', 'optimization', 'opportunity', 'saving'}],
+        'vocabulary': {'cost', 'trusted', 'advisor', 'ta', 'available'}
+    },
+    {
+        'id': 'budget_status',
+        'title': 'Budget status',
+        'query': 'Do I have any AWS budget set and if not, what is your recommendation?',
+        'agents': ['budget_management'],
+        'required': [{'budget'}],
+        'vocabulary': {'set', 'and', 'if', 'not', 'your', 'recommendation', 'status', 'am', 'doing',
+                       'tracking', 'against', 'performance'}
+    },
+    {
+        'id': 'month_to_date_cost',
+        'title': 'Month-to-date cost',
+        'query': 'What are my current AWS costs?',
+        'agents': ['cost_forecast'],
+        'required': [{'cost', 'spend', 'spending', 'spent', 'bill', 'billing'}],
+        'vocabulary': {'month', 'to', 'date', 'mtd', 'this', 'so', 'far', 'total'}
+    },
+]
+
+
+def normalize_word(word: str) -> str:
+    """Fold simple plurals so "costs" and "cost" are the same word."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def query_words(text: str) -> List[str]:
+    text = text.lower().replace("'", '').replace('’', '')
+    return [normalize_word(word) for word in re.findall(r'[a-z0-9]+', text)]
+
+
+def _normalized(words) -> set:
+    return {normalize_word(word) for word in words}
+
+
+def match_standard_report(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the standard report a query asks for, or None.
+
+    Every required word group must be present and no word may fall outside
+    the report's vocabulary, so narrower questions (a service, a month, a
+    different period) always go to the agents.
+    """
+    words = set(query_words(query)) - _normalized(STOPWORDS)
+    if not words:
+        return None
+    for report in STANDARD_REPORTS:
+        required = [_normalized(group) for group in report['required']]
+        vocabulary = _normalized(report['vocabulary']).union(*required)
+        if all(words & group for group in required) and words <= vocabulary:
+            return report
+    return None
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def build_record(report: Dict[str, Any], response: str, ttl_seconds: float,
+                 details: Optional[Dict[str, Any]] = None, now: Optional[float] = None) -> Dict[str, Any]:
+    """Assemble the stored form of a freshly computed report."""
+    now = time.time() if now is None else now
+    record = {
+        'report_id': report['id'],
+        'title': report['title'],
+        'query': report['query'],
+        'agents': report['agents'],
+        'response': response,
+        'generated_at': now,
+        'expires_at': now + ttl_seconds
+    }
+    record.update(details or {})
+    return record
+
+
+def freshness(record: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """Freshness indicator returned alongside a precomputed answer."""
+    now = time.time() if now is None else now
+    return {
+        'report_id': record['report_id'],
+        'generated_at': _iso(record['generated_at']),
+        'expires_at': _iso(record['expires_at']),
+        'age_seconds': int(max(now - record['generated_at'], 0)),
+        'fresh': now < record['expires_at']
+    }
+
+
+def _format_age(seconds: int) -> str:
+    if seconds < 60:
+        return 'just now'
+    hours, minutes = divmod(seconds // 60, 60)
+    return f"{hours}h {minutes}m ago" if hours else f"{minutes}m ago"
+
+
+def render_precomputed(record: Dict[str, Any], indicator: Dict[str, Any]) -> str:
+    """The stored answer with a note saying when its data was gathered."""
+    generated = time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(record['generated_at']))
+    refresh = time.strftime('%H:%M UTC', time.gmtime(record['expires_at']))
+    note = (f"> ⚡ Precomputed report: {record['title']} · data as of {generated} "
+            f"({_format_age(indicator['age_seconds'])}) · refreshed by {refresh}")
+    return f"{note}\n\n{record['response']}"
+
+
+class PrecomputedReportStore:
+    """Reports stored as JSON objects, with a short read cache in the warm container."""
+
+    def __init__(self, bucket: Optional[str] = None, directory: Optional[str] = None,
+                 cache_seconds: Optional[float] = None):
+        self.bucket = bucket if bucket is not None else os.environ.get('PRECOMPUTED_REPORTS_BUCKET', '')
+        self.directory = directory if directory is not None else os.environ.get('PRECOMPUTED_REPORTS_DIR', '')
+        self.prefix = os.environ.get('PRECOMPUTED_REPORTS_PREFIX', 'precomputed-reports/')
+        self.cache_seconds = cache_seconds if cache_seconds is not None else \
+            float(os.environ.get('PRECOMPUTED_REPORTS_CACHE_SECONDS', '60'))
+        self._cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._s3_client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bucket or self.directory)
+
+    def _s3(self):
+        if self._s3_client is None:
+            import boto3
+            self._s3_client = boto3.client('s3')
+        return self._s3_client
+
+    def _key(self, report_id: str) -> str:
+        return f"{self.prefix}{report_id}.json"
+
+    def _read(self, report_id: str) -> Optional[Dict[str, Any]]:
+        if self.bucket:
+            try:
+                body = self._s3().get_object(Bucket=self.bucket, Key=self._key(report_id))['Body'].read()
+            except Exception as e:
+                if getattr(e, 'response', {}).get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                    logger.warning(f"Could not read precomputed report {report_id}: {str(e)}")
+                return None
+            return json.loads(body)
+        path = os.path.join(self.directory, self._key(report_id))
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Stored record for a report, None when absent or unreadable (misses are cached too)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(report_id)
+            if cached and cached[0] > now:
+                return cached[1]
+        record = self._read(report_id)
+        with self._lock:
+            self._cache[report_id] = (now + self.cache_seconds, record)
+        return record
+
+    def put(self, record: Dict[str, Any]):
+        data = json.dumps(record, default=str)
+        if self.bucket:
+            self._s3().put_object(Bucket=self.bucket, Key=self._key(record['report_id']),
+                                  Body=data.encode('utf-8'), ContentType='application/json')
+        else:
+            path = os.path.join(self.directory, self._key(record['report_id']))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(data)
+        with self._lock:
+            self._cache[record['report_id']] = (time.time() + self.cache_seconds, record)
+
+
+# Shared across invocations in a warm container
+_report_store = None
+
+
+def get_report_store() -> PrecomputedReportStore:
+    """Return the container-wide report store."""
+    global _report_store
+    if _report_store is None:
+        _report_store = PrecomputedReportStore()
+    return _report_store
+
+
+def lookup_precomputed(query: str, now: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Find a fresh precomputed answer for a query.
+
+    Returns:
+        (record, freshness indicator), or None when the query is not a
+        standard report or no unexpired copy is stored
+    """
+    store = get_report_store()
+    if not store.enabled:
+        return None
+    report = match_standard_report(query)
+    if not report:
+        return None
+    record = store.get(report['id'])
+    if not record:
+        return None
+    indicator = freshness(record, now)
+    if not indicator['fresh']:
+        logger.info(f"Precomputed report {report['id']} expired at {indicator['expires_at']}")
+        return None
+    return record, indicator
+
+
+def is_precompute_event(event: Any) -> bool:
+    """True for the scheduled precompute trigger rather than a user query."""
+    return isinstance(event, dict) and (
+        event.get('action') == 'precompute_reports' or event.get('source') == 'aws.events'
+    )
@@ -0,0 +1,163 @@
+"""
+Chunked, compressed delivery of large WebSocket messages.
+
+API Gateway rejects WebSocket messages over 128 KB, so a full FinOps report
+cannot always be sent in one ``post_to_connection``. ``post_message`` sends a
+message unchanged when it fits in ``WS_FRAME_MAX_BYTES``. Larger messages are
+gzip-compressed, base64-encoded and split into numbered chunks:
+
+    {"type": "message_chunk", "messageId": "<uuid>", "messageType": "job_completed",
+     "jobId": "...", "seq": 0, "total": 3, "encoding": "gzip+base64", "data": "..."}
+
+With ``WS_COMPRESSION=none`` the chunks carry slices of the JSON text with
+``"encoding": "identity"``. Messages of at least ``WS_SPILL_MIN_BYTES`` are
+written to ``WS_SPILL_BUCKET`` when it is set, and the client receives a
+pre-signed URL instead:
+
+    {"type": "message_ref", "messageId": "<uuid>", "messageType": "job_completed",
+     "jobId": "...", "url": "https://...", "bytes": 2400000}
+
+Client reassembly (implemented in ``finops-ui/src/utils/websocketClient.js``):
+collect ``message_chunk`` frames by ``messageId`` until ``total`` distinct
+``seq`` values have arrived, join ``data`` in ``seq`` order, then base64-decode
+and gunzip for ``gzip+base64``. The result is the original message JSON. For
+``message_ref``, fetch ``url`` and parse the body as the original message.
+``reassemble_frames`` is the reference decoder.
+
+This file is shared verbatim by the supervisor, the progress notifier and the
+message handler.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import os
+import uuid
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# API Gateway's limit is 128 KB; the default leaves room for the frame fields
+DEFAULT_FRAME_MAX_BYTES = 100000
+
+_s3_client = None
+
+
+def _get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+
+def _spill(message: Dict[str, Any], data: bytes) -> Optional[str]:
+    """Store a message in the spill bucket and return a pre-signed URL, or None when not configured."""
+    bucket = os.environ.get('WS_SPILL_BUCKET')
+    if not bucket:
+        return None
+    key = f"websocket-messages/{message.get('jobId') or 'no-job'}/{uuid.uuid4()}.json"
+    client = _get_s3_client()
+    # Stored gzip-encoded; browsers decompress Content-Encoding: gzip transparently
+    client.put_object(Bucket=bucket, Key=key, Body=gzip.compress(data, compresslevel=6),
+                      ContentType='application/json', ContentEncoding='gzip')
+    return client.generate_presigned_url(
+        'get_object', Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=int(os.environ.get('WS_SPILL_URL_TTL_SECONDS', '3600'))
+    )
+
+
+def _split(text: str, frame: Dict[str, Any], max_bytes: int) -> List[str]:
+    """Split ``text`` into slices whose JSON-escaped form fits the frame budget."""
+    overhead = len(json.dumps(dict(frame, data='', seq=999999, total=999999)))
+    budget = max(max_bytes - overhead, 1024)
+    slices = []
+    start = 0
+    while start < len(text):
+        end = min(start + budget, len(text))
+        # Quotes and backslashes double when the slice is embedded as a JSON string
+        while len(json.dumps(text[start:end])) - 2 > budget:
+            end = start + max((end - start) // 2, 1)
+        slices.append(text[start:end])
+        start = end
+    return slices
+
+
+def build_frames(message: Dict[str, Any]) -> List[str]:
+    """
+    Serialize a message into the frames to post, in order.
+
+    Returns:
+        One frame (the plain message JSON) when it fits, otherwise a
+        ``message_ref`` frame or a sequence of ``message_chunk`` frames
+    """
+    text = json.dumps(message)
+    max_bytes = int(os.environ.get('WS_FRAME_MAX_BYTES', str(DEFAULT_FRAME_MAX_BYTES)))
+    if len(text) <= max_bytes:
+        return [text]
+
+    header = {
+        'messageId': str(uuid.uuid4()),
+        'messageType': message.get('type', 'unknown'),
+        'jobId': message.get('jobId')
+    }
+    data = text.encode('utf-8')
+
+    if len(data) >= int(os.environ.get('WS_SPILL_MIN_BYTES', '1000000')):
+        try:
+            url = _spill(message, data)
+            if url:
+                return [json.dumps(dict(header, type='message_ref', url=url, bytes=len(data)))]
+        except Exception as e:
+            logger.warning(f"WebSocket message spill failed, sending chunks: {str(e)}")
+
+    if os.environ.get('WS_COMPRESSION', 'gzip').lower() == 'gzip':
+        encoding = 'gzip+base64'
+        payload = base64.b64encode(gzip.compress(data, compresslevel=6)).decode('ascii')
+    else:
+        encoding = 'identity'
+        payload = text
+
+    frame = dict(header, type='message_chunk', encoding=encoding)
+    slices = _split(payload, frame, max_bytes)
+    frames = [json.dumps(dict(frame, seq=seq, total=len(slices), data=chunk)) for seq, chunk in enumerate(slices)]
+    logger.info(f"Chunked {header['messageType']} message: {len(text)} bytes as {len(frames)} "
+                f"{encoding} frame(s), {sum(len(f) for f in frames)} bytes sent")
+    return frames
+
+
+def post_message(client, connection_id: str, message: Dict[str, Any]) -> int:
+    """
+    Post a message to a WebSocket connection, chunking it when needed.
+
+    Client errors such as ``GoneException`` propagate to the caller.
+
+    Returns:
+        Number of frames posted
+    """
+    frames = build_frames(message)
+    for frame in frames:
+        client.post_to_connection(ConnectionId=connection_id, Data=frame)
+    return len(frames)
+
+
+def reassemble_frames(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Rebuild a message from its parsed ``message_chunk`` frames, in any order.
+
+    Raises:
+        ValueError: If chunks are missing or the encoding is unknown
+    """
+    total = frames[0]['total']
+    by_seq = {frame['seq']: frame['data'] for frame in frames}
+    if len(by_seq) != total:
+        raise ValueError(f"Expected {total} chunks, received {len(by_seq)}")
+    payload = ''.join(by_seq[seq] for seq in range(total))
+
+    encoding = frames[0]['encoding']
+    if encoding == 'gzip+base64':
+        return json.loads(gzip.decompress(base64.b64decode(payload)).decode('utf-8'))
+    if encoding == 'identity':
+        return json.loads(payload)
+    raise ValueError(f"Unsupported chunk encoding: {encoding}")